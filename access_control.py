@@ -0,0 +1,80 @@
+import hmac
+import threading
+import time
+import config
+import metrics
+
+# --- Pembatasan Percobaan Kode Akses ---
+# Kode akses hanya 3 digit, jadi tanpa batas percobaan semua kombinasi bisa dicoba dalam hitungan
+# detik (misal lewat API /api/ack). Satu AccessGuard dipakai bersama oleh input terminal dan API
+# kontrol: setelah ACCESS_MAX_FAILED_ATTEMPTS kode salah berturut-turut, semua percobaan (termasuk
+# kode yang benar) ditolak selama ACCESS_LOCKOUT_SECONDS, dan lama kunci berlipat ganda setiap kali
+# terkunci lagi sampai ACCESS_LOCKOUT_MAX_SECONDS. Kode benar mereset hitungan.
+
+
+class AccessGuard:
+    def __init__(self, code=None, max_failures=None, lockout_seconds=None, max_lockout_seconds=None, clock=time.monotonic):
+        self.code = config.ACCESS_CODE if code is None else code
+        self.max_failures = max_failures or config.ACCESS_MAX_FAILED_ATTEMPTS
+        self.lockout_seconds = config.ACCESS_LOCKOUT_SECONDS if lockout_seconds is None else lockout_seconds
+        self.max_lockout_seconds = config.ACCESS_LOCKOUT_MAX_SECONDS if max_lockout_seconds is None else max_lockout_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._consecutive_lockouts = 0 # Kunci berturut-turut tanpa kode benar di antaranya (untuk backoff)
+        self._locked_until = 0.0
+        self.failures = 0
+        self.lockouts = 0
+        self.rejected_while_locked = 0
+
+    def remaining_lockout(self):
+        with self._lock:
+            return max(0.0, self._locked_until - self.clock())
+
+    def check(self, entered_code):
+        """Mengembalikan (benar, pesan). Selama terkunci, kode tidak dibandingkan sama sekali."""
+        with self._lock:
+            remaining = self._locked_until - self.clock()
+            if remaining > 0:
+                self.rejected_while_locked += 1
+                return False, f"Terlalu banyak kode salah. Coba lagi dalam {remaining:.0f} detik."
+            # compare_digest: waktu perbandingan tidak bergantung pada berapa karakter awal yang cocok
+            if hmac.compare_digest(str(entered_code or "").encode("utf-8"), str(self.code).encode("utf-8")):
+                self._consecutive_failures = 0
+                self._consecutive_lockouts = 0
+                return True, "Kode akses benar."
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._consecutive_failures < self.max_failures:
+                return False, "Kode akses salah."
+            duration = min(self.lockout_seconds * (2 ** self._consecutive_lockouts), self.max_lockout_seconds)
+            self._consecutive_failures = 0
+            self._consecutive_lockouts += 1
+            self._locked_until = self.clock() + duration
+            self.lockouts += 1
+        print(f"Peringatan: {self.max_failures} kode akses salah berturut-turut. Kode akses dikunci {duration:.0f} detik.", flush=True)
+        return False, f"Kode akses salah. Terlalu banyak percobaan, coba lagi dalam {duration:.0f} detik."
+
+    def stats(self):
+        return {"failures": self.failures, "lockouts": self.lockouts, "rejected_while_locked": self.rejected_while_locked}
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+
+def get_guard():
+    """AccessGuard bersama untuk semua jalur input kode di proses ini (terminal dan API kontrol)."""
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = AccessGuard()
+        return _guard
+
+
+def check_code(entered_code):
+    return get_guard().check(entered_code)
+
+
+metrics.register_counter("objsec_access_code_failures_total", lambda: _guard.failures if _guard is not None else 0, "Kode akses salah yang dimasukkan")
+metrics.register_counter("objsec_access_code_lockouts_total", lambda: _guard.lockouts if _guard is not None else 0, "Berapa kali kode akses dikunci karena terlalu banyak kode salah")
@@ -0,0 +1,296 @@
+import argparse
+import datetime
+import glob
+import gzip
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import config
+import metrics
+
+# --- Log Aktivitas Append-Only (JSON Lines) ---
+# Setiap hari punya satu file log_activity/YYYY-MM-DD.jsonl, satu entri JSON per baris.
+# Entri hanya ditambahkan di akhir file, jadi tidak ada lagi baca-ubah-tulis seluruh file
+# dan crash saat menulis paling banyak merusak baris terakhir saja.
+# File hari yang sudah lewat dikompres menjadi YYYY-MM-DD.jsonl.gz oleh maintenance.py.
+
+LOG_EXTENSION = ".jsonl"
+LEGACY_EXTENSION = ".json"
+COMPRESSED_EXTENSION = ".jsonl.gz"
+
+
+def log_file_path(date_str, log_dir=None):
+    return os.path.join(log_dir or config.LOG_DIR, f"{date_str}{LOG_EXTENSION}")
+
+
+def ends_with_newline(path):
+    """True jika file kosong/tidak ada atau karakter terakhirnya baris baru."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return True
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class ActivityLogWriter:
+    """
+    Menulis entri log di thread latar belakang. Entri dikumpulkan dari antrian
+    terbatas lalu ditulis per batch (maksimal `batch_size` entri atau setiap
+    `flush_interval` detik), dengan fsync opsional.
+    """
+
+    def __init__(self, log_dir=None, queue_size=None, batch_size=None, flush_interval=None, fsync=None, put_timeout=None, event_store=None):
+        self.log_dir = log_dir or config.LOG_DIR
+        self.event_store = event_store # Opsional: event_store.EventStore, diisi dari thread penulis yang sama
+        self.batch_size = batch_size or config.LOG_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else config.LOG_FLUSH_INTERVAL
+        self.fsync = config.LOG_FSYNC if fsync is None else fsync
+        self.put_timeout = put_timeout if put_timeout is not None else config.LOG_QUEUE_PUT_TIMEOUT
+
+        self._queue = queue.Queue(maxsize=queue_size or config.LOG_QUEUE_SIZE)
+        self._checked_dates = set()
+        self._closed = False
+        self.entries_written = 0
+        self.entries_dropped = 0 # Entri yang dibuang karena antrian penuh terlalu lama
+        self._dropped_lock = threading.Lock() # write() dipanggil dari beberapa thread
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        # Migrasi hanya lewat `python activity_log.py migrate`, tidak diam-diam saat start
+        legacy_files = legacy_log_files(self.log_dir)
+        if legacy_files:
+            print(f"Peringatan: {len(legacy_files)} file log format lama (.json) di {self.log_dir}. "
+                  f"Jalankan `python activity_log.py migrate` untuk mengubahnya ke JSON Lines.", flush=True)
+
+        self._thread = threading.Thread(target=self._run, name="activity_log_writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, log_data):
+        """
+        Memasukkan entri ke antrian. Tanggal file ditentukan saat entri dibuat, bukan saat ditulis.
+        Entri diberi field 'datetime' (tanggal + jam lengkap) karena 'timestamp' hanya berisi jam.
+        Yang diantrikan adalah salinan: dict milik pemanggil (juga dipakai sink event lain) tidak diubah.
+        """
+        if self._closed:
+            return False
+        now = datetime.datetime.now()
+        date_str = now.strftime("%Y-%m-%d")
+        entry = dict(log_data)
+        entry.setdefault("datetime", now.isoformat(sep=" ", timespec="milliseconds"))
+        try:
+            self._queue.put((date_str, entry), timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            with self._dropped_lock:
+                self.entries_dropped += 1
+            print(f"Peringatan: Antrian log penuh, entri '{log_data.get('event')}' dibuang.", flush=True)
+            return False
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            batch = []
+            # Setelah entri pertama datang, tunggu entri lain maksimal flush_interval detik lalu tulis sekaligus
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                write_start = time.perf_counter()
+                self._write_batch(batch)
+                metrics.observe_stage("log_write", time.perf_counter() - write_start)
+                for _ in batch:
+                    self._queue.task_done()
+            if item is None: # Sinyal berhenti dari close(), semua entri sebelumnya sudah ditulis
+                self._queue.task_done()
+                running = False
+        if self.event_store is not None:
+            self.event_store.close() # Koneksi SQLite hanya boleh ditutup dari thread yang membukanya
+
+    def _write_batch(self, batch):
+        entries_by_date = {}
+        for date_str, log_data in batch:
+            entries_by_date.setdefault(date_str, []).append(log_data)
+
+        for date_str, entries in entries_by_date.items():
+            lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+            path = log_file_path(date_str, self.log_dir)
+            try:
+                if date_str not in self._checked_dates:
+                    # Baris terakhir bisa terpotong karena crash sebelumnya, mulai di baris baru agar entri baru tidak ikut rusak
+                    if not ends_with_newline(path):
+                        lines = "\n" + lines
+                    self._checked_dates.add(date_str)
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                self.entries_written += len(entries)
+            except OSError as e:
+                print(f"Error menulis log aktivitas {date_str}: {e}", flush=True)
+
+        if self.event_store is not None:
+            try:
+                self.event_store.insert_entries(batch)
+            except sqlite3.Error as e:
+                print(f"Error menyimpan event ke database: {e}", flush=True)
+
+    def flush(self):
+        """Menunggu sampai semua entri di antrian sudah ditulis ke disk."""
+        self._queue.join()
+
+    def close(self):
+        """Menulis sisa entri lalu menghentikan thread penulis."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+# --- Pembaca Log ---
+def read_log_file(path):
+    """
+    Membaca satu file log (JSON Lines, JSON Lines terkompres gzip, atau array JSON format lama).
+    Baris yang rusak (misal terpotong karena crash) dilewati.
+    """
+    if path.endswith(LEGACY_EXTENSION):
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                print(f"Peringatan: File log {path} rusak dan tidak bisa dibaca.")
+                return []
+
+    entries = []
+    opener = gzip.open if path.endswith(COMPRESSED_EXTENSION) else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Peringatan: Baris {line_number} di {path} rusak, dilewati.")
+    return entries
+
+
+def read_activity_log(date_str, log_dir=None):
+    """Membaca semua entri log pada tanggal tertentu (YYYY-MM-DD), termasuk bagian yang sudah dikompres."""
+    log_dir = log_dir or config.LOG_DIR
+    entries = []
+    for extension in (LEGACY_EXTENSION, COMPRESSED_EXTENSION, LOG_EXTENSION):
+        path = os.path.join(log_dir, f"{date_str}{extension}")
+        if os.path.exists(path):
+            entries.extend(read_log_file(path))
+    return entries
+
+
+def list_log_dates(log_dir=None):
+    """Tanggal (YYYY-MM-DD) yang punya file log, terurut."""
+    log_dir = log_dir or config.LOG_DIR
+    dates = set()
+    for path in glob.glob(os.path.join(log_dir, "*.json*")):
+        name = os.path.basename(path)
+        if name.endswith(LOG_EXTENSION) or name.endswith(LEGACY_EXTENSION) or name.endswith(COMPRESSED_EXTENSION):
+            dates.add(name.split(".")[0])
+    return sorted(dates)
+
+
+# --- Migrasi Sekali Jalan dari Array JSON Harian ---
+def legacy_log_files(log_dir=None):
+    """File log lama YYYY-MM-DD.json (array JSON) yang belum dimigrasi."""
+    return sorted(glob.glob(os.path.join(log_dir or config.LOG_DIR, f"*{LEGACY_EXTENSION}")))
+
+
+def migrate_legacy_logs(log_dir=None):
+    """
+    Mengubah file lama YYYY-MM-DD.json (array JSON) menjadi YYYY-MM-DD.jsonl.
+    Entri lama ditaruh sebelum entri .jsonl yang sudah ada, file lama disimpan sebagai .json.bak.
+    Tanggal hari ini dilewati karena .jsonl-nya masih ditambah ActivityLogWriter yang berjalan,
+    dan .jsonl yang berubah selama migrasi tidak ditimpa. Memakai lock yang sama dengan maintenance.py.
+    """
+    import maintenance # Impor lokal: maintenance.py mengimpor modul ini
+    log_dir = log_dir or config.LOG_DIR
+    lock = maintenance.MaintenanceLock()
+    if not lock.acquire():
+        print("Pemeliharaan log sedang berjalan di proses lain. Migrasi dibatalkan, coba lagi nanti.")
+        return 0
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    migrated = 0
+    try:
+        for legacy_path in legacy_log_files(log_dir):
+            date_str = os.path.basename(legacy_path)[:-len(LEGACY_EXTENSION)]
+            if date_str == today:
+                print(f"Log {os.path.basename(legacy_path)} dilewati: log hari ini masih ditulis. Jalankan migrate lagi besok.")
+                continue
+            legacy_entries = read_log_file(legacy_path)
+            target_path = log_file_path(date_str, log_dir)
+            target_state = file_state(target_path)
+            existing_entries = read_log_file(target_path) if target_state is not None else []
+
+            temp_path = target_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for entry in legacy_entries + existing_entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if file_state(target_path) != target_state:
+                # Ada entri yang ditambahkan setelah file dibaca; menimpa file akan menghilangkannya
+                os.remove(temp_path)
+                print(f"Log {os.path.basename(target_path)} berubah selama migrasi dan tidak ditimpa. Jalankan migrate lagi.")
+                continue
+            os.replace(temp_path, target_path)
+            os.replace(legacy_path, legacy_path + ".bak")
+            migrated += 1
+            print(f"Log {os.path.basename(legacy_path)} dimigrasi ke {os.path.basename(target_path)} ({len(legacy_entries)} entri).")
+    finally:
+        lock.release()
+    return migrated
+
+
+def file_state(path):
+    """(ukuran, mtime) file, None jika tidak ada. Dipakai mendeteksi penulisan di antara baca dan ganti."""
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_size, info.st_mtime_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alat log aktivitas (JSON Lines)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="Migrasi file log lama (array JSON) ke JSON Lines")
+    show = subparsers.add_parser("show", help="Tampilkan log pada tanggal tertentu")
+    show.add_argument("date", help="Tanggal YYYY-MM-DD")
+    subparsers.add_parser("dates", help="Daftar tanggal yang punya log")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        print(f"{migrate_legacy_logs()} file log dimigrasi.")
+    elif args.command == "show":
+        for entry in read_activity_log(args.date):
+            print(json.dumps(entry, ensure_ascii=False))
+    elif args.command == "dates":
+        print("\n".join(list_log_dates()))
+
+
+if __name__ == "__main__":
+    main()
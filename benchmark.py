@@ -0,0 +1,1560 @@
+import argparse
+import datetime
+import json
+import os
+import time
+import numpy as np
+
+# --- Frame Sintetis untuk Benchmark ---
+def make_synthetic_frames(count, width=640, height=480, seed=0):
+    """Membuat frame acak yang sama setiap kali dijalankan (seed tetap)."""
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def cpu_count_used():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def print_table(rows, columns):
+    widths = [max(len(col), *(len(str(row[col])) for row in rows)) for col in columns]
+    print("  ".join(col.ljust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[col]).ljust(w) for col, w in zip(columns, widths)))
+
+
+def write_json(results, output_path):
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Hasil benchmark disimpan: {output_path}")
+
+
+# --- Benchmark Multi-Kamera: Inferensi Batch ---
+def benchmark_multicam(args):
+    """
+    Mengukur frame/detik dan frame/detik/core untuk N aliran kamera yang
+    diinferensi bersama dalam satu panggilan model (utils.detect_objects_batch).
+    frame/detik/core dihitung dari waktu CPU proses, jadi tidak tergantung jumlah thread torch.
+    """
+    import utils
+
+    results = []
+    for streams in args.streams:
+        frames = make_synthetic_frames(streams, args.width, args.height, seed=streams)
+        for _ in range(args.warmup):
+            utils.detect_objects_batch(frames)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        for _ in range(args.iterations):
+            utils.detect_objects_batch(frames)
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+
+        total_frames = streams * args.iterations
+        results.append({
+            "streams": streams,
+            "frames": total_frames,
+            "fps": round(total_frames / wall_time, 2),
+            "fps_per_core": round(total_frames / cpu_time, 2),
+            "batch_latency_ms": round(wall_time / args.iterations * 1000, 1),
+        })
+
+    print(f"\nInferensi batch multi-kamera ({args.width}x{args.height}, {cpu_count_used()} core tersedia)")
+    print_table(results, ["streams", "frames", "fps", "fps_per_core", "batch_latency_ms"])
+    write_json({"benchmark": "multicam", "cpu_count": cpu_count_used(), "results": results}, args.output)
+
+
+# --- Benchmark Backend Inferensi: Akurasi dan Latensi terhadap Model .pt ---
+def load_frames(video_path, count, width, height):
+    """Mengambil `count` frame pertama dari file video, atau frame sintetis jika tidak ada video."""
+    if not video_path:
+        return make_synthetic_frames(count, width, height)
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"Tidak ada frame yang bisa dibaca dari {video_path}")
+    return frames
+
+
+def box_iou(boxes_a, boxes_b):
+    """Matriks IoU antara dua kumpulan box xyxy."""
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def match_detections(reference, candidate, iou_threshold=0.5):
+    """
+    Mencocokkan deteksi kandidat dengan referensi (kelas sama, IoU >= ambang, greedy).
+    Mengembalikan (jumlah cocok, total IoU dari pasangan yang cocok).
+    """
+    ref_boxes, _, ref_classes = reference
+    cand_boxes, _, cand_classes = candidate
+    if not len(ref_boxes) or not len(cand_boxes):
+        return 0, 0.0
+    iou = box_iou(ref_boxes, cand_boxes)
+    iou[ref_classes[:, None] != cand_classes[None, :]] = 0
+    matches, iou_sum = 0, 0.0
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < iou_threshold:
+            break
+        matches += 1
+        iou_sum += float(iou[i, j])
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return matches, iou_sum
+
+
+def benchmark_backends(args):
+    """
+    Menjalankan set frame yang sama pada setiap backend dan membandingkannya
+    dengan backend 'torch' (.pt): latensi per frame serta kecocokan deteksi.
+    """
+    import config
+    import inference_backend
+
+    frames = load_frames(args.video, args.frames, args.width, args.height)
+    conf_threshold = args.conf if args.conf is not None else config.CONFIDENCE_THRESHOLD
+    outputs = {}
+    results = []
+    for backend_name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        try:
+            backend = inference_backend.load_backend(backend_name)
+        except FileNotFoundError as e:
+            print(f"Lewati backend '{backend_name}': {e}")
+            continue
+
+        for frame in frames[:args.warmup]:
+            backend.predict([frame], conf_threshold)
+        latencies = []
+        backend_outputs = []
+        for frame in frames:
+            start_time = time.perf_counter()
+            backend_outputs.extend(backend.predict([frame], conf_threshold))
+            latencies.append((time.perf_counter() - start_time) * 1000)
+        outputs[backend_name] = backend_outputs
+
+        reference = outputs["torch"]
+        ref_total = sum(len(o[0]) for o in reference)
+        cand_total = sum(len(o[0]) for o in backend_outputs)
+        matched, iou_sum = 0, 0.0
+        for ref_output, cand_output in zip(reference, backend_outputs):
+            m, s = match_detections(ref_output, cand_output)
+            matched += m
+            iou_sum += s
+        same_counts = sum(
+            np.array_equal(np.sort(r[2]), np.sort(c[2])) for r, c in zip(reference, backend_outputs)
+        )
+
+        results.append({
+            "backend": backend_name,
+            "latency_ms_mean": round(float(np.mean(latencies)), 1),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 1),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 1),
+            "detections": cand_total,
+            "recall_vs_pt": round(matched / ref_total, 3) if ref_total else 1.0,
+            "precision_vs_pt": round(matched / cand_total, 3) if cand_total else 1.0,
+            "mean_iou": round(iou_sum / matched, 3) if matched else 0.0,
+            "same_counts_ratio": round(same_counts / len(frames), 3),
+        })
+
+    print(f"\nPerbandingan backend ({len(frames)} frame, conf={conf_threshold})")
+    print_table(results, ["backend", "latency_ms_mean", "latency_ms_p50", "latency_ms_p95", "detections", "recall_vs_pt", "precision_vs_pt", "mean_iou", "same_counts_ratio"])
+    write_json({"benchmark": "backends", "frames": len(frames), "conf": conf_threshold, "results": results}, args.output)
+
+
+# --- Benchmark Tracker: Throughput untuk Banyak Track Bersamaan ---
+def synthetic_scene(objects, frames, width, height, miss_rate, jitter, seed=0):
+    """
+    Objek sintetis (sebagian diam, sebagian bergerak lurus dan memantul di tepi frame).
+    Mengembalikan box ground truth per frame (frames x objects x 4), kelas, dan mask terdeteksi.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = rng.uniform(20, 60, size=(objects, 2))
+    positions = rng.uniform(0, 1, size=(objects, 2)) * (np.array([width, height]) - sizes)
+    velocities = rng.uniform(-3, 3, size=(objects, 2)) * (rng.uniform(size=(objects, 1)) < 0.5) # Piksel per frame
+    class_ids = rng.choice([39, 41, 63, 67], size=objects) # bottle, cup, laptop, cell phone
+
+    boxes = np.empty((frames, objects, 4), dtype=np.float32)
+    for frame_index in range(frames):
+        boxes[frame_index, :, :2] = positions
+        boxes[frame_index, :, 2:] = positions + sizes
+        positions = positions + velocities
+        out_of_bounds = (positions < 0) | (positions + sizes > np.array([width, height]))
+        velocities[out_of_bounds] *= -1
+    noisy = boxes + rng.normal(0, jitter, size=boxes.shape).astype(np.float32)
+    detected = rng.uniform(size=(frames, objects)) >= miss_rate
+    return boxes, noisy, class_ids, detected
+
+
+def benchmark_tracker(args):
+    """
+    Mengukur waktu update tracker untuk 100+ objek bersamaan, dengan deteksi yang
+    berkedip (miss rate) dan deteksi hanya setiap N frame (track coasting di antaranya).
+    Kualitas diukur dengan jumlah pergantian ID (ID switch) terhadap ground truth.
+    """
+    import utils
+    import tracker
+
+    results = []
+    frame_interval = 1.0 / args.fps
+    for objects in args.objects:
+        gt_boxes, noisy_boxes, class_ids, detected = synthetic_scene(objects, args.frames, args.width, args.height, args.miss_rate, args.jitter, seed=objects)
+        object_tracker = tracker.Tracker(max_coast_seconds=max(3.0, args.detect_every * frame_interval * 2))
+        update_times, predict_times = [], []
+        last_track_ids = np.zeros(objects, dtype=np.int64)
+        id_switches = 0
+        tracked_frames = 0
+
+        for frame_index in range(args.frames):
+            timestamp = frame_index * frame_interval
+            if frame_index % args.detect_every == 0:
+                keep = detected[frame_index]
+                detections = np.empty(int(keep.sum()), dtype=utils.DETECTION_DTYPE)
+                detections['class_id'] = class_ids[keep]
+                detections['x1'], detections['y1'], detections['x2'], detections['y2'] = noisy_boxes[frame_index, keep].T
+                detections['conf'] = 0.9
+                start_time = time.perf_counter()
+                tracks = object_tracker.update(detections, timestamp)
+                update_times.append((time.perf_counter() - start_time) * 1000)
+            else:
+                start_time = time.perf_counter()
+                tracks = object_tracker.tracks(timestamp) # Posisi prediksi saat tidak ada deteksi
+                predict_times.append((time.perf_counter() - start_time) * 1000)
+
+            # Pergantian ID: track yang paling cocok dengan objek ground truth berbeda dari sebelumnya
+            if len(tracks):
+                iou = tracker.iou_matrix(gt_boxes[frame_index], tracker.detection_boxes(tracks))
+                gt_indices, track_indices = tracker.greedy_match(iou, 0.3)
+                track_ids = tracks['track_id'][track_indices]
+                previous = last_track_ids[gt_indices]
+                id_switches += int(((previous != 0) & (previous != track_ids)).sum())
+                last_track_ids[gt_indices] = track_ids
+                tracked_frames += len(gt_indices)
+
+        results.append({
+            "objects": objects,
+            "updates": len(update_times),
+            "update_ms_mean": round(float(np.mean(update_times)), 3),
+            "update_ms_p95": round(float(np.percentile(update_times, 95)), 3),
+            "updates_per_s": round(1000 / float(np.mean(update_times)), 1),
+            "predict_ms_mean": round(float(np.mean(predict_times)), 3) if predict_times else 0.0,
+            "coverage": round(tracked_frames / (objects * args.frames), 3),
+            "id_switches": id_switches,
+        })
+
+    print(f"\nTracker ({args.frames} frame, deteksi setiap {args.detect_every} frame, miss rate {args.miss_rate})")
+    print_table(results, ["objects", "updates", "update_ms_mean", "update_ms_p95", "updates_per_s", "predict_ms_mean", "coverage", "id_switches"])
+    write_json({"benchmark": "tracker", "frames": args.frames, "detect_every": args.detect_every, "miss_rate": args.miss_rate, "results": results}, args.output)
+
+
+# --- Benchmark Zona: Inferensi Frame Penuh vs Crop Zona ---
+def benchmark_roi(args):
+    """
+    Membandingkan latensi inferensi frame penuh dengan inferensi crop zona saja
+    (zones.detect_in_zones, semua crop dalam satu batch). Zona diambil dari config.ZONES,
+    atau dua zona contoh (rak kiri atas dan kanan bawah) jika config.ZONES kosong.
+    """
+    import utils
+    import zones
+
+    frames = load_frames(args.video, args.frames, args.width, args.height)
+    height, width = frames[0].shape[:2]
+    zone_list = zones.load_zones()
+    if not zone_list:
+        zone_list = [
+            zones.Zone("contoh_kiri_atas", [[width // 10, height // 10], [width * 4 // 10, height // 10], [width * 4 // 10, height * 4 // 10], [width // 10, height * 4 // 10]]),
+            zones.Zone("contoh_kanan_bawah", [[width * 6 // 10, height * 6 // 10], [width * 9 // 10, height * 6 // 10], [width * 9 // 10, height * 9 // 10], [width * 6 // 10, height * 9 // 10]]),
+        ]
+
+    def measure(detect):
+        for frame in frames[:args.warmup]:
+            detect(frame)
+        latencies, detection_total = [], 0
+        for frame in frames:
+            start_time = time.perf_counter()
+            detections = detect(frame)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            detection_total += len(detections)
+        return latencies, detection_total
+
+    crop_pixels = sum((box[2] - box[0]) * (box[3] - box[1]) for box in (zone.crop_box(frames[0].shape) for zone in zone_list))
+    crops = [frames[0][y1:y2, x1:x2] for x1, y1, x2, y2 in (zone.crop_box(frames[0].shape) for zone in zone_list)]
+    modes = [
+        ("full_frame", f"{width}x{height}", lambda frame: utils.detect_objects_array(frame)),
+        ("roi", f"{len(zone_list)} crop @ {zones.zone_imgsz(crops)}", lambda frame: zones.detect_in_zones(frame, zone_list)[0]),
+    ]
+    results = []
+    for mode, model_input, detect in modes:
+        latencies, detection_total = measure(detect)
+        results.append({
+            "mode": mode,
+            "input": model_input,
+            "pixels": width * height if mode == "full_frame" else crop_pixels,
+            "latency_ms_mean": round(float(np.mean(latencies)), 1),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 1),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 1),
+            "detections": detection_total,
+        })
+    results[1]["speedup"] = round(results[0]["latency_ms_mean"] / results[1]["latency_ms_mean"], 2)
+    results[0]["speedup"] = 1.0
+
+    print(f"\nInferensi frame penuh vs zona ({len(frames)} frame, zona: {', '.join(zone.name for zone in zone_list)})")
+    print_table(results, ["mode", "input", "pixels", "latency_ms_mean", "latency_ms_p50", "latency_ms_p95", "detections", "speedup"])
+    write_json({"benchmark": "roi", "frames": len(frames), "zones": [zone.name for zone in zone_list], "results": results}, args.output)
+
+
+def benchmark_preprocess(args):
+    """
+    Jalur lama (cek frame kosong pada semua piksel, frame penuh ke backend) vs preprocessing
+    baru (cek kosong dari sampel piksel, resize sekali ke imgsz, kotak dipetakan kembali) per
+    resolusi sumber, termasuk kecocokan deteksi. Dengan --budget, imgsz adaptif diuji pada
+    fase idle -> beban CPU (--load-procs proses sibuk) -> idle.
+    """
+    import subprocess
+    import sys
+    import config
+    import preprocess
+    import utils
+
+    model = utils.get_model()
+    conf_threshold = args.conf
+
+    def old_path(frame):
+        start_time = time.perf_counter()
+        if np.all(frame == 0):
+            return None
+        prepare_ms = (time.perf_counter() - start_time) * 1000
+        start_time = time.perf_counter()
+        output = model.predict([frame], conf_threshold, None, config.INFERENCE_IMGSZ)[0]
+        return output, prepare_ms, (time.perf_counter() - start_time) * 1000
+
+    def new_path(frame):
+        start_time = time.perf_counter()
+        model_frame, scale = preprocess.prepare(frame, config.INFERENCE_IMGSZ)
+        prepare_ms = (time.perf_counter() - start_time) * 1000
+        start_time = time.perf_counter()
+        xyxy, confidences, class_ids = model.predict([model_frame], conf_threshold, None, config.INFERENCE_IMGSZ)[0]
+        model_ms = (time.perf_counter() - start_time) * 1000
+        return (xyxy / np.array([scale[0], scale[1], scale[0], scale[1]], dtype=np.float32), confidences, class_ids), prepare_ms, model_ms
+
+    rows = []
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.split("x"))
+        frames = load_frames(args.video, args.frames, width, height) if args.video else make_synthetic_frames(args.frames, width, height)
+        if args.video:
+            import cv2
+            frames = [cv2.resize(frame, (width, height)) for frame in frames]
+        outputs = {}
+        for mode, path in (("lama", old_path), ("baru", new_path)):
+            for frame in frames[:args.warmup]:
+                path(frame)
+            results = [path(frame) for frame in frames]
+            outputs[mode] = [result[0] for result in results]
+            prepare_ms = [result[1] for result in results]
+            model_ms = [result[2] for result in results]
+            total_ms = [a + b for a, b in zip(prepare_ms, model_ms)]
+            rows.append({"source": resolution, "mode": mode, "prepare_ms": round(float(np.mean(prepare_ms)), 2), "model_ms": round(float(np.mean(model_ms)), 1),
+                         "total_ms_mean": round(float(np.mean(total_ms)), 1), "total_ms_p95": round(float(np.percentile(total_ms, 95)), 1)})
+        matched = reference_total = 0
+        for reference, candidate in zip(outputs["lama"], outputs["baru"]):
+            matched += match_detections(reference, candidate)[0]
+            reference_total += len(reference[0])
+        rows[-1]["match"] = round(matched / reference_total, 3) if reference_total else 1.0
+        rows[-1]["speedup"] = round(rows[-2]["total_ms_mean"] / rows[-1]["total_ms_mean"], 2)
+        rows[-2]["match"], rows[-2]["speedup"] = 1.0, 1.0
+
+    print(f"\nPreprocessing lama vs baru ({config.INFERENCE_BACKEND}, imgsz {config.INFERENCE_IMGSZ}, {args.frames} frame, conf {conf_threshold})")
+    print_table(rows, ["source", "mode", "prepare_ms", "model_ms", "total_ms_mean", "total_ms_p95", "match", "speedup"])
+    report = {"benchmark": "preprocess", "git_commit": git_commit(), "backend": config.INFERENCE_BACKEND, "imgsz": config.INFERENCE_IMGSZ, "results": rows}
+
+    if args.budget:
+        # Imgsz adaptif: pengendali baru dengan budget dari argumen, dipakai oleh detect_objects_array
+        config.INFERENCE_LATENCY_BUDGET_MS = args.budget
+        preprocess._controller = None
+        width, height = (int(v) for v in args.resolutions[-1].split("x"))
+        frames = make_synthetic_frames(8, width, height)
+        adaptive_rows = []
+        for phase in ("idle", "beban", "idle"):
+            load = [subprocess.Popen([sys.executable, "-c", "while True: pass"]) for _ in range(args.load_procs if phase == "beban" else 0)]
+            try:
+                sizes, latencies = [], []
+                for index in range(args.adaptive_frames):
+                    sizes.append(preprocess.current_imgsz())
+                    start_time = time.perf_counter()
+                    utils.detect_objects_array(frames[index % len(frames)])
+                    latencies.append((time.perf_counter() - start_time) * 1000)
+            finally:
+                for process in load:
+                    process.kill()
+                    process.wait()
+            adaptive_rows.append({"phase": phase, "imgsz_start": sizes[0], "imgsz_end": sizes[-1], "imgsz_mean": round(float(np.mean(sizes))),
+                                  "latency_ms_mean": round(float(np.mean(latencies)), 1), "latency_ms_p95": round(float(np.percentile(latencies, 95)), 1),
+                                  "over_budget": round(float(np.mean(np.array(latencies) > args.budget)), 2)})
+        print(f"\nImgsz adaptif (budget {args.budget} ms, sumber {args.resolutions[-1]}, {args.load_procs} proses beban, {args.adaptive_frames} frame per fase)")
+        print_table(adaptive_rows, ["phase", "imgsz_start", "imgsz_end", "imgsz_mean", "latency_ms_mean", "latency_ms_p95", "over_budget"])
+        report["adaptive"] = {"budget_ms": args.budget, "load_procs": args.load_procs, "results": adaptive_rows}
+    write_json(report, args.output)
+
+
+def benchmark_events(args):
+    """
+    Latensi sink webhook terhadap server HTTP lokal pengganti dengan jeda respons dan tingkat
+    gagal yang diatur. Untuk setiap jeda diukur waktu publish() di thread pemanggil (yang
+    dialami loop video), latensi publish -> terkirim di sink, dan event yang gagal/dibuang,
+    dibanding lama satu POST sinkron (jika webhook dikirim langsung dari loop).
+    """
+    import threading
+    import urllib.error
+    import urllib.request
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import events
+
+    rng = np.random.default_rng(args.seed)
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(self.server.delay)
+            self.send_response(500 if rng.uniform() < self.server.fail_rate else 204)
+            self.end_headers()
+
+        def log_message(self, format, *log_args):
+            pass
+
+    class TimedWebhookSink(events.WebhookSink):
+        def __init__(self, *sink_args, **kwargs):
+            super().__init__(*sink_args, **kwargs)
+            self.latencies = []
+
+        def handle(self, event):
+            super().handle(event)
+            self.latencies.append((time.perf_counter() - event.published_at) * 1000)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.fail_rate = args.fail_rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/events"
+
+    rows = []
+    try:
+        for delay_ms in args.delays:
+            server.delay = delay_ms / 1000
+            sync_start = time.perf_counter()
+            try:
+                urllib.request.urlopen(urllib.request.Request(url, data=b"{}", method="POST"), timeout=args.timeout).read()
+            except (urllib.error.URLError, OSError):
+                pass
+            sync_ms = (time.perf_counter() - sync_start) * 1000
+
+            bus = events.EventBus()
+            sink = TimedWebhookSink(url, timeout=args.timeout)
+            worker = bus.register(sink, queue_size=args.queue_size, retries=args.retries, retry_delay=args.retry_delay)
+            publish_us = []
+            for index in range(args.events):
+                event = events.Event(events.STOCK_CHANGE, "unauthorized", {"change_details": "cup hilang (1 -> 0)", "seq": index})
+                publish_start = time.perf_counter()
+                bus.publish(event)
+                publish_us.append((time.perf_counter() - publish_start) * 1e6)
+                time.sleep(1 / args.rate)
+            bus.close(timeout=args.drain)
+            stats = worker.stats()
+            rows.append({
+                "delay_ms": delay_ms,
+                "sync_post_ms": round(sync_ms, 1),
+                "publish_us_p50": round(float(np.percentile(publish_us, 50)), 1),
+                "publish_us_max": round(float(np.max(publish_us)), 1),
+                "sink_ms_p50": round(float(np.percentile(sink.latencies, 50)), 1) if sink.latencies else None,
+                "sink_ms_p95": round(float(np.percentile(sink.latencies, 95)), 1) if sink.latencies else None,
+                "delivered": stats["delivered"],
+                "retried": stats["retried"],
+                "failed": stats["failed"],
+                "dropped": stats["dropped"],
+                "pending": args.events - stats["delivered"] - stats["failed"] - stats["dropped"],
+            })
+    finally:
+        server.shutdown()
+
+    print(f"\nSink webhook vs server lokal ({args.events} event @ {args.rate:g}/s, timeout {args.timeout} s, {args.retries} retry, antrian {args.queue_size}, gagal {args.fail_rate:.0%})")
+    print_table(rows, ["delay_ms", "sync_post_ms", "publish_us_p50", "publish_us_max", "sink_ms_p50", "sink_ms_p95", "delivered", "retried", "failed", "dropped", "pending"])
+    write_json({"benchmark": "events", "git_commit": git_commit(), "settings": {key: getattr(args, key) for key in ("events", "rate", "timeout", "retries", "retry_delay", "queue_size", "fail_rate")}, "results": rows}, args.output)
+
+
+# --- Replay Smoothing: Timer Persistensi Lama vs Jumlah yang Dihaluskan ---
+def simulate_counts(true_counts, samples, miss_rate, extra_rate, rng):
+    """Jumlah terdeteksi per kelas untuk setiap sampel: tiap objek bisa terlewat, tiap kelas bisa dapat deteksi palsu."""
+    names = list(true_counts)
+    truth = np.array([true_counts[name] for name in names])
+    detected = rng.binomial(truth, 1.0 - miss_rate, size=(samples, len(names))) + (rng.uniform(size=(samples, len(names))) < extra_rate)
+    return [{name: int(count) for name, count in zip(names, row) if count > 0} for row in detected]
+
+
+def replay_alarms(timestamps, counts_sequence, baseline, smoother=None):
+    """
+    Memutar ulang urutan hasil deteksi melalui logika alarm main.py dan mengembalikan waktu alarm.
+    Tanpa `smoother` perilakunya sama dengan timer lama (reset setiap kali satu hasil cocok dengan baseline).
+    Setelah alarm, timer dan filter direset seperti setelah alarm di-acknowledge.
+    """
+    import config
+    import utils
+
+    alarm_times = []
+    change_start_time = None
+    for timestamp, counts in zip(timestamps, counts_sequence):
+        compared = smoother.update(counts, baseline) if smoother is not None else counts
+        if not utils.compare_with_baseline(baseline, compared):
+            change_start_time = None
+        elif change_start_time is None:
+            change_start_time = timestamp
+        elif (timestamp - change_start_time) > config.ALARM_PERSISTENCE_THRESHOLD:
+            change_start_time = None
+            alarm_times.append(timestamp)
+            if smoother is not None:
+                smoother.reset()
+    return alarm_times
+
+
+def benchmark_smoothing(args):
+    """
+    Replay deterministik (seed tetap) dengan deteksi yang berkedip pada beberapa laju inferensi:
+    - skenario stabil: tidak ada perubahan nyata, setiap alarm adalah alarm palsu;
+    - skenario perubahan: satu objek benar-benar diambil, diukur apakah dan seberapa cepat alarm muncul.
+    Membandingkan timer persistensi lama dengan jumlah yang dihaluskan (smoothing.CountSmoother).
+    """
+    from smoothing import CountSmoother
+
+    baseline = {"cup": args.cups, "laptop": 1}
+    after_change = {"cup": args.cups - 1, "laptop": 1}
+    modes = [("lama", None), ("smoothing", lambda: CountSmoother(args.window, args.trigger_ratio, args.clear_ratio))]
+    results = []
+    for rate in args.rates:
+        interval = 1.0 / rate
+        for mode, make_smoother in modes:
+            rng = np.random.default_rng(args.seed)
+            stable_samples = int(args.stable_seconds * rate)
+            timestamps = np.arange(stable_samples) * interval
+            counts_sequence = simulate_counts(baseline, stable_samples, args.miss_rate, args.extra_rate, rng)
+            false_alarms = len(replay_alarms(timestamps, counts_sequence, baseline, make_smoother() if make_smoother else None))
+
+            latencies, trial_false_alarms = [], 0
+            before_samples = int(args.change_at * rate)
+            after_samples = int(args.detect_window * rate)
+            timestamps = np.arange(before_samples + after_samples) * interval
+            for _ in range(args.trials):
+                counts_sequence = simulate_counts(baseline, before_samples, args.miss_rate, args.extra_rate, rng) + simulate_counts(after_change, after_samples, args.miss_rate, args.extra_rate, rng)
+                alarm_times = replay_alarms(timestamps, counts_sequence, baseline, make_smoother() if make_smoother else None)
+                trial_false_alarms += sum(1 for t in alarm_times if t < args.change_at)
+                true_alarms = [t - args.change_at for t in alarm_times if t >= args.change_at]
+                if true_alarms:
+                    latencies.append(true_alarms[0])
+
+            results.append({
+                "rate_hz": rate,
+                "mode": mode,
+                "false_alarms_per_hour": round((false_alarms + trial_false_alarms) * 3600 / (args.stable_seconds + args.trials * args.change_at), 2),
+                "detected": f"{len(latencies)}/{args.trials}",
+                "latency_s_mean": round(float(np.mean(latencies)), 2) if latencies else "-",
+                "latency_s_p95": round(float(np.percentile(latencies, 95)), 2) if latencies else "-",
+            })
+
+    smoother = modes[1][1]()
+    print(f"\nReplay smoothing (baseline {baseline}, miss rate {args.miss_rate}, deteksi palsu {args.extra_rate}, jendela {smoother.window}, trigger {smoother.trigger_count}, clear {smoother.clear_count})")
+    print_table(results, ["rate_hz", "mode", "false_alarms_per_hour", "detected", "latency_s_mean", "latency_s_p95"])
+    write_json({"benchmark": "smoothing", "baseline": baseline, "miss_rate": args.miss_rate, "extra_rate": args.extra_rate, "window": smoother.window, "trigger_count": smoother.trigger_count, "clear_count": smoother.clear_count, "results": results}, args.output)
+
+
+# --- Benchmark End-to-End: Video -> Deteksi -> Baseline -> Log ---
+def make_synthetic_clip(path, seconds, fps, width, height, seed=0):
+    """
+    Klip video sintetis yang sama setiap kali dibuat: latar statis dengan beberapa kotak diam,
+    satu kotak yang melintas, dan noise sensor ringan. Ditulis dengan codec mp4v.
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    background = np.zeros((height, width, 3), dtype=np.uint8)
+    background[:] = np.linspace(40, 200, width, dtype=np.uint8)[None, :, None]
+    for _ in range(6):
+        x, y = int(rng.integers(0, width - 80)), int(rng.integers(0, height - 80))
+        color = tuple(int(c) for c in rng.integers(0, 256, size=3))
+        cv2.rectangle(background, (x, y), (x + int(rng.integers(30, 80)), y + int(rng.integers(30, 80))), color, -1)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    total_frames = int(seconds * fps)
+    for frame_index in range(total_frames):
+        frame = background.copy()
+        progress = (frame_index % int(fps * 4)) / (fps * 4) # Kotak melintas setiap 4 detik
+        if progress < 0.5:
+            x = int(progress * 2 * (width - 100))
+            cv2.rectangle(frame, (x, height // 2), (x + 100, height // 2 + 80), (30, 30, 220), -1)
+        noise = rng.integers(-3, 4, size=frame.shape, dtype=np.int16)
+        writer.write(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    writer.release()
+    return path
+
+
+def git_commit():
+    """Commit git saat ini (ditambah '-dirty' jika ada perubahan yang belum di-commit), None jika bukan repo git."""
+    import subprocess
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo_dir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def memory_usage_mb():
+    """(RSS sekarang, RSS puncak) proses dalam MB. psutil opsional; tanpa psutil hanya puncak (Unix)."""
+    current = peak = None
+    try:
+        import psutil
+        current = psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        pass
+    return current, peak
+
+
+def latency_summary(samples_ms):
+    if not samples_ms:
+        return {"count": 0}
+    values = np.asarray(samples_ms)
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def run_e2e_video(video_path, args):
+    """
+    Memutar satu file video melalui jalur yang sama dengan main.py, tanpa GUI:
+    capture (cv2.VideoCapture) -> motion gate (opsional) -> deteksi (utils / zones) ->
+    count_objects -> smoothing + compare_with_baseline + timer persistensi -> log + screenshot.
+    Semua frame diproses (tidak ada frame yang dibuang), waktu capture diambil dari posisi frame
+    di video, sehingga hasil alarm sama setiap kali dijalankan.
+    """
+    import cv2
+    import config
+    import utils
+    import zones as zones_module
+    from motion import MotionGate
+    from smoothing import CountSmoother
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Tidak bisa membuka video {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    monitor_zones = zones_module.load_zones()
+    motion_gate = MotionGate() if args.motion_gate else None
+    smoother = CountSmoother() if config.SMOOTHING_ENABLED else None
+
+    stages = {name: [] for name in ("capture", "motion", "detect", "count", "compare", "log", "total")}
+    baseline = None
+    change_start_time = None
+    last_output = None
+    frames = inferences = alarms = 0
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    while args.frames is None or frames < args.frames + args.warmup:
+        frame_start = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        timestamp = frames / fps
+        capture_done = time.perf_counter()
+
+        infer = True
+        if motion_gate is not None:
+            infer = last_output is None or motion_gate.should_infer(frame, timestamp)
+        motion_done = time.perf_counter()
+
+        if infer:
+            if monitor_zones:
+                detections, _ = zones_module.detect_in_zones(frame, monitor_zones)
+            else:
+                detections = utils.detect_objects_array(frame)
+            inferences += 1
+        else:
+            detections = last_output
+        last_output = detections
+        detect_done = time.perf_counter()
+
+        object_counts = utils.count_objects(detections)
+        count_done = time.perf_counter()
+
+        if baseline is None:
+            baseline = object_counts # Baseline = hasil deteksi frame pertama, seperti tombol 'b' saat start
+        compared = smoother.update(object_counts, baseline) if smoother is not None else object_counts
+        change_details = utils.compare_with_baseline(baseline, compared)
+        triggered = False
+        if not change_details:
+            change_start_time = None
+        elif change_start_time is None:
+            change_start_time = timestamp
+        elif timestamp - change_start_time > config.ALARM_PERSISTENCE_THRESHOLD:
+            change_start_time = None
+            triggered = True
+        compare_done = time.perf_counter()
+
+        if triggered:
+            # Sama dengan trigger_alarm + acknowledge di main.py: log stock_change, screenshot, baseline diperbarui
+            alarms += 1
+            utils.log_activity({
+                "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
+                "event": "stock_change",
+                "status": "unauthorized",
+                "initial_baseline": baseline,
+                "actual_objects_at_detection": object_counts,
+                "change_details": ", ".join(change_details),
+                "capture_path": utils.capture_screen(frame, "unauthorized", ", ".join(change_details)),
+            })
+            baseline = object_counts
+            if smoother is not None:
+                smoother.reset()
+        log_done = time.perf_counter()
+
+        frames += 1
+        if frames <= args.warmup:
+            if frames == args.warmup: # Statistik dimulai setelah warm-up
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                inferences = alarms = 0
+            continue
+        stages["capture"].append((capture_done - frame_start) * 1000)
+        if motion_gate is not None:
+            stages["motion"].append((motion_done - capture_done) * 1000)
+        if infer:
+            stages["detect"].append((detect_done - motion_done) * 1000) # Hanya frame yang benar-benar diinferensi
+        stages["count"].append((count_done - detect_done) * 1000)
+        stages["compare"].append((compare_done - count_done) * 1000)
+        if triggered:
+            stages["log"].append((log_done - compare_done) * 1000)
+        stages["total"].append((log_done - frame_start) * 1000)
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+    cap.release()
+
+    measured = max(0, frames - args.warmup)
+    current_mb, peak_mb = memory_usage_mb()
+    return {
+        "video": video_path,
+        "video_fps": round(fps, 2),
+        "frames": measured,
+        "inferences": inferences,
+        "alarms": alarms,
+        "fps": round(measured / wall_time, 2) if wall_time > 0 else 0.0,
+        "realtime_factor": round(measured / wall_time / fps, 2) if wall_time > 0 else 0.0,
+        "cpu_percent": round(cpu_time / wall_time * 100, 1) if wall_time > 0 else 0.0,
+        "rss_mb": round(current_mb, 1) if current_mb is not None else None,
+        "peak_rss_mb": round(peak_mb, 1) if peak_mb is not None else None,
+        "stages": {name: latency_summary(samples) for name, samples in stages.items() if samples},
+    }
+
+
+def benchmark_e2e(args):
+    """
+    Benchmark end-to-end yang bisa diulang untuk membandingkan commit: file video rekaman
+    (--video) dan/atau klip sintetis (--synthetic) diputar tanpa GUI melalui jalur deteksi,
+    perbandingan baseline, dan logging. Log dan screenshot ditulis ke folder sementara.
+    Hasil JSON memuat commit git, backend, dan pengaturan agar run bisa dibandingkan (--compare).
+    """
+    import platform
+    import shutil
+    import tempfile
+    import config
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark_e2e_")
+    config.LOG_DIR = os.path.join(work_dir, "log_activity")
+    config.CHANGES_DIR = os.path.join(work_dir, "screenshots_rekaman")
+    config.AUTHORIZED_DIR = os.path.join(config.CHANGES_DIR, "authorized")
+    config.UNAUTHORIZED_DIR = os.path.join(config.CHANGES_DIR, "unauthorized")
+    config.EVENT_DB_PATH = os.path.join(config.LOG_DIR, "events.sqlite3")
+    if args.conf is not None:
+        config.CONFIDENCE_THRESHOLD = args.conf
+    import utils
+
+    videos = list(args.video or [])
+    for index in range(args.synthetic):
+        path = os.path.join(work_dir, f"sintetis_{index}.mp4")
+        videos.append(make_synthetic_clip(path, args.seconds, args.fps, args.width, args.height, seed=index))
+    if not videos:
+        videos.append(make_synthetic_clip(os.path.join(work_dir, "sintetis_0.mp4"), args.seconds, args.fps, args.width, args.height))
+
+    try:
+        results = [run_e2e_video(video, args) for video in videos]
+        utils.close_screenshot_writer()
+        utils.close_activity_log()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    rows = []
+    for result in results:
+        for stage, summary in result["stages"].items():
+            if summary["count"]:
+                rows.append({"video": os.path.basename(result["video"]), "stage": stage, **{key: summary[key] for key in ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")}})
+    print(f"\nEnd-to-end ({config.INFERENCE_BACKEND}, imgsz {config.INFERENCE_IMGSZ}, motion gate {'aktif' if args.motion_gate else 'mati'})")
+    print_table(rows, ["video", "stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    print()
+    print_table([{**result, "video": os.path.basename(result["video"])} for result in results], ["video", "frames", "inferences", "alarms", "fps", "realtime_factor", "cpu_percent", "rss_mb", "peak_rss_mb"])
+
+    report = {
+        "benchmark": "e2e",
+        "git_commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": cpu_count_used(),
+        "settings": {
+            "backend": config.INFERENCE_BACKEND,
+            "imgsz": config.INFERENCE_IMGSZ,
+            "confidence_threshold": config.CONFIDENCE_THRESHOLD,
+            "motion_gate": args.motion_gate,
+            "smoothing": config.SMOOTHING_ENABLED,
+            "zones": len(config.ZONES),
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+    if args.compare:
+        compare_e2e(report, args.compare)
+    write_json(report, args.output)
+
+
+def compare_e2e(report, baseline_path):
+    """Membandingkan FPS dan p95 per tahap dengan hasil JSON run sebelumnya (per nama file video)."""
+    with open(baseline_path, 'r') as f:
+        previous = json.load(f)
+    previous_results = {os.path.basename(result["video"]): result for result in previous["results"]}
+    rows = []
+    for result in report["results"]:
+        old = previous_results.get(os.path.basename(result["video"]))
+        if old is None:
+            continue
+        rows.append({"video": os.path.basename(result["video"]), "metric": "fps", "sebelum": old["fps"], "sesudah": result["fps"], "perubahan": percent_change(old["fps"], result["fps"])})
+        for stage, summary in result["stages"].items():
+            old_summary = old["stages"].get(stage)
+            if old_summary and old_summary.get("count") and summary.get("count"):
+                rows.append({"video": os.path.basename(result["video"]), "metric": f"{stage}_p95_ms", "sebelum": old_summary["p95_ms"], "sesudah": summary["p95_ms"], "perubahan": percent_change(old_summary["p95_ms"], summary["p95_ms"])})
+    print(f"\nPerbandingan dengan {baseline_path} (commit {previous.get('git_commit')} -> {report['git_commit']})")
+    if rows:
+        print_table(rows, ["video", "metric", "sebelum", "sesudah", "perubahan"])
+    else:
+        print("Tidak ada video yang sama di kedua hasil.")
+
+
+def percent_change(old, new):
+    return f"{(new - old) / old * 100:+.1f}%" if old else "-"
+
+
+# --- Benchmark Startup: Waktu Import dan Waktu Sampai Deteksi Pertama ---
+# Dijalankan di proses Python baru agar import, pemuatan model, dan panggilan pertama benar-benar dingin.
+STARTUP_PROBE = """
+import time
+start_time = time.perf_counter()
+import json, sys
+sys.path.insert(0, {repo_dir!r})
+import config
+config.INFERENCE_BACKEND = {backend!r}
+config.MODEL_CACHE_DIR = {cache_dir!r}
+import utils
+import numpy as np
+import_seconds = time.perf_counter() - start_time
+warmup = utils.ModelWarmup(audio=False).start() if {warm_up!r} else None
+time.sleep({camera_open!r}) # Pengganti waktu membuka kamera
+frame = np.random.default_rng(0).integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+if warmup is not None:
+    warmup.wait()
+ready_seconds = time.perf_counter() - start_time
+utils.detect_objects_array(frame)
+first_detection_seconds = time.perf_counter() - start_time
+steady_start = time.perf_counter()
+utils.detect_objects_array(frame)
+print(json.dumps({{"import_s": import_seconds, "ready_s": ready_seconds, "first_detection_s": first_detection_seconds,
+                  "steady_ms": (time.perf_counter() - steady_start) * 1000, "torch_imported": "torch" in sys.modules}}))
+"""
+
+
+def run_startup_probe(backend, cache_dir, warm_up, camera_open):
+    import subprocess
+    import sys
+
+    code = STARTUP_PROBE.format(repo_dir=os.path.dirname(os.path.abspath(__file__)), backend=backend, cache_dir=cache_dir, warm_up=warm_up, camera_open=camera_open)
+    start_time = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    wall_seconds = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError(f"Probe startup backend {backend} gagal:\n{completed.stderr.strip()}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_s"] = wall_seconds # Termasuk startup interpreter dan keluar proses
+    return result
+
+
+def benchmark_startup(args):
+    """
+    Waktu `import utils`, waktu sampai siap, dan waktu sampai deteksi pertama di proses baru,
+    untuk setiap backend dengan cache model dingin (folder cache kosong) dan hangat, serta
+    dengan warm-up paralel pembukaan kamera (--camera-open detik) dan tanpa warm-up (model
+    dimuat oleh frame pertama).
+    """
+    import shutil
+    import tempfile
+
+    rows = []
+    for backend in args.backends:
+        warm_cache_dir = tempfile.mkdtemp(prefix="benchmark_startup_cache_")
+        try:
+            run_startup_probe(backend, warm_cache_dir, True, 0.0) # Mengisi cache untuk skenario "hangat"
+            for cache in ("dingin", "hangat"):
+                for warm_up in (False, True):
+                    samples = []
+                    for _ in range(args.repeats):
+                        cache_dir = warm_cache_dir if cache == "hangat" else tempfile.mkdtemp(prefix="benchmark_startup_cold_")
+                        try:
+                            samples.append(run_startup_probe(backend, cache_dir, warm_up, args.camera_open))
+                        finally:
+                            if cache_dir != warm_cache_dir:
+                                shutil.rmtree(cache_dir, ignore_errors=True)
+                    row = {"backend": backend, "cache": cache, "warmup": "ya" if warm_up else "tidak"}
+                    for key in ("import_s", "ready_s", "first_detection_s", "process_s"):
+                        row[key] = round(float(np.median([sample[key] for sample in samples])), 3)
+                    row["steady_ms"] = round(float(np.median([sample["steady_ms"] for sample in samples])), 1)
+                    rows.append(row)
+        finally:
+            shutil.rmtree(warm_cache_dir, ignore_errors=True)
+
+    print(f"\nStartup (median {args.repeats} proses, buka kamera disimulasikan {args.camera_open} s)")
+    print_table(rows, ["backend", "cache", "warmup", "import_s", "ready_s", "first_detection_s", "steady_ms", "process_s"])
+    write_json({"benchmark": "startup", "git_commit": git_commit(), "camera_open_s": args.camera_open, "results": rows}, args.output)
+
+
+def benchmark_forensic(args):
+    """
+    Skala analisis forensik (forensic.py) terhadap jumlah worker: klip sintetis yang sama
+    dianalisis dengan 1, 2, 4, ... proses. Kecepatan dilaporkan sebagai kelipatan real-time,
+    speedup dibanding 1 worker, dan efisiensi per worker (1.0 = skala linear sempurna).
+    """
+    import shutil
+    import tempfile
+    import config
+    import forensic
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark_forensic_")
+    try:
+        videos = list(args.video or [])
+        for index in range(args.synthetic if not videos else 0):
+            videos.append(make_synthetic_clip(os.path.join(work_dir, f"sintetis_{index}.mp4"), args.seconds, args.fps, args.width, args.height, seed=index))
+        rows = []
+        for workers in args.workers:
+            summary = forensic.run_analysis(videos, baseline={}, workers=workers, chunk_seconds=args.chunk_seconds, sample_fps=args.sample_fps,
+                                            output_path=os.path.join(work_dir, f"hasil_{workers}.jsonl"), save_captures=False, confidence=args.conf, quiet=True)
+            rows.append({key: summary[key] for key in ("workers", "threads_per_worker", "chunks", "video_seconds", "wall_seconds", "realtime_factor", "events")})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    base = rows[0]["realtime_factor"] / rows[0]["workers"] if rows and rows[0]["realtime_factor"] else 0.0
+    for row in rows:
+        row["speedup"] = round(row["realtime_factor"] / (base * rows[0]["workers"]), 2) if base else 0.0
+        row["efficiency"] = round(row["realtime_factor"] / (base * row["workers"]), 2) if base else 0.0
+    print(f"\nForensik ({config.INFERENCE_BACKEND}, {cpu_count_used()} core tersedia, sampel {args.sample_fps:g} fps, chunk {args.chunk_seconds:g} s)")
+    print_table(rows, ["workers", "threads_per_worker", "chunks", "video_seconds", "wall_seconds", "realtime_factor", "speedup", "efficiency", "events"])
+    write_json({"benchmark": "forensic", "git_commit": git_commit(), "cpu_count": cpu_count_used(), "results": rows}, args.output)
+
+
+# --- Mesin Status Pemantauan: Latensi Transisi di bawah Input Kontrol Bersamaan ---
+class LegacyGlobalState:
+    """Pola lama main.py: variabel global di bawah satu lock, file baseline ditulis sambil memegang lock."""
+
+    def __init__(self, state_file, persistence_threshold):
+        import threading
+        self.state_file = state_file
+        self.persistence_threshold = persistence_threshold
+        self.lock = threading.Lock()
+        self.alarm_active = False
+        self.monitoring_active = True
+        self.defense_mode_active = False
+        self.baseline = {}
+        self.change_start_time = None
+        self.change_details = []
+
+    def observe(self, change_details, timestamp, result=None):
+        with self.lock:
+            is_monitoring_active, is_alarm_active = self.monitoring_active, self.alarm_active
+        if not is_monitoring_active or is_alarm_active:
+            self.change_details = []
+            return False
+        self.change_details = change_details
+        if not change_details:
+            self.change_start_time = None
+        elif self.change_start_time is None:
+            self.change_start_time = timestamp
+        elif timestamp - self.change_start_time > self.persistence_threshold:
+            self.change_start_time = None
+            with self.lock:
+                self.alarm_active = True
+            return True
+        return False
+
+    def toggle_defense(self):
+        with self.lock:
+            self.defense_mode_active = not self.defense_mode_active
+            self.monitoring_active = not self.defense_mode_active
+
+    def acknowledge(self, baseline):
+        import utils
+        with self.lock:
+            self.alarm_active = False
+        with self.lock:
+            self.baseline = baseline
+            utils.save_initial_state(self.baseline, self.state_file)
+
+    def set_baseline(self, baseline, require_defense=False):
+        import utils
+        with self.lock:
+            self.baseline = baseline
+            utils.save_initial_state(self.baseline, self.state_file)
+
+    def read_for_render(self):
+        with self.lock:
+            return self.alarm_active, self.defense_mode_active, "Baseline: " + str(self.baseline)
+
+
+def benchmark_monitor(args):
+    """
+    Latensi transisi status (aturan baseline, mode pengaturan, hentikan alarm) saat beberapa
+    thread kontrol mengirim perintah bersamaan dengan thread hasil deteksi (satu per kamera) dan
+    thread render. Dibandingkan pola lama (satu lock global, file baseline ditulis di dalam lock)
+    dengan SecurityMonitor (snapshot tanpa lock, baseline ditulis di latar). Penulisan file
+    diperlambat `--write-delays` ms untuk meniru penyimpanan lambat (misal kartu SD).
+    """
+    import shutil
+    import tempfile
+    import threading
+    import utils
+    import security_monitor
+
+    original_write = utils.write_json_atomic
+
+    def run(implementation, cameras, write_delay_ms, work_dir):
+        def slow_write(path, data):
+            time.sleep(write_delay_ms / 1000)
+            original_write(path, data)
+        utils.write_json_atomic = slow_write
+
+        writer = security_monitor.BaselineWriter() if implementation == "monitor" else None
+        states = []
+        for index in range(cameras):
+            state_file = os.path.join(work_dir, f"{implementation}_{write_delay_ms}_{index}.json")
+            if implementation == "monitor":
+                states.append(security_monitor.SecurityMonitor(f"benchmark_{index}", state_file, args.persistence, writer))
+            else:
+                states.append(LegacyGlobalState(state_file, args.persistence))
+
+        stop_event = threading.Event()
+        transition_ms = {"defense": [], "baseline": [], "ack": []}
+        observe_ms, render_us = [], []
+        alarms = [0]
+        latency_lock = threading.Lock()
+
+        def detection_loop(state, seed):
+            rng = np.random.default_rng(seed)
+            timestamp = 0.0
+            while not stop_event.is_set():
+                timestamp += 1 / args.fps # Jam simulasi: alarm terpicu setelah `persistence` detik perubahan
+                details = ["cup hilang (1 -> 0)"] if rng.uniform() < args.change_rate else []
+                start = time.perf_counter()
+                if state.observe(details, timestamp):
+                    alarms[0] += 1
+                elapsed = (time.perf_counter() - start) * 1000
+                with latency_lock:
+                    observe_ms.append(elapsed)
+                time.sleep(1 / args.fps / args.speedup)
+
+        def render_loop():
+            while not stop_event.is_set():
+                for state in states:
+                    start = time.perf_counter()
+                    if implementation == "monitor":
+                        snapshot = state.snapshot
+                        snapshot.alarm_active, snapshot.defense_mode_active, "Baseline: " + str(snapshot.baseline)
+                    else:
+                        state.read_for_render()
+                    render_us.append((time.perf_counter() - start) * 1e6)
+                time.sleep(1 / args.render_fps)
+
+        def control_loop(seed):
+            rng = np.random.default_rng(seed)
+            while not stop_event.is_set():
+                state = states[int(rng.integers(len(states)))]
+                action = ("defense", "baseline", "ack")[int(rng.integers(3))]
+                baseline = {"cup": int(rng.integers(0, 4))}
+                start = time.perf_counter()
+                if action == "defense":
+                    state.toggle_defense()
+                elif action == "baseline":
+                    state.set_baseline(baseline)
+                elif implementation == "monitor":
+                    state.acknowledge(baseline)
+                else:
+                    state.acknowledge(baseline) if state.alarm_active else None
+                elapsed = (time.perf_counter() - start) * 1000
+                with latency_lock:
+                    transition_ms[action].append(elapsed)
+                time.sleep(rng.exponential(1 / args.control_rate))
+
+        threads = [threading.Thread(target=detection_loop, args=(state, index), daemon=True) for index, state in enumerate(states)]
+        threads.append(threading.Thread(target=render_loop, daemon=True))
+        threads += [threading.Thread(target=control_loop, args=(100 + index,), daemon=True) for index in range(args.control_threads)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+        persisted_ok = None
+        if writer is not None:
+            writer.flush()
+            persisted_ok = all(utils.load_initial_state(state.state_file) == dict(state.snapshot.baseline) for state in states)
+            writer.close()
+        utils.write_json_atomic = original_write
+
+        all_transitions = [value for values in transition_ms.values() for value in values]
+        transitions = latency_summary(all_transitions)
+        return {
+            "implementation": implementation,
+            "cameras": cameras,
+            "write_delay_ms": write_delay_ms,
+            "transitions": transitions["count"],
+            "transition_ms_p50": transitions.get("p50_ms"),
+            "transition_ms_p99": transitions.get("p99_ms"),
+            "transition_ms_max": transitions.get("max_ms"),
+            "baseline_ms_p99": latency_summary(transition_ms["baseline"]).get("p99_ms"),
+            "observe_ms_p99": latency_summary(observe_ms).get("p99_ms"),
+            "observe_ms_max": latency_summary(observe_ms).get("max_ms"),
+            "render_us_p50": round(float(np.percentile(render_us, 50)), 1) if render_us else None,
+            "render_us_max": round(float(np.max(render_us)), 1) if render_us else None,
+            "alarms": alarms[0],
+            "persisted_ok": persisted_ok,
+        }
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark_monitor_")
+    rows = []
+    try:
+        for write_delay_ms in args.write_delays:
+            for cameras in args.cameras:
+                for implementation in ("legacy", "monitor"):
+                    rows.append(run(implementation, cameras, write_delay_ms, work_dir))
+    finally:
+        utils.write_json_atomic = original_write
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\nTransisi status ({args.control_threads} thread kontrol @ {args.control_rate:g}/s masing-masing, hasil deteksi {args.fps:g}/s per kamera, render {args.render_fps:g} fps, {args.seconds:g} s per skenario)")
+    print_table(rows, ["implementation", "cameras", "write_delay_ms", "transitions", "transition_ms_p50", "transition_ms_p99", "transition_ms_max", "baseline_ms_p99",
+                       "observe_ms_p99", "observe_ms_max", "render_us_p50", "render_us_max", "alarms", "persisted_ok"])
+    write_json({"benchmark": "monitor", "git_commit": git_commit(), "settings": {key: getattr(args, key) for key in ("seconds", "fps", "render_fps", "control_threads", "control_rate", "change_rate", "persistence", "speedup")}, "results": rows}, args.output)
+
+
+# --- Server Inferensi Bersama vs Proses Independen ---
+def process_memory_mb(pid):
+    """PSS proses (MB, memori bersama dibagi rata antar proses) dari /proc, fallback RSS psutil. None jika tidak tersedia."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except (ImportError, OSError):
+        return None
+
+
+def inference_client_process(use_server, address, frame_count, width, height, seed, ready, start, results):
+    """Satu 'kamera': memuat model sendiri (use_server=False) atau menjadi klien server, lalu mendeteksi frame secepat mungkin."""
+    import config
+    config.INFERENCE_SERVER_ENABLED = use_server
+    config.INFERENCE_SERVER_ADDRESS = address
+    config.INFERENCE_SERVER_AUTOSTART = False
+    import utils
+    utils.get_model()
+    utils.warm_up_model((height, width, 3))
+    frames = make_synthetic_frames(4, width, height, seed)
+    ready.put(os.getpid())
+    start.wait()
+    latencies = []
+    begin = time.perf_counter()
+    for index in range(frame_count):
+        frame_start = time.perf_counter()
+        utils.detect_objects_array(frames[index % len(frames)])
+        latencies.append((time.perf_counter() - frame_start) * 1000)
+    results.put((time.perf_counter() - begin, latencies))
+
+
+def benchmark_inference_server(args):
+    """
+    Memori total dan throughput N proses pemantauan: N proses yang masing-masing memuat model
+    dibanding N klien + satu server inferensi (frame lewat shared memory, batch antar klien).
+    Memori diukur sebagai PSS setelah semua proses siap (pustaka bersama dibagi rata), jadi
+    jumlahnya mendekati pemakaian RAM sebenarnya.
+    """
+    import multiprocessing
+    import socket
+    import subprocess
+    import sys
+    import config
+    import inference_server
+
+    if args.batch_window_ms is None:
+        args.batch_window_ms = config.INFERENCE_SERVER_BATCH_WINDOW_MS
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for processes in args.processes:
+        for use_server in (False, True):
+            server = None
+            address = None
+            if use_server:
+                if hasattr(socket, "AF_UNIX") and os.name == "posix":
+                    address = os.path.join(inference_server.runtime_dir(), f"benchmark-{os.getpid()}.sock")
+                else:
+                    with socket.socket() as probe:
+                        probe.bind(("127.0.0.1", 0))
+                        address = f"127.0.0.1:{probe.getsockname()[1]}"
+                target = inference_server.parse_address(address)
+                # Proses terpisah lewat CLI (seperti start_server_process), bukan anak multiprocessing:
+                # server harus punya resource tracker sendiri agar shared memory klien tidak ikut dilacaknya
+                server = subprocess.Popen([sys.executable, "inference_server.py", "--address", address, "--batch-window-ms", str(args.batch_window_ms), "--max-batch", str(args.max_batch or config.INFERENCE_SERVER_MAX_BATCH)],
+                                          cwd=os.path.dirname(os.path.abspath(__file__)), stdin=subprocess.DEVNULL)
+                deadline = time.time() + args.timeout
+                while True: # Klien baru dijalankan setelah server selesai memuat model dan menerima koneksi
+                    try:
+                        if isinstance(target, tuple):
+                            socket.create_connection(target, timeout=1).close()
+                        else:
+                            with socket.socket(socket.AF_UNIX) as probe:
+                                probe.settimeout(1)
+                                probe.connect(target)
+                        break
+                    except OSError:
+                        if time.time() > deadline or server.poll() is not None:
+                            raise RuntimeError("Server inferensi gagal dijalankan")
+                        time.sleep(0.2)
+            ready, results, start = context.Queue(), context.Queue(), context.Event()
+            workers = [context.Process(target=inference_client_process, args=(use_server, address, args.frames, args.width, args.height, index, ready, start, results), daemon=True)
+                       for index in range(processes)]
+            for worker in workers:
+                worker.start()
+            pids = [ready.get(timeout=args.timeout) for _ in workers]
+            memory = [process_memory_mb(pid) for pid in pids + ([server.pid] if server is not None else [])]
+            start.set()
+            outcomes = [results.get(timeout=args.timeout) for _ in workers]
+            for worker in workers:
+                worker.join()
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+
+            wall_seconds = max(seconds for seconds, _ in outcomes)
+            latencies = [latency for _, values in outcomes for latency in values]
+            summary = latency_summary(latencies)
+            rows.append({
+                "processes": processes,
+                "mode": "server" if use_server else "independen",
+                "memory_mb": round(sum(memory), 1) if None not in memory else None,
+                "server_mb": round(memory[-1], 1) if use_server and memory[-1] is not None else "-",
+                "frames_per_s": round(len(latencies) / wall_seconds, 2),
+                "latency_ms_p50": summary["p50_ms"],
+                "latency_ms_p95": summary["p95_ms"],
+            })
+
+    print(f"\nServer inferensi vs proses independen ({cpu_count_used()} core, frame {args.width}x{args.height}, {args.frames} frame per proses, jendela batch {args.batch_window_ms:g} ms)")
+    print_table(rows, ["processes", "mode", "memory_mb", "server_mb", "frames_per_s", "latency_ms_p50", "latency_ms_p95"])
+    write_json({"benchmark": "inference_server", "git_commit": git_commit(), "cpu_count": cpu_count_used(),
+                "settings": {key: getattr(args, key) for key in ("frames", "width", "height", "batch_window_ms", "max_batch")}, "results": rows}, args.output)
+
+
+# --- Benchmark Inferensi Ber-tile: Recall Objek Kecil dan Latensi ---
+def make_static_scene(count, width, height, seed=0):
+    """Scene diam (rak) dengan satu kotak kecil yang bergeser setiap frame: hanya sebagian kecil tile yang berubah."""
+    import cv2
+    base = make_synthetic_frames(1, width, height, seed)[0]
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = (i * 37) % max(1, width - 48)
+        cv2.rectangle(frame, (x, height // 2), (x + 48, height // 2 + 48), (40, 40, 200), -1)
+        frames.append(frame)
+    return frames
+
+
+def benchmark_tiling(args):
+    """
+    Recall dan latensi inferensi frame penuh (diperkecil ke imgsz) dibanding inferensi ber-tile,
+    tanpa dan dengan cache tile. Referensi recall adalah deteksi model pada resolusi asli frame
+    (imgsz = sisi terpanjang frame), jadi backend harus menerima imgsz tersebut (misal "torch").
+    recall_small hanya menghitung objek referensi yang sisi terpanjangnya < --small-size piksel.
+    Tanpa --video dipakai scene diam dengan satu objek bergerak (kasus yang diuntungkan cache).
+    """
+    import math
+    import config
+    import preprocess
+    import tiling
+    import utils
+
+    frames = load_frames(args.video, args.frames, args.width, args.height) if args.video else make_static_scene(args.frames, args.width, args.height)
+    height, width = frames[0].shape[:2]
+    reference_imgsz = int(math.ceil(max(height, width) / 32) * 32)
+
+    def as_match_input(detections):
+        boxes = np.stack((detections['x1'], detections['y1'], detections['x2'], detections['y2']), axis=1).astype(np.float32)
+        return boxes, detections['conf'], detections['class_id']
+
+    try:
+        references = [utils.to_detection_array(utils.run_model([frame], imgsz=reference_imgsz)[0]) for frame in frames]
+    except Exception as e:
+        raise RuntimeError(f"Referensi resolusi asli (imgsz {reference_imgsz}) gagal dijalankan backend {config.INFERENCE_BACKEND}: {e}") from e
+
+    for frame in frames[:args.warmup]: # Warm-up model untuk kedua ukuran input
+        utils.detect_objects_array(frame)
+        tiling.TiledDetector(cache=False).detect(frame)
+
+    results = []
+    for mode, cache in (("full_frame", None), ("tiled", False), ("tiled_cache", True)):
+        # Detektor baru per mode: cache tile kosong seperti kamera yang baru dibuka
+        detector = tiling.TiledDetector(cache=cache) if cache is not None else None
+        detect = (lambda frame, timestamp: detector.detect(frame, timestamp)[0]) if detector is not None else (lambda frame, timestamp: utils.detect_objects_array(frame))
+        latencies, detection_total = [], 0
+        matched = matched_small = total = total_small = 0
+        for index, (frame, reference) in enumerate(zip(frames, references)):
+            start_time = time.perf_counter()
+            detections = detect(frame, index / args.fps)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            detection_total += len(detections)
+            small = np.maximum(reference['x2'] - reference['x1'], reference['y2'] - reference['y1']) < args.small_size
+            matched += match_detections(as_match_input(reference), as_match_input(detections))[0]
+            matched_small += match_detections(as_match_input(reference[small]), as_match_input(detections))[0]
+            total += len(reference)
+            total_small += int(small.sum())
+        summary = latency_summary(latencies)
+        if detector is not None:
+            stats = detector.stats()
+            tiles_per_frame = round(stats["tiles_inferred"] / max(1, stats["frames"]), 2)
+            model_input = f"{stats['tiles']} tile{' + frame penuh' if detector.full_frame_pass else ''} @ {detector.tile_size}"
+        else:
+            model_input, tiles_per_frame = f"1 x {preprocess.current_imgsz()}", "-"
+        results.append({
+            "mode": mode,
+            "input": model_input,
+            "tiles_per_frame": tiles_per_frame,
+            "latency_ms_mean": summary["mean_ms"],
+            "latency_ms_p50": summary["p50_ms"],
+            "latency_ms_p95": summary["p95_ms"],
+            "recall": round(matched / total, 3) if total else None,
+            "recall_small": round(matched_small / total_small, 3) if total_small else None,
+            "detections": detection_total,
+        })
+
+    print(f"\nInferensi frame penuh vs ber-tile ({len(frames)} frame {width}x{height}, referensi imgsz {reference_imgsz}, objek kecil < {args.small_size} px, {cpu_count_used()} core)")
+    print_table(results, ["mode", "input", "tiles_per_frame", "latency_ms_mean", "latency_ms_p50", "latency_ms_p95", "recall", "recall_small", "detections"])
+    write_json({"benchmark": "tiling", "git_commit": git_commit(), "cpu_count": cpu_count_used(), "frames": len(frames), "reference_imgsz": reference_imgsz,
+                "settings": {"tile_size": config.TILE_SIZE, "tile_overlap": config.TILE_OVERLAP, "small_size": args.small_size}, "results": results}, args.output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Sistem Keamanan Objek")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    multicam = subparsers.add_parser("multicam", help="Inferensi batch untuk 1, 2, 4, 8 aliran kamera")
+    multicam.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8])
+    multicam.add_argument("--iterations", type=int, default=20)
+    multicam.add_argument("--warmup", type=int, default=2)
+    multicam.add_argument("--width", type=int, default=640)
+    multicam.add_argument("--height", type=int, default=480)
+    multicam.add_argument("--output", help="Simpan hasil ke file JSON")
+    multicam.set_defaults(func=benchmark_multicam)
+
+    backends = subparsers.add_parser("backends", help="Akurasi dan latensi backend inferensi dibanding model .pt")
+    backends.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx_int8", "openvino"])
+    backends.add_argument("--video", help="File video sebagai sumber frame (default: frame sintetis)")
+    backends.add_argument("--frames", type=int, default=50)
+    backends.add_argument("--warmup", type=int, default=3)
+    backends.add_argument("--conf", type=float, default=None, help="Ambang confidence (default: config.CONFIDENCE_THRESHOLD)")
+    backends.add_argument("--width", type=int, default=640)
+    backends.add_argument("--height", type=int, default=480)
+    backends.add_argument("--output", help="Simpan hasil ke file JSON")
+    backends.set_defaults(func=benchmark_backends)
+
+    tracker_parser = subparsers.add_parser("tracker", help="Throughput tracker untuk 100+ track bersamaan")
+    tracker_parser.add_argument("--objects", type=int, nargs="+", default=[10, 100, 250, 500])
+    tracker_parser.add_argument("--frames", type=int, default=300)
+    tracker_parser.add_argument("--fps", type=float, default=15.0)
+    tracker_parser.add_argument("--detect-every", type=int, default=1, help="Deteksi hanya setiap N frame, track coasting di antaranya")
+    tracker_parser.add_argument("--miss-rate", type=float, default=0.05, help="Peluang sebuah objek tidak terdeteksi per frame")
+    tracker_parser.add_argument("--jitter", type=float, default=1.5, help="Noise posisi box deteksi (piksel)")
+    tracker_parser.add_argument("--width", type=int, default=1920)
+    tracker_parser.add_argument("--height", type=int, default=1080)
+    tracker_parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    tracker_parser.set_defaults(func=benchmark_tracker)
+
+    roi = subparsers.add_parser("roi", help="Latensi inferensi frame penuh vs crop zona (ROI)")
+    roi.add_argument("--video", help="File video sebagai sumber frame (default: frame sintetis)")
+    roi.add_argument("--frames", type=int, default=30)
+    roi.add_argument("--warmup", type=int, default=3)
+    roi.add_argument("--width", type=int, default=1280)
+    roi.add_argument("--height", type=int, default=720)
+    roi.add_argument("--output", help="Simpan hasil ke file JSON")
+    roi.set_defaults(func=benchmark_roi)
+
+    preprocess_parser = subparsers.add_parser("preprocess", help="Preprocessing lama vs baru per resolusi sumber, dan imgsz adaptif dari budget latensi")
+    preprocess_parser.add_argument("--resolutions", nargs="+", default=["1280x720", "1920x1080"])
+    preprocess_parser.add_argument("--video", help="File video sebagai sumber frame, di-resize ke setiap resolusi (default: frame sintetis)")
+    preprocess_parser.add_argument("--frames", type=int, default=30)
+    preprocess_parser.add_argument("--warmup", type=int, default=3)
+    preprocess_parser.add_argument("--conf", type=float, default=0.001, help="Ambang confidence rendah agar kecocokan kotak bisa dibandingkan")
+    preprocess_parser.add_argument("--budget", type=float, default=0, help="Budget latensi (ms) untuk uji imgsz adaptif, 0 = tidak diuji")
+    preprocess_parser.add_argument("--load-procs", type=int, default=2, help="Proses sibuk selama fase beban")
+    preprocess_parser.add_argument("--adaptive-frames", type=int, default=60, help="Frame per fase uji adaptif")
+    preprocess_parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    preprocess_parser.set_defaults(func=benchmark_preprocess)
+
+    events_parser = subparsers.add_parser("events", help="Latensi sink webhook terhadap server HTTP lokal pengganti (publish tidak boleh menunggu sink)")
+    events_parser.add_argument("--delays", type=float, nargs="+", default=[0, 50, 500, 3000], help="Jeda respons server pengganti (ms)")
+    events_parser.add_argument("--events", type=int, default=20, help="Event yang diterbitkan per skenario")
+    events_parser.add_argument("--rate", type=float, default=10.0, help="Event per detik")
+    events_parser.add_argument("--timeout", type=float, default=2.0, help="Timeout sink webhook (detik)")
+    events_parser.add_argument("--retries", type=int, default=2)
+    events_parser.add_argument("--retry-delay", type=float, default=0.05)
+    events_parser.add_argument("--queue-size", type=int, default=100)
+    events_parser.add_argument("--fail-rate", type=float, default=0.0, help="Proporsi respons 500 dari server pengganti")
+    events_parser.add_argument("--drain", type=float, default=10.0, help="Waktu maksimal menunggu antrian sink selesai (detik)")
+    events_parser.add_argument("--seed", type=int, default=0)
+    events_parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    events_parser.set_defaults(func=benchmark_events)
+
+    smoothing_parser = subparsers.add_parser("smoothing", help="Replay alarm palsu dan latensi deteksi: timer lama vs jumlah yang dihaluskan")
+    smoothing_parser.add_argument("--rates", type=float, nargs="+", default=[15.0, 5.0, 2.0, 1.0], help="Laju inferensi (hasil per detik)")
+    smoothing_parser.add_argument("--cups", type=int, default=3, help="Jumlah cup di baseline (ditambah 1 laptop)")
+    smoothing_parser.add_argument("--miss-rate", type=float, default=0.1, help="Peluang sebuah objek tidak terdeteksi per hasil")
+    smoothing_parser.add_argument("--extra-rate", type=float, default=0.02, help="Peluang deteksi palsu per kelas per hasil")
+    smoothing_parser.add_argument("--window", type=int, default=None, help="Default: config.SMOOTHING_WINDOW")
+    smoothing_parser.add_argument("--trigger-ratio", type=float, default=None, help="Default: config.SMOOTHING_TRIGGER_RATIO")
+    smoothing_parser.add_argument("--clear-ratio", type=float, default=None, help="Default: config.SMOOTHING_CLEAR_RATIO")
+    smoothing_parser.add_argument("--stable-seconds", type=float, default=3600.0, help="Durasi skenario stabil")
+    smoothing_parser.add_argument("--change-at", type=float, default=20.0, help="Waktu objek diambil di skenario perubahan")
+    smoothing_parser.add_argument("--detect-window", type=float, default=30.0, help="Batas waktu alarm sesudah perubahan")
+    smoothing_parser.add_argument("--trials", type=int, default=200)
+    smoothing_parser.add_argument("--seed", type=int, default=0)
+    smoothing_parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    smoothing_parser.set_defaults(func=benchmark_smoothing)
+
+    e2e = subparsers.add_parser("e2e", help="End-to-end video -> deteksi -> baseline -> log tanpa GUI, hasil JSON untuk dibandingkan antar commit")
+    e2e.add_argument("--video", nargs="+", help="File video rekaman (boleh lebih dari satu)")
+    e2e.add_argument("--synthetic", type=int, default=0, help="Jumlah klip sintetis tambahan (default 1 jika --video tidak diberikan)")
+    e2e.add_argument("--seconds", type=float, default=20.0, help="Durasi klip sintetis")
+    e2e.add_argument("--fps", type=float, default=15.0, help="FPS klip sintetis")
+    e2e.add_argument("--width", type=int, default=1280)
+    e2e.add_argument("--height", type=int, default=720)
+    e2e.add_argument("--frames", type=int, default=None, help="Batas frame yang diukur per video (default: semua)")
+    e2e.add_argument("--warmup", type=int, default=5, help="Frame awal yang tidak dihitung")
+    e2e.add_argument("--motion-gate", action="store_true", help="Aktifkan motion gate seperti di main.py")
+    e2e.add_argument("--conf", type=float, default=None, help="Ambang confidence (default: config.CONFIDENCE_THRESHOLD)")
+    e2e.add_argument("--compare", help="File JSON hasil e2e sebelumnya untuk dibandingkan")
+    e2e.add_argument("--output", help="Simpan hasil ke file JSON")
+    e2e.set_defaults(func=benchmark_e2e)
+
+    startup = subparsers.add_parser("startup", help="Waktu import dan waktu sampai deteksi pertama (cache model dingin/hangat, dengan/tanpa warm-up)")
+    startup.add_argument("--backends", nargs="+", default=["torch"])
+    startup.add_argument("--camera-open", type=float, default=1.0, help="Lama membuka kamera yang disimulasikan (detik)")
+    startup.add_argument("--repeats", type=int, default=3)
+    startup.add_argument("--output", help="Simpan hasil ke file JSON")
+    startup.set_defaults(func=benchmark_startup)
+
+    forensic_parser = subparsers.add_parser("forensic", help="Skala analisis forensik rekaman terhadap jumlah proses worker (kelipatan real-time)")
+    forensic_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    forensic_parser.add_argument("--video", nargs="+", help="File video rekaman (default: klip sintetis)")
+    forensic_parser.add_argument("--synthetic", type=int, default=2, help="Jumlah klip sintetis jika --video tidak diberikan")
+    forensic_parser.add_argument("--seconds", type=float, default=60.0, help="Durasi klip sintetis")
+    forensic_parser.add_argument("--fps", type=float, default=15.0, help="FPS klip sintetis")
+    forensic_parser.add_argument("--width", type=int, default=1280)
+    forensic_parser.add_argument("--height", type=int, default=720)
+    forensic_parser.add_argument("--chunk-seconds", type=float, default=15.0)
+    forensic_parser.add_argument("--sample-fps", type=float, default=5.0)
+    forensic_parser.add_argument("--conf", type=float, default=None, help="Ambang confidence (default: config.CONFIDENCE_THRESHOLD)")
+    forensic_parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    forensic_parser.set_defaults(func=benchmark_forensic)
+
+    monitor_parser = subparsers.add_parser("monitor", help="Latensi transisi mesin status pemantauan di bawah input kontrol bersamaan: lock global lama vs SecurityMonitor")
+    monitor_parser.add_argument("--cameras", type=int, nargs="+", default=[1, 4], help="Jumlah kamera (SecurityMonitor) dalam satu proses")
+    monitor_parser.add_argument("--write-delays", type=float, nargs="+", default=[0, 20], help="Tambahan lama menulis file baseline (ms), meniru penyimpanan lambat")
+    monitor_parser.add_argument("--seconds", type=float, default=3.0, help="Durasi per skenario")
+    monitor_parser.add_argument("--fps", type=float, default=15.0, help="Hasil deteksi per detik per kamera")
+    monitor_parser.add_argument("--render-fps", type=float, default=30.0)
+    monitor_parser.add_argument("--control-threads", type=int, default=4, help="Thread yang mengirim perintah kontrol bersamaan")
+    monitor_parser.add_argument("--control-rate", type=float, default=5.0, help="Perintah per detik per thread kontrol")
+    monitor_parser.add_argument("--change-rate", type=float, default=0.9, help="Peluang hasil deteksi berisi perubahan")
+    monitor_parser.add_argument("--persistence", type=float, default=0.2, help="Ambang persistensi alarm (detik jam simulasi)")
+    monitor_parser.add_argument("--speedup", type=float, default=1.0, help="Kelipatan kecepatan jam simulasi terhadap waktu nyata")
+    monitor_parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    monitor_parser.set_defaults(func=benchmark_monitor)
+
+    server_parser = subparsers.add_parser("inference-server", help="Memori dan throughput N proses: model per proses vs satu server inferensi bersama")
+    server_parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    server_parser.add_argument("--frames", type=int, default=30, help="Frame yang dideteksi per proses")
+    server_parser.add_argument("--width", type=int, default=1280)
+    server_parser.add_argument("--height", type=int, default=720)
+    server_parser.add_argument("--batch-window-ms", type=float, default=None, help="Default: config.INFERENCE_SERVER_BATCH_WINDOW_MS")
+    server_parser.add_argument("--max-batch", type=int, default=None, help="Default: config.INFERENCE_SERVER_MAX_BATCH")
+    server_parser.add_argument("--timeout", type=float, default=300.0, help="Batas waktu menunggu proses siap/selesai (detik)")
+    server_parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    server_parser.set_defaults(func=benchmark_inference_server)
+
+    tiling_parser = subparsers.add_parser("tiling", help="Recall objek kecil dan latensi: frame penuh vs inferensi ber-tile (tanpa/dengan cache tile)")
+    tiling_parser.add_argument("--video", help="File video sebagai sumber frame (default: scene diam sintetis dengan satu objek bergerak)")
+    tiling_parser.add_argument("--frames", type=int, default=20)
+    tiling_parser.add_argument("--warmup", type=int, default=2)
+    tiling_parser.add_argument("--width", type=int, default=1920)
+    tiling_parser.add_argument("--height", type=int, default=1080)
+    tiling_parser.add_argument("--fps", type=float, default=10.0, help="Jarak waktu antar frame untuk cache tile (frame/detik)")
+    tiling_parser.add_argument("--small-size", type=int, default=64, help="Objek referensi dengan sisi terpanjang di bawah ini dihitung di recall_small (piksel)")
+    tiling_parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    tiling_parser.set_defaults(func=benchmark_tiling)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+import config
+import metrics
+
+# --- Thread Capture dengan Buffer Frame Terbaru ---
+class FrameGrabber:
+    """
+    Membungkus cv2.VideoCapture dan membaca frame di thread terpisah.
+    Hanya frame terbaru yang disimpan, sehingga loop utama tidak pernah
+    memproses frame lama yang menumpuk di buffer internal OpenCV.
+    """
+
+    def __init__(self, cap, buffer_size=1, pace_fps=None):
+        self.cap = cap
+        self.pace_fps = pace_fps # File video dibaca dengan kecepatan aslinya (seperti kamera), bukan secepat decode
+        # Memperkecil buffer internal OpenCV (tidak semua backend mendukung, diabaikan jika gagal)
+        try:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        except Exception:
+            pass
+
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = None
+        self._seq = 0 # Nomor urut frame yang terakhir dibaca dari kamera
+        self._last_returned_seq = 0 # Nomor urut frame terakhir yang diambil loop utama
+
+        self.frames_read = 0 # Jumlah frame yang berhasil dibaca dari kamera
+        self.frames_dropped = 0 # Frame yang ditimpa frame baru sebelum sempat diambil
+        self.failed = False # True jika cap.read() gagal (kamera terputus)
+
+        self._running = False
+        self._thread = None
+        self._release_requested = False
+        self._released = False
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._update, name="capture_thread")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def _update(self):
+        try:
+            self._read_loop()
+        finally:
+            # release() yang tidak bisa menunggu thread ini (cap.read() menggantung) menyerahkan pelepasan ke sini
+            self._release_capture()
+
+    def _read_loop(self):
+        next_frame_time = time.perf_counter()
+        while self._running:
+            if self.pace_fps:
+                next_frame_time += 1.0 / self.pace_fps
+                time.sleep(max(0.0, next_frame_time - time.perf_counter()))
+            read_start = time.perf_counter()
+            ret, frame = self.cap.read()
+            timestamp = time.time()
+            metrics.observe_stage("capture_read", time.perf_counter() - read_start)
+
+            with self._condition:
+                if not ret:
+                    self.failed = True
+                    self._running = False
+                    self._condition.notify_all()
+                    break
+
+                # Frame sebelumnya belum diambil loop utama -> dihitung sebagai frame yang dibuang
+                if self._seq > self._last_returned_seq:
+                    self.frames_dropped += 1
+
+                self._frame = frame
+                self._timestamp = timestamp
+                self._seq += 1
+                self.frames_read += 1
+                self._condition.notify_all()
+
+    def read(self, timeout=0.05):
+        """
+        Mengambil frame terbaru yang belum pernah diambil beserta waktu capture-nya.
+        Menunggu paling lama `timeout` detik (0 = tidak menunggu sama sekali).
+        Mengembalikan (ret, frame, timestamp). ret False berarti kamera gagal;
+        frame None berarti belum ada frame baru.
+        """
+        with self._condition:
+            if self._seq == self._last_returned_seq and not self.failed and timeout:
+                self._condition.wait(timeout)
+
+            if self._seq > self._last_returned_seq:
+                self._last_returned_seq = self._seq
+                return True, self._frame, self._timestamp
+
+            if self.failed:
+                return False, None, None
+
+            return True, None, None
+
+    def latest(self):
+        """
+        Mengambil frame terbaru tanpa menandainya sudah diambil (tidak menunggu).
+        Dipakai pembaca tambahan, misal worker inferensi batch. Mengembalikan (frame, timestamp, seq).
+        """
+        with self._condition:
+            return self._frame, self._timestamp, self._seq
+
+    def stats(self):
+        with self._condition:
+            return {
+                "frames_read": self.frames_read,
+                "frames_dropped": self.frames_dropped,
+            }
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def release(self):
+        """
+        Melepas kamera. cap.release() tidak boleh berjalan bersamaan dengan cap.read() di thread
+        capture, jadi jika thread masih menggantung setelah stop(), thread itu yang melepas kamera
+        begitu read() kembali.
+        """
+        thread = self._thread
+        with self._condition:
+            self._release_requested = True
+        self.stop()
+        if thread is None or not thread.is_alive():
+            self._release_capture()
+
+    def _release_capture(self):
+        with self._condition:
+            if not self._release_requested or self._released:
+                return
+            self._released = True
+        if self.cap is not None and self.cap.isOpened():
+            self.cap.release()
+
+
+# --- Sumber Video dari Config/CLI ---
+def parse_source(value):
+    """'1' -> 1 (indeks webcam); URL (http://, rtsp://) dan path file video tetap string."""
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value.strip())
+    return value
+
+
+def is_stream_source(source):
+    return isinstance(source, str) and "://" in source
+
+
+def is_file_source(source):
+    return isinstance(source, str) and not is_stream_source(source) and os.path.isfile(source)
+
+
+def open_capture(source):
+    """
+    Membuka sumber video dan menerapkan properti capture dari config (resolusi, FPS).
+    URL dibuka dengan batas waktu buka/baca (backend FFmpeg), sehingga Wi-Fi yang putus
+    membuat read() gagal alih-alih menggantung. Mengembalikan None jika gagal.
+    """
+    if is_stream_source(source):
+        timeout_ms = int(config.CAMERA_OPEN_TIMEOUT * 1000)
+        cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG, [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms])
+    else:
+        cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        cap.release()
+        return None
+
+    # Tidak semua kamera/backend mendukung setiap properti, nilai yang ditolak diabaikan
+    for prop, value in ((cv2.CAP_PROP_FRAME_WIDTH, config.CAMERA_WIDTH), (cv2.CAP_PROP_FRAME_HEIGHT, config.CAMERA_HEIGHT), (cv2.CAP_PROP_FPS, config.CAMERA_FPS)):
+        if value:
+            try:
+                cap.set(prop, value)
+            except Exception:
+                pass
+    return cap
+
+
+# --- Supervisor Kamera: Sambung Ulang Otomatis dengan Backoff ---
+class CameraSupervisor:
+    """
+    Menjaga satu sumber video tetap tersambung tanpa interaksi pengguna.
+    Thread supervisor menganggap kamera terputus jika read() gagal atau tidak ada frame baru
+    selama CAMERA_STALL_TIMEOUT, lalu membuka ulang sumber yang sama dengan jeda backoff
+    eksponensial (CAMERA_RECONNECT_INITIAL_DELAY sampai CAMERA_RECONNECT_MAX_DELAY).
+    Antarmuka bacanya sama dengan FrameGrabber (read/latest/stats); nomor urut frame dan
+    counter terus naik melewati sambung ulang. Selama terputus read() tidak menunggu lebih
+    lama dari `timeout`, sehingga loop utama (tampilan, tombol, alarm) tetap berjalan.
+    File video tidak disambung ulang: setelah frame terakhir read() mengembalikan ret False.
+    `on_event(event, details)` dipanggil dari thread supervisor untuk "camera_lost" dan "camera_restored".
+    """
+
+    def __init__(self, source, name="kamera", on_event=None, cap=None):
+        self.source = source
+        self.name = name
+        self.on_event = on_event or (lambda event, details: None)
+        self.is_file = is_file_source(source)
+
+        self._lock = threading.Lock()
+        self._grabber = None
+        self._initial_cap = cap # Kamera yang sudah dibuka pemanggil (misal pilihan interaktif)
+        self._attached_at = 0.0
+        self._seq_base = 0 # Nomor urut frame dari koneksi-koneksi sebelumnya
+        self._frames_read_base = 0
+        self._frames_dropped_base = 0
+        self._last_frame = None # Frame terakhir sebelum terputus, dasar gambar pengganti
+
+        self.connected = False
+        self.ended = False # True jika file video sudah habis
+        self.started_at = time.time()
+        self.lost_at = None # Waktu kamera terputus (None jika tersambung)
+        self.downtime = 0.0 # Total detik terputus dari outage yang sudah selesai
+        self.outages = 0
+        self.reconnect_attempts = 0 # Percobaan membuka ulang pada outage saat ini
+        self.total_reconnect_attempts = 0
+        self.reconnect_seconds = [] # Lama setiap outage sampai tersambung lagi
+        self.next_retry_delay = config.CAMERA_RECONNECT_INITIAL_DELAY
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Mencoba membuka kamera sekali secara langsung; jika gagal, thread supervisor terus mencoba."""
+        cap = self._initial_cap or open_capture(self.source)
+        self._initial_cap = None
+        if cap is not None:
+            self._attach(cap)
+            print(f"Kamera '{self.name}' aktif (sumber: {self.source}).", flush=True)
+        else:
+            self._mark_lost("open_failed", "Sumber video tidak dapat dibuka saat start.")
+        self._thread = threading.Thread(target=self._run, name=f"camera_supervisor_{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _attach(self, cap):
+        pace_fps = (cap.get(cv2.CAP_PROP_FPS) or 30.0) if self.is_file else None
+        grabber = FrameGrabber(cap, buffer_size=config.CAMERA_BUFFER_SIZE, pace_fps=pace_fps).start()
+        with self._lock:
+            self._grabber = grabber
+            self._attached_at = time.time()
+            self.connected = True
+
+    def _detach(self):
+        with self._lock:
+            grabber, self._grabber = self._grabber, None
+            self.connected = False
+            if grabber is None:
+                return
+            frame, _, seq = grabber.latest()
+            self._last_frame = frame if frame is not None else self._last_frame
+            self._seq_base += seq
+            self._frames_read_base += grabber.frames_read
+            self._frames_dropped_base += grabber.frames_dropped
+        # cap.read() bisa masih menggantung (aliran macet); pelepasan tidak boleh menahan supervisor
+        threading.Thread(target=grabber.release, name=f"camera_release_{self.name}", daemon=True).start()
+
+    def _mark_lost(self, reason, message, since=None):
+        """`since` = waktu frame terakhir jika aliran macet, sehingga lama outage dihitung dari frame terakhir."""
+        self.lost_at = since or time.time()
+        self.outages += 1
+        self.reconnect_attempts = 0
+        self.next_retry_delay = config.CAMERA_RECONNECT_INITIAL_DELAY
+        print(f"Kamera '{self.name}' terputus: {message} Menyambung ulang di latar belakang...", flush=True)
+        self.on_event("camera_lost", {"camera": self.name, "source": str(self.source), "reason": reason})
+
+    def _mark_restored(self):
+        outage_seconds = time.time() - self.lost_at
+        self.reconnect_seconds.append(outage_seconds)
+        self.downtime += outage_seconds
+        self.lost_at = None
+        print(f"Kamera '{self.name}' tersambung kembali setelah {outage_seconds:.1f} detik ({self.reconnect_attempts} percobaan).", flush=True)
+        self.on_event("camera_restored", {"camera": self.name, "source": str(self.source), "outage_seconds": round(outage_seconds, 2), "attempts": self.reconnect_attempts})
+
+    def _check_lost(self, grabber):
+        """(alasan, pesan, sejak) jika kamera dianggap terputus, None jika masih sehat."""
+        if grabber.failed:
+            return "read_failed", "Gagal membaca frame.", None
+        _, timestamp, _ = grabber.latest()
+        last_activity = max(timestamp or 0.0, self._attached_at)
+        if time.time() - last_activity > config.CAMERA_STALL_TIMEOUT:
+            return "stalled", f"Tidak ada frame baru selama {config.CAMERA_STALL_TIMEOUT:g} detik.", last_activity
+        return None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            grabber = self._grabber
+            if grabber is not None:
+                lost = self._check_lost(grabber)
+                if lost is None:
+                    self._stop_event.wait(0.2)
+                    continue
+                self._detach()
+                if self.is_file and grabber.failed:
+                    self.ended = True
+                    print(f"Video '{self.source}' selesai diputar.", flush=True)
+                    return
+                self._mark_lost(*lost)
+
+            self.reconnect_attempts += 1
+            self.total_reconnect_attempts += 1
+            cap = open_capture(self.source)
+            if cap is not None:
+                self._attach(cap)
+                self._mark_restored()
+                continue
+            if self._stop_event.wait(self.next_retry_delay):
+                return
+            self.next_retry_delay = min(self.next_retry_delay * config.CAMERA_RECONNECT_BACKOFF, config.CAMERA_RECONNECT_MAX_DELAY)
+
+    # --- Antarmuka Baca (sama dengan FrameGrabber) ---
+    def read(self, timeout=0.05):
+        grabber = self._grabber
+        if grabber is None:
+            if self.ended:
+                return False, None, None
+            if timeout:
+                self._stop_event.wait(timeout)
+            return True, None, None
+        ret, frame, timestamp = grabber.read(timeout)
+        if not ret:
+            return True, None, None # Kegagalan dideteksi thread supervisor, yang menyambung ulang atau menandai file selesai
+        return True, frame, timestamp
+
+    def latest(self):
+        with self._lock:
+            grabber, seq_base = self._grabber, self._seq_base
+        if grabber is None:
+            return None, None, seq_base
+        frame, timestamp, seq = grabber.latest()
+        return frame, timestamp, seq_base + seq
+
+    @property
+    def frames_read(self):
+        grabber = self._grabber
+        return self._frames_read_base + (grabber.frames_read if grabber is not None else 0)
+
+    @property
+    def frames_dropped(self):
+        grabber = self._grabber
+        return self._frames_dropped_base + (grabber.frames_dropped if grabber is not None else 0)
+
+    def uptime_ratio(self):
+        elapsed = time.time() - self.started_at
+        current_outage = time.time() - self.lost_at if self.lost_at is not None else 0.0
+        return max(0.0, 1.0 - (self.downtime + current_outage) / elapsed) if elapsed > 0 else 1.0
+
+    def stats(self):
+        return {
+            "frames_read": self.frames_read,
+            "frames_dropped": self.frames_dropped,
+            "outages": self.outages,
+            "reconnect_attempts": self.total_reconnect_attempts,
+            "uptime_ratio": round(self.uptime_ratio(), 4),
+            "last_reconnect_seconds": round(self.reconnect_seconds[-1], 2) if self.reconnect_seconds else None,
+            "max_reconnect_seconds": round(max(self.reconnect_seconds), 2) if self.reconnect_seconds else None,
+        }
+
+    def outage_frame(self, size=(480, 640)):
+        """Gambar pengganti selama kamera terputus: frame terakhir yang digelapkan dengan status sambung ulang."""
+        frame = (self._last_frame // 3) if self._last_frame is not None else np.zeros((*size, 3), dtype=np.uint8)
+        lost_seconds = time.time() - self.lost_at if self.lost_at is not None else 0.0
+        lines = [
+            ("KAMERA TERPUTUS", 0.9, (0, 0, 255), 2),
+            (f"Menyambung ulang... percobaan {self.reconnect_attempts}, jeda {self.next_retry_delay:.1f} s", 0.5, (255, 255, 255), 1),
+            (f"Terputus selama {lost_seconds:.0f} detik", 0.5, (255, 255, 255), 1),
+        ]
+        y = frame.shape[0] // 2 - 30
+        for text, scale, color, thickness in lines:
+            cv2.putText(frame, text, (20, y), cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness, cv2.LINE_AA)
+            y += 30
+        return frame
+
+    def isOpened(self):
+        return self.connected
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+
+    def release(self):
+        self.stop()
+        with self._lock:
+            grabber, self._grabber = self._grabber, None
+            self.connected = False
+        if grabber is not None:
+            grabber.release()
@@ -0,0 +1,209 @@
+import collections
+import datetime
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+import config
+
+# --- Rekaman Klip Sebelum/Sesudah Event ---
+# Frame terakhir disimpan di ring buffer dalam bentuk JPEG (bukan array BGR mentah),
+# sehingga 30 detik video 720p hanya butuh puluhan MB. Saat event terjadi, isi buffer
+# (sebelum event) ditambah beberapa detik sesudahnya ditulis menjadi file video oleh
+# thread latar belakang, tidak di loop utama.
+
+
+class PendingClip:
+    """Klip yang masih mengumpulkan frame sesudah event."""
+
+    def __init__(self, path, event_timestamp, frames, post_seconds):
+        self.path = path
+        self.end_timestamp = event_timestamp + post_seconds
+        self.frames = frames # list (timestamp, jpeg_bytes)
+
+
+class ClipRecorder:
+    """
+    Ring buffer frame JPEG untuk satu kamera.
+    - add_frame() dipanggil dari loop utama, hanya memasukkan referensi frame ke antrian.
+    - Thread encoder mengambil sampel frame (maksimal `fps` per detik), meng-encode JPEG,
+      dan membuang frame yang lebih tua dari `pre_seconds` atau melebihi `max_buffer_mb`.
+    - trigger() langsung mengembalikan path klip; file ditulis thread penulis setelah
+      `post_seconds` detik sesudah event terkumpul.
+    """
+
+    def __init__(self, name="kamera", clip_dir=None, pre_seconds=None, post_seconds=None, fps=None, jpeg_quality=None, max_width=None, max_buffer_mb=None, codec=None):
+        self.name = name
+        self.clip_dir = clip_dir or config.CLIPS_DIR
+        self.pre_seconds = pre_seconds if pre_seconds is not None else config.CLIP_PRE_SECONDS
+        self.post_seconds = post_seconds if post_seconds is not None else config.CLIP_POST_SECONDS
+        self.fps = fps or config.CLIP_FPS
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality if jpeg_quality is not None else config.CLIP_JPEG_QUALITY)]
+        self.max_width = max_width if max_width is not None else config.CLIP_MAX_WIDTH
+        self.max_buffer_bytes = int((max_buffer_mb or config.CLIP_BUFFER_MAX_MB) * 1024 * 1024)
+        self.codec = codec or config.CLIP_CODEC
+
+        self._input = queue.Queue(maxsize=4) # Frame mentah menunggu di-encode, dibuang jika encoder tertinggal
+        self._buffer = collections.deque() # (timestamp, jpeg_bytes)
+        self._buffer_bytes = 0
+        self._pending = []
+        self._write_queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._name_lock = threading.Lock()
+        self._last_stamp = None
+        self._last_sample_timestamp = 0.0
+        self._stop_event = threading.Event()
+        self._encoder_thread = None
+        self._writer_thread = None
+
+        self.frames_encoded = 0
+        self.frames_dropped = 0 # Frame yang tidak sempat di-encode
+        self.encode_seconds = 0.0
+        self.clips_written = 0
+        self.clip_frames_written = 0
+        self.clip_write_seconds = 0.0
+
+    def start(self):
+        self._encoder_thread = threading.Thread(target=self._run_encoder, name=f"clip_encoder_{self.name}")
+        self._encoder_thread.daemon = True
+        self._encoder_thread.start()
+        self._writer_thread = threading.Thread(target=self._run_writer, name=f"clip_writer_{self.name}")
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+        return self
+
+    # --- Dipanggil dari Loop Utama ---
+    def add_frame(self, frame, timestamp):
+        """Memasukkan frame kamera (tidak disalin, jangan diubah setelahnya). Tidak pernah menunggu."""
+        if timestamp - self._last_sample_timestamp < 1.0 / self.fps:
+            return
+        self._last_sample_timestamp = timestamp
+        try:
+            self._input.put_nowait((frame, timestamp))
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def trigger(self, event_timestamp, prefix="klip"):
+        """
+        Menandai event pada waktu capture `event_timestamp`. Mengembalikan path klip
+        yang akan berisi `pre_seconds` sebelum dan `post_seconds` sesudah event.
+        """
+        path = self._reserve_path(prefix)
+        with self._lock:
+            frames = [item for item in self._buffer if item[0] >= event_timestamp - self.pre_seconds]
+            self._pending.append(PendingClip(path, event_timestamp, frames, self.post_seconds))
+        return path
+
+    def _reserve_path(self, prefix):
+        with self._name_lock:
+            stamp = datetime.datetime.now()
+            if self._last_stamp is not None and stamp <= self._last_stamp:
+                stamp = self._last_stamp + datetime.timedelta(microseconds=1)
+            self._last_stamp = stamp
+        return os.path.join(self.clip_dir, f"{prefix}_{self.name}_{stamp.strftime('%Y%m%d_%H%M%S_%f')}.mp4")
+
+    # --- Thread Encoder: Frame Mentah -> JPEG di Ring Buffer ---
+    def _run_encoder(self):
+        while not self._stop_event.is_set():
+            try:
+                frame, timestamp = self._input.get(timeout=0.2)
+            except queue.Empty:
+                self._finish_due_clips(time.time())
+                continue
+
+            start_time = time.perf_counter()
+            height, width = frame.shape[:2]
+            if self.max_width and width > self.max_width:
+                frame = cv2.resize(frame, (self.max_width, int(round(height * self.max_width / width))), interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode(".jpg", frame, self.jpeg_params)
+            self.encode_seconds += time.perf_counter() - start_time
+            if not ok:
+                continue
+            item = (timestamp, encoded.tobytes())
+            self.frames_encoded += 1
+
+            with self._lock:
+                self._buffer.append(item)
+                self._buffer_bytes += len(item[1])
+                while self._buffer and (self._buffer[0][0] < timestamp - self.pre_seconds or self._buffer_bytes > self.max_buffer_bytes):
+                    self._buffer_bytes -= len(self._buffer.popleft()[1])
+                for clip in self._pending:
+                    if timestamp <= clip.end_timestamp:
+                        clip.frames.append(item)
+            self._finish_due_clips(timestamp)
+
+    def _finish_due_clips(self, now):
+        """Klip yang waktu sesudah-event-nya sudah lewat dikirim ke thread penulis."""
+        with self._lock:
+            due = [clip for clip in self._pending if now > clip.end_timestamp]
+            self._pending = [clip for clip in self._pending if now <= clip.end_timestamp]
+        for clip in due:
+            self._write_queue.put(clip)
+
+    # --- Thread Penulis: JPEG -> File Video ---
+    def _run_writer(self):
+        while True:
+            clip = self._write_queue.get()
+            if clip is None:
+                return
+            self._write_clip(clip)
+
+    def _write_clip(self, clip):
+        if not clip.frames:
+            print(f"Peringatan: Tidak ada frame untuk klip {clip.path}.", flush=True)
+            return
+        start_time = time.perf_counter()
+        duration = clip.frames[-1][0] - clip.frames[0][0]
+        # FPS file mengikuti laju sampel sebenarnya, agar durasi klip sesuai waktu nyata
+        fps = min(float(self.fps), (len(clip.frames) - 1) / duration) if duration > 0 else float(self.fps)
+        first_frame = cv2.imdecode(np.frombuffer(clip.frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+        size = (first_frame.shape[1], first_frame.shape[0])
+
+        os.makedirs(os.path.dirname(clip.path), exist_ok=True)
+        temp_path = clip.path[:-len(".mp4")] + ".tmp.mp4" # Ekstensi menentukan container VideoWriter
+        writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*self.codec), max(fps, 1.0), size)
+        if not writer.isOpened():
+            print(f"Error: Tidak bisa membuat file klip {clip.path} (codec {self.codec}).", flush=True)
+            return
+        for _, jpeg_bytes in clip.frames:
+            frame = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR)
+            if (frame.shape[1], frame.shape[0]) != size: # Resolusi bisa berubah setelah kamera tersambung ulang
+                frame = cv2.resize(frame, size)
+            writer.write(frame)
+        writer.release()
+        os.replace(temp_path, clip.path)
+
+        self.clips_written += 1
+        self.clip_frames_written += len(clip.frames)
+        self.clip_write_seconds += time.perf_counter() - start_time
+        print(f"Klip disimpan: {clip.path} ({len(clip.frames)} frame, {duration:.1f} detik)", flush=True)
+
+    def stats(self):
+        with self._lock:
+            buffer_frames = len(self._buffer)
+            buffer_bytes = self._buffer_bytes
+        return {
+            "buffer_frames": buffer_frames,
+            "buffer_mb": round(buffer_bytes / (1024 * 1024), 2),
+            "frames_encoded": self.frames_encoded,
+            "frames_dropped": self.frames_dropped,
+            "encode_fps": round(self.frames_encoded / self.encode_seconds, 1) if self.encode_seconds else 0.0,
+            "clips_written": self.clips_written,
+            "clip_write_fps": round(self.clip_frames_written / self.clip_write_seconds, 1) if self.clip_write_seconds else 0.0,
+        }
+
+    def close(self):
+        """Menyelesaikan klip yang masih berjalan (dengan frame yang sudah ada) lalu menghentikan thread."""
+        if self._encoder_thread is None:
+            return
+        self._stop_event.set()
+        self._encoder_thread.join(timeout=2)
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for clip in pending:
+            self._write_queue.put(clip)
+        self._write_queue.put(None)
+        self._writer_thread.join(timeout=30)
+        self._encoder_thread = None
@@ -17,9 +17,100 @@ YOLO_MODEL_PATH = os.path.join(MODELS_DIR, 'yolov8n.pt')
 
 # --- Pengaturan Sistem ---
 ACCESS_CODE = "123"
+ACCESS_MAX_FAILED_ATTEMPTS = 3 # Kode salah berturut-turut (terminal dan API digabung) sebelum kode akses dikunci
+ACCESS_LOCKOUT_SECONDS = 30.0 # Lama kunci pertama; berlipat ganda setiap kali terkunci lagi
+ACCESS_LOCKOUT_MAX_SECONDS = 900.0
 CONFIDENCE_THRESHOLD = 0.5
 ALARM_PERSISTENCE_THRESHOLD = 2.0
 
+# --- Pengaturan Penghalusan Jumlah Objek (smoothing.py) ---
+SMOOTHING_ENABLED = True # Alarm memakai jumlah yang dihaluskan dan (jika TRACKING_ENABLED) event tracker yang dihaluskan, bukan hasil satu deteksi
+SMOOTHING_WINDOW = 5 # Jumlah hasil deteksi terakhir per kelas yang dipertimbangkan
+SMOOTHING_TRIGGER_RATIO = 0.6 # Jumlah yang menyimpang dari baseline harus muncul di minimal 60% jendela sebelum dipakai
+SMOOTHING_CLEAR_RATIO = 0.4 # Kembali ke jumlah baseline cukup muncul di 40% jendela (histeresis)
+
+# --- Pengaturan Log Aktivitas (JSON Lines, ditulis thread latar belakang) ---
+LOG_QUEUE_SIZE = 1000 # Maksimal entri yang menunggu ditulis
+LOG_QUEUE_PUT_TIMEOUT = 0.5 # Detik menunggu saat antrian penuh sebelum entri dibuang
+LOG_BATCH_SIZE = 100 # Maksimal entri per penulisan
+LOG_FLUSH_INTERVAL = 1.0 # Maksimal detik entri menunggu sebelum ditulis
+LOG_FSYNC = False # True = fsync setiap batch (lebih aman saat listrik mati, lebih lambat)
+EVENT_STORE_ENABLED = True # Simpan juga setiap entri log ke database SQLite terindeks (lihat event_store.py)
+EVENT_DB_PATH = os.path.join(LOG_DIR, 'events.sqlite3')
+
+# --- Pengaturan Screenshot (ditulis pool thread latar belakang) ---
+SCREENSHOT_FORMAT = "jpg" # "jpg" atau "webp"
+SCREENSHOT_JPEG_QUALITY = 90 # 0-100
+SCREENSHOT_WEBP_QUALITY = 80 # 1-100
+SCREENSHOT_MAX_WIDTH = 0 # Perkecil screenshot ke lebar ini (piksel), 0 = ukuran asli
+SCREENSHOT_WORKERS = 2 # Jumlah thread encode/tulis
+SCREENSHOT_QUEUE_SIZE = 16 # Maksimal screenshot yang menunggu ditulis
+SCREENSHOT_QUEUE_PUT_TIMEOUT = 1.0 # Detik menunggu saat antrian penuh sebelum ditulis langsung di loop utama
+
+# --- Pengaturan Pemeliharaan Log dan Bukti (maintenance.py, thread latar belakang) ---
+# Screenshot di folder unauthorized dan screenshot yang dirujuk event unauthorized tidak pernah dihapus.
+MAINTENANCE_ENABLED = True
+MAINTENANCE_INTERVAL = 3600.0 # Jeda antar putaran pemeliharaan (detik)
+MAINTENANCE_START_DELAY = 120.0 # Putaran pertama ditunda agar tidak bersaing dengan startup (detik)
+LOG_COMPRESS_ENABLED = True # Log hari yang sudah lewat dikompres menjadi YYYY-MM-DD.jsonl.gz
+LOG_COMPRESS_GRACE = 600.0 # File log baru dikompres jika tidak ditulis selama N detik
+SCREENSHOT_RETENTION_DAYS = 90 # Screenshot lain yang lebih tua dihapus, 0 = tanpa batas umur
+SCREENSHOT_MAX_TOTAL_MB = 2048 # Batas total ukuran screenshot; yang tertua dihapus lebih dulu, 0 = tanpa batas ukuran
+SCREENSHOT_DEDUPE_ENABLED = True # Capture berturut-turut yang hampir sama (dHash) cukup disimpan sekali
+SCREENSHOT_DEDUPE_MAX_DISTANCE = 4 # Bit dHash (dari 64) yang boleh berbeda agar dua capture dianggap sama
+SCREENSHOT_DEDUPE_WINDOW = 600.0 # Capture hanya dibandingkan dengan capture sebelumnya dalam N detik
+EVIDENCE_INDEX_PATH = os.path.join(CHANGES_DIR, 'evidence_index.sqlite3') # Indeks event -> file bukti (lihat maintenance.py lookup)
+
+# --- Pengaturan Event Bus dan Sink (events.py) ---
+# Setiap event (stock_change, alarm_acknowledged, baseline_set, camera_lost, ...) dikirim ke sink
+# log, screenshot, suara, dan popup, ditambah webhook/socket di bawah. Setiap sink punya antrian
+# dan thread sendiri, jadi sink yang lambat tidak menahan loop video.
+EVENT_WEBHOOK_URLS = [] # Misal ["http://127.0.0.1:8000/objsec/events"], entri log dikirim sebagai JSON (POST)
+EVENT_SOCKET_ADDRESSES = [] # Misal ["127.0.0.1:9200"] (TCP) atau ["/tmp/objsec.sock"] (Unix socket), satu baris JSON per event
+EVENT_REMOTE_EVENTS = ["stock_change", "alarm_acknowledged", "camera_lost", "camera_restored"] # Event untuk webhook/socket, None = semua
+EVENT_SINK_QUEUE_SIZE = 100 # Event yang boleh menunggu per sink; jika penuh event untuk sink itu dibuang
+EVENT_SINK_TIMEOUT = 2.0 # Batas waktu satu pengiriman webhook/socket (detik)
+EVENT_SINK_RETRIES = 3 # Percobaan ulang jika sink gagal
+EVENT_SINK_RETRY_DELAY = 0.5 # Jeda sebelum percobaan ulang pertama, berlipat dua setiap percobaan (detik)
+EVENT_BUS_CLOSE_TIMEOUT = 5.0 # Waktu maksimal per sink untuk menyelesaikan antrian saat sistem berhenti (detik)
+
+# --- Pengaturan Mesin Status Pemantauan (security_monitor.py) ---
+# Baseline yang diatur/diperbarui ditulis thread latar (file sementara + os.replace), bukan di loop video.
+STATE_WRITER_CLOSE_TIMEOUT = 5.0 # Waktu maksimal menulis sisa baseline saat sistem berhenti (detik)
+
+# --- Pengaturan Zona Pemantauan (Region of Interest) ---
+# Kosong = seluruh frame diinferensi seperti biasa. Koordinat dalam piksel frame kamera.
+# Contoh:
+# ZONES = [
+#     {"name": "rak_atas", "rect": [100, 40, 620, 220]},
+#     {"name": "rak_bawah", "polygon": [[80, 260], [600, 260], [630, 460], [50, 460]]},
+#     {"name": "meja_kasir", "rect": [0, 0, 320, 240], "camera": "kamera_2"}, # Hanya untuk kamera tertentu (multi-kamera)
+# ]
+ZONES = []
+ZONE_CROP_PADDING = 16 # Piksel di sekitar zona yang ikut di-crop agar objek di tepi zona tetap utuh
+ZONE_STATE_FILE = os.path.join(BASE_DIR, 'initial_state_zones.json') # Baseline per zona
+
+# --- Pengaturan Pelacakan Objek (Tracker) ---
+TRACKING_ENABLED = True # Alarm berdasarkan identitas objek (dipindah/hilang/muncul), bukan hanya jumlah per kelas
+INITIAL_TRACKS_FILE = os.path.join(BASE_DIR, 'initial_tracks.json') # Baseline objek beserta posisinya
+TRACKER_IOU_THRESHOLD = 0.3 # IoU minimal agar deteksi dianggap objek yang sama
+TRACKER_MAX_CENTER_DISTANCE = 0.5 # Cadangan jika IoU gagal: jarak titik tengah maksimal (kelipatan diagonal box)
+TRACKER_MIN_HITS = 3 # Jumlah deteksi sebelum track dianggap pasti (menyaring deteksi palsu sesaat)
+TRACKER_MAX_COAST_SECONDS = 3.0 # Lama track dipertahankan tanpa deteksi
+TRACKER_MOVE_THRESHOLD = 0.5 # Objek dianggap dipindah jika titik tengahnya bergeser lebih dari kelipatan diagonal ini
+TRACKER_REBIND_IOU = 0.3 # IoU minimal untuk mengikat objek baseline ke track di posisi yang sama
+
+# --- Pengaturan Klip Video Sebelum/Sesudah Event ---
+CLIP_RECORDING_ENABLED = True
+CLIPS_DIR = os.path.join(CHANGES_DIR, 'clips')
+CLIP_PRE_SECONDS = 30 # Detik sebelum event yang disimpan di ring buffer
+CLIP_POST_SECONDS = 10 # Detik sesudah event yang ikut direkam
+CLIP_FPS = 10 # Maksimal frame per detik yang disimpan di buffer dan klip
+CLIP_JPEG_QUALITY = 80 # Kualitas JPEG frame di ring buffer
+CLIP_MAX_WIDTH = 1280 # Frame lebih lebar diperkecil sebelum disimpan, 0 = ukuran asli
+CLIP_BUFFER_MAX_MB = 64 # Batas memori ring buffer per kamera
+CLIP_CODEC = "mp4v" # FourCC codec file klip (.mp4)
+
 # --- Pengaturan Deteksi Objek ---
 CLASSES_TO_TRACK_IDS = [
     39,  # bottle
@@ -31,4 +122,123 @@ CLASSES_TO_TRACK_IDS = [
     73,  # book
     74,  # clock
     76,  # scissors
-]   
\ No newline at end of file
+]   
+
+# --- Pengaturan Backend Inferensi ---
+# "torch" (model .pt asli), "onnx", "onnx_int8", atau "openvino".
+# Backend selain "torch" perlu diexport dulu: python export_model.py --backend <nama>
+INFERENCE_BACKEND = "torch"
+INFERENCE_IMGSZ = 640 # Ukuran input model untuk backend hasil export
+INFERENCE_THREADS = 0 # Jumlah thread inferensi, 0 = default runtime
+INFERENCE_CPU_AFFINITY = None # Daftar core CPU untuk proses ini, misal [0, 1, 2, 3] (hanya Linux)
+
+# --- Pengaturan Server Inferensi Bersama (inference_server.py) ---
+# Beberapa proses (misal satu main.py per kamera) memakai satu model di proses server, bukan memuat
+# model sendiri-sendiri. Frame dikirim lewat shared memory; lewat socket hanya metadata dan hasil deteksi.
+INFERENCE_SERVER_ENABLED = False # True = mode klien: proses ini tidak memuat model, inferensi dikirim ke server
+INFERENCE_SERVER_ADDRESS = None # None = Unix socket di INFERENCE_SERVER_RUNTIME_DIR (named pipe per pengguna di Windows); atau "host:port" / path socket
+INFERENCE_SERVER_RUNTIME_DIR = None # None = $XDG_RUNTIME_DIR/objsec atau <tmp>/objsec-<uid>; dibuat dengan izin 0700
+INFERENCE_SERVER_AUTHKEY = None # None = kunci acak per pengguna di file authkey (0600) di runtime dir, dibuat saat pertama dipakai
+INFERENCE_SERVER_AUTOSTART = False # True = klien menjalankan server di latar jika server belum berjalan
+INFERENCE_SERVER_IDLE_EXIT = 300.0 # Server yang dijalankan otomatis berhenti jika tidak ada klien selama ini (detik)
+INFERENCE_SERVER_LOG_FILE = os.path.join(BASE_DIR, 'inference_server.log') # Output server yang dijalankan otomatis
+INFERENCE_SERVER_CONNECT_TIMEOUT = 60.0 # Batas waktu menunggu server siap, termasuk memuat model saat autostart (detik)
+INFERENCE_SERVER_REQUEST_TIMEOUT = 10.0 # Batas waktu satu permintaan inferensi (detik)
+INFERENCE_SERVER_SLOTS = 4 # Slot frame di shared memory per klien (masing-masing imgsz x imgsz x 3 byte)
+INFERENCE_SERVER_BATCH_WINDOW_MS = 5.0 # Server menunggu frame dari klien lain selama ini untuk digabung dalam satu batch
+INFERENCE_SERVER_MAX_BATCH = 8 # Frame maksimal dalam satu panggilan model di server
+
+# --- Pengaturan Preprocessing dan Resolusi Inferensi Adaptif (preprocess.py) ---
+PREPROCESS_DOWNSCALE = True # Frame diperkecil sekali ke imgsz sebelum inferensi, kotak dipetakan kembali ke frame asli
+PREPROCESS_BLANK_STRIDE = 16 # Cek frame kosong hanya pada setiap piksel ke-N (baris dan kolom)
+INFERENCE_LATENCY_BUDGET_MS = 0 # Budget latensi satu panggilan model; 0 = imgsz tetap INFERENCE_IMGSZ
+INFERENCE_IMGSZ_STEPS = [320, 416, 512, 640] # Pilihan imgsz (kelipatan 32) saat budget latensi aktif
+INFERENCE_IMGSZ_ADAPT_INTERVAL = 10 # Minimal panggilan model antar perubahan imgsz
+INFERENCE_IMGSZ_HEADROOM = 0.8 # imgsz naik jika perkiraan latensi di tingkat berikutnya < 80% budget
+
+# --- Pengaturan Inferensi Ber-tile untuk Objek Kecil (tiling.py) ---
+# Frame besar dibagi menjadi tile yang diinferensi dalam satu batch, agar objek kecil tidak hilang saat
+# frame diperkecil ke imgsz. Biaya model naik sebanding jumlah tile (1920x1080 = 8 tile + 1 frame penuh).
+TILING_ENABLED = False
+TILE_SIZE = 640 # Sisi tile (piksel frame asli), sekaligus imgsz model untuk tile
+TILE_OVERLAP = 0.2 # Tumpang tindih minimal antar tile bertetangga (proporsi TILE_SIZE), harus lebih besar dari objek kecil
+TILE_MIN_FRAME_SIDE = 960 # Frame dengan sisi terpanjang di bawah ini diinferensi penuh seperti biasa
+TILE_FULL_FRAME_PASS = True # Frame penuh yang diperkecil ikut di batch yang sama, untuk objek besar yang terpotong tile
+TILE_NMS_IOU = 0.5 # Kotak kelas sama dari tile berbeda dengan IoU di atas ini dianggap satu objek
+TILE_NMS_IOS = 0.8 # ...atau jika irisannya di atas proporsi ini dari kotak yang lebih kecil (objek terpotong tepi tile)
+TILE_CACHE_ENABLED = True # Tile yang tidak berubah memakai hasil deteksi sebelumnya
+TILE_CHANGE_DOWNSCALE_WIDTH = 480 # Lebar frame kecil untuk perbandingan per tile (piksel)
+TILE_CHANGE_MIN_RATIO = 0.002 # Proporsi piksel tile yang berubah (ambang MOTION_PIXEL_THRESHOLD) agar tile diinferensi ulang
+TILE_REFRESH_INTERVAL = 5.0 # Setiap tile tetap diinferensi ulang setiap N detik walaupun tidak berubah
+
+# --- Pengaturan Startup (Lazy Init, Warm-up, Cache Model) ---
+# Model dan audio dimuat saat pertama dibutuhkan, bukan saat `import utils`.
+MODEL_WARMUP_ENABLED = True # Inferensi dummy di thread latar selagi kamera dibuka, frame pertama tidak membayar biaya panggilan pertama
+MODEL_CACHE_ENABLED = True # Simpan model ONNX yang sudah dioptimasi, hasil kompilasi OpenVINO, dan nama kelas di MODEL_CACHE_DIR
+MODEL_CACHE_DIR = os.path.join(MODELS_DIR, 'cache') # Khusus mesin ini, aman dihapus (dibuat ulang otomatis)
+
+# --- Pengaturan Pipeline (Capture -> Inferensi -> Render/Keputusan) ---
+# Kebijakan saat antrian penuh: "drop_oldest", "drop_newest", atau "block"
+INFERENCE_WORKERS = 1 # Jumlah worker inferensi, tiap worker tambahan memuat model sendiri
+INFERENCE_QUEUE_SIZE = 1 # Frame yang menunggu untuk diinferensi
+INFERENCE_QUEUE_DROP_POLICY = "drop_oldest"
+RESULT_QUEUE_SIZE = 8 # Hasil deteksi yang menunggu diproses logika alarm
+RESULT_QUEUE_DROP_POLICY = "drop_oldest"
+
+# --- Pengaturan Motion Gate (Lewati YOLO Jika Scene Tidak Berubah) ---
+MOTION_GATE_ENABLED = True
+MOTION_DOWNSCALE_WIDTH = 160 # Lebar frame kecil untuk perbandingan (piksel)
+MOTION_PIXEL_THRESHOLD = 25 # Selisih intensitas (0-255) agar satu piksel dianggap berubah
+MOTION_MIN_CHANGED_RATIO = 0.005 # Proporsi piksel berubah minimal agar YOLO dijalankan
+MOTION_FORCE_REFRESH_INTERVAL = 5.0 # Inferensi tetap dipaksa setiap N detik walaupun scene diam
+
+# --- Pengaturan Kamera dan Sambung Ulang Otomatis (capture.CameraSupervisor) ---
+# Sumber video: indeks webcam, URL DroidCam (http://IP:PORT/video), atau path file video.
+# None = dipilih interaktif saat start (mode GUI) atau HEADLESS_VIDEO_SOURCE (mode headless). Bisa diganti main.py --source.
+VIDEO_SOURCE = None
+CAMERA_WIDTH = 0 # Resolusi yang diminta dari kamera (piksel), 0 = default kamera
+CAMERA_HEIGHT = 0
+CAMERA_FPS = 0 # FPS yang diminta dari kamera, 0 = default kamera
+CAMERA_BUFFER_SIZE = 1 # Buffer internal OpenCV (frame); kecil agar frame yang dibaca selalu terbaru
+CAMERA_OPEN_TIMEOUT = 5.0 # Batas waktu (detik) membuka dan membaca aliran URL sebelum dianggap gagal
+CAMERA_STALL_TIMEOUT = 5.0 # Tidak ada frame baru selama ini (detik) -> kamera dianggap terputus
+CAMERA_RECONNECT_INITIAL_DELAY = 0.5 # Jeda (detik) sebelum percobaan sambung ulang kedua, lalu dikali BACKOFF
+CAMERA_RECONNECT_BACKOFF = 2.0
+CAMERA_RECONNECT_MAX_DELAY = 30.0 # Jeda maksimum antar percobaan sambung ulang (detik)
+
+# --- Pengaturan Mode Headless dan Live View (main.py --headless) ---
+HEADLESS_MODE = False # True = selalu headless: tanpa jendela OpenCV, kontrol lewat API HTTP lokal
+HEADLESS_VIDEO_SOURCE = 1 # Sumber video mode headless: indeks webcam, URL DroidCam, atau path file video
+LIVE_VIEW_HOST = "127.0.0.1" # Hanya bisa diakses dari mesin ini; ganti ke "0.0.0.0" untuk akses jaringan
+LIVE_VIEW_PORT = 8080
+LIVE_VIEW_JPEG_QUALITY = 75
+LIVE_VIEW_MAX_FPS = 10 # Frame yang di-encode per detik, dibagi ke semua penonton
+LIVE_VIEW_CLIENT_TIMEOUT = 2.0 # Penonton yang tidak membaca selama ini (detik) diputus
+LIVE_VIEW_MAX_CLIENTS = 8
+LIVE_VIEW_COMMAND_TIMEOUT = 15.0 # Batas waktu (detik) menunggu loop utama menjalankan perintah API
+
+# --- Pengaturan Metrik dan Profiling (metrics.py) ---
+METRICS_ENABLED = True # Timer per tahap dan counter; endpoint Prometheus dan baris statistik berkala
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108 # http://127.0.0.1:9108/metrics
+METRICS_LOG_INTERVAL = 30.0 # Detik antar baris statistik di terminal (0 = tidak dicetak)
+PROFILE_OUTPUT_DIR = os.path.join(BASE_DIR, "profil") # File .prof / .folded dari main.py --profile
+PROFILE_SAMPLE_INTERVAL = 0.005 # Jeda antar sampel stack untuk --profile-mode sample (detik)
+
+# --- Pengaturan Analisis Forensik Rekaman (forensic.py) ---
+FORENSIC_WORKERS = 0 # Jumlah proses worker, 0 = jumlah core CPU. Setiap worker memuat model sendiri
+FORENSIC_THREADS_PER_WORKER = 0 # Thread inferensi per worker, 0 = core dibagi rata ke worker
+FORENSIC_CHUNK_SECONDS = 60.0 # Panjang potongan video (detik) yang dianalisis satu worker sekaligus
+FORENSIC_SAMPLE_FPS = 5.0 # Frame yang dideteksi per detik video (0 = semua frame)
+FORENSIC_SAVE_CAPTURES = True # Simpan screenshot bukti (frame event + kotak deteksi) untuk setiap event
+FORENSIC_OUTPUT_DIR = os.path.join(BASE_DIR, "forensik") # File hasil forensik_<waktu>.jsonl
+FORENSIC_VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".mpg", ".mpeg", ".ts", ".webm") # Dipakai saat memindai folder
+
+# --- Pengaturan Multi-Kamera (multi_camera.py) ---
+# Setiap kamera punya nama unik (dipakai untuk file baseline dan log) dan sumber video:
+# indeks webcam, URL DroidCam (http://IP:PORT/video), atau path file video.
+CAMERA_SOURCES = [
+    {"name": "kamera_1", "source": 1},
+    # {"name": "droidcam_rak_2", "source": "http://192.168.1.100:4747/video"},
+]
+CAMERA_STATE_DIR = BASE_DIR # Baseline per kamera disimpan sebagai initial_state_<nama>.json
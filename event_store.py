@@ -0,0 +1,268 @@
+import argparse
+import ast
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import config
+import activity_log
+
+# --- Penyimpanan Event Terindeks (SQLite) ---
+# Setiap entri log_activity juga disimpan di SQLite dengan waktu lengkap (tanggal + jam)
+# dan indeks pada waktu, jenis event, status, dan kelas objek, sehingga investigasi
+# tidak perlu lagi membuka file log harian satu per satu.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    occurred_at TEXT NOT NULL,
+    event TEXT NOT NULL,
+    status TEXT,
+    camera TEXT,
+    details TEXT,
+    capture_path TEXT,
+    payload TEXT NOT NULL,
+    entry_hash TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS event_objects (
+    event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    object_class TEXT NOT NULL,
+    baseline_count INTEGER,
+    actual_count INTEGER,
+    changed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events(occurred_at);
+CREATE INDEX IF NOT EXISTS idx_events_event_time ON events(event, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_events_status_time ON events(status, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_event_objects_class ON event_objects(object_class, event_id);
+CREATE INDEX IF NOT EXISTS idx_event_objects_event ON event_objects(event_id);
+"""
+
+# Contoh: "laptop hilang (1 -> 0)", "cup muncul (0 -> 2)", atau dengan nama zona "rak_1: cup hilang (2 -> 1)"
+CHANGE_DETAIL_PATTERN = re.compile(r"(?P<object>[^,(:]+?) (?:hilang|muncul) \((?P<baseline>\d+) -> (?P<actual>\d+)\)")
+# Detail dari tracker, contoh: "cup #7 muncul", "laptop baseline-1 hilang", "cup #3 dipindah"
+TRACK_DETAIL_PATTERN = re.compile(r"(?P<object>[^,:]+?) (?:#\d+|baseline-\d+) (?:hilang|muncul|dipindah)")
+
+
+def entry_datetime(log_data, date_str):
+    """Waktu lengkap entri: field 'datetime' jika ada, jika tidak gabungan tanggal file + 'timestamp'."""
+    if log_data.get("datetime"):
+        return log_data["datetime"].replace("T", " ")
+    return f"{date_str} {log_data.get('timestamp', '00:00:00')}"
+
+
+def entry_objects(log_data):
+    """
+    Kelas objek yang terkait dengan entri: dari detail perubahan (ditandai changed)
+    dan dari dict jumlah objek (baseline / aktual) di entri.
+    """
+    objects = {}
+    for match in CHANGE_DETAIL_PATTERN.finditer(log_data.get("change_details") or ""):
+        objects[match.group("object").strip()] = [int(match.group("baseline")), int(match.group("actual")), 1]
+    for match in TRACK_DETAIL_PATTERN.finditer(log_data.get("change_details") or ""):
+        objects.setdefault(match.group("object").strip(), [None, None, 1])[2] = 1
+
+    baseline = log_data.get("initial_baseline")
+    actual = log_data.get("actual_objects_at_detection") or log_data.get("actual_objects_after_auth")
+    details = log_data.get("details") or ""
+    if actual is None and details.startswith("Initial state set: "):
+        try:
+            actual = ast.literal_eval(details[len("Initial state set: "):])
+        except (ValueError, SyntaxError):
+            actual = None
+
+    for counts, index in ((baseline, 0), (actual, 1)):
+        if isinstance(counts, dict):
+            for object_class, count in counts.items():
+                objects.setdefault(object_class, [None, None, 0])[index] = count
+    return [(object_class, values[0], values[1], values[2]) for object_class, values in objects.items()]
+
+
+def entry_row(log_data, date_str, occurrence=0):
+    """
+    Baris tabel events. `occurrence` membedakan entri kembar pada detik yang sama
+    (log lama tanpa field 'datetime'), agar tidak dianggap duplikat saat impor.
+    """
+    payload = json.dumps(log_data, ensure_ascii=False, sort_keys=True)
+    occurred_at = entry_datetime(log_data, date_str)
+    return (
+        occurred_at,
+        log_data.get("event", "unknown"),
+        log_data.get("status"),
+        log_data.get("camera"),
+        log_data.get("details") or log_data.get("change_details"),
+        log_data.get("capture_path"),
+        payload,
+        hashlib.sha1(f"{occurred_at}|{occurrence}|{payload}".encode("utf-8")).hexdigest(),
+    )
+
+
+class EventStore:
+    """
+    Penyimpanan event SQLite. Koneksi dibuat di thread yang pertama kali memakainya
+    (thread penulis log), karena koneksi sqlite3 tidak boleh dipakai lintas thread.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.EVENT_DB_PATH
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._connection = sqlite3.connect(self.db_path)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA foreign_keys=ON")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def insert_entries(self, dated_entries):
+        """
+        Menyimpan list (tanggal YYYY-MM-DD, entri log) dalam satu transaksi.
+        Entri yang sudah ada (hash sama) dilewati, jadi impor ulang satu hari penuh aman.
+        Mengembalikan jumlah entri baru.
+        """
+        connection = self.connection
+        inserted = 0
+        occurrences = {}
+        with connection:
+            for date_str, log_data in dated_entries:
+                row = entry_row(log_data, date_str)
+                occurrence = occurrences.get(row[-1], 0)
+                occurrences[row[-1]] = occurrence + 1
+                if occurrence:
+                    row = entry_row(log_data, date_str, occurrence)
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO events (occurred_at, event, status, camera, details, capture_path, payload, entry_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+                if cursor.rowcount == 0:
+                    continue
+                inserted += 1
+                event_id = cursor.lastrowid
+                connection.executemany(
+                    "INSERT INTO event_objects (event_id, object_class, baseline_count, actual_count, changed) VALUES (?, ?, ?, ?, ?)",
+                    [(event_id, *obj) for obj in entry_objects(log_data)],
+                )
+        return inserted
+
+    def import_logs(self, log_dir=None):
+        """Impor massal semua file log harian (.jsonl dan .json lama) ke SQLite."""
+        connection = self.connection
+        connection.execute("PRAGMA synchronous=OFF") # Aman untuk impor: bisa diulang jika gagal
+        total = 0
+        for date_str in activity_log.list_log_dates(log_dir):
+            entries = activity_log.read_activity_log(date_str, log_dir)
+            total += self.insert_entries([(date_str, entry) for entry in entries])
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return total
+
+    def query(self, event=None, status=None, object_class=None, camera=None, since=None, until=None, changed_only=False, limit=100):
+        """Mencari event berdasarkan filter. Waktu dalam format 'YYYY-MM-DD HH:MM:SS'."""
+        where, params = self._filters(event, status, object_class, camera, since, until, changed_only)
+        sql = (
+            "SELECT e.occurred_at, e.event, e.status, e.camera, e.details, e.capture_path FROM events e"
+            + where + " ORDER BY e.occurred_at DESC LIMIT ?"
+        )
+        return self.connection.execute(sql, params + [limit]).fetchall()
+
+    def counts_per_hour(self, event=None, status=None, object_class=None, camera=None, since=None, until=None, hour_of_day=False):
+        """Jumlah event per jam (per tanggal+jam, atau per jam dalam sehari jika hour_of_day=True)."""
+        where, params = self._filters(event, status, object_class, camera, since, until, False)
+        bucket = "substr(e.occurred_at, 12, 2)" if hour_of_day else "substr(e.occurred_at, 1, 13)"
+        sql = f"SELECT {bucket} AS hour, COUNT(*) FROM events e" + where + " GROUP BY hour ORDER BY hour"
+        return self.connection.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _filters(event, status, object_class, camera, since, until, changed_only):
+        clauses, params = [], []
+        if event:
+            clauses.append("e.event = ?")
+            params.append(event)
+        if status:
+            clauses.append("e.status = ?")
+            params.append(status)
+        if camera:
+            clauses.append("e.camera = ?")
+            params.append(camera)
+        if since:
+            clauses.append("e.occurred_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("e.occurred_at < ?")
+            params.append(until)
+        if object_class:
+            changed_clause = " AND o.changed = 1" if changed_only else ""
+            clauses.append(f"e.id IN (SELECT o.event_id FROM event_objects o WHERE o.object_class = ?{changed_clause})")
+            params.append(object_class)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# --- CLI Investigasi ---
+def main():
+    parser = argparse.ArgumentParser(description="Query event log aktivitas (SQLite)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("import", help="Impor semua file log_activity/* ke SQLite")
+
+    def add_filters(subparser):
+        subparser.add_argument("--event", help="Jenis event, misal stock_change")
+        subparser.add_argument("--status", help="authorized / unauthorized / info")
+        subparser.add_argument("--object", dest="object_class", help="Kelas objek, misal laptop")
+        subparser.add_argument("--camera", help="Nama kamera (mode multi-kamera)")
+        subparser.add_argument("--days", type=float, help="Hanya event N hari terakhir")
+        subparser.add_argument("--since", help="Mulai waktu 'YYYY-MM-DD[ HH:MM:SS]'")
+        subparser.add_argument("--until", help="Sampai waktu 'YYYY-MM-DD[ HH:MM:SS]'")
+
+    query = subparsers.add_parser("query", help="Cari event, misal: query --status unauthorized --object laptop --days 30")
+    add_filters(query)
+    query.add_argument("--changed-only", action="store_true", help="Objek harus termasuk yang berubah (bukan sekadar ada)")
+    query.add_argument("--limit", type=int, default=100)
+
+    hourly = subparsers.add_parser("hourly", help="Jumlah event per jam")
+    add_filters(hourly)
+    hourly.add_argument("--hour-of-day", action="store_true", help="Gabungkan per jam dalam sehari (00-23)")
+
+    args = parser.parse_args()
+    store = EventStore()
+    start_time = time.perf_counter()
+
+    if args.command == "import":
+        inserted = store.import_logs()
+        print(f"{inserted} event baru diimpor ke {store.db_path} ({(time.perf_counter() - start_time) * 1000:.0f} ms).")
+        return
+
+    since = args.since
+    if args.days is not None:
+        since = (datetime.datetime.now() - datetime.timedelta(days=args.days)).strftime("%Y-%m-%d %H:%M:%S")
+    filters = dict(event=args.event, status=args.status, object_class=args.object_class, camera=args.camera, since=since, until=args.until)
+
+    if args.command == "query":
+        rows = store.query(changed_only=args.changed_only, limit=args.limit, **filters)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        for occurred_at, event, status, camera, details, capture_path in rows:
+            camera_text = f" [{camera}]" if camera else ""
+            capture_text = f" -> {capture_path}" if capture_path else ""
+            print(f"{occurred_at}{camera_text} {event} ({status}): {details}{capture_text}")
+        print(f"\n{len(rows)} event ditemukan dalam {elapsed_ms:.1f} ms.")
+    else:
+        rows = store.counts_per_hour(hour_of_day=args.hour_of_day, **filters)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        for hour, count in rows:
+            print(f"{hour}:00  {count}")
+        print(f"\n{sum(count for _, count in rows)} event dalam {elapsed_ms:.1f} ms.")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import datetime
+import json
+import queue
+import socket
+import threading
+import time
+import urllib.request
+import config
+import metrics
+
+# --- Event Bus untuk Efek Samping Alarm ---
+# Loop video hanya membuat satu Event (berisi frame dan deteksi yang sudah dihitung) lalu
+# memanggil EventBus.publish(). Setiap sink (log, screenshot, suara, popup, webhook HTTP,
+# socket lokal) punya antrian dan thread sendiri, dengan retry dan timeout per sink.
+# publish() tidak pernah menunggu sink: jika antrian sink penuh, event untuk sink itu dibuang
+# dan dihitung, sehingga sink yang lambat (misal webhook ke server yang hang) tidak
+# menghentikan pemrosesan frame maupun sink lain.
+
+STOCK_CHANGE = "stock_change"
+ALARM_ACKNOWLEDGED = "alarm_acknowledged"
+ALARM_ACKNOWLEDGED_NO_FRAME = "alarm_acknowledged_no_frame"
+BASELINE_SET = "baseline_set"
+CAMERA_LOST = "camera_lost"
+CAMERA_RESTORED = "camera_restored"
+
+
+class Event:
+    """
+    Satu event sistem. `data` berisi field log tambahan (dalam urutan log_activity).
+    `frame` dan `detections` tidak disalin: pemanggil tidak boleh mengubahnya sesudah publish.
+    `capture` adalah folder status screenshot ("authorized"/"unauthorized"), None = tanpa screenshot.
+    `annotate` (opsional) dipanggil sink screenshot pada salinan frame, misal untuk menggambar zona.
+    """
+
+    def __init__(self, kind, status, data=None, frame=None, detections=None, capture=None, annotate=None, notification=None, camera=None):
+        self.kind = kind
+        self.status = status
+        self.data = dict(data or {})
+        self.frame = frame
+        self.detections = detections
+        self.capture = capture
+        self.annotate = annotate
+        self.notification = notification # (judul, pesan) untuk popup, None = tanpa popup
+        self.camera = camera
+        self.created_at = datetime.datetime.now()
+        self.published_at = None # time.perf_counter() saat publish, untuk latensi per sink
+
+    @property
+    def capture_path(self):
+        return self.data.get("capture_path")
+
+    def log_entry(self):
+        """Entri dengan format log_activity. Dibuat baru setiap dipanggil (aman dipakai beberapa sink)."""
+        entry = {"timestamp": self.created_at.strftime("%H:%M:%S"), "event": self.kind, "status": self.status}
+        entry.update(self.data)
+        if self.camera is not None:
+            entry["camera"] = self.camera
+        entry["datetime"] = self.created_at.isoformat(sep=" ", timespec="milliseconds")
+        return entry
+
+    def to_json(self):
+        return json.dumps(self.log_entry(), ensure_ascii=False, default=str)
+
+
+# --- Sink ---
+class Sink:
+    """
+    Dasar sink. `prepare` dijalankan di thread pemanggil publish (harus cepat, tanpa I/O),
+    `handle` di thread sink dan melempar exception jika gagal (akan dicoba ulang).
+    `events` membatasi jenis event yang diterima (None = semua).
+    `lossless` = event tidak pernah dibuang: jika antrian sink penuh, `handle` dijalankan di thread pemanggil.
+    """
+    name = "sink"
+    events = None
+    lossless = False
+
+    def accepts(self, event):
+        return self.events is None or event.kind in self.events
+
+    def prepare(self, event):
+        pass
+
+    def handle(self, event):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LogSink(Sink):
+    name = "log"
+
+    def handle(self, event):
+        import utils
+        utils.log_activity(event.log_entry())
+
+
+class ScreenshotSink(Sink):
+    """
+    Kotak deteksi digambar di thread sink, lalu frame diserahkan ke pool ScreenshotWriter untuk
+    encode dan tulis. Path file dipesan saat publish agar ikut tercatat di log, jadi event sink ini
+    tidak boleh dibuang (lossless): file yang dirujuk log harus benar-benar ditulis.
+    """
+    name = "screenshot"
+    lossless = True
+
+    def __init__(self, writer=None):
+        self._writer = writer
+
+    @property
+    def writer(self):
+        if self._writer is None:
+            import utils
+            self._writer = utils.get_screenshot_writer()
+        return self._writer
+
+    def accepts(self, event):
+        return event.capture is not None and event.frame is not None
+
+    def prepare(self, event):
+        event.data["capture_path"] = self.writer.reserve_path(event.capture)
+
+    def handle(self, event):
+        import utils
+        frame = event.frame
+        if event.detections is not None or event.annotate is not None:
+            frame = frame.copy()
+            if event.annotate is not None:
+                event.annotate(frame)
+            if event.detections is not None:
+                utils.draw_detections(frame, event.detections)
+        # Antrian pool penuh: submit menunggu lalu menulis langsung (backpressure ScreenshotWriter)
+        self.writer.submit(frame, event.capture, event.capture_path)
+
+
+class SoundSink(Sink):
+    name = "sound"
+    events = {STOCK_CHANGE, ALARM_ACKNOWLEDGED, ALARM_ACKNOWLEDGED_NO_FRAME}
+
+    def handle(self, event):
+        import utils
+        if event.kind == STOCK_CHANGE:
+            utils.start_alarm()
+        else:
+            utils.stop_alarm()
+
+
+class PopupSink(Sink):
+    name = "popup"
+
+    def accepts(self, event):
+        return event.notification is not None
+
+    def handle(self, event):
+        import utils
+        utils.show_popup_notification(*event.notification)
+
+
+class WebhookSink(Sink):
+    """POST entri log (JSON) ke URL. Status HTTP 4xx/5xx dan timeout dianggap gagal dan dicoba ulang."""
+
+    def __init__(self, url, timeout=None, events=None, headers=None):
+        self.url = url
+        self.name = f"webhook:{url}"
+        self.timeout = timeout if timeout is not None else config.EVENT_SINK_TIMEOUT
+        self.events = set(events) if events is not None else None
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def handle(self, event):
+        request = urllib.request.Request(self.url, data=event.to_json().encode("utf-8"), headers=self.headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class SocketSink(Sink):
+    """
+    Mengirim entri log sebagai satu baris JSON ke socket lokal: "host:port" (TCP) atau path
+    Unix socket. Koneksi dipakai ulang dan dibuka ulang setelah gagal.
+    """
+
+    def __init__(self, address, timeout=None, events=None):
+        self.address = address
+        self.name = f"socket:{address}"
+        self.timeout = timeout if timeout is not None else config.EVENT_SINK_TIMEOUT
+        self.events = set(events) if events is not None else None
+        self._socket = None
+
+    def _connect(self):
+        host, _, port = self.address.rpartition(":")
+        if host and port.isdigit():
+            return socket.create_connection((host, int(port)), timeout=self.timeout)
+        unix_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        unix_socket.settimeout(self.timeout)
+        unix_socket.connect(self.address)
+        return unix_socket
+
+    def handle(self, event):
+        if self._socket is None:
+            self._socket = self._connect()
+        try:
+            self._socket.sendall((event.to_json() + "\n").encode("utf-8"))
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+
+# --- Thread dan Antrian per Sink ---
+class SinkWorker:
+    def __init__(self, sink, queue_size=None, retries=None, retry_delay=None):
+        self.sink = sink
+        self.retries = config.EVENT_SINK_RETRIES if retries is None else retries
+        self.retry_delay = config.EVENT_SINK_RETRY_DELAY if retry_delay is None else retry_delay
+        self._queue = queue.Queue(maxsize=queue_size or config.EVENT_SINK_QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self.delivered = 0
+        self.failed = 0 # Event yang tetap gagal setelah semua retry
+        self.retried = 0
+        self.dropped = 0 # Event yang dibuang karena antrian sink penuh
+        self.handled_inline = 0 # Event sink lossless yang diproses di thread pemanggil karena antrian penuh
+        self._thread = threading.Thread(target=self._run, name=f"event_sink_{sink.name}")
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def enqueue(self, event):
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            if self.sink.lossless:
+                self.handled_inline += 1
+                print(f"Peringatan: Antrian sink '{self.sink.name}' penuh, event '{event.kind}' diproses langsung.", flush=True)
+                self._deliver(event)
+                return True
+            self.dropped += 1
+            print(f"Peringatan: Antrian sink '{self.sink.name}' penuh, event '{event.kind}' dibuang.", flush=True)
+            return False
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if event is None:
+                    return
+                self._deliver(event)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, event):
+        for attempt in range(self.retries + 1):
+            try:
+                self.sink.handle(event)
+                self.delivered += 1
+                metrics.observe_stage(f"sink_{self.sink.name.split(':')[0]}", time.perf_counter() - event.published_at)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    self.failed += 1
+                    print(f"Error sink '{self.sink.name}' untuk event '{event.kind}' setelah {attempt + 1} percobaan: {e}", flush=True)
+                    return
+                self.retried += 1
+                # Jeda backoff bisa dipotong saat bus ditutup; percobaan terakhir tetap dijalankan
+                self._stop_event.wait(self.retry_delay * (2 ** attempt))
+
+    def close(self, timeout):
+        """Mengirim sisa event di antrian lalu menghentikan thread (maksimal `timeout` detik)."""
+        self._stop_event.set()
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+        self.sink.close()
+
+    def stats(self):
+        return {"sink": self.sink.name, "delivered": self.delivered, "failed": self.failed, "retried": self.retried, "dropped": self.dropped, "handled_inline": self.handled_inline, "queue": self.queue_depth()}
+
+
+class EventBus:
+    def __init__(self):
+        self.workers = []
+        self.published = 0
+
+    def register(self, sink, queue_size=None, retries=None, retry_delay=None):
+        worker = SinkWorker(sink, queue_size, retries, retry_delay).start()
+        self.workers.append(worker)
+        labels = {"sink": sink.name}
+        metrics.register_gauge("objsec_event_sink_queue_depth", worker.queue_depth, "Event yang menunggu di antrian sink", **labels)
+        metrics.register_counter("objsec_event_sink_delivered_total", lambda: worker.delivered, "Event yang berhasil dikirim sink", **labels)
+        metrics.register_counter("objsec_event_sink_failed_total", lambda: worker.failed, "Event yang gagal dikirim sink setelah semua retry", **labels)
+        metrics.register_counter("objsec_event_sink_dropped_total", lambda: worker.dropped, "Event yang dibuang karena antrian sink penuh", **labels)
+        return worker
+
+    def publish(self, event):
+        """
+        Menyerahkan event ke semua sink yang menerimanya tanpa menunggu. Semua `prepare` dijalankan
+        lebih dulu (misal memesan path screenshot), jadi setiap sink melihat data event yang sama.
+        Mengembalikan event (misal untuk membaca event.capture_path).
+        """
+        with metrics.stage_timer("event_publish"):
+            targets = [worker for worker in self.workers if worker.sink.accepts(event)]
+            for worker in targets:
+                worker.sink.prepare(event)
+            event.published_at = time.perf_counter()
+            for worker in targets:
+                worker.enqueue(event)
+        self.published += 1
+        return event
+
+    def close(self, timeout=None):
+        timeout = config.EVENT_BUS_CLOSE_TIMEOUT if timeout is None else timeout
+        for worker in self.workers:
+            worker.close(timeout)
+
+    def stats(self):
+        return [worker.stats() for worker in self.workers]
+
+
+def create_default_bus(screenshot_writer=None):
+    """Bus dengan sink log, screenshot, suara, popup, serta webhook/socket dari config."""
+    bus = EventBus()
+    bus.register(LogSink())
+    bus.register(ScreenshotSink(screenshot_writer))
+    bus.register(SoundSink())
+    bus.register(PopupSink())
+    for url in config.EVENT_WEBHOOK_URLS:
+        bus.register(WebhookSink(url, events=config.EVENT_REMOTE_EVENTS))
+    for address in config.EVENT_SOCKET_ADDRESSES:
+        bus.register(SocketSink(address, events=config.EVENT_REMOTE_EVENTS))
+    return bus
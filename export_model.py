@@ -0,0 +1,45 @@
+import argparse
+import os
+import config
+import inference_backend
+
+# --- Export/Konversi Model YOLO untuk Backend Inferensi Lain ---
+def export_model(backend, imgsz):
+    """
+    Mengexport model .pt (config.YOLO_MODEL_PATH) ke format backend yang dipilih.
+    File hasil disimpan di lokasi yang dibaca inference_backend.backend_model_path().
+    """
+    from ultralytics import YOLO
+
+    if backend == "torch":
+        print("Backend 'torch' memakai model .pt langsung, tidak perlu export.")
+        return config.YOLO_MODEL_PATH
+
+    model = YOLO(config.YOLO_MODEL_PATH)
+    target_path = inference_backend.backend_model_path(backend)
+
+    if backend in ("onnx", "onnx_int8"):
+        # dynamic=True agar ukuran batch bebas (dipakai inferensi batch multi-kamera)
+        onnx_path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if backend == "onnx_int8":
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(onnx_path, target_path, weight_type=QuantType.QUInt8)
+    elif backend == "openvino":
+        model.export(format="openvino", imgsz=imgsz, dynamic=True)
+
+    if not os.path.exists(target_path):
+        raise RuntimeError(f"Export selesai tetapi file {target_path} tidak ditemukan.")
+    print(f"Model backend '{backend}' tersimpan di: {target_path}")
+    return target_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export model YOLO ke backend ONNX Runtime / OpenVINO / INT8")
+    parser.add_argument("--backend", choices=inference_backend.BACKENDS, required=True)
+    parser.add_argument("--imgsz", type=int, default=config.INFERENCE_IMGSZ)
+    args = parser.parse_args()
+    export_model(args.backend, args.imgsz)
+
+
+if __name__ == "__main__":
+    main()
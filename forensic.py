@@ -0,0 +1,380 @@
+import argparse
+import datetime
+import json
+import math
+import multiprocessing
+import os
+import time
+import cv2
+import config
+
+# --- Analisis Forensik Rekaman Video (Batch, Pool Proses) ---
+# Rekaman dibagi menjadi potongan waktu (chunk) yang dianalisis paralel oleh beberapa proses.
+# Setiap proses worker memuat modelnya sendiri sekali (initializer pool) dan mendeteksi objek
+# pada frame sampel dari chunk-nya. Proses utama menerima hasil chunk yang sudah selesai,
+# menggabungkannya kembali sesuai urutan waktu video, lalu menjalankan logika yang sama seperti
+# loop live (smoothing, perbandingan baseline, timer persistensi) dengan waktu video sebagai jam.
+# Event stock_change ditulis langsung (streaming) ke file JSON Lines dengan format log_activity.
+
+
+def find_videos(paths, extensions=None):
+    """Daftar file video dari argumen: file langsung dipakai, folder dipindai rekursif (urut nama)."""
+    extensions = tuple(ext.lower() for ext in (extensions or config.FORENSIC_VIDEO_EXTENSIONS))
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                videos.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(extensions))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            print(f"Peringatan: {path} tidak ditemukan, dilewati.", flush=True)
+    return videos
+
+
+def probe_video(path):
+    """(fps, jumlah frame) dari header video, None jika file tidak bisa dibuka."""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    if not fps or fps <= 0 or math.isnan(fps):
+        fps = 25.0 # Beberapa file tidak menyimpan FPS, pakai nilai umum CCTV
+    return fps, max(0, frame_count)
+
+
+def recording_start_time(path, duration, start_time=None):
+    """
+    Waktu mulai rekaman. Dari --start-time jika diberikan, jika tidak diperkirakan dari
+    waktu modifikasi file dikurangi durasi (file rekaman selesai ditulis di akhir rekaman).
+    """
+    if start_time is not None:
+        return start_time
+    return datetime.datetime.fromtimestamp(os.path.getmtime(path)) - datetime.timedelta(seconds=duration)
+
+
+def make_chunks(video_index, path, fps, frame_count, chunk_seconds, sample_fps):
+    """
+    Membagi video menjadi rentang frame [start, end). Chunk terakhir dibaca sampai file habis
+    (end None) karena jumlah frame di header tidak selalu tepat. Frame sampel memakai kelipatan
+    `step` dari awal video, jadi hasilnya sama berapa pun ukuran chunk.
+    """
+    step = max(1, int(round(fps / sample_fps))) if sample_fps > 0 else 1
+    chunk_frames = max(step, int(round(chunk_seconds * fps / step)) * step)
+    chunks = []
+    start = 0
+    while True:
+        end = start + chunk_frames
+        last = frame_count <= 0 or end >= frame_count
+        chunks.append({"video_index": video_index, "chunk_index": len(chunks), "path": path, "fps": fps, "step": step, "start": start, "end": None if last else end})
+        if last:
+            return chunks
+        start = end
+
+
+# --- Worker (Proses Terpisah) ---
+def available_cores():
+    """Jumlah core yang boleh dipakai proses ini (menghormati afinitas CPU di Linux)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def init_worker(threads, confidence, backend):
+    """Initializer pool: satu model per proses worker, dengan jumlah thread inferensi yang dibatasi."""
+    config.INFERENCE_THREADS = threads
+    config.CONFIDENCE_THRESHOLD = confidence
+    config.INFERENCE_BACKEND = backend
+    import utils
+    utils.get_model() # Dimuat sekali di sini, bukan saat chunk pertama diproses
+
+
+def analyze_chunk(chunk):
+    """
+    Mendeteksi objek pada frame sampel satu chunk. Mengembalikan dict chunk ditambah 'samples'
+    (list (indeks frame, jumlah per kelas, array deteksi)), 'frames_decoded', 'seconds', dan 'error'.
+    """
+    import utils
+    import tiling
+
+    chunk_start = time.perf_counter()
+    tiled_detector = tiling.TiledDetector() if config.TILING_ENABLED else None # Cache tile per chunk, waktu dari posisi video
+    samples = []
+    error = None
+    frames_decoded = 0
+    cap = cv2.VideoCapture(chunk["path"])
+    try:
+        if not cap.isOpened():
+            raise OSError(f"video tidak bisa dibuka: {chunk['path']}")
+        if chunk["start"] > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, chunk["start"])
+        frame_index = chunk["start"]
+        while chunk["end"] is None or frame_index < chunk["end"]:
+            if frame_index % chunk["step"]:
+                # Frame yang tidak disampel cukup di-grab (tanpa konversi warna ke BGR)
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                try:
+                    if tiled_detector is not None:
+                        detections = tiled_detector.detect(frame, frame_index / chunk["fps"])[0]
+                    else:
+                        detections = utils.detect_objects_array(frame)
+                except utils.InferenceError as e:
+                    # Sampel dilewati, bukan dicatat sebagai frame tanpa objek (perubahan palsu)
+                    print(f"{e}. Frame {frame_index} dilewati.", flush=True)
+                else:
+                    samples.append((frame_index, utils.count_objects(detections), detections))
+            frames_decoded += 1
+            frame_index += 1
+    except Exception as e:
+        error = str(e)
+    finally:
+        cap.release()
+    return {**chunk, "samples": samples, "frames_decoded": frames_decoded, "seconds": time.perf_counter() - chunk_start, "error": error}
+
+
+# --- Proses Utama: Gabung Hasil Chunk dan Logika Baseline ---
+def format_video_time(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+class VideoAnalysis:
+    """
+    Status analisis satu video di proses utama. Chunk bisa selesai tidak berurutan, jadi
+    hasilnya ditahan sampai semua chunk sebelumnya selesai; timer persistensi dan filter
+    smoothing berjalan lintas batas chunk seperti pada rekaman yang diputar utuh.
+    """
+
+    def __init__(self, path, fps, frame_count, chunk_count, baseline, start_time):
+        from smoothing import CountSmoother
+
+        self.path = path
+        self.fps = fps
+        self.frame_count = frame_count
+        self.chunk_count = chunk_count
+        self.baseline = baseline # None = baseline diambil dari sampel pertama video (--baseline-from-start)
+        self.start_time = start_time
+        self.smoother = CountSmoother() if config.SMOOTHING_ENABLED else None
+        self.change_start_time = None
+        self.active_details = None # Perubahan yang sudah dilaporkan, tidak dilaporkan ulang sampai berubah/kembali normal
+        self.next_chunk = 0
+        self.pending = {}
+        self.frames_decoded = 0
+        self.samples = 0
+        self.errors = 0
+        self.events = 0
+
+    def add_chunk(self, result):
+        """Menyimpan hasil chunk lalu memproses semua chunk yang sudah berurutan. Mengembalikan event baru."""
+        self.pending[result["chunk_index"]] = result
+        events = []
+        while self.next_chunk in self.pending:
+            chunk = self.pending.pop(self.next_chunk)
+            self.next_chunk += 1
+            self.frames_decoded += chunk["frames_decoded"]
+            if chunk["error"]:
+                self.errors += 1
+                print(f"Peringatan: Chunk {chunk['chunk_index']} dari {os.path.basename(self.path)} gagal: {chunk['error']}", flush=True)
+                self.change_start_time = None # Ada celah di rekaman, timer persistensi tidak dilanjutkan melewatinya
+            for frame_index, counts, detections in chunk["samples"]:
+                event = self.process_sample(frame_index, counts, detections)
+                if event is not None:
+                    events.append(event)
+        return events
+
+    def process_sample(self, frame_index, counts, detections):
+        """Logika yang sama dengan process_detection_result di main.py, dengan waktu video sebagai jam."""
+        import utils
+
+        self.samples += 1
+        video_seconds = frame_index / self.fps
+        if self.baseline is None:
+            self.baseline = counts
+            print(f"Baseline {os.path.basename(self.path)} dari awal video: {counts}", flush=True)
+        smoothed_counts = self.smoother.update(counts, self.baseline) if self.smoother is not None else counts
+        change_details = utils.compare_with_baseline(self.baseline, smoothed_counts)
+
+        if not change_details:
+            self.change_start_time = None
+            self.active_details = None
+            return None
+        if change_details == self.active_details:
+            return None # Perubahan yang sama masih berlangsung, sudah dilaporkan
+        if self.change_start_time is None:
+            self.change_start_time = video_seconds
+            return None
+        if video_seconds - self.change_start_time <= config.ALARM_PERSISTENCE_THRESHOLD:
+            return None
+
+        self.change_start_time = None
+        self.active_details = change_details
+        self.events += 1
+        event_time = self.start_time + datetime.timedelta(seconds=video_seconds)
+        return {
+            "timestamp": event_time.strftime("%H:%M:%S"),
+            "event": "stock_change",
+            "status": "unauthorized",
+            "initial_baseline": self.baseline,
+            "actual_objects_at_detection": counts,
+            "smoothed_objects_at_detection": smoothed_counts,
+            "change_details": ", ".join(change_details),
+            "datetime": event_time.isoformat(sep=" ", timespec="milliseconds"),
+            "source": "forensic",
+            "video": os.path.abspath(self.path),
+            "video_time": format_video_time(video_seconds),
+            "video_seconds": round(video_seconds, 3),
+            "video_frame": frame_index,
+            "_detections": detections, # Hanya untuk screenshot bukti, dihapus sebelum ditulis
+        }
+
+
+def save_capture(writer, event):
+    """Membaca ulang frame event dari video dan menyimpannya (dengan kotak deteksi) sebagai bukti."""
+    import utils
+
+    cap = cv2.VideoCapture(event["video"])
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, event["video_frame"])
+        ret, frame = cap.read()
+    finally:
+        cap.release()
+    if not ret:
+        return None
+    utils.draw_detections(frame, event["_detections"])
+    cv2.putText(frame, f"{os.path.basename(event['video'])} {event['video_time']}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+    return writer.submit(frame, "unauthorized", writer.reserve_path("unauthorized", prefix="forensik"))
+
+
+def run_analysis(videos, baseline=None, workers=None, chunk_seconds=None, sample_fps=None, output_path=None, start_time=None, save_captures=None, confidence=None, quiet=False):
+    """
+    Menganalisis daftar video dan menulis event ke `output_path` (JSON Lines).
+    `baseline` {kelas: jumlah}, None = ambil dari sampel pertama tiap video.
+    Mengembalikan ringkasan (durasi video, waktu proses, kecepatan x real-time, jumlah event).
+    """
+    workers = workers or config.FORENSIC_WORKERS or available_cores()
+    chunk_seconds = chunk_seconds or config.FORENSIC_CHUNK_SECONDS
+    sample_fps = sample_fps if sample_fps is not None else config.FORENSIC_SAMPLE_FPS
+    save_captures = config.FORENSIC_SAVE_CAPTURES if save_captures is None else save_captures
+    confidence = confidence if confidence is not None else config.CONFIDENCE_THRESHOLD
+    # Core dibagi rata ke worker agar thread inferensi antar proses tidak saling berebut core
+    threads = config.FORENSIC_THREADS_PER_WORKER or max(1, available_cores() // workers)
+
+    analyses, tasks = [], []
+    for path in videos:
+        info = probe_video(path)
+        if info is None:
+            print(f"Peringatan: {path} tidak bisa dibuka sebagai video, dilewati.", flush=True)
+            continue
+        fps, frame_count = info
+        chunks = make_chunks(len(analyses), path, fps, frame_count, chunk_seconds, sample_fps)
+        analyses.append(VideoAnalysis(path, fps, frame_count, len(chunks), dict(baseline) if baseline is not None else None, recording_start_time(path, frame_count / fps, start_time)))
+        tasks.extend(chunks)
+    if not tasks:
+        raise ValueError("Tidak ada video yang bisa dianalisis.")
+
+    writer = None
+    if save_captures:
+        import screenshot_writer
+        writer = screenshot_writer.ScreenshotWriter(base_dir=os.path.splitext(output_path)[0] + "_captures")
+
+    total_seconds = sum(analysis.frame_count / analysis.fps for analysis in analyses)
+    print(f"Analisis forensik: {len(analyses)} video ({format_video_time(total_seconds)}), {len(tasks)} chunk @ {chunk_seconds:g} detik, sampel {sample_fps:g} fps, {workers} worker x {threads} thread", flush=True)
+    print(f"Event ditulis ke: {output_path}", flush=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    analysis_start = time.perf_counter()
+    processed_seconds = 0.0
+    worker_seconds = 0.0
+    events_total = 0
+    # 'spawn' agar worker tidak mewarisi state thread/runtime proses utama (aman di semua OS)
+    context = multiprocessing.get_context("spawn")
+    with open(output_path, 'a', encoding='utf-8') as output, context.Pool(workers, initializer=init_worker, initargs=(threads, confidence, config.INFERENCE_BACKEND)) as pool:
+        # Tugas diurutkan per video lalu per chunk, jadi video awal selesai lebih dulu dan event cepat keluar
+        for done, result in enumerate(pool.imap_unordered(analyze_chunk, tasks), 1):
+            analysis = analyses[result["video_index"]]
+            processed_seconds += result["frames_decoded"] / analysis.fps
+            worker_seconds += result["seconds"]
+            for event in analysis.add_chunk(result):
+                detections = event.pop("_detections")
+                if writer is not None:
+                    event["capture_path"] = save_capture(writer, {**event, "_detections": detections})
+                output.write(json.dumps(event, ensure_ascii=False) + "\n")
+                output.flush()
+                events_total += 1
+                print(f"[{event['video_time']}] {os.path.basename(event['video'])}: {event['change_details']}", flush=True)
+            if not quiet:
+                elapsed = time.perf_counter() - analysis_start
+                print(f"Progres: {done}/{len(tasks)} chunk, {format_video_time(processed_seconds)} video dianalisis, {processed_seconds / elapsed:.1f}x real-time", flush=True)
+
+    if writer is not None:
+        writer.close()
+    wall_seconds = time.perf_counter() - analysis_start
+    summary = {
+        "videos": len(analyses),
+        "chunks": len(tasks),
+        "workers": workers,
+        "threads_per_worker": threads,
+        "video_seconds": round(processed_seconds, 2),
+        "wall_seconds": round(wall_seconds, 2),
+        "worker_seconds": round(worker_seconds, 2),
+        "realtime_factor": round(processed_seconds / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "samples": sum(analysis.samples for analysis in analyses),
+        "failed_chunks": sum(analysis.errors for analysis in analyses),
+        "events": events_total,
+        "output": output_path,
+    }
+    return summary
+
+
+def load_baseline(path):
+    import utils
+
+    if not os.path.exists(path):
+        raise ValueError(f"File baseline {path} tidak ditemukan. Gunakan --baseline-from-start untuk memakai awal video.")
+    return utils.load_initial_state(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analisis forensik rekaman video terhadap baseline (batch, paralel antar core)")
+    parser.add_argument("paths", nargs="+", help="File video atau folder berisi video")
+    baseline_group = parser.add_mutually_exclusive_group()
+    baseline_group.add_argument("--baseline", default=config.INITIAL_STATE_FILE, help="File baseline JSON {kelas: jumlah} (default: initial_state.json)")
+    baseline_group.add_argument("--baseline-from-start", action="store_true", help="Baseline diambil dari sampel pertama tiap video")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses worker (default: config.FORENSIC_WORKERS atau jumlah core)")
+    parser.add_argument("--chunk-seconds", type=float, default=None, help="Panjang chunk dalam detik video")
+    parser.add_argument("--sample-fps", type=float, default=None, help="Frame yang dideteksi per detik video (0 = semua frame)")
+    parser.add_argument("--start-time", help="Waktu mulai rekaman 'YYYY-MM-DD HH:MM:SS' (default: perkiraan dari waktu modifikasi file)")
+    parser.add_argument("--conf", type=float, default=None, help="Ambang confidence (default: config.CONFIDENCE_THRESHOLD)")
+    parser.add_argument("--output", help="File JSON Lines hasil (default: config.FORENSIC_OUTPUT_DIR/forensik_<waktu>.jsonl)")
+    parser.add_argument("--no-captures", action="store_true", help="Jangan simpan screenshot bukti untuk setiap event")
+    args = parser.parse_args()
+
+    videos = find_videos(args.paths)
+    if not videos:
+        parser.error("Tidak ada file video yang ditemukan.")
+    try:
+        baseline = None if args.baseline_from_start else load_baseline(args.baseline)
+        start_time = datetime.datetime.strptime(args.start_time, "%Y-%m-%d %H:%M:%S") if args.start_time else None
+    except ValueError as e:
+        parser.error(str(e))
+    output_path = args.output or os.path.join(config.FORENSIC_OUTPUT_DIR, f"forensik_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+
+    summary = run_analysis(videos, baseline, args.workers, args.chunk_seconds, args.sample_fps, output_path, start_time, False if args.no_captures else None, args.conf)
+    print(f"\nSelesai: {summary['video_seconds']:.1f} detik video dalam {summary['wall_seconds']:.1f} detik "
+          f"({summary['realtime_factor']:.1f}x real-time, {summary['workers']} worker), {summary['events']} event, {summary['failed_chunks']} chunk gagal.", flush=True)
+    print(f"Hasil: {summary['output']}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
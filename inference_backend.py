@@ -0,0 +1,289 @@
+import ast
+import json
+import os
+import cv2
+import numpy as np
+import config
+
+# --- Daftar Backend Inferensi ---
+# torch        : model .pt asli lewat ultralytics/PyTorch
+# onnx         : model hasil export ONNX, dijalankan ONNX Runtime
+# onnx_int8    : model ONNX yang dikuantisasi INT8 (dynamic quantization)
+# openvino     : model hasil export OpenVINO IR
+BACKENDS = ("torch", "onnx", "onnx_int8", "openvino")
+
+NMS_IOU_THRESHOLD = 0.7 # Sama dengan default ultralytics agar hasil semua backend sama
+MAX_DETECTIONS = 300
+
+
+def backend_model_path(backend):
+    """Lokasi file model untuk setiap backend, diturunkan dari config.YOLO_MODEL_PATH."""
+    base_path, _ = os.path.splitext(config.YOLO_MODEL_PATH)
+    if backend == "torch":
+        return config.YOLO_MODEL_PATH
+    if backend == "onnx":
+        return base_path + ".onnx"
+    if backend == "onnx_int8":
+        return base_path + "_int8.onnx"
+    if backend == "openvino":
+        return os.path.join(base_path + "_openvino_model", os.path.basename(base_path) + ".xml")
+    raise ValueError(f"Backend inferensi tidak dikenal: {backend}. Pilihan: {', '.join(BACKENDS)}")
+
+
+# --- Cache Model di Disk ---
+# Hasil kerja yang mahal saat startup disimpan di config.MODEL_CACHE_DIR: graf ONNX yang sudah
+# dioptimasi ONNX Runtime, blob kompilasi OpenVINO, dan nama kelas (agar count_objects tidak perlu
+# memuat model). Cache dianggap basi jika lebih tua dari file model sumbernya.
+def cache_path(model_path, suffix):
+    # Ekstensi ikut di nama (yolov8n_pt, yolov8n_xml) agar backend dengan nama dasar sama tidak bertabrakan
+    return os.path.join(config.MODEL_CACHE_DIR, os.path.basename(model_path).replace(".", "_") + suffix)
+
+
+def is_cache_fresh(cached_file, source_path):
+    return os.path.exists(cached_file) and os.path.getmtime(cached_file) >= os.path.getmtime(source_path)
+
+
+def cached_class_names(backend=None):
+    """Nama kelas {id: nama} dari cache, atau None jika belum ada/basi (tanpa memuat model)."""
+    model_path = backend_model_path(backend or config.INFERENCE_BACKEND)
+    names_file = cache_path(model_path, ".names.json")
+    if not config.MODEL_CACHE_ENABLED or not os.path.exists(model_path) or not is_cache_fresh(names_file, model_path):
+        return None
+    try:
+        with open(names_file) as f:
+            return {int(k): v for k, v in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def save_class_names(backend, names):
+    if not config.MODEL_CACHE_ENABLED:
+        return
+    names_file = cache_path(backend_model_path(backend), ".names.json")
+    try:
+        os.makedirs(config.MODEL_CACHE_DIR, exist_ok=True)
+        temp_file = f"{names_file}.{os.getpid()}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump({str(k): v for k, v in names.items()}, f)
+        os.replace(temp_file, names_file) # Atomik: proses lain tidak pernah membaca file setengah jadi
+    except OSError as e:
+        print(f"Peringatan: Gagal menyimpan cache nama kelas di {names_file}: {e}")
+
+
+# --- Pengaturan Thread dan Afinitas CPU ---
+def configure_cpu_threads(backend):
+    """
+    Menerapkan config.INFERENCE_THREADS dan config.INFERENCE_CPU_AFFINITY.
+    Afinitas berlaku untuk seluruh proses (hanya didukung di Linux). Backend
+    ONNX Runtime dan OpenVINO membaca jumlah thread saat sesi dibuat.
+    """
+    if config.INFERENCE_CPU_AFFINITY:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, set(config.INFERENCE_CPU_AFFINITY))
+        else:
+            print("Peringatan: INFERENCE_CPU_AFFINITY hanya didukung di Linux. Pengaturan diabaikan.")
+
+    if config.INFERENCE_THREADS > 0:
+        cv2.setNumThreads(config.INFERENCE_THREADS)
+        if backend == "torch":
+            import torch
+            torch.set_num_threads(config.INFERENCE_THREADS)
+
+
+# --- Pre/Post-processing Bersama untuk Backend Non-PyTorch ---
+def letterbox(frame, imgsz):
+    """Resize dengan rasio tetap lalu padding abu-abu (114) menjadi imgsz x imgsz, seperti ultralytics."""
+    height, width = frame.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (imgsz - new_width) / 2, (imgsz - new_height) / 2
+
+    if (new_width, new_height) != (width, height):
+        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return frame, ratio, (left, top)
+
+
+def to_blob(frames, imgsz):
+    """BGR uint8 -> tensor NCHW float32 RGB 0..1, beserta parameter letterbox tiap frame."""
+    letterboxed = [letterbox(frame, imgsz) for frame in frames]
+    blob = np.stack([lb[0] for lb in letterboxed])[..., ::-1].transpose(0, 3, 1, 2)
+    blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+    return blob, [(lb[1], lb[2]) for lb in letterboxed]
+
+
+def postprocess(prediction, letterbox_params, frame_shape, conf_threshold, classes=None):
+    """
+    Mengubah keluaran mentah YOLOv8 (84 x N: cx, cy, w, h, skor 80 kelas) menjadi
+    (xyxy, conf, cls) pada koordinat frame asli, dengan NMS per kelas.
+    Jika `classes` diberikan, kandidat kelas lain dibuang sebelum NMS (seperti argumen classes= ultralytics).
+    """
+    prediction = prediction.T
+    scores = prediction[:, 4:]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+    keep = confidences > conf_threshold
+    if classes is not None:
+        keep &= np.isin(class_ids, classes)
+    boxes, confidences, class_ids = prediction[keep, :4], confidences[keep], class_ids[keep]
+
+    if len(boxes):
+        xywh = np.column_stack((boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2, boxes[:, 2], boxes[:, 3]))
+        indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confidences.tolist(), class_ids.tolist(), conf_threshold, NMS_IOU_THRESHOLD)
+        indices = np.array(indices, dtype=np.int64).reshape(-1)[:MAX_DETECTIONS]
+        xywh, confidences, class_ids = xywh[indices], confidences[indices], class_ids[indices]
+    else:
+        xywh = np.zeros((0, 4), dtype=np.float32)
+
+    ratio, (left, top) = letterbox_params
+    xyxy = np.column_stack((xywh[:, 0], xywh[:, 1], xywh[:, 0] + xywh[:, 2], xywh[:, 1] + xywh[:, 3])) if len(xywh) else xywh
+    xyxy = (xyxy - np.array([left, top, left, top], dtype=np.float32)) / ratio
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, frame_shape[1])
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, frame_shape[0])
+    return xyxy.astype(np.float32), confidences.astype(np.float32), class_ids.astype(np.int64)
+
+
+def read_class_names(model_path, embedded_names=None):
+    """
+    Nama kelas disimpan ultralytics di metadata export (di dalam file ONNX atau
+    metadata.yaml untuk OpenVINO); fallback ke nama dari model .pt.
+    """
+    if embedded_names:
+        return {int(k): v for k, v in ast.literal_eval(embedded_names).items()}
+    metadata_path = os.path.join(os.path.dirname(model_path), "metadata.yaml")
+    if os.path.exists(metadata_path):
+        import yaml
+        with open(metadata_path) as f:
+            return {int(k): v for k, v in yaml.safe_load(f)["names"].items()}
+    from ultralytics import YOLO
+    return YOLO(config.YOLO_MODEL_PATH).names
+
+
+# --- Backend: PyTorch (ultralytics) ---
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_path):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+
+    def predict(self, frames, conf_threshold, classes=None, imgsz=None):
+        options = {"imgsz": imgsz} if imgsz else {}
+        results = self.model(frames, conf=conf_threshold, classes=classes, verbose=False, device='cpu', **options)
+        outputs = []
+        for r in results:
+            # Satu transfer tensor (N x 6: x1, y1, x2, y2, conf, cls) per frame, bukan per box
+            data = r.boxes.data.cpu().numpy()
+            outputs.append((
+                data[:, :4].astype(np.float32),
+                data[:, 4].astype(np.float32),
+                data[:, 5].astype(np.int64),
+            ))
+        return outputs
+
+
+# --- Backend: ONNX Runtime (termasuk model INT8) ---
+class OnnxRuntimeBackend:
+    name = "onnx"
+
+    def __init__(self, model_path, imgsz):
+        self.session = self._create_session(model_path)
+        self.input_name = self.session.get_inputs()[0].name
+        self.imgsz = imgsz
+        self.names = read_class_names(model_path, self.session.get_modelmeta().custom_metadata_map.get("names"))
+
+    @staticmethod
+    def _create_session(model_path):
+        """
+        Sesi pertama mengoptimasi graf (fusi operator, layout NCHWc) lalu menyimpannya ke cache;
+        startup berikutnya memuat graf hasil optimasi itu dengan optimasi dimatikan.
+        """
+        import onnxruntime
+
+        def session_options():
+            options = onnxruntime.SessionOptions()
+            if config.INFERENCE_THREADS > 0:
+                options.intra_op_num_threads = config.INFERENCE_THREADS
+                options.inter_op_num_threads = 1
+            return options
+
+        providers = ["CPUExecutionProvider"]
+        if not config.MODEL_CACHE_ENABLED:
+            return onnxruntime.InferenceSession(model_path, session_options(), providers=providers)
+
+        optimized_path = cache_path(model_path, ".optimized.onnx")
+        if is_cache_fresh(optimized_path, model_path):
+            options = session_options()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+            try:
+                return onnxruntime.InferenceSession(optimized_path, options, providers=providers)
+            except Exception as e:
+                print(f"Peringatan: Cache model {optimized_path} tidak bisa dimuat ({e}), dibuat ulang.")
+
+        options = session_options()
+        temp_path = f"{optimized_path}.{os.getpid()}.tmp.onnx"
+        options.optimized_model_filepath = temp_path
+        options.log_severity_level = 3 # Peringatan "model khusus mesin ini" sudah diketahui, cache memang lokal
+        try:
+            os.makedirs(config.MODEL_CACHE_DIR, exist_ok=True)
+            session = onnxruntime.InferenceSession(model_path, options, providers=providers)
+            os.replace(temp_path, optimized_path)
+            return session
+        except Exception as e:
+            print(f"Peringatan: Gagal menyimpan cache model ONNX di {optimized_path}: {e}")
+            return onnxruntime.InferenceSession(model_path, session_options(), providers=providers)
+
+    def predict(self, frames, conf_threshold, classes=None, imgsz=None):
+        blob, params = to_blob(frames, imgsz or self.imgsz) # Model diexport dengan dynamic=True, ukuran input bebas
+        predictions = self.session.run(None, {self.input_name: blob})[0]
+        return [postprocess(p, lb, f.shape, conf_threshold, classes) for p, lb, f in zip(predictions, params, frames)]
+
+
+# --- Backend: OpenVINO ---
+class OpenVinoBackend:
+    name = "openvino"
+
+    def __init__(self, model_path, imgsz):
+        import openvino
+        core = openvino.Core()
+        ov_config = {"PERFORMANCE_HINT": "LATENCY"}
+        if config.INFERENCE_THREADS > 0:
+            ov_config["INFERENCE_NUM_THREADS"] = config.INFERENCE_THREADS
+        if config.MODEL_CACHE_ENABLED:
+            # OpenVINO menyimpan blob hasil kompilasi sendiri dan memakainya lagi jika model/pengaturan sama
+            os.makedirs(config.MODEL_CACHE_DIR, exist_ok=True)
+            ov_config["CACHE_DIR"] = config.MODEL_CACHE_DIR
+            self.compiled_model = core.compile_model(model_path, "CPU", ov_config)
+        else:
+            self.compiled_model = core.compile_model(core.read_model(model_path), "CPU", ov_config)
+        self.imgsz = imgsz
+        self.names = read_class_names(model_path)
+
+    def predict(self, frames, conf_threshold, classes=None, imgsz=None):
+        blob, params = to_blob(frames, imgsz or self.imgsz) # Model diexport dengan dynamic=True, ukuran input bebas
+        predictions = self.compiled_model(blob)[self.compiled_model.output(0)]
+        return [postprocess(p, lb, f.shape, conf_threshold, classes) for p, lb, f in zip(predictions, params, frames)]
+
+
+def load_backend(backend=None):
+    """Memuat backend inferensi sesuai config.INFERENCE_BACKEND (atau argumen `backend`)."""
+    backend = backend or config.INFERENCE_BACKEND
+    model_path = backend_model_path(backend)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model untuk backend '{backend}' tidak ditemukan di {model_path}. Jalankan: python export_model.py --backend {backend}")
+
+    configure_cpu_threads(backend)
+    if backend == "torch":
+        # Tidak ada cache bobot untuk .pt: fuse Conv+BN hanya ~40 ms, biaya panggilan pertama
+        # (import torchvision, alokasi buffer) ditangani warm-up di utils.ModelWarmup
+        loaded = TorchBackend(model_path)
+    elif backend in ("onnx", "onnx_int8"):
+        loaded = OnnxRuntimeBackend(model_path, config.INFERENCE_IMGSZ)
+    else:
+        loaded = OpenVinoBackend(model_path, config.INFERENCE_IMGSZ)
+    if cached_class_names(backend) is None:
+        save_class_names(backend, loaded.names)
+    return loaded
@@ -0,0 +1,535 @@
+import argparse
+import atexit
+import itertools
+import os
+import queue
+import secrets
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import connection, resource_tracker, shared_memory
+import numpy as np
+import config
+
+# --- Server Inferensi Bersama ---
+# Satu proses server memuat model; proses lain (misal satu main.py per kamera) menjadi klien
+# tanpa memuat model sendiri. Setiap klien membuat satu blok shared memory berisi beberapa slot
+# frame. Frame yang sudah diperkecil ke imgsz ditulis langsung ke slot, lalu lewat socket hanya
+# dikirim metadata kecil (nomor slot, ukuran frame, imgsz). Server membaca frame dari slot tanpa
+# salinan (view numpy di atas shared memory), menggabungkan frame dari beberapa klien yang datang
+# dalam INFERENCE_SERVER_BATCH_WINDOW_MS menjadi satu panggilan model, dan mengembalikan hasil
+# ringkas per frame: array float32 N x 6 (x1, y1, x2, y2, conf, cls).
+#
+# InferenceClient punya `names` dan `predict()` seperti backend di inference_backend.py, jadi
+# utils.run_model/detect_objects memakainya tanpa perubahan (mode klien: INFERENCE_SERVER_ENABLED).
+#
+# multiprocessing.connection melakukan unpickle setiap pesan, jadi hanya proses milik pengguna yang
+# sama yang boleh tersambung: default-nya Unix socket di runtime dir 0700, dan kunci autentikasi
+# acak dibaca dari file 0600 di direktori yang sama (bukan konstanta di kode).
+AUTHKEY_FILE_NAME = "authkey"
+SOCKET_FILE_NAME = "inference.sock"
+
+
+def runtime_dir():
+    """Direktori privat (0700) untuk socket dan kunci server. Ditolak jika dimiliki pengguna lain atau bisa dibaca orang lain."""
+    path = config.INFERENCE_SERVER_RUNTIME_DIR
+    if not path:
+        if os.environ.get("XDG_RUNTIME_DIR"):
+            path = os.path.join(os.environ["XDG_RUNTIME_DIR"], "objsec")
+        else:
+            suffix = f"-{os.getuid()}" if hasattr(os, "getuid") else ""
+            path = os.path.join(tempfile.gettempdir(), f"objsec{suffix}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.name == "posix":
+        info = os.lstat(path)
+        if stat.S_ISLNK(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise PermissionError(f"Runtime dir server inferensi {path} bukan milik pengguna ini atau izinnya bukan 0700.")
+    return path
+
+
+def default_address():
+    if os.name == "nt":
+        return r"\\.\pipe\objsec-inferensi-" + os.environ.get("USERNAME", "user")
+    return os.path.join(runtime_dir(), SOCKET_FILE_NAME)
+
+
+def load_authkey():
+    """Kunci autentikasi: INFERENCE_SERVER_AUTHKEY jika diisi, selain itu file acak 0600 di runtime dir (dibuat sekali, dipakai server dan klien)."""
+    if config.INFERENCE_SERVER_AUTHKEY:
+        return config.INFERENCE_SERVER_AUTHKEY.encode("utf-8")
+    path = os.path.join(runtime_dir(), AUTHKEY_FILE_NAME)
+    if not os.path.exists(path):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            try:
+                os.link(temp_path, path) # Atomik dan tidak menimpa: jika proses lain lebih dulu, kuncinya yang dipakai
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(temp_path)
+    if os.name == "posix":
+        info = os.lstat(path)
+        if stat.S_ISLNK(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise PermissionError(f"File kunci server inferensi {path} bukan milik pengguna ini atau izinnya bukan 0600.")
+    with open(path) as f:
+        key = f.read().strip()
+    if not key:
+        raise ValueError(f"File kunci server inferensi {path} kosong.")
+    return key.encode("utf-8")
+
+
+def parse_address(address):
+    """"host:port" -> (host, port) untuk TCP, selain itu path Unix socket (atau named pipe Windows)."""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def pack_output(output):
+    """(xyxy, conf, cls) dari backend -> bytes float32 N x 6."""
+    xyxy, confidences, class_ids = output
+    packed = np.empty((len(confidences), 6), dtype=np.float32)
+    packed[:, :4] = xyxy
+    packed[:, 4] = confidences
+    packed[:, 5] = class_ids
+    return packed.tobytes()
+
+
+def unpack_output(payload):
+    packed = np.frombuffer(payload, dtype=np.float32).reshape(-1, 6)
+    return packed[:, :4].copy(), packed[:, 4].copy(), packed[:, 5].astype(np.int64)
+
+
+def attach_shared_memory(name):
+    """Membuka shared memory milik proses lain tanpa didaftarkan ke resource tracker proses ini (pemiliknya yang menghapus)."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def slot_side():
+    """Sisi terpanjang frame yang muat di satu slot: imgsz terbesar yang mungkin dipakai."""
+    return max([config.INFERENCE_IMGSZ] + list(config.INFERENCE_IMGSZ_STEPS))
+
+
+# --- Sisi Server ---
+class ClientSession:
+    """Koneksi satu klien beserta shared memory slot frame miliknya."""
+
+    def __init__(self, conn, shm_name, slots, slot_bytes, pid):
+        self.conn = conn
+        self.shm = attach_shared_memory(shm_name)
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.pid = pid
+        self.closed = False
+        self._send_lock = threading.Lock()
+
+    def frame(self, slot, shape):
+        """View numpy ke slot (tanpa salinan)."""
+        if not 0 <= slot < self.slots or int(np.prod(shape)) > self.slot_bytes:
+            raise ValueError(f"slot {slot} dengan ukuran {shape} di luar shared memory klien")
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def send(self, message):
+        if self.closed:
+            return
+        try:
+            with self._send_lock:
+                self.conn.send(message)
+        except (OSError, EOFError):
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        self.conn.close()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass # Masih ada view di batch yang sedang berjalan; mapping dilepas saat view dibuang
+
+
+class InferenceRequest:
+    def __init__(self, session, request_id, frames, imgsz, conf_threshold, classes):
+        self.session = session
+        self.request_id = request_id
+        self.frames = frames # [(slot, shape), ...]
+        self.imgsz = imgsz
+        self.conf_threshold = conf_threshold
+        self.classes = classes
+
+    @property
+    def batch_key(self):
+        # Frame hanya bisa digabung dalam satu panggilan jika parameter model sama
+        return self.imgsz, self.conf_threshold, tuple(self.classes) if self.classes is not None else None
+
+
+class InferenceServer:
+    def __init__(self, address=None, authkey=None, backend=None, batch_window_ms=None, max_batch=None, idle_exit=0.0):
+        self.address_text = address or config.INFERENCE_SERVER_ADDRESS or default_address()
+        self.address = parse_address(self.address_text)
+        self.authkey = authkey.encode("utf-8") if authkey else load_authkey()
+        self.backend = backend
+        self.batch_window = (config.INFERENCE_SERVER_BATCH_WINDOW_MS if batch_window_ms is None else batch_window_ms) / 1000
+        self.max_batch = max_batch or config.INFERENCE_SERVER_MAX_BATCH
+        self.idle_exit = idle_exit
+        self.model = None
+        self.sessions = []
+        self._sessions_lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._stop_event = threading.Event()
+        self._listener = None
+        self.last_client_time = time.time()
+        self.batches = 0
+        self.frames = 0
+        self.requests = 0
+        self.model_seconds = 0.0
+
+    def serve_forever(self):
+        """Memuat model lalu melayani klien sampai stop() atau idle. Mengembalikan False jika alamat sudah dipakai."""
+        import inference_backend
+        load_start = time.perf_counter()
+        self.model = inference_backend.load_backend(self.backend)
+        side = slot_side()
+        self.model.predict([np.full((side, side, 3), 114, dtype=np.uint8)], config.CONFIDENCE_THRESHOLD, config.CLASSES_TO_TRACK_IDS, config.INFERENCE_IMGSZ) # Warm-up
+        print(f"Model {config.INFERENCE_BACKEND if self.backend is None else self.backend} dimuat dalam {time.perf_counter() - load_start:.2f} s.", flush=True)
+
+        if isinstance(self.address, str) and os.name == "posix" and os.path.exists(self.address):
+            with socket.socket(socket.AF_UNIX) as probe:
+                try:
+                    probe.connect(self.address)
+                except OSError:
+                    os.unlink(self.address) # Sisa socket dari server yang berhenti tidak normal
+                else:
+                    print(f"Server inferensi lain sudah berjalan di {self.address_text}.", flush=True)
+                    return False
+        try:
+            self._listener = connection.Listener(self.address, authkey=self.authkey)
+        except OSError as e:
+            # Misal dua klien menjalankan server bersamaan: server yang kalah berhenti, klien memakai server yang lain
+            print(f"Server inferensi tidak bisa dibuka di {self.address_text}: {e}. Server lain mungkin sudah berjalan.", flush=True)
+            return False
+        print(f"Server inferensi siap di {self.address_text} (batch maks {self.max_batch} frame, jendela {self.batch_window * 1000:g} ms).", flush=True)
+        threading.Thread(target=self._accept_loop, name="inference_server_accept", daemon=True).start()
+        batch_thread = threading.Thread(target=self._batch_loop, name="inference_server_batch", daemon=True)
+        batch_thread.start()
+
+        self.last_client_time = time.time() # Waktu idle dihitung sejak server siap, bukan sejak mulai memuat model
+        try:
+            while not self._stop_event.wait(1.0):
+                with self._sessions_lock:
+                    has_clients = bool(self.sessions)
+                if has_clients:
+                    self.last_client_time = time.time()
+                elif self.idle_exit and time.time() - self.last_client_time > self.idle_exit:
+                    print(f"Tidak ada klien selama {self.idle_exit:g} detik. Server inferensi berhenti.", flush=True)
+                    self._stop_event.set()
+        except KeyboardInterrupt:
+            self._stop_event.set()
+        self._listener.close()
+        batch_thread.join(timeout=5.0)
+        with self._sessions_lock:
+            for session in self.sessions:
+                session.close()
+        print(f"Statistik server inferensi: {self.requests} permintaan, {self.frames} frame dalam {self.batches} batch "
+              f"(rata-rata {self.frames / self.batches if self.batches else 0:.2f} frame/batch), model {self.model_seconds:.1f} s.", flush=True)
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _accept_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                conn = self._listener.accept()
+            except connection.AuthenticationError:
+                print("Peringatan: Koneksi ke server inferensi ditolak (authkey salah).", flush=True)
+                continue
+            except (EOFError, ConnectionError):
+                continue # Koneksi putus sebelum autentikasi selesai (misal pemeriksaan port)
+            except OSError:
+                return # Listener ditutup
+            threading.Thread(target=self._client_loop, args=(conn,), name="inference_server_client", daemon=True).start()
+
+    def _client_loop(self, conn):
+        try:
+            kind, shm_name, slots, slot_bytes, pid = conn.recv()
+            session = ClientSession(conn, shm_name, slots, slot_bytes, pid)
+        except (OSError, EOFError, ValueError) as e:
+            print(f"Peringatan: Klien server inferensi gagal tersambung: {e}", flush=True)
+            conn.close()
+            return
+        session.send(("welcome", dict(self.model.names)))
+        with self._sessions_lock:
+            self.sessions.append(session)
+        print(f"Klien inferensi tersambung (pid {pid}, {slots} slot). Klien aktif: {len(self.sessions)}.", flush=True)
+        try:
+            while not self._stop_event.is_set():
+                kind, request_id, frames, imgsz, conf_threshold, classes = conn.recv()
+                self._requests.put(InferenceRequest(session, request_id, frames, imgsz, conf_threshold, classes))
+        except (OSError, EOFError):
+            pass
+        with self._sessions_lock:
+            self.sessions.remove(session)
+            remaining = len(self.sessions)
+        session.close()
+        print(f"Klien inferensi terputus (pid {pid}). Klien aktif: {remaining}.", flush=True)
+
+    def _collect_batch(self, first):
+        """Menunggu permintaan lain selama jendela batch (hanya jika ada klien lain yang bisa mengirim)."""
+        batch = [first]
+        frame_count = len(first.frames)
+        with self._sessions_lock:
+            other_clients = len(self.sessions) > 1
+        deadline = time.perf_counter() + (self.batch_window if other_clients else 0.0)
+        while frame_count < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                request = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            frame_count += len(request.frames)
+        return batch
+
+    def _batch_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                first = self._requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            groups = {}
+            for request in self._collect_batch(first):
+                if not request.session.closed:
+                    groups.setdefault(request.batch_key, []).append(request)
+            for requests in groups.values():
+                self._run_group(requests)
+
+    def _run_group(self, requests):
+        first = requests[0]
+        try:
+            frames = [request.session.frame(slot, shape) for request in requests for slot, shape in request.frames]
+            model_start = time.perf_counter()
+            outputs = self.model.predict(frames, first.conf_threshold, first.classes, first.imgsz)
+            self.model_seconds += time.perf_counter() - model_start
+        except Exception as e:
+            for request in requests:
+                request.session.send(("error", request.request_id, str(e)))
+            return
+        finally:
+            frames = None # View ke shared memory dilepas sebelum klien boleh menutupnya
+        self.batches += 1
+        self.frames += len(outputs)
+        self.requests += len(requests)
+        position = 0
+        for request in requests:
+            payloads = [pack_output(output) for output in outputs[position:position + len(request.frames)]]
+            position += len(request.frames)
+            request.session.send(("result", request.request_id, payloads))
+
+
+# --- Sisi Klien ---
+class PendingRequest:
+    def __init__(self):
+        self.done = threading.Event()
+        self.payloads = None
+        self.error = None
+
+
+class InferenceClient:
+    """
+    Pengganti backend inferensi yang mengirim frame ke server inferensi. Aman dipakai beberapa
+    thread sekaligus (setiap panggilan memakai slot shared memory sendiri). Jika server terputus,
+    panggilan berikutnya mencoba tersambung ulang sekali.
+    """
+    name = "server"
+
+    def __init__(self, address=None, authkey=None, slots=None, connect_timeout=None, request_timeout=None, autostart=None):
+        self.address = address or config.INFERENCE_SERVER_ADDRESS or default_address()
+        self.authkey = authkey.encode("utf-8") if authkey else load_authkey()
+        self.connect_timeout = config.INFERENCE_SERVER_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout
+        self.request_timeout = config.INFERENCE_SERVER_REQUEST_TIMEOUT if request_timeout is None else request_timeout
+        self.autostart = config.INFERENCE_SERVER_AUTOSTART if autostart is None else autostart
+        self.side = slot_side()
+        self.slot_bytes = self.side * self.side * 3
+        self.slots = slots or config.INFERENCE_SERVER_SLOTS
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._free_slots = queue.Queue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+        self._slot_lock = threading.Lock() # Semua slot satu panggilan diambil sekaligus, mencegah deadlock antar thread
+        self._send_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._pending = {}
+        self._request_ids = itertools.count()
+        self.conn = None
+        self.names = None
+        self._closed = False
+        self._connect()
+        atexit.register(self.close) # Shared memory dihapus saat proses keluar normal
+
+    # --- Koneksi ---
+    def _connect(self):
+        address = parse_address(self.address)
+        deadline = time.time() + self.connect_timeout
+        started = False
+        while True:
+            try:
+                conn = connection.Client(address, authkey=self.authkey)
+                break
+            except (ConnectionRefusedError, FileNotFoundError) as e:
+                if not self.autostart or time.time() > deadline:
+                    raise ConnectionError(f"Server inferensi di {self.address} tidak berjalan: {e}. "
+                                          f"Jalankan dulu `python inference_server.py` (atau aktifkan INFERENCE_SERVER_AUTOSTART).") from e
+                if not started:
+                    start_server_process(self.address)
+                    started = True
+                time.sleep(0.2)
+        conn.send(("hello", self.shm.name, self.slots, self.slot_bytes, os.getpid()))
+        kind, names = conn.recv()
+        self.names = names
+        self.conn = conn
+        threading.Thread(target=self._receive_loop, args=(conn,), name="inference_client_receive", daemon=True).start()
+
+    def _receive_loop(self, conn):
+        try:
+            while True:
+                kind, request_id, payload = conn.recv()
+                pending = self._pending.pop(request_id, None)
+                if pending is None:
+                    continue
+                if kind == "result":
+                    pending.payloads = payload
+                else:
+                    pending.error = RuntimeError(f"Server inferensi gagal: {payload}")
+                pending.done.set()
+        except (OSError, EOFError):
+            pass
+        # Koneksi putus: semua permintaan yang menunggu gagal, panggilan berikutnya menyambung ulang
+        with self._connect_lock:
+            if self.conn is conn:
+                self.conn = None
+        for request_id in list(self._pending):
+            pending = self._pending.pop(request_id, None)
+            if pending is not None:
+                pending.error = ConnectionError("Koneksi ke server inferensi terputus")
+                pending.done.set()
+
+    def _ensure_connected(self):
+        with self._connect_lock:
+            if self.conn is None:
+                print(f"Menyambung ulang ke server inferensi {self.address}...", flush=True)
+                self._connect()
+            return self.conn
+
+    # --- Inferensi ---
+    def predict(self, frames, conf_threshold, classes=None, imgsz=None):
+        """Sama dengan predict() backend: list (xyxy, conf, cls) per frame, koordinat frame masukan."""
+        outputs = []
+        for start in range(0, len(frames), self.slots):
+            outputs.extend(self._predict_chunk(frames[start:start + self.slots], conf_threshold, classes, imgsz or config.INFERENCE_IMGSZ))
+        return outputs
+
+    def _predict_chunk(self, frames, conf_threshold, classes, imgsz):
+        import cv2
+        if imgsz > self.side:
+            raise ValueError(f"imgsz {imgsz} lebih besar dari slot shared memory ({self.side})")
+        conn = self._ensure_connected()
+        with self._slot_lock:
+            slots = [self._free_slots.get() for _ in frames]
+        request_id = next(self._request_ids)
+        try:
+            frame_specs, scales = [], []
+            for slot, frame in zip(slots, frames):
+                height, width = frame.shape[:2]
+                scale = None
+                if max(height, width) > imgsz:
+                    # Crop/frame yang lebih besar dari imgsz (misal crop zona) diperkecil seperti letterbox model,
+                    # hasilnya ditulis langsung ke slot
+                    ratio = imgsz / max(height, width)
+                    size = (max(1, int(round(width * ratio))), max(1, int(round(height * ratio))))
+                    view = np.ndarray((size[1], size[0], 3), dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+                    cv2.resize(frame, size, dst=view, interpolation=cv2.INTER_LINEAR)
+                    scale = (size[0] / width, size[1] / height)
+                else:
+                    view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+                    view[...] = frame
+                frame_specs.append((slot, view.shape))
+                scales.append(scale)
+                view = None
+            pending = PendingRequest()
+            self._pending[request_id] = pending
+            with self._send_lock:
+                conn.send(("detect", request_id, frame_specs, imgsz, conf_threshold, list(classes) if classes is not None else None))
+            if not pending.done.wait(self.request_timeout):
+                self._pending.pop(request_id, None)
+                # Server dianggap macet: koneksi ditutup (hasil yang datang terlambat untuk slot ini dibuang
+                # bersama sesinya) dan panggilan berikutnya menyambung ulang
+                conn.close()
+                raise TimeoutError(f"Server inferensi tidak menjawab dalam {self.request_timeout:g} detik")
+            if pending.error is not None:
+                raise pending.error
+        finally:
+            for slot in slots:
+                self._free_slots.put(slot)
+
+        outputs = []
+        for payload, scale in zip(pending.payloads, scales):
+            xyxy, confidences, class_ids = unpack_output(payload)
+            if scale is not None:
+                xyxy /= np.array([scale[0], scale[1], scale[0], scale[1]], dtype=np.float32)
+            outputs.append((xyxy, confidences, class_ids))
+        return outputs
+
+    def close(self):
+        with self._connect_lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def start_server_process(address=None):
+    """Menjalankan server inferensi di proses latar (tetap berjalan setelah klien keluar, berhenti sendiri jika tidak ada klien)."""
+    command = [sys.executable, os.path.abspath(__file__), "--address", address or config.INFERENCE_SERVER_ADDRESS or default_address(), "--idle-exit", str(config.INFERENCE_SERVER_IDLE_EXIT)]
+    print(f"Server inferensi belum berjalan. Menjalankan: {' '.join(command)} (log: {config.INFERENCE_SERVER_LOG_FILE})", flush=True)
+    options = {"start_new_session": True} if os.name == "posix" else {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+    with open(config.INFERENCE_SERVER_LOG_FILE, "a") as log_file:
+        return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server inferensi bersama: satu model untuk beberapa proses pemantauan.")
+    parser.add_argument("--address", default=None, help="\"host:port\" atau path Unix socket (default: config.INFERENCE_SERVER_ADDRESS, atau socket di runtime dir)")
+    parser.add_argument("--backend", default=None, help="Default: config.INFERENCE_BACKEND")
+    parser.add_argument("--batch-window-ms", type=float, default=None, help="Default: config.INFERENCE_SERVER_BATCH_WINDOW_MS")
+    parser.add_argument("--max-batch", type=int, default=None, help="Default: config.INFERENCE_SERVER_MAX_BATCH")
+    parser.add_argument("--idle-exit", type=float, default=0.0, help="Berhenti jika tidak ada klien selama N detik (0 = tidak pernah)")
+    args = parser.parse_args()
+
+    server = InferenceServer(args.address, backend=args.backend, batch_window_ms=args.batch_window_ms, max_batch=args.max_batch, idle_exit=args.idle_exit)
+    signal.signal(signal.SIGTERM, lambda signum, stack_frame: server.stop())
+    if not server.serve_forever():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
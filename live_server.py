@@ -0,0 +1,239 @@
+import json
+import queue
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import cv2
+import config
+
+# --- Mode Headless: Live View MJPEG dan API Kontrol Lokal ---
+# Frame beranotasi di-encode JPEG satu kali oleh thread encoder, lalu byte yang sama
+# dikirim ke semua penonton. Setiap penonton hanya menerima frame terbaru (frame yang
+# terlewat tidak diantrikan), dan penonton yang socket-nya macet lebih lama dari
+# LIVE_VIEW_CLIENT_TIMEOUT diputus. Perintah kontrol (baseline, mode pengaturan,
+# acknowledge alarm) diteruskan ke loop utama lewat antrian, seperti input keyboard.
+
+BOUNDARY = "frame"
+
+
+class ControlCommand:
+    """Perintah dari API kontrol. Loop utama memanggil finish() dengan hasilnya."""
+
+    def __init__(self, action, code=None):
+        self.action = action
+        self.code = code
+        self.ok = False
+        self.message = "Perintah tidak diproses."
+        self._done = threading.Event()
+
+    def finish(self, ok, message):
+        self.ok = ok
+        self.message = message
+        self._done.set()
+
+    def wait(self, timeout):
+        return self._done.wait(timeout)
+
+
+class LiveViewServer:
+    """
+    Server HTTP lokal:
+    - GET  /stream        MJPEG (multipart/x-mixed-replace) frame beranotasi
+    - GET  /snapshot.jpg  frame JPEG terbaru
+    - GET  /status        status sistem (JSON)
+    - POST /api/baseline  atur baseline (aturan sama dengan tombol 'b')
+    - POST /api/defense   masuk/keluar mode pengaturan, body {"code": ACCESS_CODE}
+    - POST /api/ack       hentikan alarm dan perbarui baseline, body {"code": ACCESS_CODE}
+    """
+
+    def __init__(self, host=None, port=None, jpeg_quality=None, max_fps=None, client_timeout=None, max_clients=None, status_provider=None):
+        self.host = host or config.LIVE_VIEW_HOST
+        self.port = port if port is not None else config.LIVE_VIEW_PORT
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality or config.LIVE_VIEW_JPEG_QUALITY)]
+        self.max_fps = max_fps or config.LIVE_VIEW_MAX_FPS
+        self.client_timeout = client_timeout or config.LIVE_VIEW_CLIENT_TIMEOUT
+        self.max_clients = max_clients or config.LIVE_VIEW_MAX_CLIENTS
+        self.status_provider = status_provider or (lambda: {})
+
+        self.commands = queue.Queue()
+        self._frame_condition = threading.Condition()
+        self._pending_frame = None # Frame mentah terbaru yang belum di-encode
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._last_publish = 0.0
+        self._clients = 0
+        self._clients_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._server = None
+        self._encoder_thread = None
+
+        self.frames_encoded = 0
+        self.clients_dropped = 0
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1] # Port sebenarnya jika port 0 (dipilih OS)
+        threading.Thread(target=self._server.serve_forever, name="live_view_server", daemon=True).start()
+        self._encoder_thread = threading.Thread(target=self._run_encoder, name="live_view_encoder", daemon=True)
+        self._encoder_thread.start()
+        print(f"Live view: http://{self.host}:{self.port}/stream, API kontrol: http://{self.host}:{self.port}/api/...", flush=True)
+        return self
+
+    # --- Dipanggil dari Loop Utama ---
+    def has_viewers(self):
+        return self._clients > 0
+
+    def publish(self, frame):
+        """Menyerahkan frame beranotasi (tidak disalin, jangan diubah setelahnya). Tidak pernah menunggu encode."""
+        now = time.time()
+        if not self._clients or now - self._last_publish < 1.0 / self.max_fps:
+            return
+        self._last_publish = now
+        with self._frame_condition:
+            self._pending_frame = frame
+            self._frame_condition.notify_all()
+
+    def pending_commands(self):
+        while True:
+            try:
+                yield self.commands.get_nowait()
+            except queue.Empty:
+                return
+
+    # --- Thread Encoder: Satu Encode untuk Semua Penonton ---
+    def _run_encoder(self):
+        while not self._stop_event.is_set():
+            with self._frame_condition:
+                while self._pending_frame is None and not self._stop_event.is_set():
+                    self._frame_condition.wait(0.5)
+                frame, self._pending_frame = self._pending_frame, None
+            if frame is None:
+                continue
+            ok, encoded = cv2.imencode(".jpg", frame, self.jpeg_params)
+            if not ok:
+                continue
+            with self._frame_condition:
+                self._jpeg = encoded.tobytes()
+                self._jpeg_seq += 1
+                self.frames_encoded += 1
+                self._frame_condition.notify_all()
+
+    def _wait_for_jpeg(self, last_seq, timeout):
+        with self._frame_condition:
+            # Kondisi yang sama juga dibangunkan publish() untuk encoder, jadi tunggu sampai JPEG baru benar-benar ada
+            self._frame_condition.wait_for(lambda: self._jpeg_seq != last_seq or self._stop_event.is_set(), timeout)
+            return self._jpeg_seq, self._jpeg
+
+    def stats(self):
+        return {"clients": self._clients, "frames_encoded": self.frames_encoded, "clients_dropped": self.clients_dropped}
+
+    def stop(self):
+        self._stop_event.set()
+        with self._frame_condition:
+            self._frame_condition.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # --- Handler HTTP ---
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass # Akses HTTP tidak dicetak ke terminal
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/stream":
+                    server._serve_stream(self)
+                elif path == "/snapshot.jpg":
+                    server._serve_snapshot(self)
+                elif path == "/status":
+                    self._send_json(200, server.status_provider())
+                else:
+                    self._send_json(404, {"error": "Tidak ditemukan"})
+
+            def do_POST(self):
+                actions = {"/api/baseline": "baseline", "/api/defense": "defense", "/api/ack": "ack"}
+                action = actions.get(self.path.split("?")[0])
+                if action is None:
+                    self._send_json(404, {"error": "Tidak ditemukan"})
+                    return
+                command = ControlCommand(action, self._read_code())
+                server.commands.put(command)
+                if not command.wait(config.LIVE_VIEW_COMMAND_TIMEOUT):
+                    self._send_json(504, {"ok": False, "message": "Loop utama tidak merespons."})
+                    return
+                self._send_json(200 if command.ok else 403, {"ok": command.ok, "message": command.message})
+
+            def _read_code(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8", errors="replace") if length else ""
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    try:
+                        return str(json.loads(body or "{}").get("code", "")) or None
+                    except (json.JSONDecodeError, AttributeError):
+                        return None
+                return (parse_qs(body).get("code") or [None])[0]
+
+            def _send_json(self, status, data):
+                payload = json.dumps(data, default=str).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def _serve_snapshot(self, handler):
+        jpeg = self._jpeg
+        if jpeg is None:
+            # Frame hanya di-encode jika ada penonton; snapshot dihitung sebagai penonton sampai frame pertama siap
+            with self._clients_lock:
+                self._clients += 1
+            try:
+                _, jpeg = self._wait_for_jpeg(0, 2.0)
+            finally:
+                with self._clients_lock:
+                    self._clients -= 1
+        if jpeg is None:
+            handler._send_json(503, {"error": "Frame belum tersedia"})
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "image/jpeg")
+        handler.send_header("Content-Length", str(len(jpeg)))
+        handler.end_headers()
+        handler.wfile.write(jpeg)
+
+    def _serve_stream(self, handler):
+        with self._clients_lock:
+            if self._clients >= self.max_clients:
+                handler._send_json(503, {"error": "Terlalu banyak penonton"})
+                return
+            self._clients += 1
+        try:
+            handler.connection.settimeout(self.client_timeout) # Penonton yang tidak membaca diputus, tidak menahan penonton lain
+            handler.send_response(200)
+            handler.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+            handler.send_header("Cache-Control", "no-cache, private")
+            handler.end_headers()
+            last_seq = 0
+            while not self._stop_event.is_set():
+                seq, jpeg = self._wait_for_jpeg(last_seq, 1.0)
+                if seq == last_seq or jpeg is None:
+                    continue
+                last_seq = seq
+                handler.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode("ascii") + jpeg + b"\r\n")
+        except socket.timeout:
+            self.clients_dropped += 1
+            print(f"Penonton live view {handler.client_address[0]} terlalu lambat, koneksi diputus.", flush=True)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Penonton menutup koneksi
+        finally:
+            with self._clients_lock:
+                self._clients -= 1
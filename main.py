@@ -1,16 +1,43 @@
-import cv2
 import time
+startup_start = time.perf_counter() # Awal pengukuran waktu import dan waktu sampai deteksi pertama
+import argparse
+import cv2
 import datetime
 import config # Pastikan file config.py ada dan berisi ACCESS_CODE dan ALARM_PERSISTENCE_THRESHOLD
 import utils # Pastikan file utils.py ada dan berisi fungsi-fungsi yang dipanggil
 import threading
 import queue # Untuk komunikasi antar thread
+import signal
+from capture import CameraSupervisor, open_capture, parse_source # Thread capture (frame terbaru) dengan sambung ulang otomatis
+import pipeline # Antrian antar tahap dan worker inferensi
+from motion import MotionGate # Detektor perubahan murah di depan model YOLO
+from clip_recorder import ClipRecorder # Ring buffer frame untuk klip sebelum/sesudah event
+import tracker # Pelacak objek: ID tetap per objek dan event dipindah/hilang/muncul
+import zones # Zona pemantauan: inferensi hanya pada crop zona, baseline per zona
+import tiling # Inferensi ber-tile untuk objek kecil di frame beresolusi tinggi
+from smoothing import CountSmoother, EventSmoother # Penghalusan jumlah objek dan event tracker di beberapa hasil deteksi terakhir
+from live_server import LiveViewServer # Live view MJPEG dan API kontrol untuk mode headless
+import metrics # Timer per tahap, counter, endpoint Prometheus, dan profiling opt-in
+import events # Event bus: log, screenshot, suara, popup, webhook, dan socket diproses di thread sink masing-masing
+import access_control # Kode akses: perbandingan aman dan kunci sementara setelah beberapa kode salah
+import security_monitor # Mesin status pemantauan: status eksplisit, snapshot tanpa lock, baseline ditulis di latar
+import maintenance # Kompresi log lama, budget dan deduplikasi screenshot, indeks bukti (thread latar)
+
+# --- Argumen Command Line ---
+arg_parser = argparse.ArgumentParser(description="Sistem Keamanan Objek")
+arg_parser.add_argument("--source", help="Sumber video: indeks webcam (misal 1), URL DroidCam, atau path file video (default: config.VIDEO_SOURCE)")
+arg_parser.add_argument("--headless", action="store_true", help="Tanpa jendela OpenCV: live view MJPEG dan API kontrol HTTP lokal (lihat config.LIVE_VIEW_*)")
+arg_parser.add_argument("--profile", metavar="MULAI:JUMLAH", help="Profil frame ke-MULAI sebanyak JUMLAH frame, misal 100:300 (hasil di config.PROFILE_OUTPUT_DIR)")
+arg_parser.add_argument("--profile-mode", choices=["cprofile", "sample"], default="cprofile", help="cprofile = thread loop utama, sample = sampling stack semua thread")
+args = arg_parser.parse_args()
+headless = args.headless or config.HEADLESS_MODE
+startup_times = {"import": time.perf_counter() - startup_start} # Detik per fase startup, dicetak dan diekspor sebagai metrik
 
 # --- Fungsi untuk Memilih Sumber Video --- #
 def select_video_source():
     """
     Meminta pengguna untuk memilih sumber video: webcam laptop atau DroidCam.
-    Mengembalikan objek VideoCapture.
+    Mengembalikan (sumber, VideoCapture), atau (sumber, None) jika kamera gagal dibuka.
     """
     while True:
         print("\nPilih sumber video:")
@@ -19,86 +46,182 @@ def select_video_source():
         choice = input("Masukkan pilihan Anda (1 atau 2): ")
 
         if choice == '1':
-            cap = cv2.VideoCapture(1)
-            if not cap.isOpened():
+            cap = open_capture(1)
+            if cap is None:
                 print("Error: Tidak dapat membuka aliran video dari webcam laptop. Pastikan tidak sedang digunakan aplikasi lain.")
-                return None
+                return 1, None
             print("Menggunakan Webcam Laptop sebagai sumber video.")
-            return cap
+            return 1, cap
         elif choice == '2':
             droidcam_ip = input("Masukkan alamat IP DroidCam (misal: 192.168.1.100:4747): ")
             # Format URL DroidCam, sesuaikan jika Anda menggunakan port lain atau /video
             droidcam_url = f"http://{droidcam_ip}/video" 
             # droidcam_url = f"http://192.168.100.77:4747/video"             
             print(f"Mencoba menyambung ke DroidCam di: {droidcam_url}")
-            cap = cv2.VideoCapture(droidcam_url)
-            if not cap.isOpened():
+            cap = open_capture(droidcam_url)
+            if cap is None:
                 print(f"Error: Tidak dapat membuka aliran video dari DroidCam di {droidcam_url}. Pastikan DroidCam aktif dan IP benar.")
-                return None
+                return droidcam_url, None
             print("Menggunakan DroidCam sebagai sumber video.")
-            return cap
+            return droidcam_url, cap
         else:
             print("Pilihan tidak valid. Silakan masukkan 1 atau 2.")
 
-# --- Inisialisasi Utama ---
-cap = None
-while cap is None:
-    cap = select_video_source()
-    if cap is None:
+# Urutan sumber video: --source, config.VIDEO_SOURCE, lalu HEADLESS_VIDEO_SOURCE (headless) atau pilihan interaktif.
+# Pilihan interaktif hanya ditanyakan saat start; setelah itu kamera yang putus disambung ulang otomatis ke sumber yang sama.
+def resolve_video_source():
+    source = args.source if args.source is not None else config.VIDEO_SOURCE
+    if source is None and headless:
+        source = config.HEADLESS_VIDEO_SOURCE
+    if source is not None:
+        return parse_source(source), None
+    while True:
+        source, cap = select_video_source()
+        if cap is not None:
+            return source, cap
         print("Gagal menginisialisasi kamera. Mencoba lagi dalam 3 detik...")
         time.sleep(3)
-# terus mencoba memilih dan menginisialisasi sumber video sampai berhasil. Jika gagal, ia akan menunggu 3 detik sebelum mencoba lagi.
 
-cv2.namedWindow('Sistem Keamanan Objek', cv2.WINDOW_NORMAL) # Pastikan jendela dibuat di awal
+# Dipanggil thread supervisor kamera saat kamera terputus/tersambung kembali
+def log_camera_event(event, details):
+    if event == "camera_lost":
+        log_details = f"Camera {details['source']} lost ({details['reason']}). Reconnecting in background."
+    else:
+        log_details = f"Camera {details['source']} restored after {details['outage_seconds']}s ({details['attempts']} attempts)."
+    event_bus.publish(events.Event(event, "warning" if event == "camera_lost" else "info", {
+        "details": log_details,
+        "outage_seconds": details.get("outage_seconds"),
+        "reconnect_attempts": details.get("attempts")
+    }))
+
+# --- Inisialisasi Utama ---
+# Efek samping event (log, screenshot, alarm suara, popup, webhook/socket) dijalankan thread sink, bukan loop video
+event_bus = events.create_default_bus()
+# Model dimuat dan di-warm-up di thread latar selagi kamera dibuka (atau pengguna memilih sumber video)
+model_warmup = utils.ModelWarmup().start()
+camera_start = time.perf_counter()
+video_source, initial_cap = resolve_video_source()
+camera = CameraSupervisor(video_source, name="utama", on_event=log_camera_event, cap=initial_cap).start()
+# Kamera dibaca di thread terpisah, loop utama selalu mengambil frame terbaru tanpa menunggu inferensi.
+# Jika kamera putus, supervisor menyambung ulang dengan backoff tanpa menghentikan loop utama.
+
+if not headless:
+    cv2.namedWindow('Sistem Keamanan Objek', cv2.WINDOW_NORMAL) # Pastikan jendela dibuat di awal
 # Baris ini membuat jendela tampilan OpenCV dengan nama 'Sistem Keamanan Objek'. cv2.WINDOW_NORMAL memungkinkan jendela diubah ukurannya.
+startup_times["camera"] = time.perf_counter() - camera_start
 
-current_initial_state = utils.load_initial_state()
-print(f"Status baseline awal dimuat: {current_initial_state}")
+try:
+    model_warmup.wait()
+except RuntimeError as e:
+    print(f"FATAL ERROR: {e}", flush=True)
+    camera.release()
+    exit()
+startup_times["model_load"] = model_warmup.load_seconds
+if model_warmup.warmup_seconds is not None:
+    startup_times["warmup"] = model_warmup.warmup_seconds
+startup_times["ready"] = time.perf_counter() - startup_start
+
+# Status pemantauan (baseline, timer persistensi, alarm, mode pengaturan) ada di satu mesin status.
+# Transisi memakai lock milik monitor, sedangkan render dan endpoint /status cukup membaca monitor.snapshot.
+monitor = security_monitor.SecurityMonitor()
+print(f"Status baseline awal dimuat: {monitor.snapshot.baseline}")
+object_tracker = tracker.Tracker() if config.TRACKING_ENABLED else None
+count_smoother = CountSmoother() if config.SMOOTHING_ENABLED else None # Jumlah objek dihaluskan sebelum dibandingkan dengan baseline
+event_smoother = EventSmoother() if config.SMOOTHING_ENABLED else None # Event tracker dihaluskan sebelum memicu alarm
+tracked_baseline = utils.load_tracked_baseline() if config.TRACKING_ENABLED else None # Baseline objek beserta posisinya
+# Jika baseline objek belum ada (misal baseline lama hanya berisi jumlah), perbandingan memakai jumlah per kelas
+monitor_zones = zones.load_zones() # Kosong jika config.ZONES tidak diisi
+zone_monitor = zones.ZoneMonitor(monitor_zones) if monitor_zones else None
+if zone_monitor is not None:
+    print(f"Zona pemantauan: {', '.join(zone.name for zone in monitor_zones)}. Baseline zona: {zone_monitor.baselines}")
 # Memuat status baseline awal objek menggunakan fungsi dari modul utils
 
 # --- Variabel Global dan Flags Status Sistem --- #
-# --- Variabel Status Sistem (Akses Aman dengan Lock jika diakses antar thread) ---
-alarm_active = False # Menunjukkan apakah alarm sedang berbunyi atau tidak
-monitoring_active = True # Menunjukkan apakah sistem sedang aktif memantau perubahan objek, akan false jika defense_mode_active true
-defense_mode_active = False # True jika sedang dalam mode pengaturan, monitoring_active false dan baseline bisa diatur ulang.
-last_frame_with_change = None # Menyimpan salinan frame terakhir di mana perubahan terdeteksi. untuk mengambil screenshot yang relevan saat alarm dipicu atau dihentikan
-
 # Variabel untuk sinkronisasi thread input kode
 input_code_queue = queue.Queue() # Thread yang bertugas mengambil input kode akan "menaruh" kode yang diketik ke sini, dan thread utama akan "mengambil" kode dari sini.
 input_thread = None # menyimpan objek thread yang sedang berjalan untuk mengambil input kode.
 input_thread_running = False # Flag untuk menunjukkan apakah thread input sedang berjalan. Ini mencegah memulai beberapa thread input secara bersamaan
 
-# Variabel untuk deteksi perubahan persisten
-change_start_time = None # fitur penundaan alarm. Jika perubahan itu bertahan lebih lama dari ALARM_PERSISTENCE_THRESHOLD, alarm akan dipicu.
+# Variabel hasil deteksi terakhir (timer persistensi dan detail perubahan ada di snapshot monitor)
+current_object_counts = {} # jumlah objek dari hasil deteksi terakhir (juga dibaca endpoint /status mode headless)
+smoothed_object_counts = {} # jumlah objek setelah dihaluskan, dipakai untuk perbandingan dengan baseline
 
-# Lock untuk melindungi akses ke variabel global yang diubah oleh thread
-global_status_lock = threading.Lock()   #objek lock dari modul threading. memastikan hanya satu thread dapat memodifikasi variabel global pada satu waktu, menjaga integritas data
+# --- Pipeline Capture -> Inferensi -> Render/Keputusan ---
+# Antrian terbatas di antara tahap, kedalaman dan kebijakan drop diatur di config.py
+inference_queue = pipeline.StageQueue(config.INFERENCE_QUEUE_SIZE, config.INFERENCE_QUEUE_DROP_POLICY)
+result_queue = pipeline.StageQueue(config.RESULT_QUEUE_SIZE, config.RESULT_QUEUE_DROP_POLICY)
+motion_gate = MotionGate() if config.MOTION_GATE_ENABLED else None # Lewati YOLO jika scene tidak berubah
+tiled_detector = tiling.TiledDetector(monitor_zones) if config.TILING_ENABLED else None # Cache hasil per tile untuk kamera ini
+inference_stage = pipeline.InferenceStage(inference_queue, result_queue, workers=config.INFERENCE_WORKERS, motion_gate=motion_gate, zones=monitor_zones, tiled=tiled_detector).start()
+clip_recorder = ClipRecorder().start() if config.CLIP_RECORDING_ENABLED else None # Klip video saat stock_change
 
 
 # --- Fungsi-fungsi Utama --- #
 # --- Fungsi untuk Mengatur Baseline Secara Manual ---
 # fungsi yang dipanggil ketika pengguna ingin mengatur ulang baseline objek yang harus dipantau
-def set_baseline_manually(frame_to_set_from): # Menerima salinan frame video saat ini
-    global current_initial_state
-    detections = utils.detect_objects(frame_to_set_from) # deteksi objek frame
-    current_object_counts = utils.count_objects(detections) # Menghitung jumlah objek yang terdeteksi 
-    
-    with global_status_lock: # Lindungi akses saat mengubah baseline
-        current_initial_state = current_object_counts # diperbarui dengan hitungan objek yang baru
-        utils.save_initial_state(current_initial_state) # Baseline baru disimpan
-    
-    print(f"Baseline awal berhasil diatur: {current_initial_state}", flush=True)
-    utils.show_popup_notification("Sistem Keamanan", "Baseline awal berhasil diatur.")
-    # Mencetak konfirmasi di terminal dan menampilkan notifikasi popup
-
-    utils.log_activity({
-        "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-        "event": "baseline_set",
-        "status": "authorized",
-        "details": f"Initial state set: {current_initial_state}",
-        "capture_path": utils.capture_screen(frame_to_set_from.copy(), "authorized", "Baseline Set")
-    }) # Mencatat aktivitas ini ke dalam log dan mengambil screenshot dari frame saat baseline diatur
+# `require_defense`: baseline hanya diganti jika sistem masih di mode pengaturan saat transisi
+def set_baseline_manually(frame_to_set_from, require_defense=False): # Menerima salinan frame video saat ini
+    detections, zone_counts = detect_for_baseline(frame_to_set_from) # deteksi objek frame (hanya di dalam zona jika zona diatur)
+    new_initial_state = utils.count_objects(detections) # Menghitung jumlah objek yang terdeteksi
+
+    # Transisi monitor tidak menunggu disk: file baseline ditulis thread latar
+    if not monitor.set_baseline(new_initial_state, require_defense=require_defense):
+        print("Mode Pengaturan sudah ditutup. Baseline tidak diubah.", flush=True)
+        return False
+    set_zone_baseline(zone_counts)
+    set_tracked_baseline(detections)
+    reset_smoothing()
+
+    print(f"Baseline awal berhasil diatur: {new_initial_state}", flush=True)
+    # Notifikasi popup, entri log, dan screenshot frame saat baseline diatur dikerjakan sink event
+    event_bus.publish(events.Event(events.BASELINE_SET, "authorized", {"details": f"Initial state set: {new_initial_state}"},
+                                   frame=frame_to_set_from, capture="authorized", notification=("Sistem Keamanan", "Baseline awal berhasil diatur.")))
+    return True
     
+# Deteksi yang sudah dihitung pipeline dipakai ulang untuk baseline baru, tanpa inferensi ulang.
+# Hasil tanpa deteksi per zona (misal zona baru diatur) tetap dideteksi ulang di dalam zona.
+def baseline_detections_from_result(result):
+    if zone_monitor is None:
+        return result.detections, None
+    if result.zone_counts is None:
+        return detect_for_baseline(result.frame)
+    return result.detections, result.zone_counts
+
+# Deteksi untuk baseline baru: (deteksi, jumlah per zona). Jumlah per zona None jika zona tidak diatur.
+# Baseline zona belum diubah di sini; set_zone_baseline() dipanggil setelah transisi monitor berhasil.
+def detect_for_baseline(frame):
+    if tiled_detector is not None:
+        detections, zone_detections = tiled_detector.detect(frame, refresh=True) # Semua tile diinferensi ulang, tanpa cache
+    elif zone_monitor is None:
+        return utils.detect_objects_array(frame), None
+    else:
+        detections, zone_detections = zones.detect_in_zones(frame, monitor_zones)
+    if zone_monitor is None:
+        return detections, None
+    return detections, zones.zone_counts(zone_detections)
+
+def set_zone_baseline(zone_counts):
+    if zone_monitor is None or zone_counts is None:
+        return
+    zone_monitor.set_baseline(zone_counts)
+    print(f"Baseline zona diatur: {zone_monitor.baselines}", flush=True)
+
+# Baseline objek (kelas + posisi) untuk tracker, disimpan terpisah dari baseline jumlah
+def set_tracked_baseline(detections):
+    global tracked_baseline
+    if object_tracker is None:
+        return
+    tracked_baseline = tracker.TrackedBaseline.from_detections(detections)
+    # Ditulis BaselineWriter di thread latar (atomik), seperti baseline jumlah
+    security_monitor.get_writer().save(config.INITIAL_TRACKS_FILE, tracked_baseline.to_json(utils.get_class_names()))
+
+# Riwayat jumlah lama dibuang setelah baseline diganti, agar jumlah yang dihaluskan langsung mengikuti scene sekarang
+def reset_smoothing():
+    if count_smoother is not None:
+        count_smoother.reset()
+    if event_smoother is not None:
+        event_smoother.reset()
+
 # --- Fungsi yang akan dijalankan di Thread Terpisah untuk Input Kode ---
 def get_code_input_threaded(): 
     global input_thread_running 
@@ -110,61 +233,328 @@ def get_code_input_threaded():
     print("--- KEMBALI KE MONITORING ---", flush=True)
 # untuk dijalankan di thread terpisah. Tugasnya adalah meminta input kode akses dari pengguna
 
+# --- Fungsi Perbandingan dengan Baseline dan Pemicu Alarm ---
+# Dipanggil untuk setiap hasil dari worker inferensi. Waktu yang dipakai adalah waktu capture frame, bukan waktu selesai inferensi.
+def process_detection_result(result):
+    global smoothed_object_counts
+
+    # Tracker selalu diperbarui (juga saat monitoring mati) agar ID objek tetap berlanjut
+    tracks = object_tracker.update(result.detections, result.timestamp) if object_tracker is not None else None
+
+    snapshot = monitor.snapshot # Tanpa lock; transisi di bawah tetap diputuskan monitor terhadap status terbarunya
+    initial_state = snapshot.baseline
+
+    # Filter smoothing juga selalu diisi, agar langsung stabil saat monitoring aktif kembali
+    smoothed_object_counts = count_smoother.update(result.object_counts, initial_state) if count_smoother is not None else result.object_counts
+
+    if not snapshot.monitoring_active: # Alarm aktif atau mode pengaturan
+        if zone_monitor is not None:
+            zone_monitor.smooth(result.zone_counts)
+        return
+
+    track_events = []
+    if tracked_baseline is not None:
+        # Perbandingan per ID objek: objek yang ditukar atau dipindah juga terdeteksi, bukan hanya perubahan jumlah
+        track_events = tracked_baseline.compare(tracks)
+        if event_smoother is not None:
+            track_events = event_smoother.update(track_events)
+
+    if zone_monitor is not None:
+        # Mode zona: setiap zona punya baseline dan timer persistensi sendiri
+        events_by_zone = zones.assign_events(track_events, monitor_zones, result.frame.shape) if tracked_baseline is not None else None
+        triggered_zones = zone_monitor.update(result.zone_counts, result.timestamp, events_by_zone)
+        if not triggered_zones:
+            monitor.observe(zone_monitor.details_text(), result.timestamp, result, triggered=False)
+            return
+        triggered_details = zone_monitor.details_text(triggered_zones)
+        if monitor.observe(triggered_details, result.timestamp, result, triggered=True):
+            zone_changes = {name: zone_monitor.change_details[name] for name in triggered_zones}
+            trigger_alarm(result, initial_state, triggered_details, track_events, zone_changes)
+        return
+
+    if tracked_baseline is not None:
+        current_frame_change_details = tracker.describe_events(track_events, utils.get_class_names())
+    else:
+        current_frame_change_details = utils.compare_with_baseline(initial_state, smoothed_object_counts)
+
+    # Deteksi perubahan persisten (MONITORING -> PENDING_CHANGE -> ALARM) menghindari alarm palsu karena kedipan deteksi sesaat.
+    # Jumlah yang dibandingkan sudah dihaluskan, jadi satu deteksi yang hilang/berlebih tidak mereset timer.
+    if monitor.observe(current_frame_change_details, result.timestamp, result):
+        trigger_alarm(result, initial_state, current_frame_change_details, track_events)
+
+# Efek samping alarm setelah monitor berpindah ke ALARM: bukti (screenshot, klip) dan event stock_change.
+# Loop hanya menerbitkan event berisi frame dan deteksi yang sudah ada; suara, screenshot, log,
+# popup, dan webhook dikerjakan sink di thread masing-masing.
+# Hasil pemicu disimpan di snapshot monitor (alarm_result) untuk update baseline saat alarm dihentikan.
+def trigger_alarm(result, initial_state, current_frame_change_details, track_events, zone_changes=None):
+    print("\n!!! PERUBAHAN PERSISTEN TERDETEKSI! Mengaktifkan alarm...", flush=True)
+    metrics.inc("objsec_alarms_total")
+
+    change_text = ", ".join(current_frame_change_details)
+    log_data = {
+        "initial_baseline": initial_state,
+        "actual_objects_at_detection": result.object_counts,
+        "smoothed_objects_at_detection": smoothed_object_counts,
+        "change_details": change_text,
+    }
+    if zone_changes:
+        log_data["zone_changes"] = zone_changes # Detail perubahan per zona yang memicu alarm
+        log_data["zone_baselines"] = {name: zone_monitor.baselines.get(name, {}) for name in zone_changes}
+        log_data["zone_counts"] = {name: result.zone_counts.get(name, {}) for name in zone_changes}
+    if track_events:
+        log_data["track_events"] = track_events
+    if clip_recorder is not None:
+        log_data["clip_path"] = clip_recorder.trigger(result.timestamp) # File ditulis setelah CLIP_POST_SECONDS
+    event_bus.publish(events.Event(
+        events.STOCK_CHANGE, "unauthorized", log_data,
+        frame=result.frame, detections=result.detections, capture="unauthorized",
+        annotate=(lambda evidence_frame: zones.draw_zones(evidence_frame, monitor_zones, zone_monitor)) if monitor_zones else None,
+        notification=("PERINGATAN KEAMANAN!", f"Perubahan terdeteksi: {change_text}. Alarm aktif! Masukkan kode akses di terminal."),
+    ))
+
+# --- Aksi Kontrol (dipakai input kode di terminal dan API kontrol mode headless) ---
+# Mengembalikan (berhasil, pesan)
+def toggle_defense_mode(entered_code):
+    code_ok, code_message = access_control.check_code(entered_code) # Batas percobaan bersama terminal dan API
+    if not code_ok:
+        print(f"{code_message} Tidak bisa mengubah Mode Pengaturan.", flush=True)
+        event_bus.publish(events.Event("defense_mode_attempt", "unauthorized", {"details": "Attempt to enter defense mode with incorrect code."},
+                                       notification=("Sistem Keamanan", "Kode salah. Tidak bisa masuk Mode Pengaturan.")))
+        return False, code_message
+
+    new_state = monitor.toggle_defense()
+    if new_state is None:
+        print("Alarm aktif. Hentikan alarm dengan kode akses ('a') sebelum masuk Mode Pengaturan.", flush=True)
+        return False, "Alarm aktif. Hentikan alarm terlebih dahulu."
+
+    if new_state == security_monitor.DEFENSE:
+        print("Kode akses benar. Masuk Mode Pengaturan. Monitoring non-aktif.", flush=True)
+        event_bus.publish(events.Event("defense_mode_enter", "authorized", {"details": "User entered defense mode."},
+                                       notification=("Sistem Keamanan", "Kode benar. Anda sekarang di Mode Pengaturan. Tekan 'b' untuk atur baseline baru.")))
+        return True, "Masuk Mode Pengaturan. Monitoring non-aktif."
+
+    print("Keluar dari Mode Pengaturan. Monitoring aktif kembali.", flush=True)
+    event_bus.publish(events.Event("defense_mode_exit", "authorized", {"details": "User exited defense mode. Monitoring resumed."},
+                                   notification=("Sistem Keamanan", "Keluar dari Mode Pengaturan. Monitoring aktif kembali.")))
+    return True, "Keluar dari Mode Pengaturan. Monitoring aktif kembali."
+
+def acknowledge_alarm(entered_code):
+    code_ok, code_message = access_control.check_code(entered_code)
+    if not code_ok:
+        print(f"{code_message} Alarm tetap aktif.", flush=True)
+        event_bus.publish(events.Event("alarm_code_incorrect", "unauthorized", {"details": "Incorrect code entered while alarm was active."},
+                                       notification=("Sistem Keamanan", "Kode akses salah. Alarm tetap aktif.")))
+        return False, f"{code_message} Alarm tetap aktif."
+
+    alarm_result = monitor.snapshot.alarm_result
+    if alarm_result is None:
+        if not monitor.acknowledge():
+            return False, "Alarm tidak aktif saat ini."
+        print("Kode akses benar. Alarm dihentikan.", flush=True)
+        # Sink suara tetap menghentikan alarm untuk event ini
+        event_bus.publish(events.Event(events.ALARM_ACKNOWLEDGED_NO_FRAME, "authorized", {"details": "Kode benar, tapi frame untuk update baseline tidak ditemukan."},
+                                       notification=("Sistem Keamanan", "Kode benar, tapi frame untuk update baseline tidak ditemukan.")))
+        return True, "Alarm dihentikan, tapi frame untuk update baseline tidak ditemukan."
+
+    try:
+        new_state_detections, zone_counts = baseline_detections_from_result(alarm_result)
+    except utils.InferenceError as e:
+        # Baseline kosong karena model gagal akan langsung memicu alarm lagi; alarm tetap aktif dan bisa dicoba lagi
+        print(f"{e}. Alarm tetap aktif, coba lagi.", flush=True)
+        return False, "Deteksi objek gagal. Alarm tetap aktif, coba lagi."
+    new_initial_state = utils.count_objects(new_state_detections)
+    # Alarm dihentikan dan baseline diganti dalam satu transisi; file baseline ditulis di latar.
+    # Baseline zona dan objek hanya diganti jika transisi berhasil (alarm belum dihentikan dari jalur lain).
+    if not monitor.acknowledge(new_initial_state):
+        return False, "Alarm tidak aktif saat ini."
+    print("Kode akses benar. Alarm dihentikan.", flush=True)
+    set_zone_baseline(zone_counts)
+    set_tracked_baseline(new_state_detections)
+    reset_smoothing()
+    print(f"Baseline berhasil diperbarui: {new_initial_state}", flush=True)
+
+    event_bus.publish(events.Event(events.ALARM_ACKNOWLEDGED, "authorized", {
+        "details": "Alarm acknowledged. Baseline updated to current state.",
+        "actual_objects_after_auth": new_initial_state,
+    }, frame=alarm_result.frame, capture="authorized", notification=("Sistem Keamanan", "Perubahan diotorisasi. Baseline diperbarui.")))
+    return True, f"Alarm dihentikan. Baseline diperbarui: {new_initial_state}"
+
+# Baseline hanya boleh diatur di mode pengaturan, atau jika baseline belum pernah diatur
+def request_baseline(frame):
+    if not camera.connected:
+        print("Kamera terputus. Baseline tidak bisa diatur sampai kamera tersambung kembali.", flush=True)
+        return False, "Kamera terputus."
+    snapshot = monitor.snapshot
+    is_initial_state_set = snapshot.baseline_set or (zone_monitor is not None and zone_monitor.is_baseline_set())
+
+    if not snapshot.defense_mode_active and is_initial_state_set:
+        print("Tekan 'd' dan masukkan kode akses untuk masuk mode pengaturan baseline terlebih dahulu.", flush=True)
+        return False, "Masuk mode pengaturan terlebih dahulu."
+    try:
+        if not set_baseline_manually(frame.copy(), require_defense=is_initial_state_set):
+            return False, "Masuk mode pengaturan terlebih dahulu."
+    except utils.InferenceError as e:
+        print(f"{e}. Baseline tidak diubah.", flush=True)
+        return False, "Deteksi objek gagal. Baseline tidak diubah."
+    return True, f"Baseline awal berhasil diatur: {monitor.snapshot.baseline}"
+
+# Perintah dari API kontrol (mode headless), dijalankan di loop utama seperti tombol keyboard
+def handle_control_command(command, frame):
+    is_alarm_active = monitor.snapshot.alarm_active
+    if command.action == "baseline":
+        command.finish(*request_baseline(frame))
+    elif command.action == "defense":
+        command.finish(*toggle_defense_mode(command.code))
+    elif command.action == "ack":
+        if is_alarm_active:
+            command.finish(*acknowledge_alarm(command.code))
+        else:
+            command.finish(False, "Alarm tidak aktif saat ini.")
+
+# Status sistem untuk endpoint /status live view
+# Dipanggil dari thread server HTTP: snapshot dibaca tanpa lock dan tidak pernah diubah setelah diterbitkan
+def get_system_status():
+    snapshot = monitor.snapshot
+    status = {
+        "state": snapshot.state,
+        "alarm_active": snapshot.alarm_active,
+        "monitoring_active": snapshot.monitoring_active,
+        "defense_mode_active": snapshot.defense_mode_active,
+        "baseline": dict(snapshot.baseline),
+    }
+    status["objects"] = dict(current_object_counts)
+    status["change_details"] = list(snapshot.change_details)
+    if zone_monitor is not None:
+        status["zone_baselines"] = zone_monitor.baselines
+    return status
+
+# Batas zona dan box objek di atas frame tampilan
+def draw_detection_overlay(display_frame, detections, frame_timestamp):
+    # Gambar batas zona pemantauan (merah jika ada perubahan di zona tersebut)
+    if monitor_zones:
+        zones.draw_zones(display_frame, monitor_zones, zone_monitor)
+
+    # Gambar bounding box dan label dari hasil deteksi terbaru untuk visualisasi
+    if not camera.connected:
+        return # Frame pengganti saat kamera terputus: posisi objek tidak diketahui
+    if object_tracker is not None:
+        utils.draw_tracks(display_frame, object_tracker.tracks(frame_timestamp)) # Posisi diprediksi di antara inferensi
+    else:
+        utils.draw_detections(display_frame, detections)
+
+def report_startup_times():
+    warmup_text = f" + warm-up {startup_times['warmup']:.2f} s" if "warmup" in startup_times else ""
+    print(f"Waktu startup: import {startup_times['import']:.2f} s, kamera {startup_times['camera']:.2f} s, "
+          f"model {startup_times['model_load']:.2f} s{warmup_text} (paralel dengan kamera), "
+          f"siap {startup_times['ready']:.2f} s, deteksi pertama {startup_times['first_detection']:.2f} s sejak start.", flush=True)
+
 # --- Pesan Instruksi Awal --- #
-print("\n--- Sistem Keamanan Objek ---")
-print("Tekan 'b' untuk mengatur baseline awal (objek yang harus ada saat pertama kali start).")
-print("Tekan 'd' untuk masuk/keluar dari mode pengaturan (Defense Mode).")
-print("Tekan 'a' jika alarm berbunyi untuk memasukkan kode akses dan menghentikannya.")
-print("Tekan 'q' untuk keluar dari sistem.")
-print("-----------------------------\n")
+live_server = None
+shutdown_requested = threading.Event() # Diset oleh SIGTERM (misal systemd stop) di mode headless
+if headless:
+    live_server = LiveViewServer(status_provider=get_system_status).start()
+    signal.signal(signal.SIGTERM, lambda signum, stack_frame: shutdown_requested.set())
+    print("\n--- Sistem Keamanan Objek (Headless) ---")
+    print("POST /api/baseline untuk mengatur baseline awal.")
+    print("POST /api/defense dengan {\"code\": ...} untuk masuk/keluar dari mode pengaturan (Defense Mode).")
+    print("POST /api/ack dengan {\"code\": ...} jika alarm berbunyi untuk menghentikannya.")
+    print("Tekan Ctrl+C untuk keluar dari sistem.")
+    print("-----------------------------\n")
+else:
+    print("\n--- Sistem Keamanan Objek ---")
+    print("Tekan 'b' untuk mengatur baseline awal (objek yang harus ada saat pertama kali start).")
+    print("Tekan 'd' untuk masuk/keluar dari mode pengaturan (Defense Mode).")
+    print("Tekan 'a' jika alarm berbunyi untuk memasukkan kode akses dan menghentikannya.")
+    print("Tekan 'q' untuk keluar dari sistem.")
+    print("-----------------------------\n")
+
+
+# --- Metrik dan Profiling ---
+metrics.register_counter("objsec_frames_read_total", lambda: camera.frames_read, "Frame yang dibaca dari kamera")
+metrics.register_counter("objsec_frames_dropped_total", lambda: camera.frames_dropped, "Frame kamera yang ditimpa sebelum diambil loop utama")
+metrics.register_gauge("objsec_camera_connected", lambda: int(camera.connected), "1 jika kamera tersambung")
+metrics.register_counter("objsec_camera_outages_total", lambda: camera.outages, "Berapa kali kamera terputus")
+metrics.register_counter("objsec_camera_reconnect_attempts_total", lambda: camera.total_reconnect_attempts, "Percobaan membuka ulang kamera")
+metrics.register_gauge("objsec_camera_uptime_ratio", lambda: camera.uptime_ratio(), "Proporsi waktu kamera tersambung sejak start")
+metrics.register_gauge("objsec_camera_last_reconnect_seconds", lambda: camera.reconnect_seconds[-1] if camera.reconnect_seconds else 0, "Lama outage kamera terakhir sampai tersambung kembali")
+metrics.register_counter("objsec_inferences_total", lambda: inference_stage.inferences, "Inferensi YOLO yang dijalankan")
+metrics.register_counter("objsec_inferences_skipped_total", lambda: inference_stage.skipped, "Inferensi yang dilewati motion gate")
+metrics.register_counter("objsec_queue_dropped_total", lambda: inference_queue.dropped, "Item yang dibuang antrian pipeline", queue="inference")
+metrics.register_counter("objsec_queue_dropped_total", lambda: result_queue.dropped, "Item yang dibuang antrian pipeline", queue="result")
+for phase in ("import", "camera", "model_load", "warmup", "ready", "first_detection"):
+    metrics.register_gauge("objsec_startup_seconds", lambda phase=phase: startup_times.get(phase, 0), "Lama fase startup (detik sejak proses mulai untuk ready/first_detection)", phase=phase)
+metrics_server = metrics.MetricsServer().start() if config.METRICS_ENABLED else None
+stats_reporter = metrics.StatsReporter().start() if config.METRICS_ENABLED else None
+profiler = metrics.FrameProfiler.from_spec(args.profile, args.profile_mode) if args.profile else None
+maintenance_job = maintenance.MaintenanceJob().start() if config.MAINTENANCE_ENABLED else None
 
 
 # --- Loop Utama Aplikasi - Sistem --- #
 try:
     first_detection_logged = False # Inisialisasi di sini juga
+    frame_seq = 0 # Nomor urut frame yang dikirim ke worker inferensi
+    last_processed_seq = 0 # Nomor urut frame dari hasil deteksi terakhir yang diproses
+    current_detections_list = [] # Hasil deteksi terbaru, dipakai ulang untuk setiap frame yang ditampilkan
 
     while True: #jantung program yang akan terus berjalan
-        ret, frame = cap.read() # feed video real-time. tiap iterasi, sistem membaca 1 frame dari kamera. Ada juga penanganan error jika kamera terputus.
-        if not ret:
-            print("Gagal membaca frame dari kamera. Mencoba inisialisasi ulang kamera...", flush=True)
-            cap.release()
-            # Mencoba inisialisasi ulang, tapi sekarang dengan fungsi select_video_source
-            cap = None
-            while cap is None:
-                cap = select_video_source()
-                if cap is None:
-                    print("Gagal menginisialisasi ulang kamera. Mencoba lagi dalam 3 detik...")
-                    time.sleep(3)
-            continue
-        
-        # --- Deteksi dan Tampilkan Objek ---
-        current_detections_list = []
-        current_object_counts = {}
+        ret, frame, frame_timestamp = camera.read() # frame terbaru dari thread capture beserta waktu capture-nya, None jika belum ada frame baru atau kamera sedang terputus
+        if not ret: # Hanya untuk sumber file video: frame terakhir sudah dibaca
+            print("Sumber video selesai. Menghentikan sistem...", flush=True)
+            break
 
-        try:
-            current_detections_list = utils.detect_objects(frame)
-            current_object_counts = utils.count_objects(current_detections_list)
+        # --- Kirim Frame Baru ke Worker Inferensi ---
+        if frame is not None:
+            frame_seq += 1
+            if profiler is not None:
+                profiler.on_frame(frame_seq)
+            inference_queue.put(pipeline.FrameJob(frame, frame_timestamp, frame_seq))
+            if clip_recorder is not None:
+                clip_recorder.add_frame(frame, frame_timestamp)
+
+        # --- Proses Hasil Deteksi yang Sudah Selesai ---
+        # Logika baseline dan alarm berjalan untuk setiap hasil, sesuai waktu capture frame-nya
+        for result in result_queue.get_all():
+            if result.seq <= last_processed_seq:
+                continue # Hasil dari frame yang lebih lama dari hasil terakhir (worker lain lebih cepat)
+            last_processed_seq = result.seq
+            current_detections_list = result.detections
+            current_object_counts = result.object_counts
 
             # Log deteksi awal/saat startup
             if not first_detection_logged:
-                utils.log_activity({
-                    "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-                    "event": "initial_camera_detection",
-                    "status": "info",
-                    "details": f"Objects detected on camera startup: {current_object_counts}"
-                })
+                event_bus.publish(events.Event("initial_camera_detection", "info", {"details": f"Objects detected on camera startup: {current_object_counts}"}))
                 first_detection_logged = True
-            
-        except Exception as e:
-            print(f"Error saat deteksi objek di main loop: {e}. Melanjutkan tanpa deteksi untuk frame ini.", flush=True)
-            pass
+                startup_times["first_detection"] = time.perf_counter() - startup_start
+                report_startup_times()
+
+            with metrics.stage_timer("decision"):
+                process_detection_result(result)
+
+        if frame is None:
+            if camera.connected:
+                continue # Belum ada frame baru dari kamera, tidak ada yang perlu ditampilkan
+            # Kamera terputus: frame pengganti agar tampilan, tombol, API kontrol, dan alarm tetap berjalan
+            frame, frame_timestamp = camera.outage_frame(), time.time()
+
+        if headless:
+            # --- Mode Headless: Perintah API Kontrol dan Live View MJPEG (tanpa jendela dan HUD) ---
+            if shutdown_requested.is_set():
+                print("Menghentikan sistem...", flush=True)
+                break
+            for command in live_server.pending_commands():
+                handle_control_command(command, frame)
+            if live_server.has_viewers(): # Overlay dan encode JPEG hanya jika ada yang menonton
+                with metrics.stage_timer("overlay"):
+                    display_frame = frame.copy()
+                    draw_detection_overlay(display_frame, current_detections_list, frame_timestamp)
+                live_server.publish(display_frame)
+            continue
 
-        # Gambar bounding box dan label di frame untuk visualisasi
-        for d in current_detections_list:
-            x1, y1, x2, y2 = d['bbox']
-            class_name = d['class']
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)  # bounding box hijau objek
-            cv2.putText(frame, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2) # label nama objek dan mengurangi ukuran font untuk label objek
+        # Frame asli juga dipakai worker inferensi, jadi overlay digambar pada salinannya
+        overlay_start = time.perf_counter()
+        snapshot = monitor.snapshot # Satu snapshot untuk seluruh HUD frame ini, dibaca tanpa lock
+        display_frame = frame.copy()
+        draw_detection_overlay(display_frame, current_detections_list, frame_timestamp)
 
         # --- Tampilkan Informasi Status dan Objek di Layar ---
         text_start_x = 10
@@ -174,113 +564,55 @@ try:
         
         # Tampilkan Tanggal dan Waktu
         current_time_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cv2.putText(frame, f"Waktu: {current_time_str}", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        cv2.putText(display_frame, f"Waktu: {current_time_str}", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         current_y_pos += text_line_height 
         
         # Tampilkan Jumlah Objek Saat Ini
-        cv2.putText(frame, "Objek Saat Ini:", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        cv2.putText(display_frame, "Objek Saat Ini:", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         current_y_pos += text_line_height
 
         # Menampilkan setiap objek terdeteksi dengan indentasi
         for obj_name, count in sorted(current_object_counts.items()):
-            cv2.putText(frame, f"  - {obj_name}: {count}", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+            cv2.putText(display_frame, f"  - {obj_name}: {count}", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
             current_y_pos += text_line_height
 
         # Tambahkan sedikit spasi sebelum Baseline
         current_y_pos += 5 
         
         # Tampilkan Baseline
-        with global_status_lock: # Ambil baseline dengan lock
-            baseline_text = "Baseline: " + str(current_initial_state)
-        cv2.putText(frame, baseline_text, (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1) # Kuning
+        baseline_text = "Baseline: " + str(snapshot.baseline)
+        cv2.putText(display_frame, baseline_text, (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1) # Kuning
         current_y_pos += text_line_height # Tambahkan spasi lebih setelah baseline
 
-        # Tampilkan detail perubahan (jika ada)
-        is_changed_display = False
-        change_details_display = []
-
-        # --- Perbandingan dengan Baseline dan Pemicu Alarm ---
-        with global_status_lock: # Ambil status dengan lock
-            is_monitoring_active = monitoring_active
-            is_alarm_active_check = alarm_active 
-
-        if is_monitoring_active and not is_alarm_active_check:
-            is_current_frame_changed = False
-            current_frame_change_details = []
-
-            # Cek objek yang HILANG
-            for obj_name, initial_count in current_initial_state.items():
-                current_count = current_object_counts.get(obj_name, 0)
-                if current_count < initial_count:
-                    is_current_frame_changed = True
-                    current_frame_change_details.append(f"{obj_name} hilang ({initial_count} -> {current_count})")
-            
-            # Cek objek yang MUNCUL
-            for obj_name, current_count in current_object_counts.items():
-                initial_count = current_initial_state.get(obj_name, 0)
-                if current_count > initial_count:
-                    is_current_frame_changed = True
-                    current_frame_change_details.append(f"{obj_name} muncul ({initial_count} -> {current_count})")
-            
-            is_changed_display = is_current_frame_changed
-            change_details_display = current_frame_change_details
-
-            # Logika untuk Deteksi Perubahan Persisten menghindari alarm palsu karena kedipan deteksi sesaat.
-            if is_current_frame_changed:
-                if change_start_time is None:
-                    change_start_time = time.time()
-                elif (time.time() - change_start_time) > config.ALARM_PERSISTENCE_THRESHOLD:
-                    print("\n!!! PERUBAHAN PERSISTEN TERDETEKSI! Mengaktifkan alarm...", flush=True)
-                    utils.start_alarm()
-                    with global_status_lock: # Ubah status alarm dengan lock
-                        alarm_active = True
-                    last_frame_with_change = frame.copy()
-                    
-                    change_start_time = None 
-
-                    log_data = {
-                        "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-                        "event": "stock_change",
-                        "status": "unauthorized",
-                        "initial_baseline": current_initial_state,
-                        "actual_objects_at_detection": current_object_counts,
-                        "change_details": ", ".join(current_frame_change_details),
-                        "capture_path": utils.capture_screen(frame.copy(), "unauthorized", ", ".join(current_frame_change_details))
-                    }
-                    utils.log_activity(log_data)
-                    utils.show_popup_notification("PERINGATAN KEAMANAN!", f"Perubahan terdeteksi: {', '.join(current_frame_change_details)}. Alarm aktif! Masukkan kode akses di terminal.")
-            else:
-                change_start_time = None # Reset jika tidak ada perubahan atau sudah kembali normal
-        
-        if is_changed_display: # Only display if changes are present in the current frame
-            change_text = ", ".join(change_details_display)
-            cv2.putText(frame, f"Perubahan: {change_text}", (text_start_x, current_y_pos + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1) # Cyan
+        if snapshot.change_details: # Hanya ditampilkan jika hasil deteksi terakhir berbeda dari baseline
+            change_text = ", ".join(snapshot.change_details)
+            cv2.putText(display_frame, f"Perubahan: {change_text}", (text_start_x, current_y_pos + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1) # Cyan
             current_y_pos += text_line_height + 5
 
         # Indikator Status Sistem (posisi di kanan atas)
-        status_text_pos_x = frame.shape[1] - 250
+        status_text_pos_x = display_frame.shape[1] - 250
         status_line_height = 20
         status_y_pos = 20
 
-        with global_status_lock: # Ambil status dengan lock
-            is_alarm_active = alarm_active
-            is_defense_mode_active = defense_mode_active
-
-        if is_alarm_active:
-            cv2.putText(frame, "ALARM AKTIF!", (status_text_pos_x, status_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
-            cv2.putText(frame, "Tekan 'a' untuk kode akses", (status_text_pos_x, status_y_pos + status_line_height), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1, cv2.LINE_AA)
-        elif is_defense_mode_active:
-            cv2.putText(frame, "DEFENSE MODE (OFFLINE)", (status_text_pos_x, status_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 165, 0), 2, cv2.LINE_AA)
-            cv2.putText(frame, "Tekan 'd' untuk kembali monitoring", (status_text_pos_x, status_y_pos + status_line_height), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 165, 0), 1, cv2.LINE_AA)
-            cv2.putText(frame, "Tekan 'b' untuk SET BASELINE", (status_text_pos_x, status_y_pos + 2 * status_line_height), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 165, 0), 1, cv2.LINE_AA)
+        if snapshot.alarm_active:
+            cv2.putText(display_frame, "ALARM AKTIF!", (status_text_pos_x, status_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
+            cv2.putText(display_frame, "Tekan 'a' untuk kode akses", (status_text_pos_x, status_y_pos + status_line_height), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1, cv2.LINE_AA)
+        elif snapshot.defense_mode_active:
+            cv2.putText(display_frame, "DEFENSE MODE (OFFLINE)", (status_text_pos_x, status_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 165, 0), 2, cv2.LINE_AA)
+            cv2.putText(display_frame, "Tekan 'd' untuk kembali monitoring", (status_text_pos_x, status_y_pos + status_line_height), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 165, 0), 1, cv2.LINE_AA)
+            cv2.putText(display_frame, "Tekan 'b' untuk SET BASELINE", (status_text_pos_x, status_y_pos + 2 * status_line_height), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 165, 0), 1, cv2.LINE_AA)
         else:
-            cv2.putText(frame, "MONITORING AKTIF", (status_text_pos_x, status_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
+            cv2.putText(display_frame, "MONITORING AKTIF", (status_text_pos_x, status_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
+
+        metrics.observe_stage("overlay", time.perf_counter() - overlay_start)
 
         # --- Tampilkan Frame ke Jendela ---
-        cv2.imshow('Sistem Keamanan Objek', frame) # Baris ini terus memperbarui tampilan jendela kamera dengan frame terbaru
+        display_start = time.perf_counter()
+        cv2.imshow('Sistem Keamanan Objek', display_frame) # Baris ini terus memperbarui tampilan jendela kamera dengan frame terbaru
 
         # --- Penanganan Input Keyboard untuk Kontrol Aplikasi ---
         key = cv2.waitKey(1) & 0xFF 
+        metrics.observe_stage("display", time.perf_counter() - display_start) # imshow + waitKey
         # cara OpenCV mendengarkan tombol yang ditekan. akan menunggu 1 milidetik untuk keypress, sangat responsif.
         
         # --- Proses Kode Akses dari Thread Input (jika ada) ---
@@ -288,87 +620,9 @@ try:
             entered_code = input_code_queue.get()
             
             if input_thread.name == "defense_mode_thread":
-                with global_status_lock:
-                    is_defense_mode_active = defense_mode_active
-                    
-                if entered_code == config.ACCESS_CODE:
-                    with global_status_lock:
-                        defense_mode_active = not defense_mode_active
-                        monitoring_active = not defense_mode_active
-                    
-                    if defense_mode_active:
-                        print("Kode akses benar. Masuk Mode Pengaturan. Monitoring non-aktif.", flush=True)
-                        utils.show_popup_notification("Sistem Keamanan", "Kode benar. Anda sekarang di Mode Pengaturan. Tekan 'b' untuk atur baseline baru.")
-                        utils.log_activity({
-                            "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-                            "event": "defense_mode_enter",
-                            "status": "authorized",
-                            "details": "User entered defense mode."
-                        })
-                    else:
-                        print("Keluar dari Mode Pengaturan. Monitoring aktif kembali.", flush=True)
-                        utils.show_popup_notification("Sistem Keamanan", "Keluar dari Mode Pengaturan. Monitoring aktif kembali.")
-                        utils.log_activity({
-                            "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-                            "event": "defense_mode_exit",
-                            "status": "authorized",
-                            "details": "User exited defense mode. Monitoring resumed."
-                        })
-                else:
-                    print("Kode akses salah. Tidak bisa mengubah Mode Pengaturan.", flush=True)
-                    utils.show_popup_notification("Sistem Keamanan", "Kode salah. Tidak bisa masuk Mode Pengaturan.")
-                    utils.log_activity({
-                        "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-                        "event": "defense_mode_attempt",
-                        "status": "unauthorized",
-                        "details": "Attempt to enter defense mode with incorrect code."
-                    })
-            
+                toggle_defense_mode(entered_code)
             elif input_thread.name == "alarm_code_thread":
-                with global_status_lock:
-                    is_alarm_active = alarm_active
-
-                if entered_code == config.ACCESS_CODE:
-                    print("Kode akses benar. Alarm dihentikan.", flush=True)
-                    utils.stop_alarm()
-                    with global_status_lock:
-                        alarm_active = False
-                    
-                    if last_frame_with_change is not None:
-                        new_state_detections = utils.detect_objects(last_frame_with_change)
-                        new_initial_state = utils.count_objects(new_state_detections) 
-                        with global_status_lock:
-                            current_initial_state = new_initial_state
-                            utils.save_initial_state(current_initial_state)
-                        print(f"Baseline berhasil diperbarui: {current_initial_state}", flush=True)
-                        
-                        utils.log_activity({
-                            "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-                            "event": "alarm_acknowledged",
-                            "status": "authorized",
-                            "details": "Alarm acknowledged. Baseline updated to current state.",
-                            "actual_objects_after_auth": current_initial_state,
-                            "capture_path": utils.capture_screen(last_frame_with_change.copy(), "authorized", "Changes Authorized (Alarm)")
-                        })
-                        utils.show_popup_notification("Sistem Keamanan", "Perubahan diotorisasi. Baseline diperbarui.")
-                    else:
-                        utils.show_popup_notification("Sistem Keamanan", "Kode benar, tapi frame untuk update baseline tidak ditemukan.")
-                        utils.log_activity({
-                            "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-                            "event": "alarm_acknowledged_no_frame",
-                            "status": "authorized",
-                            "details": "Kode benar, tapi frame untuk update baseline tidak ditemukan."
-                        })
-
-                else:
-                    print("Kode akses salah. Alarm tetap aktif.", flush=True)
-                    utils.show_popup_notification("Sistem Keamanan", "Kode akses salah. Alarm tetap aktif.")
-                    utils.log_activity({
-                        "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
-                        "event": "alarm_code_incorrect",
-                        "status": "unauthorized",
-                        "details": "Incorrect code entered while alarm was active."
-                    })
+                acknowledge_alarm(entered_code)
             input_thread = None
             input_thread_running = False
 
@@ -378,26 +632,14 @@ try:
             break
 
         elif key == ord('b'):
-            with global_status_lock:
-                is_defense_mode_active = defense_mode_active
-                is_initial_state_set = bool(current_initial_state)
-
             if not input_thread_running:
-                if is_defense_mode_active:
-                    set_baseline_manually(frame.copy())
-                elif not is_initial_state_set:
-                    set_baseline_manually(frame.copy())
-                else:
-                    print("Tekan 'd' dan masukkan kode akses untuk masuk mode pengaturan baseline terlebih dahulu.", flush=True)
+                request_baseline(frame)
             else:
                 print("Sistem sedang menunggu input kode. Mohon tunggu.", flush=True)
 
         elif key == ord('d'):
             if not input_thread_running:
-                with global_status_lock:
-                    is_defense_mode_active = defense_mode_active
-
-                if not is_defense_mode_active:
+                if not monitor.snapshot.defense_mode_active:
                     input_thread_running = True
                     input_thread = threading.Thread(target=get_code_input_threaded, name="defense_mode_thread")
                     input_thread.daemon = True
@@ -411,10 +653,7 @@ try:
                 print("Sistem sedang menunggu input kode. Mohon tunggu.", flush=True)
 
         elif key == ord('a'):
-            with global_status_lock:
-                is_alarm_active = alarm_active
-
-            if is_alarm_active:
+            if monitor.snapshot.alarm_active:
                 if not input_thread_running:
                     input_thread_running = True
                     input_thread = threading.Thread(target=get_code_input_threaded, name="alarm_code_thread")
@@ -431,8 +670,40 @@ except KeyboardInterrupt:
 
 # --- Cleanup (Setelah Loop Berhenti) ---
 print("Membersihkan sumber daya...", flush=True)
+if profiler is not None:
+    profiler.stop() # Jendela profiling yang belum selesai tetap disimpan
+if stats_reporter is not None:
+    stats_reporter.stop()
+    print(stats_reporter.report_line(), flush=True)
+if metrics_server is not None:
+    metrics_server.stop()
+if maintenance_job is not None:
+    maintenance_job.stop()
+event_bus.close() # Menjalankan sisa event di antrian sink (maksimal EVENT_BUS_CLOSE_TIMEOUT detik per sink)
+print("Statistik event: " + ", ".join(f"{stat['sink']} {stat['delivered']} terkirim/{stat['failed']} gagal/{stat['dropped']} dibuang" for stat in event_bus.stats()), flush=True)
 utils.stop_alarm() # Memastikan alarm berhenti jika masih berbunyi
-if cap.isOpened(): # Melepaskan kamera agar aplikasi lain bisa menggunakannya
-    cap.release() # Menutup semua jendela OpenCV 
-cv2.destroyAllWindows() 
+baseline_write_stats = security_monitor.close_writer() # Menulis baseline yang belum sempat ditulis
+if baseline_write_stats is not None:
+    print(f"Statistik baseline: {baseline_write_stats['writes']} kali ditulis, {baseline_write_stats['coalesced']} digabung, {baseline_write_stats['failed']} gagal.", flush=True)
+utils.close_screenshot_writer() # Menyimpan sisa screenshot di antrian
+if clip_recorder is not None:
+    clip_recorder.close() # Klip yang belum selesai ditulis dengan frame yang sudah terkumpul
+    clip_stats = clip_recorder.stats()
+    print(f"Statistik klip: buffer {clip_stats['buffer_frames']} frame ({clip_stats['buffer_mb']} MB), encode {clip_stats['encode_fps']} frame/detik, {clip_stats['clips_written']} klip ditulis ({clip_stats['clip_write_fps']} frame/detik).", flush=True)
+utils.close_activity_log() # Menulis sisa entri log ke disk
+inference_stage.stop() # Menghentikan worker inferensi
+print(f"Statistik pipeline: {inference_stage.inferences} inferensi, {inference_stage.skipped} inferensi dilewati motion gate, {inference_queue.dropped} frame tidak diinferensi, {result_queue.dropped} hasil dibuang.", flush=True)
+if tiled_detector is not None:
+    tile_stats = tiled_detector.stats()
+    print(f"Statistik tile: {tile_stats['tiles']} tile per frame, {tile_stats['tiles_inferred']} tile diinferensi, {tile_stats['tiles_reused']} tile memakai hasil sebelumnya ({tile_stats['reuse_ratio'] * 100:.1f}%).", flush=True)
+capture_stats = camera.stats()
+reconnect_text = f", sambung ulang terakhir {capture_stats['last_reconnect_seconds']} detik (maks {capture_stats['max_reconnect_seconds']})" if capture_stats["last_reconnect_seconds"] is not None else ""
+print(f"Statistik kamera: {capture_stats['frames_read']} frame dibaca, {capture_stats['frames_dropped']} frame dibuang, {capture_stats['outages']} kali terputus, uptime {capture_stats['uptime_ratio'] * 100:.1f}%{reconnect_text}.", flush=True)
+camera.release() # Menghentikan supervisor dan thread capture, lalu melepaskan kamera agar aplikasi lain bisa menggunakannya
+if live_server is not None:
+    live_stats = live_server.stats()
+    print(f"Statistik live view: {live_stats['frames_encoded']} frame di-encode, {live_stats['clients_dropped']} penonton lambat diputus.", flush=True)
+    live_server.stop()
+else:
+    cv2.destroyAllWindows() 
 print("Sistem keamanan objek telah dimatikan.", flush=True) # Mencetak pesan konfirmasi bahwa sistem telah dimatikan
\ No newline at end of file
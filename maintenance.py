@@ -0,0 +1,496 @@
+import argparse
+import datetime
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+import cv2
+import numpy as np
+import config
+import metrics
+import activity_log
+from event_store import entry_datetime
+
+try:
+    import fcntl
+except ImportError: # Windows: tanpa lock antar proses
+    fcntl = None
+
+# --- Pemeliharaan Log dan Bukti Screenshot ---
+# Dijalankan berkala di thread latar (MaintenanceJob) atau sekali lewat CLI:
+#   1. Log hari yang sudah lewat dikompres menjadi YYYY-MM-DD.jsonl.gz (activity_log tetap bisa membacanya).
+#   2. Setiap entri log yang punya screenshot dicatat di indeks bukti (SQLite), sehingga event lama
+#      bisa dicari tanpa membuka log harian dan path buktinya tetap bisa ditemukan setelah step 3 dan 4.
+#   3. Capture berturut-turut yang hampir sama (dHash 64 bit) di folder dan kamera yang sama cukup
+#      disimpan sekali; indeks mengarahkan event duplikat ke capture yang disimpan.
+#   4. Screenshot dijaga dalam budget umur dan ukuran, yang tertua dihapus lebih dulu.
+# Screenshot di folder unauthorized dan screenshot yang dirujuk event unauthorized tidak pernah
+# dihapus maupun dideduplikasi oleh langkah 3 dan 4.
+
+STORED = "stored" # File bukti ada di capture_path
+DUPLICATE = "duplicate" # File dihapus karena hampir sama dengan capture sebelumnya, bukti ada di stored_path
+DELETED = "deleted" # Dihapus karena budget umur/ukuran
+MISSING = "missing" # File belum/tidak ada (misal log tertulis sebelum screenshot selesai), diperiksa ulang setiap putaran
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".webp", ".png")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evidence (
+    id INTEGER PRIMARY KEY,
+    occurred_at TEXT NOT NULL,
+    event TEXT NOT NULL,
+    status TEXT,
+    camera TEXT,
+    log_date TEXT NOT NULL,
+    capture_path TEXT NOT NULL UNIQUE,
+    stored_path TEXT, -- Path (dinormalisasi) file yang sekarang berisi bukti event, NULL jika dihapus
+    clip_path TEXT,
+    state TEXT NOT NULL,
+    dhash TEXT,
+    updated_at TEXT,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS indexed_logs (
+    log_date TEXT PRIMARY KEY,
+    signature TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_evidence_time ON evidence(occurred_at);
+CREATE INDEX IF NOT EXISTS idx_evidence_event_time ON evidence(event, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_evidence_status_time ON evidence(status, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_evidence_stored ON evidence(stored_path);
+"""
+
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def is_in_dir(path, directory):
+    return normalize_path(path).startswith(normalize_path(directory) + os.sep)
+
+
+# --- Kompresi Log Harian ---
+def compress_closed_logs(log_dir=None, today=None, grace=None):
+    """
+    Mengompres YYYY-MM-DD.jsonl untuk hari sebelum `today` yang tidak ditulis selama `grace` detik.
+    Jika hari itu sudah punya .jsonl.gz (entri terlambat setelah kompresi), isinya digabung.
+    File ditulis ke file sementara lalu os.replace, baru .jsonl dihapus. Mengembalikan jumlah file.
+    """
+    log_dir = log_dir or config.LOG_DIR
+    today = today or datetime.date.today().strftime("%Y-%m-%d")
+    grace = config.LOG_COMPRESS_GRACE if grace is None else grace
+    compressed = 0
+    for date_str in activity_log.list_log_dates(log_dir):
+        path = activity_log.log_file_path(date_str, log_dir)
+        if date_str >= today or not os.path.exists(path) or time.time() - os.path.getmtime(path) < grace:
+            continue
+        gz_path = os.path.join(log_dir, f"{date_str}{activity_log.COMPRESSED_EXTENSION}")
+        with open(path, 'rb') as f:
+            data = f.read()
+        if os.path.exists(gz_path):
+            with gzip.open(gz_path, 'rb') as f:
+                existing = f.read()
+            if existing and not existing.endswith(b"\n"):
+                existing += b"\n"
+            data = existing + data
+        temp_path = gz_path + ".tmp"
+        with open(temp_path, 'wb') as raw:
+            with gzip.GzipFile(filename=os.path.basename(path), mode='wb', fileobj=raw, compresslevel=6) as f:
+                f.write(data)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temp_path, gz_path)
+        os.remove(path)
+        compressed += 1
+    return compressed
+
+
+# --- Hash Perseptual (dHash) ---
+def dhash(path):
+    """dHash 64 bit (hex) dari gambar: perbandingan kecerahan piksel bertetangga pada versi 9x8 grayscale. None jika tidak bisa dibaca."""
+    image = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4) # Decode JPEG langsung di 1/4 ukuran
+    if image is None:
+        return None
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return np.packbits(bits.ravel()).tobytes().hex()
+
+
+def hamming_distance(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+# --- Indeks Bukti (SQLite) ---
+class EvidenceIndex:
+    """
+    Indeks event -> file bukti. Koneksi dibuat di thread yang pertama kali memakainya,
+    seperti event_store.EventStore.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.EVIDENCE_INDEX_PATH
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._connection = sqlite3.connect(self.db_path)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def update_from_logs(self, log_dir=None):
+        """
+        Menambahkan entri log yang punya capture_path ke indeks. Hari yang filenya tidak berubah
+        sejak putaran sebelumnya dilewati. Bukti berstatus MISSING diperiksa ulang.
+        Mengembalikan jumlah bukti baru.
+        """
+        connection = self.connection
+        now = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        added = 0
+        for date_str in activity_log.list_log_dates(log_dir):
+            signature = log_signature(date_str, log_dir)
+            row = connection.execute("SELECT signature FROM indexed_logs WHERE log_date = ?", (date_str,)).fetchone()
+            if row is not None and row[0] == signature:
+                continue
+            rows = []
+            for entry in activity_log.read_activity_log(date_str, log_dir):
+                capture_path = entry.get("capture_path")
+                if not capture_path:
+                    continue
+                state = STORED if os.path.exists(capture_path) else MISSING
+                rows.append((entry_datetime(entry, date_str), entry.get("event", "unknown"), entry.get("status"), entry.get("camera"), date_str,
+                             capture_path, normalize_path(capture_path) if state == STORED else None, entry.get("clip_path"), state, now,
+                             json.dumps(entry, ensure_ascii=False, sort_keys=True)))
+            with connection:
+                before = connection.total_changes
+                connection.executemany(
+                    "INSERT OR IGNORE INTO evidence (occurred_at, event, status, camera, log_date, capture_path, stored_path, clip_path, state, updated_at, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                added += connection.total_changes - before
+                connection.execute("INSERT OR REPLACE INTO indexed_logs (log_date, signature) VALUES (?, ?)", (date_str, signature))
+
+        with connection:
+            for evidence_id, capture_path in connection.execute("SELECT id, capture_path FROM evidence WHERE state = ?", (MISSING,)).fetchall():
+                if os.path.exists(capture_path):
+                    connection.execute("UPDATE evidence SET state = ?, stored_path = ?, updated_at = ? WHERE id = ?", (STORED, normalize_path(capture_path), now, evidence_id))
+        return added
+
+    def protected_paths(self):
+        """File yang dirujuk event unauthorized (langsung atau sebagai capture yang disimpan untuk duplikat)."""
+        rows = self.connection.execute("SELECT stored_path FROM evidence WHERE status = 'unauthorized' AND stored_path IS NOT NULL")
+        return {path for path, in rows}
+
+    def mark_deleted(self, path):
+        """Bukti di `path` dihapus: event yang merujuknya (termasuk duplikatnya) ditandai DELETED."""
+        now = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        with self.connection:
+            self.connection.execute("UPDATE evidence SET state = ?, stored_path = NULL, updated_at = ? WHERE stored_path = ?", (DELETED, now, normalize_path(path)))
+
+    def lookup(self, event=None, status=None, camera=None, since=None, until=None, capture=None, limit=100):
+        """Mencari bukti. `capture` adalah path atau nama file screenshot seperti yang tercatat di log."""
+        clauses, params = [], []
+        for column, value in (("event", event), ("status", status), ("camera", camera)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("occurred_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("occurred_at < ?")
+            params.append(until)
+        if capture:
+            clauses.append("(capture_path = ? OR capture_path LIKE ?)")
+            params.extend([capture, "%" + os.sep + os.path.basename(capture)])
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        sql = "SELECT occurred_at, event, status, camera, state, capture_path, stored_path, clip_path, log_date FROM evidence" + where + " ORDER BY occurred_at DESC LIMIT ?"
+        return self.connection.execute(sql, params + [limit]).fetchall()
+
+    def counts(self):
+        return dict(self.connection.execute("SELECT state, COUNT(*) FROM evidence GROUP BY state").fetchall())
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def log_signature(date_str, log_dir=None):
+    """Ukuran dan waktu ubah semua file log satu hari, untuk melewati hari yang tidak berubah."""
+    log_dir = log_dir or config.LOG_DIR
+    parts = []
+    for extension in (activity_log.LEGACY_EXTENSION, activity_log.COMPRESSED_EXTENSION, activity_log.LOG_EXTENSION):
+        path = os.path.join(log_dir, f"{date_str}{extension}")
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{extension}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+# --- Deduplikasi Capture Berturut-turut ---
+def deduplicate(index, max_distance=None, window=None):
+    """
+    Menghitung dHash capture baru dan menghapus capture yang hampir sama dengan capture yang disimpan
+    sebelumnya (folder dan kamera sama, maksimal `window` detik sebelumnya). Capture unauthorized
+    tidak disentuh. Mengembalikan (jumlah duplikat, byte dibebaskan).
+    """
+    max_distance = config.SCREENSHOT_DEDUPE_MAX_DISTANCE if max_distance is None else max_distance
+    window = config.SCREENSHOT_DEDUPE_WINDOW if window is None else window
+    connection = index.connection
+    unprotected = "state = ? AND (status IS NULL OR status != 'unauthorized')"
+    oldest_new = connection.execute(f"SELECT MIN(occurred_at) FROM evidence WHERE {unprotected} AND dhash IS NULL", (STORED,)).fetchone()[0]
+    if oldest_new is None:
+        return 0, 0
+    # Capture lama dalam jendela waktu ikut dibaca sebagai pembanding untuk capture baru pertama
+    start = (datetime.datetime.fromisoformat(oldest_new) - datetime.timedelta(seconds=window)).isoformat(sep=" ")
+    rows = connection.execute(f"SELECT id, occurred_at, camera, capture_path, dhash FROM evidence WHERE {unprotected} AND occurred_at >= ? ORDER BY occurred_at, id",
+                              (STORED, start)).fetchall()
+
+    now = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+    last_kept = {} # (folder, kamera) -> (waktu, dHash, path)
+    duplicates, freed = 0, 0
+    for evidence_id, occurred_at, camera, capture_path, hash_hex in rows:
+        if is_in_dir(capture_path, config.UNAUTHORIZED_DIR):
+            continue
+        key = (os.path.dirname(normalize_path(capture_path)), camera)
+        occurred = datetime.datetime.fromisoformat(occurred_at)
+        is_new = hash_hex is None
+        if is_new:
+            hash_hex = dhash(capture_path)
+            if hash_hex is None:
+                continue # File rusak atau sedang ditulis, dicoba lagi putaran berikutnya
+        previous = last_kept.get(key)
+        if (is_new and previous is not None and (occurred - previous[0]).total_seconds() <= window
+                and hamming_distance(previous[1], hash_hex) <= max_distance):
+            try:
+                size = os.path.getsize(capture_path)
+                os.remove(capture_path)
+            except OSError as e:
+                print(f"Peringatan: Capture duplikat {capture_path} gagal dihapus: {e}", flush=True)
+                continue
+            with connection:
+                connection.execute("UPDATE evidence SET state = ?, stored_path = ?, dhash = ?, updated_at = ? WHERE id = ?", (DUPLICATE, previous[2], hash_hex, now, evidence_id))
+            duplicates += 1
+            freed += size
+            continue
+        if is_new:
+            with connection:
+                connection.execute("UPDATE evidence SET dhash = ? WHERE id = ?", (hash_hex, evidence_id))
+        last_kept[key] = (occurred, hash_hex, normalize_path(capture_path))
+    return duplicates, freed
+
+
+# --- Budget Umur dan Ukuran Screenshot ---
+def list_screenshots(directories=None):
+    """(path, ukuran, mtime) semua screenshot di folder authorized dan unauthorized."""
+    files = []
+    for directory in directories or (config.AUTHORIZED_DIR, config.UNAUTHORIZED_DIR):
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+    return files
+
+
+def enforce_budget(index, retention_days=None, max_total_mb=None, now=None):
+    """
+    Menghapus screenshot yang lebih tua dari `retention_days`, lalu yang tertua sampai total ukuran
+    di bawah `max_total_mb`. Bukti unauthorized dihitung dalam total tetapi tidak pernah dihapus.
+    Mengembalikan (jumlah dihapus, byte dibebaskan, total byte sesudahnya).
+    """
+    retention_days = config.SCREENSHOT_RETENTION_DAYS if retention_days is None else retention_days
+    max_total_mb = config.SCREENSHOT_MAX_TOTAL_MB if max_total_mb is None else max_total_mb
+    now = time.time() if now is None else now
+    files = list_screenshots()
+    total = sum(size for _, size, _ in files)
+    protected = index.protected_paths()
+    candidates = sorted((mtime, path, size) for path, size, mtime in files
+                        if not is_in_dir(path, config.UNAUTHORIZED_DIR) and normalize_path(path) not in protected)
+
+    max_bytes = max_total_mb * 1024 * 1024
+    cutoff = now - retention_days * 86400 if retention_days else None
+    deleted, freed = 0, 0
+    for mtime, path, size in candidates:
+        too_old = cutoff is not None and mtime < cutoff
+        over_budget = max_bytes and total > max_bytes
+        if not too_old and not over_budget:
+            break # Kandidat terurut dari yang tertua: sisanya lebih baru dan budget sudah terpenuhi
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Peringatan: Screenshot {path} gagal dihapus: {e}", flush=True)
+            continue
+        index.mark_deleted(path)
+        deleted += 1
+        freed += size
+        total -= size
+    if max_bytes and total > max_bytes:
+        print(f"Peringatan: Total screenshot {total / 1024 / 1024:.1f} MB melebihi budget {max_total_mb} MB, "
+              f"tetapi sisanya bukti unauthorized yang tidak dihapus otomatis.", flush=True)
+    return deleted, freed, total
+
+
+# --- Satu Putaran Pemeliharaan ---
+class MaintenanceLock:
+    """Lock file agar hanya satu proses (misal satu main.py per kamera) yang menjalankan pemeliharaan."""
+
+    def __init__(self, path=None):
+        self.path = path or config.EVIDENCE_INDEX_PATH + ".lock"
+        self._fd = None
+
+    def acquire(self):
+        if fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            os.close(self._fd)
+            self._fd = None
+            return False
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+def run_maintenance(index=None):
+    """
+    Menjalankan kompresi log, pembaruan indeks, deduplikasi, dan budget screenshot sekali.
+    Mengembalikan dict statistik, atau None jika proses lain sedang menjalankan pemeliharaan.
+    """
+    lock = MaintenanceLock()
+    if not lock.acquire():
+        return None
+    own_index = index is None
+    index = index or EvidenceIndex()
+    start_time = time.perf_counter()
+    try:
+        stats = {"logs_compressed": compress_closed_logs() if config.LOG_COMPRESS_ENABLED else 0}
+        stats["evidence_indexed"] = index.update_from_logs()
+        stats["duplicates"], dedupe_freed = deduplicate(index) if config.SCREENSHOT_DEDUPE_ENABLED else (0, 0)
+        stats["deleted"], budget_freed, stats["total_bytes"] = enforce_budget(index)
+        stats["freed_bytes"] = dedupe_freed + budget_freed
+        stats["seconds"] = round(time.perf_counter() - start_time, 3)
+        return stats
+    finally:
+        if own_index:
+            index.close()
+        lock.release()
+
+
+def format_stats(stats):
+    return (f"{stats['logs_compressed']} log dikompres, {stats['evidence_indexed']} bukti baru diindeks, "
+            f"{stats['duplicates']} capture duplikat dan {stats['deleted']} screenshot lama dihapus "
+            f"({stats['freed_bytes'] / 1024 / 1024:.1f} MB dibebaskan), total screenshot {stats['total_bytes'] / 1024 / 1024:.1f} MB, {stats['seconds']:.2f} s")
+
+
+class MaintenanceJob:
+    """Menjalankan run_maintenance() di thread latar setiap MAINTENANCE_INTERVAL detik."""
+
+    def __init__(self, interval=None, start_delay=None):
+        self.interval = config.MAINTENANCE_INTERVAL if interval is None else interval
+        self.start_delay = config.MAINTENANCE_START_DELAY if start_delay is None else start_delay
+        self.runs = 0
+        self.duplicates = 0
+        self.deleted = 0
+        self.freed_bytes = 0
+        self.last_stats = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+        metrics.register_counter("objsec_maintenance_runs_total", lambda: self.runs, "Putaran pemeliharaan log dan screenshot")
+        metrics.register_counter("objsec_maintenance_duplicates_total", lambda: self.duplicates, "Capture duplikat yang dihapus")
+        metrics.register_counter("objsec_maintenance_deleted_total", lambda: self.deleted, "Screenshot yang dihapus karena budget umur/ukuran")
+        metrics.register_counter("objsec_maintenance_freed_bytes_total", lambda: self.freed_bytes, "Byte screenshot yang dibebaskan pemeliharaan")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        index = EvidenceIndex() # Koneksi SQLite milik thread ini
+        delay = self.start_delay
+        while not self._stop_event.wait(delay):
+            delay = self.interval
+            try:
+                stats = run_maintenance(index)
+            except Exception as e:
+                print(f"Error pemeliharaan log/screenshot: {e}", flush=True)
+                continue
+            if stats is None:
+                continue # Dijalankan proses lain
+            self.runs += 1
+            self.duplicates += stats["duplicates"]
+            self.deleted += stats["deleted"]
+            self.freed_bytes += stats["freed_bytes"]
+            self.last_stats = stats
+            if stats["logs_compressed"] or stats["duplicates"] or stats["deleted"]:
+                print(f"Pemeliharaan: {format_stats(stats)}.", flush=True)
+        index.close()
+
+    def stop(self, timeout=5.0):
+        """Menghentikan thread; putaran yang sedang berjalan diselesaikan dulu (maksimal `timeout` detik)."""
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+
+
+# --- CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="Pemeliharaan log aktivitas dan screenshot bukti")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("run", help="Jalankan satu putaran pemeliharaan sekarang")
+    lookup = subparsers.add_parser("lookup", help="Cari bukti event, misal: lookup --status unauthorized --days 30")
+    lookup.add_argument("--event", help="Jenis event, misal stock_change")
+    lookup.add_argument("--status", help="authorized / unauthorized")
+    lookup.add_argument("--camera", help="Nama kamera (mode multi-kamera)")
+    lookup.add_argument("--days", type=float, help="Hanya event N hari terakhir")
+    lookup.add_argument("--since", help="Mulai waktu 'YYYY-MM-DD[ HH:MM:SS]'")
+    lookup.add_argument("--until", help="Sampai waktu 'YYYY-MM-DD[ HH:MM:SS]'")
+    lookup.add_argument("--capture", help="Path atau nama file screenshot seperti tercatat di log")
+    lookup.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        stats = run_maintenance()
+        print("Pemeliharaan sedang dijalankan proses lain." if stats is None else f"Pemeliharaan: {format_stats(stats)}.")
+        return
+
+    index = EvidenceIndex()
+    start_time = time.perf_counter()
+    since = args.since
+    if args.days is not None:
+        since = (datetime.datetime.now() - datetime.timedelta(days=args.days)).strftime("%Y-%m-%d %H:%M:%S")
+    index.update_from_logs() # Entri log terbaru ikut dicari (hari yang tidak berubah dilewati)
+    rows = index.lookup(event=args.event, status=args.status, camera=args.camera, since=since, until=args.until, capture=args.capture, limit=args.limit)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    for occurred_at, event, status, camera, state, capture_path, stored_path, clip_path, log_date in rows:
+        camera_text = f" [{camera}]" if camera else ""
+        if state == STORED:
+            evidence_text = stored_path
+        elif state == DUPLICATE:
+            evidence_text = f"{stored_path} (duplikat dari {os.path.basename(capture_path)})"
+        elif state == DELETED:
+            evidence_text = f"dihapus oleh budget screenshot ({os.path.basename(capture_path)})"
+        else:
+            evidence_text = f"file tidak ditemukan ({capture_path})"
+        clip_text = f", klip {clip_path}" if clip_path else ""
+        print(f"{occurred_at}{camera_text} {event} ({status}): {evidence_text}{clip_text} [log {log_date}]")
+    print(f"\n{len(rows)} bukti ditemukan dalam {elapsed_ms:.1f} ms. Status indeks: {index.counts()}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
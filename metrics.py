@@ -0,0 +1,386 @@
+import bisect
+import collections
+import contextlib
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+# --- Metrik Runtime: Timer, Histogram, Counter ---
+# Dipanggil dari jalur panas (loop utama, worker inferensi, penulis log/screenshot), jadi
+# setiap observasi hanya bisect + beberapa penjumlahan di bawah lock. Semua fungsi modul
+# ini tidak melakukan apa pun jika config.METRICS_ENABLED = False.
+# Metrik dibaca lewat endpoint teks Prometheus (/metrics) dan baris statistik berkala.
+
+STAGE_SECONDS = "objsec_stage_seconds"
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HELP_TEXTS = {
+    STAGE_SECONDS: "Lama setiap tahap (detik)",
+    "objsec_alarms_total": "Alarm stock_change yang dipicu",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Bucket terakhir = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+def quantile_from_counts(buckets, counts, q):
+    """Perkiraan kuantil dari jumlah per bucket: batas atas bucket tempat kuantil jatuh."""
+    total = sum(counts)
+    if not total:
+        return None
+    target = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        cumulative += count
+        if cumulative >= target:
+            return buckets[index] if index < len(buckets) else float("inf")
+    return float("inf")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """
+    Counter, histogram, dan metrik callback (nilai dibaca dari objek lain saat di-render,
+    misal jumlah frame dibaca FrameGrabber atau kedalaman antrian log).
+    Seri dibedakan dengan nama + label.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = collections.defaultdict(float) # (nama, label) -> nilai
+        self._histograms = {} # (nama, label) -> Histogram
+        self._callbacks = {} # (nama, label) -> (jenis, fungsi)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        histogram.observe(value)
+
+    def register_callback(self, name, kind, function, **labels):
+        """`kind` adalah 'counter' atau 'gauge'. Fungsi yang gagal dilewati saat render."""
+        with self._lock:
+            self._callbacks[(name, tuple(sorted(labels.items())))] = (kind, function)
+
+    def value(self, name, **labels):
+        """Nilai counter atau callback saat ini (0 jika belum ada)."""
+        key = (name, tuple(sorted(labels.items())))
+        if key in self._callbacks:
+            try:
+                return self._callbacks[key][1]()
+            except Exception:
+                return 0
+        return self._counters.get(key, 0)
+
+    def histogram(self, name, **labels):
+        return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def histogram_labels(self, name):
+        return [dict(labels) for (series_name, labels) in list(self._histograms) if series_name == name]
+
+    def render(self):
+        """Format teks Prometheus (versi 0.0.4)."""
+        series = collections.defaultdict(list) # nama -> [(jenis, label, nilai/histogram)]
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                series[name].append(("counter", labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                series[name].append(("histogram", labels, histogram))
+            callbacks = list(self._callbacks.items())
+        for (name, labels), (kind, function) in callbacks:
+            try:
+                series[name].append((kind, labels, float(function())))
+            except Exception:
+                continue
+
+        lines = []
+        for name in sorted(series):
+            kind = series[name][0][0]
+            lines.append(f"# HELP {name} {HELP_TEXTS.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+            for _, labels, value in series[name]:
+                if kind != "histogram":
+                    lines.append(f"{name}{format_labels(labels)} {value:g}")
+                    continue
+                counts, total, count = value.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(list(value.buckets) + ["+Inf"], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', bound if isinstance(bound, str) else f'{bound:g}'),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total:g}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# --- Fungsi untuk Jalur Panas ---
+def inc(name, amount=1, **labels):
+    if config.METRICS_ENABLED:
+        registry.inc(name, amount, **labels)
+
+
+def observe_stage(stage, seconds):
+    if config.METRICS_ENABLED:
+        registry.observe(STAGE_SECONDS, seconds, stage=stage)
+
+
+@contextlib.contextmanager
+def stage_timer(stage):
+    """`with metrics.stage_timer("overlay"): ...` mencatat lama blok ke objsec_stage_seconds."""
+    if not config.METRICS_ENABLED:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(STAGE_SECONDS, time.perf_counter() - start_time, stage=stage)
+
+
+def register_counter(name, function, help_text=None, **labels):
+    if help_text:
+        HELP_TEXTS[name] = help_text
+    registry.register_callback(name, "counter", function, **labels)
+
+
+def register_gauge(name, function, help_text=None, **labels):
+    if help_text:
+        HELP_TEXTS[name] = help_text
+    registry.register_callback(name, "gauge", function, **labels)
+
+
+# --- Endpoint HTTP /metrics ---
+class MetricsServer:
+    def __init__(self, host=None, port=None):
+        self.host = host or config.METRICS_HOST
+        self.port = port if port is not None else config.METRICS_PORT
+        self._server = None
+
+    def start(self):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"Peringatan: Endpoint metrik tidak bisa dibuka di {self.host}:{self.port}: {e}", flush=True)
+            return self
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics_server", daemon=True).start()
+        print(f"Metrik Prometheus: http://{self.host}:{self.port}/metrics", flush=True)
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+# --- Baris Statistik Berkala ---
+class StatsReporter:
+    """
+    Mencetak satu baris statistik setiap `interval` detik: laju frame, frame dibuang,
+    inferensi, alarm, kedalaman antrian, dan p50/p95 setiap tahap di jendela terakhir.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval if interval is not None else config.METRICS_LOG_INTERVAL
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._previous_counters = {}
+        self._previous_histograms = {}
+        self._last_report = time.monotonic()
+
+    def start(self):
+        # Counter yang sudah berjalan sebelum reporter dimulai (misal frame selama warm-up model) tidak ikut baris pertama
+        for name in ("objsec_frames_read_total", "objsec_frames_dropped_total", "objsec_inferences_total", "objsec_inferences_skipped_total", "objsec_alarms_total"):
+            self._delta(name)
+        self._last_report = time.monotonic()
+        if self.interval and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="stats_reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def _delta(self, name):
+        value = registry.value(name)
+        previous = self._previous_counters.get(name, 0)
+        self._previous_counters[name] = value
+        return value - previous if value >= previous else value # Counter bisa mulai dari 0 lagi (kamera tersambung ulang)
+
+    def _stage_text(self, stage):
+        histogram = registry.histogram(STAGE_SECONDS, stage=stage)
+        if histogram is None:
+            return None
+        counts, _, _ = histogram.snapshot()
+        previous = self._previous_histograms.get(stage, [0] * len(counts))
+        self._previous_histograms[stage] = counts
+        window = [now - before for now, before in zip(counts, previous)]
+        p50 = quantile_from_counts(histogram.buckets, window, 0.5)
+        if p50 is None:
+            return None
+        p95 = quantile_from_counts(histogram.buckets, window, 0.95)
+        return f"{stage} p50<={p50 * 1000:g}/p95<={p95 * 1000:g} ms"
+
+    def report_line(self):
+        now = time.monotonic()
+        elapsed, self._last_report = max(now - self._last_report, 1e-6), now
+        frames = self._delta("objsec_frames_read_total")
+        parts = [
+            f"kamera {frames / elapsed:.1f} fps",
+            f"dibuang +{self._delta('objsec_frames_dropped_total'):g}",
+            f"inferensi +{self._delta('objsec_inferences_total'):g} (dilewati +{self._delta('objsec_inferences_skipped_total'):g})",
+            f"alarm +{self._delta('objsec_alarms_total'):g}",
+            f"antrian log {registry.value('objsec_log_queue_depth'):g}, screenshot {registry.value('objsec_screenshot_queue_depth'):g}",
+        ]
+        stages = [self._stage_text(labels["stage"]) for labels in sorted(registry.histogram_labels(STAGE_SECONDS), key=lambda labels: labels["stage"])]
+        return "Statistik: " + " | ".join(parts + [text for text in stages if text])
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            print(self.report_line(), flush=True)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# --- Profiling Opt-in untuk Jendela Frame Tertentu ---
+class FrameProfiler:
+    """
+    Memprofil frame ke-`start_frame` sampai `start_frame + frame_count` di loop utama.
+    - "cprofile": cProfile pada thread loop utama, disimpan sebagai .prof (buka dengan pstats/snakeviz).
+    - "sample": sampling semua thread (termasuk worker inferensi dan penulis) setiap
+      `sample_interval` detik, disimpan sebagai stack terlipat .folded (flamegraph.pl / speedscope).
+    Ringkasan fungsi teratas dicetak ke terminal setelah jendela selesai.
+    """
+
+    def __init__(self, start_frame, frame_count, mode="cprofile", output_dir=None, sample_interval=None):
+        if mode not in ("cprofile", "sample"):
+            raise ValueError(f"Mode profiling tidak dikenal: {mode}. Pilihan: cprofile, sample")
+        self.start_frame = start_frame
+        self.end_frame = start_frame + frame_count
+        self.mode = mode
+        self.output_dir = output_dir or config.PROFILE_OUTPUT_DIR
+        self.sample_interval = sample_interval or config.PROFILE_SAMPLE_INTERVAL
+        self.finished = False
+        self._profile = None
+        self._sampler = None
+        self._stop_event = threading.Event()
+        self._stacks = collections.Counter()
+
+    @classmethod
+    def from_spec(cls, spec, mode="cprofile"):
+        """Membuat profiler dari teks 'MULAI:JUMLAH', misal '100:300'."""
+        start, _, count = spec.partition(":")
+        return cls(int(start), int(count or 100), mode)
+
+    def on_frame(self, frame_index):
+        """Dipanggil sekali per frame dari loop utama."""
+        if self.finished:
+            return
+        if frame_index == self.start_frame:
+            print(f"Profiling ({self.mode}) frame {self.start_frame} - {self.end_frame}...", flush=True)
+            if self.mode == "cprofile":
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            else:
+                self._sampler = threading.Thread(target=self._sample, name="profile_sampler", daemon=True)
+                self._sampler.start()
+        elif frame_index >= self.end_frame and (self._profile is not None or self._sampler is not None):
+            self.stop()
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.sample_interval):
+            names.update((thread.ident, thread.name) for thread in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._stacks[";".join([names.get(thread_id, str(thread_id))] + stack[::-1])] += 1
+
+    def stop(self):
+        if self.finished:
+            return
+        self.finished = True
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        if self._profile is not None:
+            self._profile.disable()
+            path = os.path.join(self.output_dir, f"profil_{stamp}.prof")
+            self._profile.dump_stats(path)
+            summary = io.StringIO()
+            pstats.Stats(self._profile, stream=summary).sort_stats("cumulative").print_stats(20)
+            print(summary.getvalue(), flush=True)
+        elif self._sampler is not None:
+            self._stop_event.set()
+            self._sampler.join(timeout=2)
+            path = os.path.join(self.output_dir, f"profil_{stamp}.folded")
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            leaf_counts = collections.Counter()
+            for stack, count in self._stacks.items():
+                leaf_counts[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaf_counts.values()) or 1
+            print("Fungsi teratas (sampel di puncak stack, semua thread):", flush=True)
+            for leaf, count in leaf_counts.most_common(15):
+                print(f"  {count / total * 100:5.1f}%  {leaf}", flush=True)
+        else:
+            return
+        print(f"Profil disimpan: {path}", flush=True)
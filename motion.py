@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+import config
+
+# --- Motion Gate: Lewati Inferensi Jika Scene Tidak Berubah ---
+class MotionGate:
+    """
+    Detektor perubahan murah di depan model YOLO. Frame diperkecil dan diubah
+    ke grayscale, lalu dibandingkan dengan frame terakhir yang benar-benar
+    diinferensi. Jika proporsi piksel yang berubah di bawah ambang batas,
+    inferensi dilewati dan hasil deteksi sebelumnya dipakai ulang.
+    Inferensi tetap dipaksa setiap `force_refresh_interval` detik.
+    """
+
+    def __init__(self, downscale_width=None, pixel_threshold=None, min_changed_ratio=None, force_refresh_interval=None):
+        self.downscale_width = downscale_width or config.MOTION_DOWNSCALE_WIDTH
+        self.pixel_threshold = pixel_threshold if pixel_threshold is not None else config.MOTION_PIXEL_THRESHOLD
+        self.min_changed_ratio = min_changed_ratio if min_changed_ratio is not None else config.MOTION_MIN_CHANGED_RATIO
+        self.force_refresh_interval = force_refresh_interval if force_refresh_interval is not None else config.MOTION_FORCE_REFRESH_INTERVAL
+
+        self._reference = None # Frame kecil dari inferensi terakhir
+        self._last_inference_timestamp = None
+        self.last_changed_ratio = 0.0
+
+        self.checks = 0 # Jumlah frame yang diperiksa
+        self.skipped = 0 # Jumlah inferensi yang dilewati
+
+    def _small_gray(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.downscale_width / float(width)
+        small = cv2.resize(frame, (self.downscale_width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0) # Meredam noise sensor agar tidak dianggap gerakan
+
+    def should_infer(self, frame, timestamp):
+        """Mengembalikan True jika frame perlu diinferensi YOLO."""
+        self.checks += 1
+        small = self._small_gray(frame)
+
+        force_refresh = (
+            self._reference is None
+            or self._reference.shape != small.shape
+            or timestamp - self._last_inference_timestamp >= self.force_refresh_interval
+        )
+        if not force_refresh:
+            diff = cv2.absdiff(small, self._reference)
+            self.last_changed_ratio = np.count_nonzero(diff > self.pixel_threshold) / float(diff.size)
+            if self.last_changed_ratio < self.min_changed_ratio:
+                self.skipped += 1
+                return False
+
+        self._reference = small
+        self._last_inference_timestamp = timestamp
+        return True
+
+    def reset(self):
+        """Memaksa inferensi pada frame berikutnya (misal setelah kamera tersambung ulang)."""
+        self._reference = None
+
+    def stats(self):
+        return {
+            "checks": self.checks,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.checks, 3) if self.checks else 0.0,
+        }
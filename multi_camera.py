@@ -0,0 +1,376 @@
+import cv2
+import os
+import time
+import datetime
+import threading
+import queue
+import config
+import utils
+import pipeline
+import tracker
+import zones
+import events
+import security_monitor
+import access_control
+import maintenance
+from capture import CameraSupervisor
+from clip_recorder import ClipRecorder
+from smoothing import CountSmoother, EventSmoother
+
+# --- Status Pemantauan Satu Kamera ---
+class CameraMonitor:
+    """
+    Menyimpan kamera, tracker, zona, dan hasil deteksi terakhir milik satu kamera. Baseline,
+    timer persistensi, alarm, dan mode pengaturan ada di mesin status `security` (satu per
+    kamera), dengan baseline di file terpisah per kamera (initial_state_<nama>.json).
+    """
+
+    def __init__(self, name, source, event_bus):
+        self.name = name
+        self.source = source
+        self.event_bus = event_bus # Efek samping event (log, screenshot, suara, popup, webhook) dikerjakan thread sink
+        self.window_name = f"Sistem Keamanan Objek - {name}"
+        self.state_file = os.path.join(config.CAMERA_STATE_DIR, f"initial_state_{name}.json")
+        self.security = security_monitor.SecurityMonitor(name, self.state_file)
+        self.tracks_file = os.path.join(config.CAMERA_STATE_DIR, f"initial_tracks_{name}.json")
+        self.tracker = tracker.Tracker() if config.TRACKING_ENABLED else None
+        self.tracked_baseline = utils.load_tracked_baseline(self.tracks_file) if config.TRACKING_ENABLED else None
+        self.tracks = None
+        self.track_events = []
+        self.zones = zones.load_zones(name)
+        self.zone_monitor = zones.ZoneMonitor(self.zones, os.path.join(config.CAMERA_STATE_DIR, f"initial_state_zones_{name}.json")) if self.zones else None
+        self.zone_counts = {}
+        self.zone_changes = {} # Detail perubahan per zona yang memicu alarm terakhir
+
+        self.grabber = None # CameraSupervisor: sambung ulang otomatis dengan backoff
+        self.last_outage_display = 0.0
+        self.clip_recorder = ClipRecorder(name).start() if config.CLIP_RECORDING_ENABLED else None
+
+        self.detections = utils.empty_detections() # Hasil deteksi terbaru, dipakai ulang untuk setiap frame yang ditampilkan
+        self.object_counts = {}
+        self.count_smoother = CountSmoother() if config.SMOOTHING_ENABLED else None
+        self.event_smoother = EventSmoother() if config.SMOOTHING_ENABLED else None
+        self.smoothed_counts = {} # Jumlah objek setelah dihaluskan, dibandingkan dengan baseline
+        self.last_seq = 0
+        self.first_detection_logged = False
+
+    def open(self):
+        """Memulai supervisor kamera. Kamera yang gagal dibuka terus dicoba di latar belakang."""
+        self.grabber = CameraSupervisor(self.source, name=self.name, on_event=self.log_camera_event).start()
+        return self.grabber.connected
+
+    def log_camera_event(self, event, details):
+        if event == "camera_lost":
+            log_details = f"Camera lost ({details['reason']}). Reconnecting in background."
+        else:
+            log_details = f"Camera restored after {details['outage_seconds']}s ({details['attempts']} attempts)."
+        self.publish(event, "warning" if event == "camera_lost" else "info", {
+            "details": log_details,
+            "outage_seconds": details.get("outage_seconds"),
+            "reconnect_attempts": details.get("attempts")
+        })
+
+    def publish(self, kind, status, data, **options):
+        """Menerbitkan event milik kamera ini (field 'camera' ikut dicatat di log)."""
+        return self.event_bus.publish(events.Event(kind, status, data, camera=self.name, **options))
+
+    def process_result(self, result):
+        """
+        Memproses satu hasil deteksi untuk kamera ini.
+        Mengembalikan True jika perubahan persisten baru saja memicu alarm.
+        """
+        if result.seq <= self.last_seq:
+            return False # Hasil lebih lama dari hasil terakhir yang sudah diproses
+        self.last_seq = result.seq
+        self.detections = result.detections
+        self.object_counts = result.object_counts
+        self.zone_counts = result.zone_counts or {}
+        if self.tracker is not None:
+            self.tracks = self.tracker.update(result.detections, result.timestamp)
+        snapshot = self.security.snapshot
+        self.smoothed_counts = self.count_smoother.update(result.object_counts, snapshot.baseline) if self.count_smoother is not None else result.object_counts
+
+        if not snapshot.monitoring_active:
+            if self.zone_monitor is not None:
+                self.zone_monitor.smooth(self.zone_counts)
+            return False
+
+        if self.tracked_baseline is not None:
+            self.track_events = self.tracked_baseline.compare(self.tracks)
+            if self.event_smoother is not None:
+                self.track_events = self.event_smoother.update(self.track_events)
+
+        if self.zone_monitor is not None:
+            events_by_zone = zones.assign_events(self.track_events, self.zones, result.frame.shape) if self.tracked_baseline is not None else None
+            triggered_zones = self.zone_monitor.update(self.zone_counts, result.timestamp, events_by_zone)
+            if not triggered_zones:
+                return self.security.observe(self.zone_monitor.details_text(), result.timestamp, result, triggered=False)
+            self.zone_changes = {name: self.zone_monitor.change_details[name] for name in triggered_zones}
+            return self.security.observe(self.zone_monitor.details_text(triggered_zones), result.timestamp, result, triggered=True)
+
+        if self.tracked_baseline is not None:
+            change_details = tracker.describe_events(self.track_events, utils.get_class_names())
+        else:
+            change_details = utils.compare_with_baseline(snapshot.baseline, self.smoothed_counts)
+        return self.security.observe(change_details, result.timestamp, result)
+
+    def set_baseline(self, object_counts, detections=None, zone_counts=None, require_defense=False):
+        """Mengganti baseline kamera ini. Mengembalikan False jika `require_defense` dan kamera tidak lagi di mode pengaturan."""
+        if not self.security.set_baseline(object_counts, require_defense=require_defense):
+            return False
+        self._set_detail_baselines(detections, zone_counts)
+        return True
+
+    def acknowledge(self):
+        """
+        Menghentikan alarm kamera ini dan mengganti baseline dengan hasil deteksi pemicu alarm.
+        Mengembalikan hasil deteksi tersebut, atau None jika alarm kamera ini tidak aktif.
+        """
+        alarm_result = self.security.snapshot.alarm_result
+        if alarm_result is None or not self.security.acknowledge(alarm_result.object_counts):
+            return None
+        self._set_detail_baselines(alarm_result.detections, alarm_result.zone_counts)
+        return alarm_result
+
+    def _set_detail_baselines(self, detections, zone_counts):
+        # Baseline per zona dan baseline objek (tracker) mengikuti baseline jumlah yang baru
+        if self.zone_monitor is not None and zone_counts is not None:
+            self.zone_monitor.set_baseline(zone_counts)
+        if self.tracker is not None and detections is not None:
+            self.tracked_baseline = tracker.TrackedBaseline.from_detections(detections)
+            security_monitor.get_writer().save(self.tracks_file, self.tracked_baseline.to_json(utils.get_class_names())) # Ditulis di latar
+        if self.count_smoother is not None:
+            self.count_smoother.reset()
+        if self.event_smoother is not None:
+            self.event_smoother.reset()
+
+    def release(self):
+        if self.grabber is not None:
+            self.grabber.release()
+            self.grabber = None
+
+    def close(self):
+        """Melepaskan kamera dan menyelesaikan klip yang masih direkam."""
+        self.release()
+        if self.clip_recorder is not None:
+            self.clip_recorder.close()
+
+
+# --- Fungsi Menggambar Status Kamera ---
+def draw_camera_overlay(display_frame, monitor):
+    snapshot = monitor.security.snapshot # Dibaca tanpa lock, satu snapshot untuk seluruh HUD
+    if monitor.zones:
+        zones.draw_zones(display_frame, monitor.zones, monitor.zone_monitor)
+    if monitor.tracker is not None:
+        utils.draw_tracks(display_frame, monitor.tracker.tracks(time.time()))
+    else:
+        utils.draw_detections(display_frame, monitor.detections)
+
+    text_start_x = 10
+    text_line_height = 20
+    current_y_pos = 20
+    current_time_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cv2.putText(display_frame, f"{monitor.name} | {current_time_str}", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    current_y_pos += text_line_height
+    cv2.putText(display_frame, f"Objek: {monitor.object_counts}", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    current_y_pos += text_line_height
+    cv2.putText(display_frame, f"Baseline: {snapshot.baseline}", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1) # Kuning
+    current_y_pos += text_line_height
+    if snapshot.change_details:
+        cv2.putText(display_frame, f"Perubahan: {', '.join(snapshot.change_details)}", (text_start_x, current_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1) # Cyan
+
+    status_text_pos_x = display_frame.shape[1] - 250
+    if snapshot.alarm_active:
+        cv2.putText(display_frame, "ALARM AKTIF!", (status_text_pos_x, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
+    elif snapshot.defense_mode_active:
+        cv2.putText(display_frame, "DEFENSE MODE (OFFLINE)", (status_text_pos_x, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 165, 0), 2, cv2.LINE_AA)
+    else:
+        cv2.putText(display_frame, "MONITORING AKTIF", (status_text_pos_x, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
+
+
+# --- Fungsi untuk Input Kode Akses di Thread Terpisah ---
+def get_code_input_threaded(code_queue, purpose):
+    print("\n--- MASUKKAN KODE AKSES ---", flush=True)
+    print(">>> KETIK KODE AKSES DI TERMINAL INI DAN TEKAN ENTER <<<", flush=True)
+    entered_code = input("Kode Akses: ")
+    code_queue.put((purpose, entered_code))
+    print("--- KEMBALI KE MONITORING ---", flush=True)
+
+
+# --- Program Utama Mode Multi-Kamera ---
+def main():
+    model_warmup = utils.ModelWarmup().start() # Model dimuat dan di-warm-up selagi kamera dibuka
+    event_bus = events.create_default_bus()
+    monitors = {}
+    for camera in config.CAMERA_SOURCES:
+        monitor = CameraMonitor(camera["name"], camera["source"], event_bus)
+        monitor.open()
+        monitors[monitor.name] = monitor
+        cv2.namedWindow(monitor.window_name, cv2.WINDOW_NORMAL)
+        print(f"Baseline kamera '{monitor.name}' dimuat: {monitor.security.snapshot.baseline}")
+
+    if not monitors:
+        print("Tidak ada kamera di config.CAMERA_SOURCES. Keluar.", flush=True)
+        return
+
+    try:
+        model_warmup.wait()
+    except RuntimeError as e:
+        print(f"FATAL ERROR: {e}", flush=True)
+        for monitor in monitors.values():
+            monitor.close()
+        event_bus.close()
+        security_monitor.close_writer()
+        return
+
+    # Frame terbaru dari semua kamera diinferensi bersama dalam satu panggilan model
+    grabbers = {name: m.grabber for name, m in monitors.items()}
+    result_queue = pipeline.StageQueue(config.RESULT_QUEUE_SIZE * len(monitors), config.RESULT_QUEUE_DROP_POLICY)
+    zones_by_camera = {name: m.zones for name, m in monitors.items() if m.zones}
+    inference_stage = pipeline.BatchInferenceStage(grabbers, result_queue, use_motion_gate=config.MOTION_GATE_ENABLED, zones_by_camera=zones_by_camera, use_tiling=config.TILING_ENABLED).start()
+
+    maintenance_job = maintenance.MaintenanceJob().start() if config.MAINTENANCE_ENABLED else None
+    code_queue = queue.Queue()
+    input_thread = None
+
+    print("\n--- Sistem Keamanan Objek (Multi-Kamera) ---")
+    print(f"Kamera: {', '.join(monitors)}")
+    print("Tekan 'b' untuk mengatur baseline semua kamera (di Defense Mode atau jika kamera belum punya baseline).")
+    print("Tekan 'd' untuk masuk/keluar dari mode pengaturan (Defense Mode).")
+    print("Tekan 'a' jika alarm berbunyi untuk memasukkan kode akses dan menghentikannya.")
+    print("Tekan 'q' untuk keluar dari sistem.")
+    print("--------------------------------------------\n")
+
+    try:
+        while True:
+            # --- Proses Hasil Deteksi Batch ---
+            for result in result_queue.get_all():
+                monitor = monitors[result.source]
+                if not monitor.first_detection_logged:
+                    monitor.publish("initial_camera_detection", "info", {"details": f"Objects detected on camera startup: {result.object_counts}"})
+                    monitor.first_detection_logged = True
+
+                if monitor.process_result(result):
+                    snapshot = monitor.security.snapshot
+                    change_text = ", ".join(snapshot.alarm_details)
+                    print(f"\n!!! PERUBAHAN PERSISTEN TERDETEKSI di kamera '{monitor.name}'! Mengaktifkan alarm...", flush=True)
+                    # Frame dan deteksi dari pipeline dipakai langsung; suara, screenshot, log, dan popup di thread sink
+                    monitor.publish(events.STOCK_CHANGE, "unauthorized", {
+                        "initial_baseline": snapshot.baseline,
+                        "actual_objects_at_detection": result.object_counts,
+                        "smoothed_objects_at_detection": monitor.smoothed_counts,
+                        "change_details": change_text,
+                        "clip_path": monitor.clip_recorder.trigger(result.timestamp) if monitor.clip_recorder is not None else None,
+                        "track_events": monitor.track_events,
+                        "zone_changes": monitor.zone_changes if monitor.zone_monitor is not None else None
+                    }, frame=result.frame, detections=result.detections, capture="unauthorized",
+                        notification=("PERINGATAN KEAMANAN!", f"[{monitor.name}] Perubahan terdeteksi: {change_text}. Alarm aktif! Masukkan kode akses di terminal."))
+
+            # --- Tampilkan Frame Setiap Kamera ---
+            for monitor in monitors.values():
+                if not monitor.grabber.connected:
+                    # Disambung ulang oleh supervisor; jendela menampilkan status outage (2x per detik cukup)
+                    if time.time() - monitor.last_outage_display >= 0.5:
+                        monitor.last_outage_display = time.time()
+                        cv2.imshow(monitor.window_name, monitor.grabber.outage_frame())
+                    continue
+
+                ret, frame, frame_timestamp = monitor.grabber.read(timeout=0)
+                if not ret or frame is None:
+                    continue
+                if monitor.clip_recorder is not None:
+                    monitor.clip_recorder.add_frame(frame, frame_timestamp)
+                display_frame = frame.copy()
+                draw_camera_overlay(display_frame, monitor)
+                cv2.imshow(monitor.window_name, display_frame)
+
+            key = cv2.waitKey(1) & 0xFF
+
+            # --- Proses Kode Akses dari Thread Input ---
+            if not code_queue.empty():
+                purpose, entered_code = code_queue.get()
+                input_thread = None
+                code_ok, code_message = access_control.check_code(entered_code)
+
+                if purpose == "defense" and code_ok and any(m.security.snapshot.alarm_active for m in monitors.values()):
+                    # Mode pengaturan berlaku untuk semua kamera; alarm yang aktif harus dihentikan dulu
+                    print("Alarm aktif. Hentikan alarm dengan kode akses ('a') sebelum masuk Mode Pengaturan.", flush=True)
+                elif purpose == "defense" and code_ok:
+                    defense_mode_active = not any(m.security.snapshot.defense_mode_active for m in monitors.values())
+                    for monitor in monitors.values():
+                        monitor.security.set_defense(defense_mode_active)
+                    print("Masuk Mode Pengaturan." if defense_mode_active else "Keluar dari Mode Pengaturan. Monitoring aktif kembali.", flush=True)
+                    event_bus.publish(events.Event("defense_mode_enter" if defense_mode_active else "defense_mode_exit", "authorized", {"details": "User toggled defense mode (multi-camera)."}))
+                elif purpose == "alarm" and code_ok:
+                    print("Kode akses benar. Alarm dihentikan.", flush=True)
+                    for monitor in monitors.values():
+                        alarm_result = monitor.acknowledge() # Alarm dihentikan dan baseline diganti dalam satu transisi
+                        if alarm_result is None:
+                            continue
+                        # Sink suara menghentikan alarm saat menerima alarm_acknowledged
+                        monitor.publish(events.ALARM_ACKNOWLEDGED, "authorized", {
+                            "details": "Alarm acknowledged. Baseline updated to current state.",
+                            "actual_objects_after_auth": alarm_result.object_counts,
+                        }, frame=alarm_result.frame, capture="authorized")
+                        print(f"Baseline kamera '{monitor.name}' diperbarui: {alarm_result.object_counts}", flush=True)
+                    utils.show_popup_notification("Sistem Keamanan", "Perubahan diotorisasi. Baseline diperbarui.")
+                else:
+                    print(code_message, flush=True)
+                    event_bus.publish(events.Event("defense_mode_attempt" if purpose == "defense" else "alarm_code_incorrect", "unauthorized", {"details": "Incorrect access code entered (multi-camera)."}))
+
+            # --- Penanganan Keypress ---
+            if key == ord('q'):
+                print("Menghentikan sistem...", flush=True)
+                break
+
+            elif key == ord('b'):
+                if input_thread is not None:
+                    print("Sistem sedang menunggu input kode. Mohon tunggu.", flush=True)
+                    continue
+                for monitor in monitors.values():
+                    if monitor.last_seq == 0:
+                        print(f"Kamera '{monitor.name}' belum punya hasil deteksi. Baseline tidak diubah.", flush=True)
+                    elif not monitor.grabber.connected:
+                        print(f"Kamera '{monitor.name}' sedang terputus. Baseline tidak diubah.", flush=True)
+                    elif monitor.set_baseline(monitor.object_counts, monitor.detections, monitor.zone_counts, require_defense=monitor.security.snapshot.baseline_set):
+                        print(f"Baseline kamera '{monitor.name}' berhasil diatur: {monitor.object_counts}", flush=True)
+                        monitor.publish(events.BASELINE_SET, "authorized", {"details": f"Initial state set: {monitor.object_counts}"})
+                    else:
+                        print(f"Kamera '{monitor.name}': masuk mode pengaturan ('d') terlebih dahulu untuk mengubah baseline.", flush=True)
+
+            elif key in (ord('d'), ord('a')):
+                if input_thread is not None:
+                    print("Sistem sedang menunggu input kode. Mohon tunggu.", flush=True)
+                elif key == ord('a') and not any(m.security.snapshot.alarm_active for m in monitors.values()):
+                    print("Alarm tidak aktif saat ini.", flush=True)
+                else:
+                    purpose = "defense" if key == ord('d') else "alarm"
+                    input_thread = threading.Thread(target=get_code_input_threaded, args=(code_queue, purpose), name=f"{purpose}_code_thread")
+                    input_thread.daemon = True
+                    input_thread.start()
+
+    except KeyboardInterrupt:
+        print("\nKeyboardInterrupt terdeteksi. Menghentikan sistem dengan paksa.", flush=True)
+
+    # --- Cleanup ---
+    print("Membersihkan sumber daya...", flush=True)
+    if maintenance_job is not None:
+        maintenance_job.stop()
+    event_bus.close() # Menjalankan sisa event di antrian sink
+    utils.stop_alarm()
+    security_monitor.close_writer() # Menulis baseline yang belum sempat ditulis
+    utils.close_screenshot_writer() # Menyimpan sisa screenshot di antrian
+    utils.close_activity_log() # Menulis sisa entri log ke disk
+    inference_stage.stop()
+    print(f"Statistik inferensi batch: {inference_stage.inferences} panggilan model untuk {inference_stage.frames_inferred} frame, {inference_stage.skipped} frame dilewati motion gate.", flush=True)
+    for monitor in monitors.values():
+        monitor.close()
+        if monitor.clip_recorder is not None:
+            clip_stats = monitor.clip_recorder.stats()
+            print(f"Statistik klip '{monitor.name}': buffer {clip_stats['buffer_frames']} frame ({clip_stats['buffer_mb']} MB), encode {clip_stats['encode_fps']} frame/detik, {clip_stats['clips_written']} klip ditulis.", flush=True)
+    cv2.destroyAllWindows()
+    print("Sistem keamanan objek (multi-kamera) telah dimatikan.", flush=True)
+
+
+if __name__ == "__main__":
+    main()
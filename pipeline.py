@@ -0,0 +1,288 @@
+import collections
+import threading
+import time
+import metrics
+import tiling
+import utils
+import zones as zones_module
+from motion import MotionGate
+
+# --- Kebijakan Antrian Saat Penuh ---
+DROP_OLDEST = "drop_oldest" # Buang item paling lama, simpan item baru (selalu memproses data terbaru)
+DROP_NEWEST = "drop_newest" # Tolak item baru, pertahankan item yang sudah mengantri
+BLOCK = "block" # Tunggu sampai ada tempat (maksimal `block_timeout`), lalu tolak item baru
+
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+# --- Antrian Terbatas dengan Kebijakan Drop ---
+class StageQueue:
+    """
+    Antrian berkapasitas tetap di antara dua tahap pipeline.
+    Menghitung berapa item yang dibuang karena antrian penuh.
+    """
+
+    def __init__(self, maxsize=1, drop_policy=DROP_OLDEST, block_timeout=0.5):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Kebijakan drop tidak dikenal: {drop_policy}. Pilihan: {', '.join(DROP_POLICIES)}")
+        self.maxsize = max(1, int(maxsize))
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+
+    def put(self, item):
+        """Memasukkan item. Mengembalikan False jika item baru ditolak."""
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                if self.drop_policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.drop_policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                else:
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._items) >= self.maxsize:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._condition.wait(remaining)
+
+            self._items.append(item)
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Mengambil item tertua. Mengembalikan None jika antrian kosong sampai timeout."""
+        with self._condition:
+            if not self._items:
+                self._condition.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def get_all(self):
+        """Mengambil semua item yang sedang mengantri tanpa menunggu."""
+        with self._condition:
+            items = list(self._items)
+            self._items.clear()
+            self._condition.notify_all()
+            return items
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
+
+
+# --- Data yang Mengalir di Pipeline ---
+class FrameJob:
+    def __init__(self, frame, timestamp, seq, source=None):
+        self.frame = frame
+        self.timestamp = timestamp # Waktu capture frame
+        self.seq = seq # Nomor urut frame, untuk membuang hasil yang datang tidak berurutan
+        self.source = source # Nama kamera asal frame (mode multi-kamera)
+
+
+class DetectionResult:
+    def __init__(self, job, detections, object_counts, inference_time, reused=False, zone_detections=None):
+        self.frame = job.frame
+        self.timestamp = job.timestamp
+        self.seq = job.seq
+        self.source = job.source
+        self.detections = detections
+        self.object_counts = object_counts
+        self.inference_time = inference_time # Lama inferensi dalam detik
+        self.reused = reused # True jika inferensi dilewati motion gate dan hasil sebelumnya dipakai ulang
+        self.zone_detections = zone_detections # dict nama zona -> deteksi, None jika tanpa zona
+        self.zone_counts = zones_module.zone_counts(zone_detections) if zone_detections is not None else None
+
+
+# --- Tahap Inferensi (Worker atau Pool Worker) ---
+class InferenceStage:
+    """
+    Menjalankan utils.detect_objects_array di satu atau beberapa thread worker.
+    Worker pertama memakai model global di utils, worker tambahan memuat
+    model YOLO sendiri agar bisa berjalan paralel.
+    Jika `motion_gate` diberikan, frame tanpa perubahan tidak diinferensi
+    dan hasil deteksi terakhir dikirim ulang dengan waktu capture frame baru.
+    Jika `zones` diberikan, hanya crop zona yang diinferensi (lihat zones.py).
+    Jika `tiled` (tiling.TiledDetector) diberikan, frame besar diinferensi per tile (lihat tiling.py).
+    """
+
+    def __init__(self, input_queue, output_queue, workers=1, motion_gate=None, zones=None, tiled=None):
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.workers = max(1, int(workers))
+        self.motion_gate = motion_gate
+        self.zones = zones or []
+        self.tiled = tiled
+        self.inferences = 0
+        self.skipped = 0
+        self._last_output = None # (detections, object_counts, zone_detections) dari inferensi terakhir
+        self._running = False
+        self._threads = []
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        for i in range(self.workers):
+            worker_model = None if i == 0 else utils.load_model()
+            thread = threading.Thread(target=self._run, args=(worker_model,), name=f"inference_worker_{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _run(self, worker_model):
+        while self._running:
+            job = self.input_queue.get(timeout=0.1)
+            if job is None:
+                continue
+
+            if self.motion_gate is not None:
+                with self._stats_lock:
+                    previous_output = self._last_output
+                    if previous_output is not None and not self.motion_gate.should_infer(job.frame, job.timestamp):
+                        self.skipped += 1
+                        skip = True
+                    else:
+                        skip = False
+                if skip:
+                    detections, object_counts, zone_detections = previous_output
+                    self.output_queue.put(DetectionResult(job, detections, object_counts, 0.0, reused=True, zone_detections=zone_detections))
+                    continue
+
+            start_time = time.perf_counter()
+            try:
+                if self.tiled is not None:
+                    detections, zone_detections = self.tiled.detect(job.frame, job.timestamp, worker_model)
+                elif self.zones:
+                    detections, zone_detections = zones_module.detect_in_zones(job.frame, self.zones, worker_model)
+                else:
+                    detections, zone_detections = utils.detect_objects_array(job.frame, worker_model), None
+                object_counts = utils.count_objects(detections)
+            except Exception as e:
+                print(f"Error saat deteksi objek di worker inferensi: {e}. Frame dilewati.", flush=True)
+                if self.motion_gate is not None:
+                    # Referensi gate sudah maju ke frame yang gagal; tanpa reset, frame statis berikutnya memakai hasil lama
+                    with self._stats_lock:
+                        self.motion_gate.reset()
+                continue
+            inference_time = time.perf_counter() - start_time
+            metrics.observe_stage("inference", inference_time)
+
+            with self._stats_lock:
+                self.inferences += 1
+                self._last_output = (detections, object_counts, zone_detections)
+            self.output_queue.put(DetectionResult(job, detections, object_counts, inference_time, zone_detections=zone_detections))
+
+    def stop(self):
+        self._running = False
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+
+
+# --- Tahap Inferensi Batch untuk Beberapa Kamera ---
+class BatchInferenceStage:
+    """
+    Mengambil frame terbaru dari setiap kamera dan menjalankannya dalam
+    satu panggilan model (utils.detect_objects_batch). Hasil per kamera
+    dikirim ke `output_queue` sebagai DetectionResult dengan `source` = nama kamera.
+    Kamera yang punya zona hanya mengirim crop zonanya (zones.detect_in_zones_batch).
+    Dengan `use_tiling`, frame besar semua kamera dikirim per tile (tiling.detect_tiled_batch).
+    """
+
+    def __init__(self, grabbers, output_queue, wait_timeout=0.01, use_motion_gate=False, zones_by_camera=None, use_tiling=False):
+        self.grabbers = grabbers # dict: nama kamera -> CameraSupervisor (atau FrameGrabber)
+        self.zones_by_camera = zones_by_camera or {} # dict: nama kamera -> list Zone
+        self.output_queue = output_queue
+        self.wait_timeout = wait_timeout
+        self.use_motion_gate = use_motion_gate
+        self.use_tiling = use_tiling
+        self.tiled_detectors = {} # TiledDetector per kamera (cache hasil per tile)
+        self.inferences = 0 # Jumlah panggilan model (batch)
+        self.frames_inferred = 0
+        self.skipped = 0 # Frame yang tidak diinferensi karena scene kamera tidak berubah
+        self._motion_gates = {} # Motion gate per kamera
+        self._last_output = {} # (detections, object_counts, zone_detections) terakhir per kamera
+        self._seq = {} # (grabber, nomor urut) frame terakhir yang sudah diinferensi per kamera
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="batch_inference_worker")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def _collect_jobs(self):
+        jobs = []
+        for name, grabber in list(self.grabbers.items()):
+            frame, timestamp, seq = grabber.latest()
+            last_grabber, last_seq = self._seq.get(name, (None, 0))
+            if frame is None or (last_grabber is grabber and seq <= last_seq):
+                continue # Belum ada frame baru dari kamera ini
+            self._seq[name] = (grabber, seq)
+            job = FrameJob(frame, timestamp, seq, source=name)
+
+            if self.use_motion_gate and name in self._last_output:
+                gate = self._motion_gates.setdefault(name, MotionGate())
+                if not gate.should_infer(frame, timestamp):
+                    self.skipped += 1
+                    detections, object_counts, zone_detections = self._last_output[name]
+                    self.output_queue.put(DetectionResult(job, detections, object_counts, 0.0, reused=True, zone_detections=zone_detections))
+                    continue
+            jobs.append(job)
+        return jobs
+
+    def _run(self):
+        while self._running:
+            jobs = self._collect_jobs()
+            if not jobs:
+                time.sleep(self.wait_timeout)
+                continue
+
+            start_time = time.perf_counter()
+            try:
+                if self.use_tiling:
+                    detectors = [self._tiled_detector(job.source) for job in jobs]
+                    batch_outputs = tiling.detect_tiled_batch(detectors, [job.frame for job in jobs], [job.timestamp for job in jobs])
+                else:
+                    zone_lists = [self.zones_by_camera.get(job.source, []) for job in jobs]
+                    batch_outputs = zones_module.detect_in_zones_batch([job.frame for job in jobs], zone_lists)
+            except Exception as e:
+                print(f"Error saat deteksi objek batch: {e}. Batch dilewati.", flush=True)
+                for job in jobs: # Frame berikutnya dari kamera ini diinferensi lagi (lihat InferenceStage)
+                    if job.source in self._motion_gates:
+                        self._motion_gates[job.source].reset()
+                continue
+            inference_time = time.perf_counter() - start_time
+
+            self.inferences += 1
+            self.frames_inferred += len(jobs)
+            for job, (detections, zone_detections) in zip(jobs, batch_outputs):
+                object_counts = utils.count_objects(detections)
+                self._last_output[job.source] = (detections, object_counts, zone_detections)
+                self.output_queue.put(DetectionResult(job, detections, object_counts, inference_time, zone_detections=zone_detections))
+
+    def _tiled_detector(self, name):
+        if name not in self.tiled_detectors:
+            self.tiled_detectors[name] = tiling.TiledDetector(self.zones_by_camera.get(name, []), name=name)
+        return self.tiled_detectors[name]
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self._thread = None
@@ -0,0 +1,127 @@
+import threading
+import cv2
+import config
+import metrics
+
+# --- Preprocessing Frame Sebelum Inferensi ---
+# Frame kamera (misal 1080p) diperkecil sekali ke ukuran input model (imgsz) sebelum masuk ke
+# backend, jadi backend tidak lagi me-resize frame penuh dan konversi warna dilakukan pada
+# frame kecil. Frame kosong dideteksi dari sampel piksel (setiap PREPROCESS_BLANK_STRIDE
+# baris/kolom), bukan dengan memeriksa seluruh piksel. Skala per sumbu dikembalikan agar
+# kotak deteksi bisa dipetakan kembali ke koordinat frame asli untuk overlay dan screenshot.
+
+
+def is_blank(frame, stride=None):
+    """True jika semua piksel sampel bernilai 0 (frame hitam/kosong dari kamera yang belum siap)."""
+    stride = max(1, int(stride or config.PREPROCESS_BLANK_STRIDE))
+    return not frame[::stride, ::stride].any()
+
+
+def prepare(frame, imgsz=None):
+    """
+    Menyiapkan frame untuk model: BGR 3 channel, sisi terpanjang maksimal `imgsz`.
+    Mengembalikan (frame model, (skala x, skala y)), atau (None, None) jika frame kosong.
+    Skala 1.0 berarti frame tidak diperkecil.
+    """
+    if frame is None:
+        return None, None
+    if isinstance(frame, cv2.UMat):
+        frame = frame.get()
+    if frame.size == 0 or is_blank(frame):
+        return None, None
+
+    scale = (1.0, 1.0)
+    height, width = frame.shape[:2]
+    if config.PREPROCESS_DOWNSCALE and imgsz and max(height, width) > imgsz:
+        ratio = imgsz / max(height, width)
+        new_width, new_height = max(1, int(round(width * ratio))), max(1, int(round(height * ratio)))
+        # INTER_LINEAR sama dengan resize di letterbox ultralytics/backend, jadi hasil deteksi tidak bergeser
+        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+        scale = (new_width / width, new_height / height)
+
+    # Konversi warna sesudah resize: lebih sedikit piksel yang diproses
+    if frame.ndim == 2:
+        frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    elif frame.shape[2] == 4:
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
+    return frame, scale
+
+
+# --- Resolusi Inferensi Adaptif dari Budget Latensi ---
+class AdaptiveImgsz:
+    """
+    Memilih imgsz dari INFERENCE_IMGSZ_STEPS berdasarkan latensi panggilan model (rata-rata
+    bergerak eksponensial). Jika latensi melebihi budget, imgsz turun satu tingkat; jika
+    perkiraan latensi di tingkat berikutnya (latensi ~ imgsz^2) masih di bawah
+    `headroom` x budget, imgsz naik kembali. Setelah berganti, minimal `interval` panggilan
+    ditunggu sebelum berganti lagi agar tidak bolak-balik.
+    """
+
+    def __init__(self, budget_ms=None, steps=None, start=None, interval=None, headroom=None, alpha=0.3):
+        self.budget = (budget_ms if budget_ms is not None else config.INFERENCE_LATENCY_BUDGET_MS) / 1000.0
+        self.steps = sorted(set(int(step) for step in (steps or config.INFERENCE_IMGSZ_STEPS)))
+        start = start or config.INFERENCE_IMGSZ
+        # Mulai dari tingkat terbesar yang tidak melebihi imgsz awal
+        self.index = max([i for i, step in enumerate(self.steps) if step <= start] or [0])
+        self.interval = max(1, int(interval or config.INFERENCE_IMGSZ_ADAPT_INTERVAL))
+        self.headroom = headroom if headroom is not None else config.INFERENCE_IMGSZ_HEADROOM
+        self.alpha = alpha
+        self.latency = None # Rata-rata bergerak latensi (detik) pada imgsz saat ini
+        self.samples = 0
+        self.changes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def imgsz(self):
+        return self.steps[self.index]
+
+    def observe(self, imgsz, seconds):
+        """Mencatat latensi satu panggilan model. Hasil dari imgsz lama (sebelum berganti) diabaikan."""
+        with self._lock:
+            if imgsz != self.imgsz:
+                return
+            self.latency = seconds if self.latency is None else self.alpha * seconds + (1 - self.alpha) * self.latency
+            self.samples += 1
+            if self.samples < self.interval:
+                return
+            current = self.imgsz
+            if self.latency > self.budget and self.index > 0:
+                self.index -= 1
+            elif self.index < len(self.steps) - 1 and self.latency * (self.steps[self.index + 1] / current) ** 2 < self.budget * self.headroom:
+                self.index += 1
+            else:
+                return
+            print(f"Resolusi inferensi: {current} -> {self.imgsz} (latensi {self.latency * 1000:.0f} ms, budget {self.budget * 1000:.0f} ms)", flush=True)
+            self.changes += 1
+            self.latency = None
+            self.samples = 0
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    """Pengendali imgsz global, None jika INFERENCE_LATENCY_BUDGET_MS = 0 (imgsz tetap)."""
+    global _controller
+    if _controller is None and config.INFERENCE_LATENCY_BUDGET_MS > 0:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdaptiveImgsz()
+    return _controller
+
+
+def current_imgsz():
+    """imgsz untuk inferensi frame penuh saat ini."""
+    controller = get_controller()
+    return controller.imgsz if controller is not None else config.INFERENCE_IMGSZ
+
+
+def observe_latency(imgsz, seconds):
+    controller = get_controller()
+    if controller is not None:
+        controller.observe(imgsz, seconds)
+
+
+metrics.register_gauge("objsec_inference_imgsz", current_imgsz, "Ukuran input model untuk inferensi frame penuh")
+metrics.register_counter("objsec_inference_imgsz_changes_total", lambda: _controller.changes if _controller is not None else 0, "Jumlah perubahan imgsz oleh budget latensi")
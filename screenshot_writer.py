@@ -0,0 +1,152 @@
+import datetime
+import os
+import queue
+import threading
+import time
+import cv2
+import config
+import metrics
+
+# --- Penulis Screenshot Latar Belakang ---
+# Encode JPEG/WebP dan tulis ke disk dilakukan oleh beberapa thread pekerja, jadi loop
+# utama hanya memasukkan frame ke antrian dan langsung mendapat path file akhirnya.
+# Nama file memakai mikrodetik dan dijamin unik, sehingga dua event pada detik yang sama
+# tidak saling menimpa.
+
+FORMAT_EXTENSIONS = {"jpg": ".jpg", "jpeg": ".jpg", "webp": ".webp"}
+
+
+def encode_params(image_format, jpeg_quality, webp_quality):
+    if image_format == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, int(webp_quality)]
+    return [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+
+
+def downscale(frame, max_width):
+    """Memperkecil frame (rasio tetap) jika lebih lebar dari max_width. 0 = ukuran asli."""
+    height, width = frame.shape[:2]
+    if not max_width or width <= max_width:
+        return frame
+    new_height = int(round(height * max_width / width))
+    return cv2.resize(frame, (max_width, new_height), interpolation=cv2.INTER_AREA)
+
+
+class ScreenshotWriter:
+    """
+    Pool thread untuk encode dan menyimpan screenshot.
+    Jika antrian penuh (disk tidak mampu mengikuti), pemanggil menunggu maksimal
+    `put_timeout` detik, lalu screenshot ditulis langsung di thread pemanggil agar
+    bukti tidak hilang; cara ini sekaligus memperlambat produsen (backpressure).
+    """
+
+    def __init__(self, base_dir=None, workers=None, queue_size=None, image_format=None, jpeg_quality=None, webp_quality=None, max_width=None, put_timeout=None):
+        self.base_dir = base_dir or config.CHANGES_DIR
+        self.image_format = (image_format or config.SCREENSHOT_FORMAT).lower()
+        if self.image_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Format screenshot tidak dikenal: {self.image_format}. Pilihan: jpg, webp")
+        self.extension = FORMAT_EXTENSIONS[self.image_format]
+        self.params = encode_params(
+            self.image_format,
+            jpeg_quality if jpeg_quality is not None else config.SCREENSHOT_JPEG_QUALITY,
+            webp_quality if webp_quality is not None else config.SCREENSHOT_WEBP_QUALITY,
+        )
+        self.max_width = max_width if max_width is not None else config.SCREENSHOT_MAX_WIDTH
+        self.put_timeout = put_timeout if put_timeout is not None else config.SCREENSHOT_QUEUE_PUT_TIMEOUT
+
+        self._queue = queue.Queue(maxsize=queue_size or config.SCREENSHOT_QUEUE_SIZE)
+        self._name_lock = threading.Lock()
+        self._last_stamp = None
+        self._closed = False
+        self.written = 0
+        self.written_inline = 0 # Ditulis di thread pemanggil karena antrian penuh
+        self.failed = 0
+
+        self._threads = []
+        for index in range(workers or config.SCREENSHOT_WORKERS):
+            thread = threading.Thread(target=self._run, name=f"screenshot_writer_{index}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def reserve_path(self, status_type, prefix="deteksi"):
+        """Membuat path unik (resolusi mikrodetik) tanpa menulis apa pun."""
+        with self._name_lock:
+            stamp = datetime.datetime.now()
+            if self._last_stamp is not None and stamp <= self._last_stamp:
+                stamp = self._last_stamp + datetime.timedelta(microseconds=1)
+            self._last_stamp = stamp
+        capture_dir = os.path.join(self.base_dir, status_type)
+        return os.path.join(capture_dir, f"{prefix}_{stamp.strftime('%Y%m%d_%H%M%S_%f')}{self.extension}")
+
+    def submit(self, frame, status_type, file_path=None):
+        """
+        Menjadwalkan penyimpanan frame dan langsung mengembalikan path akhirnya.
+        Frame tidak disalin: pemanggil tidak boleh mengubah frame setelah submit.
+        """
+        file_path = file_path or self.reserve_path(status_type)
+        if self._closed:
+            self._write(frame, file_path)
+            return file_path
+        try:
+            self._queue.put((frame, file_path), timeout=self.put_timeout)
+        except queue.Full:
+            self.written_inline += 1
+            print("Peringatan: Antrian screenshot penuh, screenshot ditulis langsung.", flush=True)
+            self._write(frame, file_path)
+        return file_path
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, frame, file_path):
+        write_start = time.perf_counter()
+        try:
+            ok, encoded = cv2.imencode(self.extension, downscale(frame, self.max_width), self.params)
+            if not ok:
+                raise OSError("encode gagal")
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            # Tulis ke file sementara lalu rename, agar tidak ada file bukti yang setengah jadi
+            temp_path = file_path + ".tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(encoded.tobytes())
+            os.replace(temp_path, file_path)
+            self.written += 1
+            metrics.observe_stage("screenshot_write", time.perf_counter() - write_start)
+            print(f"Screenshot disimpan: {file_path}", flush=True)
+            return True
+        except (OSError, cv2.error) as e:
+            self.failed += 1
+            print(f"Error menyimpan screenshot {file_path}: {e}", flush=True)
+            return False
+
+    def flush(self):
+        """Menunggu sampai semua screenshot di antrian sudah tersimpan."""
+        self._queue.join()
+
+    def close(self):
+        """Menyimpan sisa screenshot lalu menghentikan semua thread pekerja."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=10)
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "written_inline": self.written_inline,
+            "failed": self.failed,
+            "queue_depth": self.queue_depth(),
+        }
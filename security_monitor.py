@@ -0,0 +1,275 @@
+import atexit
+import collections
+import threading
+import time
+import config
+import metrics
+import utils
+
+# --- Mesin Status Pemantauan ---
+# Status sistem satu kamera (baseline, timer persistensi, alarm, mode pengaturan) disimpan di
+# satu objek SecurityMonitor dengan status dan transisi eksplisit:
+#
+#   MONITORING --perubahan--> PENDING_CHANGE --bertahan > ALARM_PERSISTENCE_THRESHOLD--> ALARM
+#   PENDING_CHANGE --kembali normal--> MONITORING
+#   ALARM --kode benar (acknowledge)--> MONITORING
+#   MONITORING/PENDING_CHANGE <--kode benar (toggle_defense)--> DEFENSE
+#
+# Setiap transisi menerbitkan MonitorSnapshot baru yang tidak pernah diubah lagi. Pembaca
+# (render, endpoint /status) cukup membaca atribut `snapshot` tanpa lock; hanya transisi yang
+# memakai lock, dan lock tidak pernah dipegang saat I/O: baseline ditulis BaselineWriter di
+# thread latar (file sementara + os.replace).
+
+MONITORING = "monitoring"
+PENDING_CHANGE = "pending_change"
+ALARM = "alarm"
+DEFENSE = "defense"
+STATES = (MONITORING, PENDING_CHANGE, ALARM, DEFENSE)
+
+
+class FrozenCounts(dict):
+    """dict {kelas: jumlah} yang tidak bisa diubah, aman dibagi antar thread tanpa salinan (tetap bisa di-json.dump)."""
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Baseline di snapshot tidak bisa diubah, gunakan SecurityMonitor.set_baseline()")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+
+_SNAPSHOT_FIELDS = ["state", "baseline", "change_details", "change_start_time", "alarm_result", "alarm_details", "version", "entered_at"]
+
+
+class MonitorSnapshot(collections.namedtuple("MonitorSnapshot", _SNAPSHOT_FIELDS)):
+    """
+    Status pemantauan pada satu saat. `baseline` adalah FrozenCounts, `change_details` dan
+    `alarm_details` adalah tuple. `alarm_result` adalah hasil deteksi yang memicu alarm
+    (dipakai untuk screenshot dan update baseline saat alarm dihentikan).
+    """
+    __slots__ = ()
+
+    @property
+    def alarm_active(self):
+        return self.state == ALARM
+
+    @property
+    def defense_mode_active(self):
+        return self.state == DEFENSE
+
+    @property
+    def monitoring_active(self):
+        return self.state in (MONITORING, PENDING_CHANGE)
+
+    @property
+    def baseline_set(self):
+        return bool(self.baseline)
+
+
+class SecurityMonitor:
+    """
+    Mesin status pemantauan satu kamera. Semua metode transisi aman dipanggil dari thread mana
+    pun; `snapshot` dibaca tanpa lock. Beberapa SecurityMonitor (satu per kamera) bisa dipakai
+    dalam satu proses, masing-masing dengan `state_file` sendiri dan BaselineWriter bersama.
+    """
+
+    def __init__(self, name=None, state_file=None, persistence_threshold=None, writer=None):
+        self.name = name
+        self.state_file = state_file or config.INITIAL_STATE_FILE
+        self.persistence_threshold = config.ALARM_PERSISTENCE_THRESHOLD if persistence_threshold is None else persistence_threshold
+        self.writer = writer or get_writer()
+        self.transitions = 0 # Perpindahan status (bukan pembaruan detail perubahan)
+        self._lock = threading.Lock()
+        self._snapshot = MonitorSnapshot(MONITORING, FrozenCounts(utils.load_initial_state(self.state_file)), (), None, None, (), 0, time.time())
+        labels = {"camera": name} if name is not None else {}
+        metrics.register_gauge("objsec_monitor_state", lambda: STATES.index(self._snapshot.state), "Status pemantauan: 0 monitoring, 1 pending_change, 2 alarm, 3 defense", **labels)
+        metrics.register_counter("objsec_monitor_transitions_total", lambda: self.transitions, "Perpindahan status mesin pemantauan", **labels)
+
+    @property
+    def snapshot(self):
+        """Snapshot terbaru. Tidak perlu lock: snapshot diganti utuh, tidak pernah diubah di tempat."""
+        return self._snapshot
+
+    def _publish(self, current, **changes):
+        # Dipanggil dengan self._lock dipegang
+        if changes.get("state", current.state) != current.state:
+            changes.setdefault("entered_at", time.time())
+            self.transitions += 1
+        self._snapshot = current._replace(version=current.version + 1, **changes)
+        return self._snapshot
+
+    # --- Transisi dari Hasil Deteksi ---
+    def observe(self, change_details, timestamp, result=None, triggered=None):
+        """
+        Memasukkan detail perubahan dari satu hasil deteksi (waktu capture `timestamp`).
+        Dengan `triggered=None` timer persistensi milik monitor dipakai; dengan True/False
+        keputusan diambil dari timer pemanggil (misal timer per zona).
+        Mengembalikan True jika hasil ini memicu alarm (transisi ke ALARM).
+        """
+        details = tuple(change_details)
+        with self._lock:
+            current = self._snapshot
+            if current.state in (ALARM, DEFENSE):
+                return False
+
+            if triggered is None:
+                if not details:
+                    if current.state != MONITORING or current.change_details:
+                        self._publish(current, state=MONITORING, change_details=(), change_start_time=None)
+                    return False
+                if current.state == MONITORING:
+                    self._publish(current, state=PENDING_CHANGE, change_details=details, change_start_time=timestamp)
+                    return False
+                if timestamp - current.change_start_time <= self.persistence_threshold:
+                    if details != current.change_details:
+                        self._publish(current, change_details=details)
+                    return False
+            elif not triggered:
+                state = PENDING_CHANGE if details else MONITORING
+                if state != current.state or details != current.change_details:
+                    change_start_time = (current.change_start_time or timestamp) if details else None
+                    self._publish(current, state=state, change_details=details, change_start_time=change_start_time)
+                return False
+
+            self._publish(current, state=ALARM, change_details=(), change_start_time=None, alarm_result=result, alarm_details=details)
+            return True
+
+    # --- Transisi dari Aksi Kontrol ---
+    def acknowledge(self, baseline=None):
+        """
+        ALARM -> MONITORING. Jika `baseline` diberikan, baseline diganti dalam transisi yang sama
+        (tidak ada hasil deteksi yang dibandingkan dengan baseline lama sesudah alarm dihentikan).
+        Mengembalikan False jika alarm tidak aktif (misal sudah dihentikan thread lain).
+        """
+        with self._lock:
+            current = self._snapshot
+            if current.state != ALARM:
+                return False
+            changes = {"baseline": FrozenCounts(baseline)} if baseline is not None else {}
+            self._publish(current, state=MONITORING, change_details=(), change_start_time=None, alarm_result=None, alarm_details=(), **changes)
+            if baseline is not None:
+                self.writer.save(self.state_file, dict(baseline))
+        return True
+
+    def toggle_defense(self):
+        """
+        MONITORING/PENDING_CHANGE <-> DEFENSE. Mengembalikan status baru, atau None saat alarm
+        aktif (alarm harus dihentikan dengan kode akses lebih dulu).
+        """
+        with self._lock:
+            current = self._snapshot
+            if current.state == ALARM:
+                return None
+            state = MONITORING if current.state == DEFENSE else DEFENSE
+            self._publish(current, state=state, change_details=(), change_start_time=None)
+            return state
+
+    def set_defense(self, active):
+        """Masuk (True) atau keluar (False) dari DEFENSE. Mengembalikan False saat alarm aktif."""
+        with self._lock:
+            current = self._snapshot
+            if current.state == ALARM:
+                return False
+            if (current.state == DEFENSE) != active:
+                self._publish(current, state=DEFENSE if active else MONITORING, change_details=(), change_start_time=None)
+            return True
+
+    def set_baseline(self, baseline, require_defense=False):
+        """
+        Mengganti baseline dan mereset timer persistensi. File baseline ditulis di latar belakang.
+        Dengan `require_defense=True` baseline hanya diganti jika masih di DEFENSE saat transisi.
+        Mengembalikan True jika baseline diganti.
+        """
+        with self._lock:
+            current = self._snapshot
+            if require_defense and current.state != DEFENSE:
+                return False
+            state = current.state if current.state in (ALARM, DEFENSE) else MONITORING
+            self._publish(current, state=state, baseline=FrozenCounts(baseline), change_details=(), change_start_time=None)
+            self.writer.save(self.state_file, dict(baseline))
+        return True
+
+
+# --- Penulisan Baseline di Latar Belakang ---
+class BaselineWriter:
+    """
+    Menulis file baseline di thread latar. Jika baseline satu file diganti beberapa kali sebelum
+    sempat ditulis, hanya isi terbaru yang ditulis. Penulisan lewat file sementara + os.replace,
+    jadi file baseline tidak pernah setengah tertulis jika proses mati di tengah penulisan.
+    """
+
+    def __init__(self):
+        self._pending = {} # {path: isi terbaru yang belum ditulis}
+        self._condition = threading.Condition()
+        self._writing = False
+        self._closed = False
+        self.writes = 0
+        self.coalesced = 0 # Penulisan yang digantikan isi yang lebih baru sebelum sempat ditulis
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="baseline_writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def save(self, path, data):
+        """Menjadwalkan penulisan `data` (JSON) ke `path`. Tidak pernah menunggu disk."""
+        with self._condition:
+            if path in self._pending:
+                self.coalesced += 1
+            self._pending[path] = data
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, {}
+                self._writing = True
+            for path, data in pending.items():
+                try:
+                    utils.write_json_atomic(path, data)
+                    self.writes += 1
+                except OSError as e:
+                    self.failed += 1
+                    print(f"Error menyimpan baseline ke {path}: {e}", flush=True)
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Menunggu semua baseline yang dijadwalkan selesai ditulis. Mengembalikan False jika timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def close(self, timeout=None):
+        """Menulis sisa baseline lalu menghentikan thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout=config.STATE_WRITER_CLOSE_TIMEOUT if timeout is None else timeout)
+
+    def stats(self):
+        return {"writes": self.writes, "coalesced": self.coalesced, "failed": self.failed}
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """BaselineWriter bersama untuk semua SecurityMonitor di proses ini, dibuat saat pertama dibutuhkan."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BaselineWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def close_writer():
+    """Menulis sisa baseline ke disk. Mengembalikan statistik penulisan, None jika writer belum dibuat."""
+    if _writer is None:
+        return None
+    _writer.close()
+    return _writer.stats()
@@ -0,0 +1,103 @@
+import collections
+import math
+import config
+
+# --- Penghalusan Jumlah Objek (Sliding Window + Histeresis) ---
+# Jumlah objek per kelas dihaluskan dengan mayoritas di N hasil deteksi terakhir.
+# Ambang berganti dibuat berbeda (histeresis): menyimpang dari jumlah baseline butuh
+# `trigger_ratio` x N hasil yang sama, kembali ke jumlah baseline cukup `clear_ratio` x N.
+# Satu deteksi yang hilang/berlebih sesaat tidak mengubah hasil dan tidak mereset timer
+# persistensi alarm, sehingga inferensi tidak perlu dijalankan di setiap frame.
+
+
+class CountSmoother:
+    """
+    Filter temporal per kelas. Setiap update O(1) per kelas: ring buffer nilai terakhir
+    dan histogram nilai di jendela diperbarui secara inkremental, dan hanya nilai yang
+    baru masuk yang perlu diperiksa (hanya kemunculan nilai itu yang bertambah).
+    """
+
+    def __init__(self, window=None, trigger_ratio=None, clear_ratio=None, initial=None):
+        self.window = max(1, int(window or config.SMOOTHING_WINDOW))
+        trigger_ratio = trigger_ratio if trigger_ratio is not None else config.SMOOTHING_TRIGGER_RATIO
+        clear_ratio = clear_ratio if clear_ratio is not None else config.SMOOTHING_CLEAR_RATIO
+        self.trigger_count = max(1, math.ceil(trigger_ratio * self.window))
+        self.clear_count = max(1, math.ceil(clear_ratio * self.window))
+        self._history = {} # kelas -> deque nilai terakhir
+        self._histogram = {} # kelas -> Counter {nilai: kemunculan di jendela}
+        self._smoothed = {} # kelas -> jumlah yang dihaluskan
+        self.initial = initial # None: kelas baru langsung memakai nilai pertamanya; angka: kelas baru mulai dari nilai ini dan ambang berlaku penuh
+
+    def reset(self):
+        self._history.clear()
+        self._histogram.clear()
+        self._smoothed.clear()
+
+    def update(self, counts, reference=None):
+        """
+        Menambahkan satu hasil deteksi {kelas: jumlah} dan mengembalikan jumlah yang dihaluskan.
+        `reference` adalah baseline {kelas: jumlah}; tanpa baseline semua perubahan memakai trigger_ratio.
+        """
+        reference = reference or {}
+        for name in list(self._history.keys() | counts.keys() | reference.keys()):
+            value = counts.get(name, 0)
+            history = self._history.setdefault(name, collections.deque())
+            histogram = self._histogram.setdefault(name, collections.Counter())
+            if len(history) == self.window:
+                oldest = history.popleft()
+                histogram[oldest] -= 1
+                if not histogram[oldest]:
+                    del histogram[oldest]
+            history.append(value)
+            histogram[value] += 1
+
+            current = self._smoothed.setdefault(name, self.initial) if self.initial is not None else self._smoothed.get(name)
+            required = self.clear_count if value == reference.get(name, 0) else self.trigger_count
+            if self.initial is None:
+                required = min(required, len(history)) # Selama jendela belum penuh, mayoritas dari hasil yang ada
+            if current is None or (value != current and histogram[value] >= required):
+                self._smoothed[name] = value
+
+            # Kelas yang tidak terlihat selama satu jendela penuh dan tidak ada di baseline dilupakan
+            if self._smoothed[name] == 0 and histogram[0] == len(history) == self.window and name not in reference:
+                del self._history[name], self._histogram[name], self._smoothed[name]
+        return self.counts()
+
+    def counts(self):
+        return {name: count for name, count in self._smoothed.items() if count > 0}
+
+
+class EventSmoother:
+    """
+    Histeresis yang sama untuk event tracker (dipindah/hilang/muncul per objek): setiap event
+    dihitung sebagai kelas bernilai 1 di CountSmoother yang mulai dari 0 ("tidak ada event").
+    Event baru dipakai setelah muncul di `trigger_ratio` x N hasil terakhir, dan tetap dipakai
+    sampai absen di `clear_ratio` x N hasil, jadi event yang berkedip satu deteksi tidak memicu
+    atau mereset timer persistensi.
+    """
+
+    def __init__(self, window=None, trigger_ratio=None, clear_ratio=None):
+        self._counts = CountSmoother(window, trigger_ratio, clear_ratio, initial=0)
+        self._last_event = {} # kunci event -> event terakhir yang terlihat (untuk detail dan log)
+
+    @staticmethod
+    def event_key(event):
+        label = event["track_id"] if event["track_id"] is not None else f"baseline-{event['baseline_index']}"
+        return f"{event['type']}:{event['class_id']}:{label}"
+
+    def reset(self):
+        self._counts.reset()
+        self._last_event.clear()
+
+    def update(self, events):
+        """Menambahkan event dari satu hasil deteksi dan mengembalikan event yang sudah stabil."""
+        keys = []
+        for event in events:
+            key = self.event_key(event)
+            self._last_event[key] = event
+            keys.append(key)
+        stable = self._counts.update(dict.fromkeys(keys, 1))
+        for key in list(self._last_event):
+            if key not in stable and key not in keys:
+                del self._last_event[key]
+        return [self._last_event[key] for key in stable]
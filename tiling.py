@@ -0,0 +1,296 @@
+import functools
+import threading
+import time
+import cv2
+import numpy as np
+import config
+import metrics
+import preprocess
+import utils
+import zones as zones_module
+
+# --- Inferensi Ber-tile untuk Objek Kecil ---
+# Frame 1080p ke atas yang diperkecil ke imgsz membuat objek kecil (mouse, cell phone, scissors)
+# tinggal beberapa piksel dan tidak terdeteksi. Dalam mode tile, frame dibagi menjadi tile
+# TILE_SIZE x TILE_SIZE yang saling tumpang tindih, ditambah satu input frame penuh yang
+# diperkecil (untuk objek besar yang terpotong tile). Semua input dijalankan dalam satu
+# panggilan model, lalu kotak dari tile yang berbeda digabung dengan NMS per kelas.
+#
+# Hasil deteksi per tile disimpan per kamera (TiledDetector). Tile yang tidak menyentuh zona
+# (config.ZONES) tidak pernah diinferensi, dan tile yang tidak berubah sejak inferensi
+# terakhirnya (dibandingkan dengan frame kecil grayscale milik tile itu) memakai hasil
+# sebelumnya, sampai TILE_REFRESH_INTERVAL detik.
+
+
+@functools.lru_cache(maxsize=32)
+def tile_grid(frame_shape, tile_size, overlap):
+    """
+    Kotak tile (N x 4, xyxy) yang menutupi frame berukuran `frame_shape` (tinggi, lebar).
+    Tile berukuran tetap `tile_size` (kecuali frame lebih kecil) dan tersebar rata, dengan
+    tumpang tindih minimal `overlap` x `tile_size` antar tile bertetangga.
+    """
+    height, width = frame_shape[:2]
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return np.zeros(1, dtype=np.int32)
+        count = int(np.ceil((length - tile_size) / stride)) + 1
+        return np.round(np.linspace(0, length - tile_size, count)).astype(np.int32)
+
+    xs, ys = starts(width), starts(height)
+    x1, y1 = np.meshgrid(xs, ys)
+    x1, y1 = x1.ravel(), y1.ravel()
+    grid = np.stack((x1, y1, np.minimum(x1 + tile_size, width), np.minimum(y1 + tile_size, height)), axis=1)
+    grid.flags.writeable = False # Dibagi semua pemanggil lewat cache
+    return grid
+
+
+def nms(detections, iou_threshold=None, ios_threshold=None):
+    """
+    NMS per kelas untuk array DETECTION_DTYPE, tanpa loop per kotak di Python. Dua kotak kelas
+    sama dianggap objek yang sama jika IoU > `iou_threshold`, atau jika irisannya > `ios_threshold`
+    dari luas kotak yang lebih kecil (potongan objek di tepi tile di dalam kotak utuh dari tile tetangga).
+    Kotak dengan confidence tertinggi dipertahankan; hasil diurutkan dari confidence tertinggi.
+    """
+    iou_threshold = config.TILE_NMS_IOU if iou_threshold is None else iou_threshold
+    ios_threshold = config.TILE_NMS_IOS if ios_threshold is None else ios_threshold
+    if len(detections) < 2:
+        return detections
+    detections = detections[np.argsort(-detections['conf'], kind='stable')]
+    boxes = np.stack((detections['x1'], detections['y1'], detections['x2'], detections['y2']), axis=1).astype(np.float32)
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+    width = np.clip(np.minimum(boxes[:, None, 2], boxes[None, :, 2]) - np.maximum(boxes[:, None, 0], boxes[None, :, 0]), 0, None)
+    height = np.clip(np.minimum(boxes[:, None, 3], boxes[None, :, 3]) - np.maximum(boxes[:, None, 1], boxes[None, :, 1]), 0, None)
+    intersection = width * height
+    iou = intersection / np.maximum(areas[:, None] + areas[None, :] - intersection, 1e-9)
+    ios = intersection / np.maximum(np.minimum(areas[:, None], areas[None, :]), 1e-9)
+    same_class = detections['class_id'][:, None] == detections['class_id'][None, :]
+    # suppresses[i, j]: kotak i (confidence lebih tinggi) menekan kotak j
+    suppresses = np.triu(same_class & ((iou > iou_threshold) | (ios > ios_threshold)), k=1)
+
+    # Hasil NMS greedy sebagai titik tetap: kotak dipertahankan jika tidak ditekan kotak lain yang
+    # dipertahankan. Setiap iterasi memastikan minimal satu kotak berikutnya (urut confidence)
+    # sudah benar, dan biasanya selesai dalam beberapa iterasi.
+    keep = np.ones(len(detections), dtype=bool)
+    while True:
+        new_keep = ~(suppresses & keep[:, None]).any(axis=0)
+        if np.array_equal(new_keep, keep):
+            return detections[keep]
+        keep = new_keep
+
+
+def offset_detections(detections, offset_x, offset_y):
+    detections['x1'] += offset_x
+    detections['x2'] += offset_x
+    detections['y1'] += offset_y
+    detections['y2'] += offset_y
+    return detections
+
+
+def split_by_zones(detections, zones, frame_shape):
+    """(deteksi gabungan, dict nama zona -> deteksi) seperti zones.detect_in_zones: hanya objek yang titik tengahnya di dalam zona."""
+    centers = zones_module.detection_centers(detections)
+    zone_detections = {zone.name: detections[zone.contains(centers, frame_shape)] for zone in zones}
+    merged = np.concatenate(list(zone_detections.values())) if zone_detections else utils.empty_detections()
+    return merged, zone_detections
+
+
+class TilePlan:
+    """Input model untuk satu frame dan data yang dibutuhkan untuk menggabungkan hasilnya."""
+
+    def __init__(self, frame_shape, timestamp, grid=None, tile_indices=(), inputs=(), full_scale=None, small=None):
+        self.frame_shape = frame_shape
+        self.timestamp = timestamp
+        self.grid = grid # None = frame terlalu kecil atau kosong, tanpa tile
+        self.tile_indices = list(tile_indices) # Tile yang diinferensi ulang
+        self.inputs = list(inputs) # Crop tile (urutan tile_indices), lalu frame penuh yang diperkecil jika ada
+        self.full_scale = full_scale
+        self.small = small
+
+
+# --- Detektor Ber-tile dengan Cache per Kamera ---
+class TiledDetector:
+    """
+    Deteksi ber-tile untuk satu kamera. Menyimpan hasil deteksi per tile dari inferensi terakhir
+    dan frame kecil grayscale tiap tile untuk mendeteksi perubahan. Aman dipanggil dari beberapa
+    worker inferensi (status cache memakai lock, panggilan model tidak).
+    Frame dengan sisi terpanjang di bawah TILE_MIN_FRAME_SIDE diinferensi seperti biasa.
+    """
+
+    def __init__(self, zones=None, name=None, tile_size=None, overlap=None, full_frame_pass=None, cache=None):
+        self.zones = zones or []
+        self.name = name
+        self.tile_size = int(tile_size or config.TILE_SIZE)
+        self.overlap = config.TILE_OVERLAP if overlap is None else overlap
+        self.full_frame_pass = config.TILE_FULL_FRAME_PASS if full_frame_pass is None else full_frame_pass
+        self.cache = config.TILE_CACHE_ENABLED if cache is None else cache
+        self.refresh_interval = config.TILE_REFRESH_INTERVAL
+        self.frames = 0
+        self.tiles_inferred = 0
+        self.tiles_reused = 0
+        self._lock = threading.Lock()
+        self._reset(None)
+        labels = {"camera": name} if name is not None else {}
+        metrics.register_counter("objsec_tiles_inferred_total", lambda: self.tiles_inferred, "Tile yang diinferensi model", **labels)
+        metrics.register_counter("objsec_tiles_reused_total", lambda: self.tiles_reused, "Tile yang memakai hasil deteksi sebelumnya karena tidak berubah", **labels)
+
+    def _reset(self, frame_shape):
+        # Dipanggil dengan self._lock dipegang (atau dari __init__)
+        self._frame_shape = frame_shape
+        self._grid = None
+        self._active = None # Tile yang menyentuh zona (semua tile jika tanpa zona)
+        self._tile_detections = None # Deteksi per tile (koordinat frame), None = belum pernah diinferensi
+        self._tile_references = None # Frame kecil grayscale per tile saat terakhir diinferensi
+        self._tile_times = None
+        self._full_detections = utils.empty_detections()
+        self._small_scale = 1.0
+        if frame_shape is None:
+            return
+        self._grid = tile_grid(frame_shape[:2], self.tile_size, self.overlap)
+        if self.zones:
+            zone_boxes = np.array([zone.crop_box(frame_shape) for zone in self.zones])
+            self._active = ((self._grid[:, None, 0] < zone_boxes[None, :, 2]) & (self._grid[:, None, 2] > zone_boxes[None, :, 0])
+                            & (self._grid[:, None, 1] < zone_boxes[None, :, 3]) & (self._grid[:, None, 3] > zone_boxes[None, :, 1])).any(axis=1)
+        else:
+            self._active = np.ones(len(self._grid), dtype=bool)
+        self._tile_detections = [None] * len(self._grid)
+        self._tile_references = [None] * len(self._grid)
+        self._tile_times = np.full(len(self._grid), -np.inf)
+        self._small_scale = min(1.0, config.TILE_CHANGE_DOWNSCALE_WIDTH / float(frame_shape[1]))
+
+    def uses_tiles(self, frame):
+        return frame is not None and max(frame.shape[:2]) >= max(self.tile_size, config.TILE_MIN_FRAME_SIDE)
+
+    def _small_gray(self, frame):
+        small = frame
+        if self._small_scale < 1.0:
+            height, width = frame.shape[:2]
+            small = cv2.resize(frame, (max(1, int(width * self._small_scale)), max(1, int(height * self._small_scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0) # Meredam noise sensor agar tidak dianggap perubahan
+
+    def _small_box(self, tile_index):
+        x1, y1, x2, y2 = self._grid[tile_index]
+        s = self._small_scale
+        return int(x1 * s), int(y1 * s), max(int(x1 * s) + 1, int(np.ceil(x2 * s))), max(int(y1 * s) + 1, int(np.ceil(y2 * s)))
+
+    def _tile_changed(self, small, tile_index):
+        reference = self._tile_references[tile_index]
+        if reference is None:
+            return True
+        x1, y1, x2, y2 = self._small_box(tile_index)
+        diff = cv2.absdiff(small[y1:y2, x1:x2], reference)
+        return np.count_nonzero(diff > config.MOTION_PIXEL_THRESHOLD) >= config.TILE_CHANGE_MIN_RATIO * diff.size
+
+    def plan(self, frame, timestamp=None, refresh=False):
+        """Memilih tile yang perlu diinferensi dan menyiapkan inputnya. `refresh=True` mengabaikan cache."""
+        timestamp = time.time() if timestamp is None else timestamp
+        frame, _ = preprocess.prepare(frame) # BGR 3 channel, tanpa resize; None jika frame kosong
+        if frame is None:
+            return TilePlan(None, timestamp)
+        with self._lock:
+            if self._frame_shape != frame.shape:
+                self._reset(frame.shape)
+            small = self._small_gray(frame) if self.cache else None
+            tile_indices = []
+            for tile_index in np.flatnonzero(self._active):
+                stale = self._tile_detections[tile_index] is None or timestamp - self._tile_times[tile_index] >= self.refresh_interval
+                if refresh or not self.cache or stale or self._tile_changed(small, tile_index):
+                    tile_indices.append(int(tile_index))
+            grid = self._grid
+        inputs = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in grid[tile_indices]]
+        full_scale = None
+        if self.full_frame_pass and tile_indices:
+            # Frame penuh ikut diinferensi ulang setiap kali ada tile yang diinferensi ulang
+            full_frame, full_scale = preprocess.prepare(frame, self.tile_size)
+            inputs.append(full_frame)
+        return TilePlan(frame.shape, timestamp, grid, tile_indices, inputs, full_scale, small)
+
+    def finish(self, plan, outputs):
+        """Menyimpan keluaran model untuk tile yang diinferensi, lalu menggabungkan semua tile: (deteksi, dict zona -> deteksi atau None)."""
+        if plan.frame_shape is None:
+            detections = utils.empty_detections()
+            return (detections, {zone.name: detections for zone in self.zones}) if self.zones else (detections, None)
+        fresh = []
+        for tile_index, output in zip(plan.tile_indices, outputs):
+            x1, y1 = plan.grid[tile_index][:2]
+            fresh.append(offset_detections(utils.to_detection_array(output), x1, y1))
+        with self._lock:
+            if self._grid is plan.grid: # Ukuran frame tidak berganti selama inferensi
+                for tile_index, detections in zip(plan.tile_indices, fresh):
+                    self._tile_detections[tile_index] = detections
+                    self._tile_times[tile_index] = plan.timestamp
+                    if plan.small is not None:
+                        x1, y1, x2, y2 = self._small_box(tile_index)
+                        self._tile_references[tile_index] = plan.small[y1:y2, x1:x2].copy()
+                if plan.full_scale is not None:
+                    self._full_detections = utils.to_detection_array(outputs[len(plan.tile_indices)], plan.full_scale)
+                tile_detections = [detections for detections, active in zip(self._tile_detections, self._active) if active and detections is not None]
+                full_detections = self._full_detections
+            else:
+                tile_detections = fresh
+                full_detections = utils.to_detection_array(outputs[len(plan.tile_indices)], plan.full_scale) if plan.full_scale is not None else utils.empty_detections()
+            self.frames += 1
+            self.tiles_inferred += len(plan.tile_indices)
+            self.tiles_reused += int(self._active.sum()) - len(plan.tile_indices) if self._active is not None else 0
+
+        with metrics.stage_timer("tile_merge"):
+            detections = nms(np.concatenate(tile_detections + [full_detections]))
+        if self.zones:
+            return split_by_zones(detections, self.zones, plan.frame_shape)
+        return detections, None
+
+    def detect(self, frame, timestamp=None, yolo_model=None, refresh=False):
+        """Versi satu frame dari detect_tiled_batch: (deteksi, dict zona -> deteksi atau None)."""
+        return detect_tiled_batch([self], [frame], [timestamp], yolo_model, refresh)[0]
+
+    def stats(self):
+        total = self.tiles_inferred + self.tiles_reused
+        return {
+            "frames": self.frames,
+            "tiles": len(self._grid) if self._grid is not None else 0,
+            "tiles_inferred": self.tiles_inferred,
+            "tiles_reused": self.tiles_reused,
+            "reuse_ratio": round(self.tiles_reused / total, 3) if total else 0.0,
+        }
+
+
+def detect_tiled_batch(detectors, frames, timestamps=None, yolo_model=None, refresh=False):
+    """
+    Deteksi ber-tile untuk beberapa frame (satu TiledDetector per kamera) dalam satu panggilan
+    model: tile semua kamera beserta frame penuhnya diinferensi dengan imgsz = TILE_SIZE.
+    Frame yang terlalu kecil untuk tile diinferensi seperti biasa (zones.detect_in_zones_batch).
+    Mengembalikan list (deteksi, dict nama zona -> deteksi atau None) dengan urutan `frames`.
+    Jika model gagal, utils.InferenceError dilempar dan cache tile tidak diubah (frame dilewati pemanggil).
+    """
+    timestamps = timestamps or [None] * len(frames)
+    results = [None] * len(frames)
+    plans = {}
+    regular_indices = []
+    with metrics.stage_timer("preprocess"):
+        for i, (detector, frame, timestamp) in enumerate(zip(detectors, frames, timestamps)):
+            if detector.uses_tiles(frame):
+                plans[i] = detector.plan(frame, timestamp, refresh)
+            else:
+                regular_indices.append(i)
+
+    if regular_indices:
+        regular = zones_module.detect_in_zones_batch([frames[i] for i in regular_indices], [detectors[i].zones for i in regular_indices], yolo_model)
+        for i, output in zip(regular_indices, regular):
+            results[i] = output
+
+    inputs = [model_input for plan in plans.values() for model_input in plan.inputs]
+    outputs = []
+    if inputs:
+        tile_size = detectors[next(iter(plans))].tile_size
+        try:
+            outputs = utils.run_model(inputs, yolo_model, imgsz=tile_size)
+        except Exception as e:
+            raise utils.InferenceError(f"Error saat menjalankan model YOLO pada tile: {e}") from e
+    position = 0
+    for i, plan in plans.items():
+        results[i] = detectors[i].finish(plan, outputs[position:position + len(plan.inputs)])
+        position += len(plan.inputs)
+    return results
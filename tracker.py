@@ -0,0 +1,274 @@
+import numpy as np
+import config
+
+# --- Pelacak Multi-Objek (IoU + Centroid, gaya SORT) ---
+# Setiap objek mendapat ID tetap selama masih terlihat. Track disimpan sebagai array
+# NumPy paralel sehingga pencocokan 100+ track tetap murah. Di antara dua inferensi
+# (atau saat satu deteksi berkedip hilang) track "coasting": posisinya diprediksi dari
+# kecepatan terakhir dan tidak langsung dihapus.
+
+TRACK_DTYPE = np.dtype([
+    ('track_id', np.int64),
+    ('class_id', np.int16),
+    ('x1', np.float32), ('y1', np.float32), ('x2', np.float32), ('y2', np.float32),
+    ('conf', np.float32),
+    ('hits', np.int32),
+    ('time_since_update', np.float32),
+])
+
+EVENT_MOVED = "moved"
+EVENT_REMOVED = "removed"
+EVENT_ADDED = "added"
+
+
+def detection_boxes(detections):
+    """Array DETECTION_DTYPE / TRACK_DTYPE -> box xyxy float32 (N x 4)."""
+    return np.stack((detections['x1'], detections['y1'], detections['x2'], detections['y2']), axis=1).astype(np.float32)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Matriks IoU antara dua kumpulan box xyxy."""
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def center_distance_matrix(boxes_a, boxes_b):
+    """Jarak titik tengah, dinormalisasi dengan diagonal box pertama (baris)."""
+    centers_a = (boxes_a[:, :2] + boxes_a[:, 2:]) / 2
+    centers_b = (boxes_b[:, :2] + boxes_b[:, 2:]) / 2
+    diagonals = np.maximum(np.hypot(boxes_a[:, 2] - boxes_a[:, 0], boxes_a[:, 3] - boxes_a[:, 1]), 1.0)
+    return np.linalg.norm(centers_a[:, None, :] - centers_b[None, :, :], axis=2) / diagonals[:, None]
+
+
+def greedy_match(scores, threshold):
+    """
+    Pencocokan serakah: pasangan dengan skor tertinggi (>= threshold) dipilih lebih dulu,
+    setiap baris dan kolom paling banyak satu kali. Mengembalikan (baris, kolom).
+    """
+    rows, cols = np.nonzero(scores >= threshold)
+    if not len(rows):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    order = np.argsort(-scores[rows, cols], kind='stable')
+    used_rows = np.zeros(scores.shape[0], dtype=bool)
+    used_cols = np.zeros(scores.shape[1], dtype=bool)
+    matched_rows, matched_cols = [], []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if used_rows[row] or used_cols[col]:
+            continue
+        used_rows[row] = used_cols[col] = True
+        matched_rows.append(row)
+        matched_cols.append(col)
+    return np.array(matched_rows, dtype=np.int64), np.array(matched_cols, dtype=np.int64)
+
+
+class Tracker:
+    """
+    Pelacak berbasis IoU dengan cadangan jarak titik tengah.
+    - Track baru dianggap pasti (confirmed) setelah `min_hits` kali terdeteksi, jadi deteksi
+      palsu satu frame tidak menjadi objek.
+    - Track yang tidak terdeteksi tetap hidup (coasting) maksimal `max_coast_seconds`.
+    """
+
+    def __init__(self, iou_threshold=None, max_center_distance=None, min_hits=None, max_coast_seconds=None, velocity_smoothing=0.3):
+        self.iou_threshold = iou_threshold if iou_threshold is not None else config.TRACKER_IOU_THRESHOLD
+        self.max_center_distance = max_center_distance if max_center_distance is not None else config.TRACKER_MAX_CENTER_DISTANCE
+        self.min_hits = min_hits if min_hits is not None else config.TRACKER_MIN_HITS
+        self.max_coast_seconds = max_coast_seconds if max_coast_seconds is not None else config.TRACKER_MAX_COAST_SECONDS
+        self.velocity_smoothing = velocity_smoothing
+        self.next_id = 1
+        self._reset_arrays()
+
+    def _reset_arrays(self):
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._class_ids = np.zeros(0, dtype=np.int16)
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._velocities = np.zeros((0, 4), dtype=np.float32) # Piksel per detik untuk setiap koordinat box
+        self._conf = np.zeros(0, dtype=np.float32)
+        self._hits = np.zeros(0, dtype=np.int32)
+        self._last_update = np.zeros(0, dtype=np.float64)
+
+    def reset(self):
+        self._reset_arrays()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _predicted_boxes(self, timestamp):
+        elapsed = np.clip(timestamp - self._last_update, 0, self.max_coast_seconds).astype(np.float32)
+        return self._boxes + self._velocities * elapsed[:, None]
+
+    def update(self, detections, timestamp):
+        """
+        Memperbarui track dengan deteksi satu frame (array DETECTION_DTYPE) pada waktu capture
+        `timestamp`. Mengembalikan track yang sudah pasti (array TRACK_DTYPE).
+        """
+        det_boxes = detection_boxes(detections)
+        det_classes = detections['class_id']
+        predicted = self._predicted_boxes(timestamp)
+
+        track_indices = np.zeros(0, dtype=np.int64)
+        det_indices = np.zeros(0, dtype=np.int64)
+        if len(predicted) and len(det_boxes):
+            same_class = self._class_ids[:, None] == det_classes[None, :]
+            iou = np.where(same_class, iou_matrix(predicted, det_boxes), 0.0)
+            track_indices, det_indices = greedy_match(iou, self.iou_threshold)
+
+            # Tahap kedua: objek kecil/cepat yang box-nya tidak lagi bertumpuk dicocokkan dengan jarak titik tengah
+            free_tracks = np.setdiff1d(np.arange(len(predicted)), track_indices)
+            free_dets = np.setdiff1d(np.arange(len(det_boxes)), det_indices)
+            if len(free_tracks) and len(free_dets):
+                distance = center_distance_matrix(predicted[free_tracks], det_boxes[free_dets])
+                closeness = np.where(same_class[np.ix_(free_tracks, free_dets)], -distance, -np.inf)
+                extra_tracks, extra_dets = greedy_match(closeness, -self.max_center_distance)
+                track_indices = np.concatenate((track_indices, free_tracks[extra_tracks]))
+                det_indices = np.concatenate((det_indices, free_dets[extra_dets]))
+
+        # Track yang cocok: perbarui posisi dan kecepatan (dihaluskan agar jitter deteksi tidak menggeser prediksi)
+        if len(track_indices):
+            elapsed = np.maximum(timestamp - self._last_update[track_indices], 1e-3).astype(np.float32)
+            new_velocity = (det_boxes[det_indices] - self._boxes[track_indices]) / elapsed[:, None]
+            alpha = self.velocity_smoothing
+            self._velocities[track_indices] = alpha * new_velocity + (1 - alpha) * self._velocities[track_indices]
+            self._boxes[track_indices] = det_boxes[det_indices]
+            self._conf[track_indices] = detections['conf'][det_indices]
+            self._hits[track_indices] += 1
+            self._last_update[track_indices] = timestamp
+
+        # Hapus track yang terlalu lama tidak terdeteksi, dan track belum pasti yang langsung hilang
+        matched = np.zeros(len(self._ids), dtype=bool)
+        matched[track_indices] = True
+        expired = (timestamp - self._last_update) > self.max_coast_seconds
+        unconfirmed_missed = ~matched & (self._hits < self.min_hits)
+        keep = ~(expired | unconfirmed_missed)
+        if not keep.all():
+            self._ids, self._class_ids, self._boxes = self._ids[keep], self._class_ids[keep], self._boxes[keep]
+            self._velocities, self._conf = self._velocities[keep], self._conf[keep]
+            self._hits, self._last_update = self._hits[keep], self._last_update[keep]
+
+        # Deteksi tanpa pasangan menjadi track baru
+        new_dets = np.setdiff1d(np.arange(len(det_boxes)), det_indices)
+        if len(new_dets):
+            count = len(new_dets)
+            self._ids = np.concatenate((self._ids, np.arange(self.next_id, self.next_id + count, dtype=np.int64)))
+            self.next_id += count
+            self._class_ids = np.concatenate((self._class_ids, det_classes[new_dets].astype(np.int16)))
+            self._boxes = np.concatenate((self._boxes, det_boxes[new_dets]))
+            self._velocities = np.concatenate((self._velocities, np.zeros((count, 4), dtype=np.float32)))
+            self._conf = np.concatenate((self._conf, detections['conf'][new_dets]))
+            self._hits = np.concatenate((self._hits, np.ones(count, dtype=np.int32)))
+            self._last_update = np.concatenate((self._last_update, np.full(count, timestamp, dtype=np.float64)))
+
+        return self.tracks(timestamp)
+
+    def tracks(self, timestamp=None, include_unconfirmed=False):
+        """
+        Track saat ini sebagai array TRACK_DTYPE. Jika `timestamp` diberikan, posisi
+        track yang sedang coasting diprediksi ke waktu tersebut.
+        """
+        selected = np.ones(len(self._ids), dtype=bool) if include_unconfirmed else self._hits >= self.min_hits
+        boxes = self._boxes if timestamp is None else self._predicted_boxes(timestamp)
+        tracks = np.empty(int(selected.sum()), dtype=TRACK_DTYPE)
+        tracks['track_id'] = self._ids[selected]
+        tracks['class_id'] = self._class_ids[selected]
+        tracks['x1'], tracks['y1'], tracks['x2'], tracks['y2'] = boxes[selected].T
+        tracks['conf'] = self._conf[selected]
+        tracks['hits'] = self._hits[selected]
+        reference_time = timestamp if timestamp is not None else (self._last_update.max() if len(self._last_update) else 0.0)
+        tracks['time_since_update'] = np.maximum(reference_time - self._last_update[selected], 0)
+        return tracks
+
+
+# --- Baseline Berbasis Objek yang Dilacak ---
+class TrackedBaseline:
+    """
+    Baseline sebagai daftar objek (kelas + posisi box). Setiap objek baseline diikat ke
+    ID track yang cocok; ikatan ini dipakai untuk mendeteksi objek yang dipindah,
+    hilang, atau muncul per ID, bukan hanya perubahan jumlah per kelas.
+    """
+
+    def __init__(self, class_ids, boxes, move_threshold=None, rebind_iou=None):
+        self.class_ids = np.asarray(class_ids, dtype=np.int16)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.move_threshold = move_threshold if move_threshold is not None else config.TRACKER_MOVE_THRESHOLD
+        self.rebind_iou = rebind_iou if rebind_iou is not None else config.TRACKER_REBIND_IOU
+        self.bound_track_ids = np.zeros(len(self.class_ids), dtype=np.int64) # 0 = belum terikat ke track
+
+    @classmethod
+    def from_detections(cls, detections):
+        return cls(detections['class_id'], detection_boxes(detections))
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def to_json(self, class_names):
+        return {"objects": [
+            {"class": class_names[int(class_id)], "class_id": int(class_id), "bbox": [round(float(v), 1) for v in box]}
+            for class_id, box in zip(self.class_ids, self.boxes)
+        ]}
+
+    @classmethod
+    def from_json(cls, data):
+        objects = data.get("objects", [])
+        return cls([obj["class_id"] for obj in objects], [obj["bbox"] for obj in objects])
+
+    def compare(self, tracks):
+        """
+        Membandingkan baseline dengan track yang sudah pasti (array TRACK_DTYPE).
+        Mengembalikan list event dict: type (moved/removed/added), class_id, track_id,
+        baseline_index (urutan objek di baseline), bbox, dan baseline_bbox.
+        """
+        track_boxes = detection_boxes(tracks)
+        track_ids = tracks['track_id']
+
+        # Lepaskan ikatan ke track yang sudah tidak ada
+        alive = np.isin(self.bound_track_ids, track_ids)
+        self.bound_track_ids[~alive] = 0
+
+        # Ikat objek baseline yang belum terikat ke track yang belum terikat di posisi yang sama
+        free_objects = np.flatnonzero(self.bound_track_ids == 0)
+        free_tracks = np.flatnonzero(~np.isin(track_ids, self.bound_track_ids))
+        if len(free_objects) and len(free_tracks):
+            same_class = self.class_ids[free_objects][:, None] == tracks['class_id'][free_tracks][None, :]
+            iou = np.where(same_class, iou_matrix(self.boxes[free_objects], track_boxes[free_tracks]), 0.0)
+            object_indices, track_indices = greedy_match(iou, self.rebind_iou)
+            self.bound_track_ids[free_objects[object_indices]] = track_ids[free_tracks[track_indices]]
+
+        events = []
+        track_index_by_id = {int(track_id): i for i, track_id in enumerate(track_ids.tolist())}
+        for i in range(len(self)):
+            bound_id = int(self.bound_track_ids[i])
+            if bound_id == 0:
+                events.append({"type": EVENT_REMOVED, "class_id": int(self.class_ids[i]), "track_id": None, "baseline_index": i,
+                               "bbox": None, "baseline_bbox": self.boxes[i].round(1).tolist()})
+                continue
+            track_box = track_boxes[track_index_by_id[bound_id]]
+            if center_distance_matrix(self.boxes[i:i + 1], track_box[None, :])[0, 0] > self.move_threshold:
+                events.append({"type": EVENT_MOVED, "class_id": int(self.class_ids[i]), "track_id": bound_id, "baseline_index": i,
+                               "bbox": track_box.round(1).tolist(), "baseline_bbox": self.boxes[i].round(1).tolist()})
+
+        for i in np.flatnonzero(~np.isin(track_ids, self.bound_track_ids)).tolist():
+            events.append({"type": EVENT_ADDED, "class_id": int(tracks['class_id'][i]), "track_id": int(track_ids[i]), "baseline_index": None,
+                           "bbox": track_boxes[i].round(1).tolist(), "baseline_bbox": None})
+        return events
+
+
+def describe_events(events, class_names):
+    """
+    Event track -> teks detail perubahan, misal 'laptop #4 dipindah', 'cup #7 muncul'.
+    Objek yang hilang tidak punya track lagi, jadi memakai nomor urut baseline ('cup baseline-2 hilang').
+    """
+    words = {EVENT_REMOVED: "hilang", EVENT_ADDED: "muncul", EVENT_MOVED: "dipindah"}
+    details = []
+    for event in events:
+        if event["track_id"] is not None:
+            label = f"#{event['track_id']}"
+        else:
+            label = f"baseline-{event['baseline_index'] + 1}"
+        details.append(f"{class_names[event['class_id']]} {label} {words[event['type']]}")
+    return details
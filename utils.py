@@ -1,117 +1,391 @@
+import atexit
+import contextlib
 import json
-import datetime
 import os
 import cv2
 import time
 from collections import Counter
-from ultralytics import YOLO
 import threading
-import pygame.mixer
 import numpy as np
 import config
+import inference_backend
+import activity_log
+import event_store
+import screenshot_writer
+import tracker
+import metrics
+import preprocess
 
-# --- Inisialisasi Model YOLO ---
-try:
-    model = YOLO(config.YOLO_MODEL_PATH)
-    coco_classes = model.names
-except Exception as e:
-    print(f"FATAL ERROR: Gagal memuat model YOLO dari {config.YOLO_MODEL_PATH}. Pastikan file ada dan tidak rusak. Error: {e}")
-    exit()
+# --- Inisialisasi Model YOLO (Lazy) ---
+# Model tidak dimuat saat modul diimport: alat yang hanya butuh count_objects/load_initial_state
+# tidak membayar biaya memuat PyTorch dan bobot model. Model dimuat saat pertama dipakai
+# (get_model), atau lebih awal lewat ModelWarmup yang berjalan paralel dengan pembukaan kamera.
+def load_model():
+    """
+    Memuat instance model YOLO baru dengan backend dari config.INFERENCE_BACKEND.
+    Dipakai untuk model global dan untuk worker inferensi tambahan yang membutuhkan model sendiri.
+    Dalam mode klien (config.INFERENCE_SERVER_ENABLED) model tidak dimuat di proses ini: yang
+    dikembalikan adalah klien server inferensi dengan `names` dan `predict()` yang sama.
+    """
+    if config.INFERENCE_SERVER_ENABLED:
+        import inference_server
+        return inference_server.InferenceClient()
+    return inference_backend.load_backend()
+
+_model = None
+_class_names = None
+_model_init_lock = threading.Lock()
+
+def get_model():
+    """Model global, dimuat saat pertama kali dibutuhkan. Melempar RuntimeError jika model gagal dimuat."""
+    global _model, _class_names
+    if _model is None:
+        with _model_init_lock:
+            if _model is None:
+                try:
+                    loaded = load_model()
+                except Exception as e:
+                    if config.INFERENCE_SERVER_ENABLED:
+                        raise RuntimeError(f"Gagal tersambung ke server inferensi di {config.INFERENCE_SERVER_ADDRESS}. Jalankan: python inference_server.py. Error: {e}") from e
+                    raise RuntimeError(f"Gagal memuat model YOLO (backend {config.INFERENCE_BACKEND}) dari {inference_backend.backend_model_path(config.INFERENCE_BACKEND)}. Pastikan file ada dan tidak rusak. Error: {e}") from e
+                _class_names = loaded.names
+                _model = loaded
+    return _model
+
+def get_class_names():
+    """Nama kelas {id: nama}. Diambil dari cache di disk jika ada, sehingga model tidak perlu dimuat."""
+    global _class_names
+    if _class_names is None:
+        names = inference_backend.cached_class_names()
+        _class_names = names if names is not None else get_model().names
+    return _class_names
 
-# --- Inisialisasi Pygame Mixer ---
-try:
-    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-except Exception as e:
-    print(f"Peringatan: Gagal menginisialisasi pygame.mixer: {e}. Alarm suara mungkin tidak berfungsi.")
+def __getattr__(name):
+    # Kompatibilitas: utils.model dan utils.coco_classes tetap bisa dipakai, dimuat saat pertama diakses
+    if name == "model":
+        return get_model()
+    if name == "coco_classes":
+        return get_class_names()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up_model(frame_shape=(480, 640, 3)):
+    """
+    Memuat model dan menjalankan satu inferensi pada frame dummy abu-abu, sehingga biaya panggilan
+    pertama (import lazy torchvision/runtime, alokasi buffer, fuse) tidak jatuh ke frame kamera pertama.
+    """
+    imgsz = preprocess.current_imgsz()
+    dummy_frame, _ = preprocess.prepare(np.full(frame_shape, 114, dtype=np.uint8), imgsz) # Bentuk input sama dengan frame kamera
+    shared_model = get_model()
+    with model_lock: # Tanpa stage_timer: warm-up tidak ikut histogram tahap "model"
+        shared_model.predict([dummy_frame], config.CONFIDENCE_THRESHOLD, config.CLASSES_TO_TRACK_IDS, imgsz)
+
+class ModelWarmup:
+    """
+    Memuat model (dan warm-up jika config.MODEL_WARMUP_ENABLED) serta pygame.mixer di thread latar,
+    selagi thread utama membuka kamera. wait() menunggu selesai dan melempar ulang error pemuatan model.
+    """
+
+    def __init__(self, warm_up=None, audio=True):
+        self.warm_up = config.MODEL_WARMUP_ENABLED if warm_up is None else warm_up
+        self.audio = audio
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="model_warmup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            start_time = time.perf_counter()
+            get_model()
+            self.load_seconds = time.perf_counter() - start_time
+            if self.warm_up:
+                start_time = time.perf_counter()
+                warm_up_model()
+                self.warmup_seconds = time.perf_counter() - start_time
+        except Exception as e:
+            self.error = e
+        if self.audio:
+            init_audio()
+
+    def wait(self):
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self
+
+# Model global dipakai bersama oleh beberapa thread, pemanggilannya harus bergantian
+model_lock = threading.Lock()
 
 # --- Variabel Global untuk Alarm ---
 stop_alarm_event = threading.Event()
 alarm_thread = None
 
 # --- Fungsi Deteksi dan Penghitungan Objek ---
-def detect_objects(frame):
-    if frame is None or frame.size == 0 or np.all(frame == 0):
-        return []
-
-    if isinstance(frame, cv2.UMat):
-        frame = frame.get()
-
-    if len(frame.shape) == 2:
-        frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
-    elif frame.shape[2] == 4:
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
-    
+class InferenceError(RuntimeError):
+    """
+    Model gagal dijalankan. Berbeda dengan frame tanpa objek: pemanggil melewati frame ini
+    (tidak menyimpan hasil kosong sebagai deteksi terakhir) agar tidak memicu alarm "objek hilang".
+    """
+
+def prepare_frame(frame):
+    """
+    Menyiapkan frame untuk model (BGR 3 channel) tanpa mengubah ukuran.
+    Mengembalikan None jika frame kosong atau seluruhnya hitam.
+    """
+    return preprocess.prepare(frame)[0]
+
+# Array deteksi ringkas: satu baris per objek, tanpa dict per box
+DETECTION_DTYPE = np.dtype([
+    ('class_id', np.int16),
+    ('x1', np.int32), ('y1', np.int32), ('x2', np.int32), ('y2', np.int32),
+    ('conf', np.float32),
+])
+
+def empty_detections():
+    return np.zeros(0, dtype=DETECTION_DTYPE)
+
+def to_detection_array(output, scale=None):
+    """
+    Mengubah keluaran satu frame dari backend inferensi (xyxy, conf, cls)
+    menjadi array terstruktur DETECTION_DTYPE, hanya untuk kelas yang dilacak.
+    `scale` (skala x, skala y) dari preprocess.prepare memetakan kotak kembali ke frame asli.
+    """
+    xyxy, confidences, class_ids = output
+    keep = np.isin(class_ids, config.CLASSES_TO_TRACK_IDS)
+    detections = np.empty(int(keep.sum()), dtype=DETECTION_DTYPE)
+    detections['class_id'] = class_ids[keep]
+    xyxy = xyxy[keep]
+    if scale is not None and scale != (1.0, 1.0):
+        xyxy = xyxy / np.array([scale[0], scale[1], scale[0], scale[1]], dtype=np.float32)
+    boxes = xyxy.astype(np.int32)
+    detections['x1'], detections['y1'], detections['x2'], detections['y2'] = boxes.T
+    detections['conf'] = confidences[keep]
+    return detections
+
+def detections_to_list(detections):
+    """Tampilan kompatibilitas: array deteksi -> list dict {'class', 'bbox'} seperti format lama."""
+    class_ids = detections['class_id'].tolist()
+    boxes = np.stack((detections['x1'], detections['y1'], detections['x2'], detections['y2']), axis=1).tolist()
+    class_names = get_class_names()
+    return [{'class': class_names[class_id], 'bbox': box} for class_id, box in zip(class_ids, boxes)]
+
+def run_model(frames, yolo_model=None, imgsz=None, adaptive=False):
+    """
+    Menjalankan backend inferensi pada list frame (satu panggilan batch).
+    Filter kelas (config.CLASSES_TO_TRACK_IDS) diteruskan ke model.
+    `imgsz` mengganti ukuran input model (misal lebih kecil untuk crop zona).
+    `adaptive=True` untuk inferensi frame penuh: latensi dicatat ke pengendali imgsz adaptif.
+    Jika `yolo_model` tidak diberikan, model global dipakai (dengan lock agar aman dipanggil dari beberapa thread).
+    """
+    if yolo_model is None:
+        yolo_model = get_model()
+        lock = model_lock
+    else:
+        lock = contextlib.nullcontext()
+    with lock: # Waktu menunggu lock tidak ikut dihitung
+        model_start = time.perf_counter()
+        outputs = yolo_model.predict(frames, config.CONFIDENCE_THRESHOLD, config.CLASSES_TO_TRACK_IDS, imgsz)
+        model_seconds = time.perf_counter() - model_start
+    metrics.observe_stage("model", model_seconds)
+    if adaptive:
+        preprocess.observe_latency(imgsz, model_seconds)
+    return outputs
+
+def detect_objects_array(frame, yolo_model=None):
+    """
+    Mendeteksi objek yang dilacak pada frame dan mengembalikan array DETECTION_DTYPE.
+    Frame diperkecil ke imgsz saat ini sebelum inferensi; kotak dikembalikan dalam koordinat frame asli.
+    Jika `yolo_model` tidak diberikan, model global dipakai (dengan lock agar aman dipanggil dari beberapa thread).
+    Melempar InferenceError jika model gagal.
+    """
+    imgsz = preprocess.current_imgsz()
+    with metrics.stage_timer("preprocess"):
+        model_frame, scale = preprocess.prepare(frame, imgsz)
+    if model_frame is None:
+        return empty_detections()
+
     try:
-        results = model(frame, conf=config.CONFIDENCE_THRESHOLD, verbose=False, device='cpu')
+        outputs = run_model([model_frame], yolo_model, imgsz, adaptive=True)
     except Exception as e:
-        print(f"Error saat menjalankan model YOLO pada frame: {e}. Mungkin masalah dengan input frame atau model.")
-        return []
-    
-    detections = []
-    for r in results:
-        if r.boxes:
-            for box in r.boxes:
-                if box.cls.numel() > 0:
-                    class_id = int(box.cls[0])
-                    class_name = coco_classes[class_id]
-                    
-                    if class_id in config.CLASSES_TO_TRACK_IDS:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        detections.append({'class': class_name, 'bbox': [x1, y1, x2, y2]})
-    return detections
+        raise InferenceError(f"Error saat menjalankan model YOLO pada frame: {e}. Mungkin masalah dengan input frame atau model") from e
+    return to_detection_array(outputs[0], scale)
+
+def detect_objects(frame, yolo_model=None):
+    """
+    Mendeteksi objek yang dilacak pada frame, dalam format list dict {'class', 'bbox'}.
+    """
+    return detections_to_list(detect_objects_array(frame, yolo_model))
+
+def detect_objects_batch(frames, yolo_model=None):
+    """
+    Mendeteksi objek pada beberapa frame (misal dari beberapa kamera) dalam satu panggilan model.
+    Mengembalikan list array DETECTION_DTYPE dengan urutan yang sama seperti `frames`.
+    Melempar InferenceError jika model gagal (semua frame batch dilewati).
+    """
+    imgsz = preprocess.current_imgsz()
+    with metrics.stage_timer("preprocess"):
+        prepared = [preprocess.prepare(frame, imgsz) for frame in frames]
+    valid_indices = [i for i, (frame, _) in enumerate(prepared) if frame is not None]
+    batch_detections = [empty_detections() for _ in frames]
+    if not valid_indices:
+        return batch_detections
+
+    try:
+        outputs = run_model([prepared[i][0] for i in valid_indices], yolo_model, imgsz, adaptive=True)
+    except Exception as e:
+        raise InferenceError(f"Error saat menjalankan model YOLO pada batch frame: {e}. Mungkin masalah dengan input frame atau model") from e
+
+    for i, output in zip(valid_indices, outputs):
+        batch_detections[i] = to_detection_array(output, prepared[i][1])
+    return batch_detections
+
+# --- Fungsi Menggambar Bounding Box dan Label ---
+def draw_detections(frame_to_draw, detections):
+    if isinstance(detections, np.ndarray):
+        detections = detections_to_list(detections)
+    for d in detections:
+        x1, y1, x2, y2 = d['bbox']
+        class_name = d['class']
+        cv2.rectangle(frame_to_draw, (x1, y1), (x2, y2), (0, 255, 0), 2)  # bounding box hijau objek
+        cv2.putText(frame_to_draw, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2) # label nama objek
+
+def draw_tracks(frame_to_draw, tracks):
+    """Menggambar track (array TRACK_DTYPE) dengan ID-nya. Track yang sedang coasting digambar kuning."""
+    for track in tracks:
+        x1, y1, x2, y2 = (int(v) for v in (track['x1'], track['y1'], track['x2'], track['y2']))
+        color = (0, 255, 0) if track['time_since_update'] < 0.5 else (0, 255, 255)
+        cv2.rectangle(frame_to_draw, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame_to_draw, f"{get_class_names()[int(track['class_id'])]} #{int(track['track_id'])}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
 # --- Fungsi Hitung Jumlah Objek ---
 def count_objects(detections):
+    """Menghitung jumlah objek per kelas. Menerima array DETECTION_DTYPE atau list dict."""
+    if isinstance(detections, np.ndarray):
+        class_names = get_class_names()
+        counts = np.bincount(detections['class_id'], minlength=len(class_names))
+        return {class_names[class_id]: int(counts[class_id]) for class_id in np.flatnonzero(counts)}
     counts = Counter(d['class'] for d in detections)
     return dict(counts)
 
+# --- Fungsi Perbandingan dengan Baseline ---
+def compare_with_baseline(initial_state, current_counts):
+    """
+    Membandingkan jumlah objek saat ini dengan baseline.
+    Mengembalikan daftar detail perubahan (kosong jika tidak ada perubahan).
+    """
+    change_details = []
+
+    # Cek objek yang HILANG
+    for obj_name, initial_count in initial_state.items():
+        current_count = current_counts.get(obj_name, 0)
+        if current_count < initial_count:
+            change_details.append(f"{obj_name} hilang ({initial_count} -> {current_count})")
+
+    # Cek objek yang MUNCUL
+    for obj_name, current_count in current_counts.items():
+        initial_count = initial_state.get(obj_name, 0)
+        if current_count > initial_count:
+            change_details.append(f"{obj_name} muncul ({initial_count} -> {current_count})")
+
+    return change_details
+
 # --- Fungsi Manajemen Status Awal (Baseline) ---
-def load_initial_state():
-    if os.path.exists(config.INITIAL_STATE_FILE):
-        with open(config.INITIAL_STATE_FILE, 'r') as f:
+# `state_file` dipakai mode multi-kamera (satu file baseline per kamera), default initial_state.json
+def load_initial_state(state_file=None):
+    state_file = state_file or config.INITIAL_STATE_FILE
+    if os.path.exists(state_file):
+        with open(state_file, 'r') as f:
             try:
                 return json.load(f)
             except json.JSONDecodeError:
-                print(f"Peringatan: File {config.INITIAL_STATE_FILE} kosong atau rusak. Memulai dengan state kosong.")
+                print(f"Peringatan: File {state_file} kosong atau rusak. Memulai dengan state kosong.")
                 return {}
     return {}
 
-def save_initial_state(state):
-    with open(config.INITIAL_STATE_FILE, 'w') as f:
-        json.dump(state, f, indent=4)
+def save_initial_state(state, state_file=None):
+    write_json_atomic(state_file or config.INITIAL_STATE_FILE, state)
+
+def write_json_atomic(path, data):
+    """Menulis JSON ke file sementara lalu os.replace: pembaca tidak pernah melihat file setengah tertulis."""
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def load_tracked_baseline(tracks_file=None):
+    """Memuat baseline objek yang dilacak (kelas + posisi). Mengembalikan None jika belum ada."""
+    tracks_file = tracks_file or config.INITIAL_TRACKS_FILE
+    if not os.path.exists(tracks_file):
+        return None
+    with open(tracks_file, 'r') as f:
+        try:
+            return tracker.TrackedBaseline.from_json(json.load(f))
+        except (json.JSONDecodeError, KeyError):
+            print(f"Peringatan: File {tracks_file} rusak. Baseline objek diabaikan.")
+            return None
 
 # --- Fungsi Logging Aktivitas ---
+activity_log_writer = None
+activity_log_writer_lock = threading.Lock()
+
+def get_activity_log_writer():
+    """Penulis log latar belakang, dibuat saat pertama kali dibutuhkan."""
+    global activity_log_writer
+    with activity_log_writer_lock:
+        if activity_log_writer is None:
+            store = event_store.EventStore() if config.EVENT_STORE_ENABLED else None
+            activity_log_writer = activity_log.ActivityLogWriter(event_store=store)
+            atexit.register(activity_log_writer.close)
+        return activity_log_writer
+
 def log_activity(log_data):
     """
-    Mencatat aktivitas ke dalam file log harian (YYYY-MM-DD.json).
+    Mencatat aktivitas ke dalam file log harian (YYYY-MM-DD.jsonl).
+    Entri hanya dimasukkan ke antrian, penulisan ke disk dilakukan thread latar belakang.
     """
-    today_str = datetime.datetime.now().strftime("%Y-%m-%d")
-    log_file_path = os.path.join(config.LOG_DIR, f"{today_str}.json")
-    
-    os.makedirs(config.LOG_DIR, exist_ok=True)
-    
-    logs = []
-    if os.path.exists(log_file_path):
-        with open(log_file_path, 'r') as f:
-            try:
-                logs = json.load(f)
-            except json.JSONDecodeError:
-                logs = []
+    with metrics.stage_timer("log_enqueue"):
+        get_activity_log_writer().write(log_data)
 
-    logs.append(log_data)
-    with open(log_file_path, 'w') as f:
-        json.dump(logs, f, indent=4)
+def close_activity_log():
+    """Menulis semua entri log yang tersisa ke disk (dipanggil saat sistem berhenti)."""
+    if activity_log_writer is not None:
+        activity_log_writer.close()
+
+# --- Inisialisasi Pygame Mixer (Lazy) ---
+mixer = None # Modul pygame.mixer setelah berhasil diinisialisasi
+_audio_init_attempted = False
+_audio_init_lock = threading.Lock()
+
+def init_audio():
+    """Mengimport dan menginisialisasi pygame.mixer sekali saja (saat warm-up atau alarm pertama). True jika siap."""
+    global mixer, _audio_init_attempted
+    with _audio_init_lock:
+        if not _audio_init_attempted:
+            _audio_init_attempted = True
+            try:
+                import pygame.mixer
+                pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+                mixer = pygame.mixer
+            except Exception as e:
+                print(f"Peringatan: Gagal menginisialisasi pygame.mixer: {e}. Alarm suara mungkin tidak berfungsi.")
+        return mixer is not None and mixer.get_init() is not None
 
 # --- Fungsi Alarm Suara ---
 def play_alarm_sound():
-    if not pygame.mixer.get_init():
+    if not init_audio():
         print("Error: pygame.mixer belum diinisialisasi. Tidak bisa memutar alarm.")
         stop_alarm_event.set()
         return
 
     try:
-        pygame.mixer.music.load(config.ALARM_SOUND_PATH)
-        pygame.mixer.music.play(loops=-1)
+        mixer.music.load(config.ALARM_SOUND_PATH)
+        mixer.music.play(loops=-1)
         print("Alarm mulai berbunyi (looping)...")
     except Exception as e:
         print(f"Error memutar alarm sound dengan pygame.mixer: {e}. Pastikan alarm.mp3 valid dan tidak rusak.")
@@ -132,8 +406,8 @@ def start_alarm():
 def stop_alarm():
     global alarm_thread
     if alarm_thread and alarm_thread.is_alive():
-        if pygame.mixer.get_init():
-            pygame.mixer.music.stop()
+        if mixer is not None and mixer.get_init():
+            mixer.music.stop()
             print("Alarm dihentikan.")
         else:
             print("Peringatan: pygame.mixer tidak diinisialisasi saat mencoba menghentikan alarm.")
@@ -142,48 +416,39 @@ def stop_alarm():
         alarm_thread = None
 
 # --- Fungsi Screen Capture ---
+screenshot_writer_instance = None
+screenshot_writer_lock = threading.Lock()
+
+def get_screenshot_writer():
+    """Pool penulis screenshot latar belakang, dibuat saat pertama kali dibutuhkan."""
+    global screenshot_writer_instance
+    with screenshot_writer_lock:
+        if screenshot_writer_instance is None:
+            screenshot_writer_instance = screenshot_writer.ScreenshotWriter()
+            atexit.register(screenshot_writer_instance.close)
+        return screenshot_writer_instance
+
 def capture_screen(frame_to_save, status_type, details):
     """
     Mengambil screenshot dari frame yang diberikan dan menyimpannya
-    ke dalam folder berdasarkan status (authorized/unauthorized).
-    """
-    # Menentukan direktori dasar tempat semua screenshot akan disimpan
-    base_capture_dir = "screenshots_rekaman" # Anda bisa ubah nama folder ini jika mau
-
-    # Menentukan sub-direktori berdasarkan status_type
-    # Ini akan menjadi "screenshots_rekaman/authorized" atau "screenshots_rekaman/unauthorized"
-    capture_dir = os.path.join(base_capture_dir, status_type)
-
-    # Memastikan direktori dan sub-direktori ada
-    if not os.path.exists(capture_dir):
-        os.makedirs(capture_dir)
-
-    timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Nama file sekarang tidak perlu menyertakan status_type karena sudah di foldernya
-    # Anda bisa tetap menyertakannya jika ingin informasi ganda
-    file_name = f"deteksi_{timestamp_str}.jpg" 
-    
-    file_path = os.path.join(capture_dir, file_name)
-
-    # Membuat salinan frame agar tidak memodifikasi frame asli
-    display_frame = frame_to_save.copy()
-
-    # --- Bagian cv2.putText yang sebelumnya Anda komentari untuk screenshot ---
-    # Pastikan bagian ini tetap dikomentari atau dihapus jika Anda tidak ingin teks di screenshot
-    # font = cv2.FONT_HERSHEY_SIMPLEX
-    # font_scale = 0.6
-    # font_thickness = 1
-    # text_color = (0, 255, 0) # Green
-
-    # cv2.putText(display_frame, f"Time: {timestamp_str}", (10, 30), font, font_scale, text_color, font_thickness, cv2.LINE_AA)
-    # cv2.putText(display_frame, f"Status: {status_type.upper()}", (10, 60), font, font_scale, text_color, font_thickness, cv2.LINE_AA)
-    # cv2.putText(display_frame, f"Details: {details}", (10, 90), font, font_scale, text_color, font_thickness, cv2.LINE_AA)
-    # --- Akhir bagian teks di screenshot ---
-
-    cv2.imwrite(file_path, display_frame)
-    print(f"Screenshot disimpan: {file_path}", flush=True)
-    return file_path
+    ke dalam folder berdasarkan status (authorized/unauthorized) di config.CHANGES_DIR.
+    Encode dan penulisan dilakukan di thread latar belakang; path akhir langsung dikembalikan.
+    Frame tidak disalin lagi, jadi jangan ubah frame setelah memanggil fungsi ini.
+    """
+    with metrics.stage_timer("screenshot_submit"):
+        return get_screenshot_writer().submit(frame_to_save, status_type)
+
+def close_screenshot_writer():
+    """Menyimpan semua screenshot yang masih di antrian (dipanggil saat sistem berhenti)."""
+    if screenshot_writer_instance is not None:
+        screenshot_writer_instance.close()
+
+# --- Metrik Antrian Log dan Screenshot ---
+metrics.register_gauge("objsec_log_queue_depth", lambda: activity_log_writer.queue_depth() if activity_log_writer is not None else 0, "Entri log yang menunggu ditulis")
+metrics.register_counter("objsec_log_entries_written_total", lambda: activity_log_writer.entries_written if activity_log_writer is not None else 0, "Entri log yang sudah ditulis ke disk")
+metrics.register_counter("objsec_log_entries_dropped_total", lambda: activity_log_writer.entries_dropped if activity_log_writer is not None else 0, "Entri log yang dibuang karena antrian penuh")
+metrics.register_gauge("objsec_screenshot_queue_depth", lambda: screenshot_writer_instance.queue_depth() if screenshot_writer_instance is not None else 0, "Screenshot yang menunggu ditulis")
+metrics.register_counter("objsec_screenshots_written_total", lambda: screenshot_writer_instance.written if screenshot_writer_instance is not None else 0, "Screenshot yang sudah ditulis")
 
 # --- Popup Notifikasi ---
 def show_popup_notification(title, message):
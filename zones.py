@@ -0,0 +1,250 @@
+import json
+import math
+import os
+import cv2
+import numpy as np
+import config
+import utils
+import preprocess
+import security_monitor
+import tracker
+from smoothing import CountSmoother
+
+# --- Zona Pemantauan (Region of Interest) ---
+# Zona didefinisikan di config.ZONES sebagai persegi ("rect") atau poligon ("polygon")
+# dalam koordinat piksel frame kamera. Hanya crop zona yang dikirim ke model (dalam satu
+# batch), dan setiap zona punya baseline, timer persistensi, dan detail perubahan sendiri.
+
+
+class Zone:
+    def __init__(self, name, points, camera=None, padding=None):
+        self.name = name
+        self.points = np.asarray(points, dtype=np.int32).reshape(-1, 2)
+        self.camera = camera
+        self.padding = padding if padding is not None else config.ZONE_CROP_PADDING
+        self._mask_cache = {} # ukuran frame -> (crop_box, mask poligon di koordinat crop)
+
+    @classmethod
+    def from_config(cls, zone_config):
+        if "rect" in zone_config:
+            x1, y1, x2, y2 = zone_config["rect"]
+            points = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        else:
+            points = zone_config["polygon"]
+        return cls(zone_config["name"], points, zone_config.get("camera"))
+
+    def crop_box(self, frame_shape):
+        """Persegi yang dikirim ke model: batas poligon + padding, dipotong ke ukuran frame."""
+        return self._geometry(frame_shape)[0]
+
+    def _geometry(self, frame_shape):
+        key = tuple(frame_shape[:2])
+        if key not in self._mask_cache:
+            height, width = key
+            x1, y1 = self.points.min(axis=0) - self.padding
+            x2, y2 = self.points.max(axis=0) + self.padding
+            box = (max(0, int(x1)), max(0, int(y1)), min(width, int(x2)), min(height, int(y2)))
+            mask = np.zeros((box[3] - box[1], box[2] - box[0]), dtype=np.uint8)
+            cv2.fillPoly(mask, [self.points - np.array(box[:2], dtype=np.int32)], 1)
+            self._mask_cache[key] = (box, mask.astype(bool))
+        return self._mask_cache[key]
+
+    def contains(self, points, frame_shape):
+        """Mask titik (N x 2, koordinat frame) yang berada di dalam poligon zona."""
+        box, mask = self._geometry(frame_shape)
+        if not len(points) or not mask.size:
+            return np.zeros(len(points), dtype=bool)
+        local = np.asarray(points, dtype=np.int64) - np.array(box[:2])
+        inside = (local[:, 0] >= 0) & (local[:, 1] >= 0) & (local[:, 0] < mask.shape[1]) & (local[:, 1] < mask.shape[0])
+        result = np.zeros(len(points), dtype=bool)
+        result[inside] = mask[local[inside, 1], local[inside, 0]]
+        return result
+
+
+def load_zones(camera=None):
+    """
+    Zona dari config.ZONES. Mode satu kamera (camera=None) memakai zona tanpa key "camera";
+    mode multi-kamera memakai zona tanpa "camera" ditambah zona milik kamera tersebut.
+    """
+    zones = []
+    for zone_config in config.ZONES:
+        zone_camera = zone_config.get("camera")
+        if zone_camera is None or (camera is not None and zone_camera == camera):
+            zones.append(Zone.from_config(zone_config))
+    return zones
+
+
+def detection_centers(detections):
+    return np.stack(((detections['x1'] + detections['x2']) // 2, (detections['y1'] + detections['y2']) // 2), axis=1)
+
+
+def zone_imgsz(crops):
+    """Ukuran input model untuk crop: sisi terpanjang dibulatkan ke kelipatan 32, maksimal imgsz frame penuh saat ini."""
+    longest = max(max(crop.shape[:2]) for crop in crops)
+    return min(preprocess.current_imgsz(), max(32, int(math.ceil(longest / 32) * 32)))
+
+
+# --- Inferensi Hanya pada Crop Zona ---
+def detect_in_zones_batch(frames, zone_lists, yolo_model=None):
+    """
+    Mendeteksi objek hanya di dalam zona untuk beberapa frame sekaligus. Semua crop zona
+    dari semua frame dijalankan dalam satu panggilan model dengan input sekecil crop terbesar.
+    Frame tanpa zona diinferensi penuh (panggilan terpisah karena ukuran input berbeda).
+    Mengembalikan list (deteksi gabungan, dict nama zona -> deteksi) per frame, koordinat frame asli.
+    Objek di area tumpang tindih dua zona ikut terhitung di kedua zona.
+    Melempar utils.InferenceError jika model gagal.
+    """
+    outputs = [None] * len(frames)
+    crops, crop_owners = [], []
+    full_frame_indices = []
+    for frame_index, (frame, zones) in enumerate(zip(frames, zone_lists)):
+        if not zones:
+            full_frame_indices.append(frame_index)
+            continue
+        for zone in zones:
+            x1, y1, x2, y2 = zone.crop_box(frame.shape)
+            if x2 > x1 and y2 > y1:
+                # Seperti frame penuh: grayscale/BGRA -> BGR, crop hitam/kosong tidak dikirim ke model (zona tanpa deteksi)
+                crop, _ = preprocess.prepare(frame[y1:y2, x1:x2])
+                if crop is not None:
+                    crops.append(crop)
+                    crop_owners.append((frame_index, zone, (x1, y1)))
+
+    if full_frame_indices:
+        full_detections = utils.detect_objects_batch([frames[i] for i in full_frame_indices], yolo_model)
+        for frame_index, detections in zip(full_frame_indices, full_detections):
+            outputs[frame_index] = (detections, None)
+
+    zone_results = {i: {zone.name: utils.empty_detections() for zone in zone_lists[i]} for i in range(len(frames)) if zone_lists[i]}
+    if crops:
+        try:
+            crop_outputs = utils.run_model(crops, yolo_model, imgsz=zone_imgsz(crops))
+        except Exception as e:
+            raise utils.InferenceError(f"Error saat menjalankan model YOLO pada crop zona: {e}") from e
+        for (frame_index, zone, (offset_x, offset_y)), output in zip(crop_owners, crop_outputs):
+            detections = utils.to_detection_array(output)
+            detections['x1'] += offset_x
+            detections['x2'] += offset_x
+            detections['y1'] += offset_y
+            detections['y2'] += offset_y
+            # Padding crop bisa memuat objek di luar poligon; hanya objek yang titik tengahnya di dalam zona dihitung
+            inside = zone.contains(detection_centers(detections), frames[frame_index].shape)
+            zone_results[frame_index][zone.name] = detections[inside]
+
+    for frame_index, zone_detections in zone_results.items():
+        merged = np.concatenate(list(zone_detections.values())) if zone_detections else utils.empty_detections()
+        outputs[frame_index] = (merged, zone_detections)
+    return outputs
+
+
+def detect_in_zones(frame, zones, yolo_model=None):
+    """Versi satu frame dari detect_in_zones_batch: (deteksi gabungan, dict zona -> deteksi)."""
+    return detect_in_zones_batch([frame], [zones], yolo_model)[0]
+
+
+def zone_counts(zone_detections):
+    return {name: utils.count_objects(detections) for name, detections in zone_detections.items()}
+
+
+def assign_events(events, zones, frame_shape):
+    """Mengelompokkan event tracker per zona berdasarkan titik tengah box (posisi baseline untuk objek hilang/dipindah)."""
+    grouped = {zone.name: [] for zone in zones}
+    for event in events:
+        box = event["baseline_bbox"] if event["baseline_bbox"] is not None else event["bbox"]
+        center = np.array([[(box[0] + box[2]) / 2, (box[1] + box[3]) / 2]])
+        for zone in zones:
+            if zone.contains(center, frame_shape)[0]:
+                grouped[zone.name].append(event)
+    return grouped
+
+
+# --- Baseline dan Timer Persistensi per Zona ---
+class ZoneMonitor:
+    """
+    Baseline jumlah objek, timer persistensi, dan detail perubahan untuk setiap zona.
+    Baseline disimpan di satu file JSON: {nama zona: {kelas: jumlah}}, ditulis BaselineWriter di
+    thread latar (file sementara + os.replace) seperti baseline jumlah.
+    """
+
+    def __init__(self, zones, state_file=None, writer=None):
+        self.zones = zones
+        self.state_file = state_file or config.ZONE_STATE_FILE
+        self.writer = writer or security_monitor.get_writer()
+        self.baselines = self._load()
+        self.change_start_time = {zone.name: None for zone in zones}
+        self.change_details = {zone.name: [] for zone in zones}
+        self.smoothers = {zone.name: CountSmoother() for zone in zones} if config.SMOOTHING_ENABLED else None
+        self.smoothed_counts = {zone.name: {} for zone in zones}
+
+    def _load(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as f:
+                try:
+                    return json.load(f)
+                except json.JSONDecodeError:
+                    print(f"Peringatan: File {self.state_file} rusak. Baseline zona dimulai kosong.")
+        return {}
+
+    def set_baseline(self, counts_by_zone):
+        self.baselines = {name: dict(counts) for name, counts in counts_by_zone.items()}
+        self.writer.save(self.state_file, {name: dict(counts) for name, counts in self.baselines.items()}) # Tidak menunggu disk
+        self.reset_timers()
+
+    def is_baseline_set(self):
+        return any(self.baselines.values())
+
+    def reset_timers(self):
+        for zone in self.zones:
+            self.change_start_time[zone.name] = None
+            self.change_details[zone.name] = []
+        if self.smoothers is not None:
+            for smoother in self.smoothers.values():
+                smoother.reset()
+
+    def smooth(self, counts_by_zone):
+        """Memasukkan jumlah per zona dari satu hasil deteksi ke filter smoothing. Dipanggil langsung saat monitoring mati."""
+        for zone in self.zones:
+            counts = counts_by_zone.get(zone.name, {})
+            self.smoothed_counts[zone.name] = self.smoothers[zone.name].update(counts, self.baselines.get(zone.name, {})) if self.smoothers is not None else counts
+
+    def update(self, counts_by_zone, timestamp, events_by_zone=None):
+        """
+        Memperbarui detail perubahan dan timer setiap zona dengan satu hasil deteksi.
+        `counts_by_zone` dibandingkan setelah dihaluskan (lihat smooth()).
+        Jika `events_by_zone` (event tracker per zona) diberikan, perubahan dinilai per ID objek.
+        Mengembalikan nama zona yang perubahannya baru saja melewati ALARM_PERSISTENCE_THRESHOLD.
+        """
+        self.smooth(counts_by_zone)
+        triggered = []
+        for zone in self.zones:
+            name = zone.name
+            if events_by_zone is not None:
+                details = tracker.describe_events(events_by_zone.get(name, []), utils.get_class_names())
+            else:
+                details = utils.compare_with_baseline(self.baselines.get(name, {}), self.smoothed_counts[name])
+            self.change_details[name] = details
+
+            if not details:
+                self.change_start_time[name] = None
+            elif self.change_start_time[name] is None:
+                self.change_start_time[name] = timestamp
+            elif (timestamp - self.change_start_time[name]) > config.ALARM_PERSISTENCE_THRESHOLD:
+                self.change_start_time[name] = None
+                triggered.append(name)
+        return triggered
+
+    def details_text(self, zone_names=None):
+        """Detail perubahan dengan nama zona, misal ['rak_1: cup hilang (2 -> 1)']."""
+        names = zone_names if zone_names is not None else [zone.name for zone in self.zones]
+        return [f"{name}: {detail}" for name in names for detail in self.change_details[name]]
+
+
+# --- Menggambar Zona ---
+def draw_zones(frame_to_draw, zones, zone_monitor=None):
+    """Garis batas zona beserta namanya. Zona dengan perubahan digambar merah."""
+    for zone in zones:
+        changed = zone_monitor is not None and zone_monitor.change_details.get(zone.name)
+        color = (0, 0, 255) if changed else (255, 128, 0)
+        cv2.polylines(frame_to_draw, [zone.points], True, color, 2)
+        x, y = zone.points.min(axis=0)
+        cv2.putText(frame_to_draw, zone.name, (int(x) + 4, int(y) + 18), cv2.FONT_HERSHEY_SIMPLEX, 0.55, color, 2)